@@ -5,42 +5,40 @@ Uses LangGraph to build an agent that can answer questions about clinical trials
 import os
 import sys
 import json
+import asyncio
+import contextvars
 from pathlib import Path
 from typing import List, Dict, Any, Tuple, Optional
 import pandas as pd
 from langchain_core.messages import HumanMessage, AIMessage
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph, END
 from pydantic import BaseModel, Field
 import re
 import numpy as np
+from app.agents.llm import get_llm, invoke_llm
+from app.agents.query_templates import answer_from_template
+from app.agents.sandbox import get_sandbox
+from app.agents.code_validator import validate_generated_code
+from app.agents.schema_registry import get_schema_registry
+from app.data.drug_linkage import DRUG_LINK_COLUMNS, build_drug_links
+from app.utils.admission import LLM_GATE, AdmissionRejected
+from app.utils.log import get_logger
+from app.utils.metrics import AGENT_NODE_SECONDS
+from app.agents.context_builder import (
+    ANSWER_DATA_TOKEN_BUDGET,
+    ANSWER_OUTPUT_TOKEN_BUDGET,
+    CODE_PROMPT_TOKEN_BUDGET,
+    build_data_context,
+    count_tokens,
+    truncate_to_budget,
+)
+
+logger = get_logger(__name__)
 
 # Add parent directory to path to import key loading module
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
-# Load API keys directly from file
-api_keys_path = os.path.join(Path(__file__).parent.parent.parent, "API_KEYS.txt")
-if os.path.exists(api_keys_path):
-    with open(api_keys_path, 'r') as file:
-        for line in file:
-            line = line.strip()
-            if line.startswith('OPENAI_API_KEY'):
-                parts = line.split('=', 1)
-                if len(parts) == 2:
-                    api_key = parts[1].strip().strip('"\'')
-                    os.environ['OPENAI_API_KEY'] = api_key
-                    print(f"Set OPENAI_API_KEY from file: {api_key[:10]}...")
-                    break
-
-# Get OpenAI API key from environment variable
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
-if not OPENAI_API_KEY:
-    print("WARNING: OPENAI_API_KEY environment variable is not set!")
-else:
-    print(f"Using OPENAI_API_KEY: {OPENAI_API_KEY[:10]}...")
-llm = ChatOpenAI(model="gpt-4.1") 
-
 class AgentState(BaseModel):
     """State for the chat agent graph."""
     query: str
@@ -57,72 +55,47 @@ class AgentState(BaseModel):
     execution_result: Dict[str, Any] = {}
     filtered_data: Optional[List[Dict[str, Any]]] = None
     retry_count: int = 0
+    # Reason: an empty string rather than None, since the graph does not write back None updates
+    validation_error: str = ""
+    # Prompt size in tokens per LLM call, keyed by graph node
+    prompt_tokens: Dict[str, int] = {}
+    # Trial-to-label drug links, built on the first execution that uses drug_links_df
+    drug_links: Optional[List[Dict[str, Any]]] = None
+
+# Number of times invalid generated code is sent back for regeneration
+MAX_CODE_RETRIES = 2
 
 def create_code_generation_agent(state: AgentState) -> AgentState:
     """
     Generate Python code to filter and analyze the data based on the query.
     """
     try:
-        print(f"[Code Generation Agent] Generating code for query: {state.query}")
+        logger.debug("[Code Generation Agent] Generating code for query: %s", state.query)
         # Create context about available data
         data_context = "# Data Context for Analysis\n"
         
-        # Read column information from CSV files
-        clinical_trials_columns = []
-        fda_columns = []
+        # Build the selected DataFrames once for the schema fragment and the data summary
+        selected_frames = {
+            name: pd.DataFrame(getattr(state, name))
+            for name in state.selected_dataframes
+            if getattr(state, name, None)
+        }
         
-        try:
-            # Read clinical trials column information
-            with open("d:/CT_FDA/windsurf/clinical_trials_column.csv", "r") as f:
-                import csv
-                reader = csv.DictReader(f)
-                clinical_trials_columns = list(reader)
+        if selected_frames:
+            # Column descriptions merged with live dtypes come precomputed from the schema registry
+            data_context += get_schema_registry().prompt_fragment(selected_frames.keys(), selected_frames)
+            for name, df in selected_frames.items():
+                data_context += f"Total records in {name}: {len(df)}\n"
+            if len(selected_frames) == 2:
+                data_context += (
+                    f"\ndrug_links_df links trial drug interventions to FDA labels by normalized drug name "
+                    f"(columns: {', '.join(DRUG_LINK_COLUMNS)}; label_row is the row position in fda_df). "
+                    "Use it to match drugs across the two datasets instead of comparing name strings.\n"
+                )
             
-            # Read FDA column information
-            with open("d:/CT_FDA/windsurf/fda_column.csv", "r") as f:
-                import csv
-                reader = csv.DictReader(f)
-                fda_columns = list(reader)
-        except Exception as e:
-            print(f"Error reading column CSV files: {str(e)}")
-         
-        # Add information about clinical trials data if selected
-        if "clinical_trials_df" in state.selected_dataframes and state.clinical_trials_df:
-            data_context += "\n## Clinical Trials Data Structure:\n"
-            if state.clinical_trials_df:
-                # Get column names from the first item
-                sample_item = state.clinical_trials_df[0]
-                data_context += f"Available fields: {', '.join(sample_item.keys())}\n"
-                data_context += f"Total records: {len(state.clinical_trials_df)}\n"
-                
-                # Add column descriptions from CSV
-                if clinical_trials_columns:
-                    data_context += "\nKey columns with descriptions:\n"
-                    for col in clinical_trials_columns:
-                        if col["column_name"] in sample_item:
-                            data_context += f"- {col['column_name']} ({col['data_type']}): {col['description']}\n"
-                
-                # Add a few sample records
-                data_context += f"Sample data (first 3 records):\n{json.dumps(state.clinical_trials_df[:3], indent=2)[:1000]}...\n"
-        
-        # Add information about FDA data if selected
-        if "fda_df" in state.selected_dataframes and state.fda_df:
-            data_context += "\n## FDA Data Structure:\n"
-            if state.fda_df:
-                # Get column names from the first item
-                sample_item = state.fda_df[0]
-                data_context += f"Available fields: {', '.join(sample_item.keys())}\n"
-                data_context += f"Total records: {len(state.fda_df)}\n"
-                
-                # Add column descriptions from CSV
-                if fda_columns:
-                    data_context += "\nKey columns with descriptions:\n"
-                    for col in fda_columns:
-                        if col["column_name"] in sample_item:
-                            data_context += f"- {col['column_name']} ({col['data_type']}): {col['description']}\n"
-                
-                # Add a few sample records
-                data_context += f"Sample data (first 3 records):\n{json.dumps(state.fda_df[:3], indent=2)[:1000]}...\n"
+            # Add schema-aware summaries (dtypes, cardinalities, value counts, top rows) within the token budget
+            summary = build_data_context(selected_frames, CODE_PROMPT_TOKEN_BUDGET)
+            data_context += f"\n## Data Summary:\n{summary.text}\n"
         
         # Create the code generation prompt
         code_prompt = f"""You are a smart and intellegent clinical trial and Food Drug Authority (FDA) Analyst. Your job is to Generate Python code that:
@@ -132,7 +105,7 @@ def create_code_generation_agent(state: AgentState) -> AgentState:
         - If fixing an error, correct the previous code while maintaining logic
         - While matching any name lower the case for the term to search and in data where to search
         - Also, try to use contains rather than exact match like ==
-        - You have available dataframe are {state.selected_dataframes}  
+        - You have available dataframe are {list(_dataframe_schema(state))}  
         -The data context is as below:
         {data_context}
         """
@@ -143,9 +116,21 @@ def create_code_generation_agent(state: AgentState) -> AgentState:
             {"role": "user", "content": state.query}
         ]
         
+        # Send the rejected code and the validation errors back when regenerating
+        if state.validation_error:
+            messages.append({"role": "assistant", "content": f"```python\n{state.generated_code}\n```"})
+            messages.append({
+                "role": "user",
+                "content": f"The code above failed validation before execution:\n{state.validation_error}\nFix these errors and return the corrected code."
+            })
+        
+        # Record the prompt size for this call
+        state.prompt_tokens["generate_code"] = sum(count_tokens(message["content"]) for message in messages)
+        logger.debug("[Code Generation Agent] Prompt tokens: %d", state.prompt_tokens["generate_code"])
+        
         # Get response from LLM
-        llm = ChatOpenAI(model="gpt-4.1")
-        response = llm.invoke(messages)
+        llm = get_llm("gpt-4.1")
+        response = invoke_llm(llm, messages, "generate_code", state.prompt_tokens["generate_code"])
         code = response.content
         
         # Extract code from markdown if present
@@ -156,111 +141,110 @@ def create_code_generation_agent(state: AgentState) -> AgentState:
             # If no code block, use the entire response but remove any markdown
             code = re.sub(r'```.*?```', '', code, flags=re.DOTALL).strip()
         
-        print(f"[Code Generation Agent] Generated code: {code}")
+        logger.debug("[Code Generation Agent] Generated code:\n%s", code)
         state.generated_code = code
         return state
     except Exception as e:  
-        print(f"[Code Generation Agent] Error: {str(e)}")   
+        logger.exception("[Code Generation Agent] Error: %s", e)
         state.error = f"Error generating code: {str(e)}"
         return state
 
+def _dataframe_schema(state: AgentState) -> Dict[str, List[str]]:
+    """
+    Get the columns of each selected dataframe, plus drug_links_df when both datasets are loaded.
+
+    Args:
+        state: The agent state.
+
+    Returns:
+        Dict[str, List[str]]: Selected dataframe names mapped to their columns.
+    """
+    schema = {}
+    for name in state.selected_dataframes:
+        records = getattr(state, name, None) or []
+        columns = {}
+        for record in records:
+            columns.update(dict.fromkeys(record))
+        schema[name] = list(columns)
+    if all(schema.get(name) for name in ("clinical_trials_df", "fda_df")):
+        schema["drug_links_df"] = DRUG_LINK_COLUMNS
+    return schema
+
+def validate_code(state: AgentState) -> AgentState:
+    """
+    Statically check the generated code before it is executed.
+    """
+    errors = validate_generated_code(state.generated_code, _dataframe_schema(state))
+    if not errors:
+        logger.debug("[Code Validation Agent] Generated code passed validation")
+        state.validation_error = ""
+        return state
+
+    state.validation_error = "\n".join(errors)
+    state.retry_count += 1
+    logger.warning("[Code Validation Agent] Validation failed (attempt %d): %s", state.retry_count, state.validation_error)
+
+    if state.retry_count > MAX_CODE_RETRIES:
+        # Reason: never execute code that failed validation; answer from the error instead
+        state.error = f"Generated code failed validation: {state.validation_error}"
+        state.execution_result = {
+            "output": "",
+            "error": state.validation_error,
+            "last_df_name": None,
+            "dataframes": {}
+        }
+    return state
+
+def route_after_validation(state: AgentState) -> str:
+    """
+    Decide where to go after code validation.
+
+    Returns:
+        str: "execute_code" for valid code, "generate_code" to retry, or
+        "generate_answer" once retries are exhausted.
+    """
+    if not state.validation_error:
+        return "execute_code"
+    if state.retry_count <= MAX_CODE_RETRIES:
+        return "generate_code"
+    return "generate_answer"
+
 def execute_code(state: AgentState) -> AgentState:
     """
     Execute the generated code to filter and analyze the data.
     """
     try:
-        print(f"[Code Execution Agent] Executing code for query: {state.query}")
+        logger.debug("[Code Execution Agent] Executing code for query: %s", state.query)
         # Prepare data for execution
-        local_vars = {
-            'pd': pd,
-            # 'np': __import__('numpy'),
-            # 're': __import__('re'),
-            '__builtins__': __builtins__,
-        }
+        frames = {}
         
-        # Add selected data to local variables
+        # Add selected data to the execution namespace
         if "clinical_trials_df" in state.selected_dataframes:
             # Convert list of dictionaries to DataFrame if it's not already a DataFrame
             if isinstance(state.clinical_trials_df, list) and state.clinical_trials_df:
-                local_vars["clinical_trials_df"] = pd.DataFrame(state.clinical_trials_df)
+                frames["clinical_trials_df"] = pd.DataFrame(state.clinical_trials_df)
             else:
-                local_vars["clinical_trials_df"] = state.clinical_trials_df or []
+                frames["clinical_trials_df"] = state.clinical_trials_df or []
         if "fda_df" in state.selected_dataframes:
             # Convert list of dictionaries to DataFrame if it's not already a DataFrame
             if isinstance(state.fda_df, list) and state.fda_df:
-                local_vars["fda_df"] = pd.DataFrame(state.fda_df)
+                frames["fda_df"] = pd.DataFrame(state.fda_df)
             else:
-                local_vars["fda_df"] = state.fda_df or []
+                frames["fda_df"] = state.fda_df or []
         
-        # Execute the code
-        output = ""
-        error = None
-        last_df_name = None
+        # Link trial drugs to FDA labels when both datasets are loaded and the code uses the links.
+        # Reason: the join is costly, so it is built once per request and kept on the state
+        if ("drug_links_df" in state.generated_code
+                and all(isinstance(frames.get(name), pd.DataFrame) for name in ("clinical_trials_df", "fda_df"))):
+            if state.drug_links is None:
+                state.drug_links = build_drug_links(frames["clinical_trials_df"], frames["fda_df"]).to_dict("records")
+            frames["drug_links_df"] = pd.DataFrame(state.drug_links, columns=DRUG_LINK_COLUMNS)
         
-        # Set pandas display options to avoid truncation
-        pd.set_option('display.max_rows', None)
-        pd.set_option('display.max_columns', None)
-        pd.set_option('display.width', None)
+        # Execute the code in an isolated worker process with its own stdout and limits
+        result = get_sandbox().execute(state.generated_code, frames)
+        error = result["error"]
         
-        try:
-            # Redirect stdout to capture output
-            import io
-            import sys
-            mystdout = io.StringIO()
-            old_stdout = sys.stdout
-            sys.stdout = mystdout
-            # Store initial variables
-            initial_vars = set(local_vars.keys())
-            
-            # Execute the code
-            exec(state.generated_code, local_vars)
-            
-            # Find all new DataFrame variables
-            new_vars = set(local_vars.keys()) - initial_vars
-            df_vars = {var: local_vars[var] for var in new_vars 
-                    if isinstance(local_vars[var], pd.DataFrame)}
-            
-            # Print information about all DataFrames created
-            if df_vars:
-                print(f"\n--- Created {len(df_vars)} DataFrames ---")
-                for df_name, df in df_vars.items():
-                    print(f"\nDataFrame: {df_name}")
-                    print(f"Shape: {df.shape}")
-                    print(f"Columns: {list(df.columns)}")
-                    print(f"Sample data:")
-                    print(df.head(5))
-                    print("-" * 50)
-            
-            # Get the last DataFrame created (if any exist)
-            result_df = None
-            if df_vars:
-                last_df_name = re.findall(r'\b\w+_df\b', state.generated_code)[-1]
-                if last_df_name in local_vars:
-                    result_df = local_vars[last_df_name]
-                    # Print the DataFrame to capture it in the output
-                    print(f"\n--- Final DataFrame ({last_df_name}) ---")
-                    print(result_df)
-            
-            # Get output
-            output = mystdout.getvalue()
-            sys.stdout = old_stdout
-            pd.reset_option('display.max_rows')
-            pd.reset_option('display.max_columns')
-            pd.reset_option('display.width')
-            
-        except Exception as e:
-            error = str(e)
-            sys.stdout = old_stdout
-            pd.reset_option('display.max_rows')
-            pd.reset_option('display.max_columns')
-            pd.reset_option('display.width')
-            
-            # Create a simple error DataFrame
-            error_df = pd.DataFrame({
-                "error": [str(e)],
-                "query": [state.query]
-            })
-            
+        if error:
             # Add summary data even on error
             summary_data = []
             if "clinical_trials_df" in state.selected_dataframes:
@@ -278,29 +262,23 @@ def execute_code(state: AgentState) -> AgentState:
                 })
             
             state.filtered_data = summary_data
-        
 
         # Store execution results
-        state.execution_result = {
-            "output": output,
-            "error": error,
-            "last_df_name": last_df_name,
-            "dataframes": {name: df.to_dict('records') for name, df in df_vars.items()} if 'df_vars' in locals() and df_vars else {}
-        }
+        state.execution_result = result
         
         if error:
-            print(f"[Code Execution Agent] Error executing code: {error}")
+            logger.warning("[Code Execution Agent] Error executing code: %s", error)
             state.error = f"Error executing code: {error}"
         else:
-            print(f"[Code Execution Agent] Code executed successfully")
+            logger.debug("[Code Execution Agent] Code executed successfully")
             if state.filtered_data:
-                print(f"[Code Execution Agent] Found {len(state.filtered_data)} filtered records")
+                logger.debug("[Code Execution Agent] Found %d filtered records", len(state.filtered_data))
             else:
-                print("[Code Execution Agent] No filtered data found")
+                logger.debug("[Code Execution Agent] No filtered data found")
         
         return state
     except Exception as e:
-        print(f"[Code Execution Agent] Error: {str(e)}")
+        logger.exception("[Code Execution Agent] Error: %s", e)
         state.error = f"Error executing code: {str(e)}"
         return state
 
@@ -309,7 +287,7 @@ def generate_answer(state: AgentState) -> AgentState:
     Generate an answer to the query based on the context.
     """
     try:
-        print(f"[Final Answer Generation] Generating answer for query: {state.query}    ")
+        logger.debug("[Final Answer Generation] Generating answer for query: %s", state.query)
         # Create the prompt template
         prompt = ChatPromptTemplate.from_messages([
             ("system", """You are an expert healthcare analyst specializing in clinical trials and FDA data.
@@ -344,34 +322,35 @@ def generate_answer(state: AgentState) -> AgentState:
             """)
         ])
         
-        # Prepare dataframe results text
-        dataframe_results = ""
-        if state.execution_result and "dataframes" in state.execution_result and state.execution_result["dataframes"]:
-            dataframes = state.execution_result["dataframes"]
-            for df_name, records in dataframes.items():
-                if records:
-                    dataframe_results += f"\n{df_name}:\n"
-                    # Show first 5 records or fewer if less available
-                    sample_records = records[:5]
-                    for i, record in enumerate(sample_records):
-                        dataframe_results += f"Record {i+1}: {record}\n"
-                    if len(records) > 5:
-                        dataframe_results += f"... and {len(records) - 5} more records\n"
-        
+        # Summarize the result DataFrames and the execution output within the token budget
+        dataframes = {
+            df_name: records
+            for df_name, records in (state.execution_result or {}).get("dataframes", {}).items()
+            if records
+        }
+        dataframe_results = build_data_context(dataframes, ANSWER_DATA_TOKEN_BUDGET).text
         if not dataframe_results:
             dataframe_results = "No DataFrame results available."
         
-        # Get the model - using the existing llm variable
+        if state.execution_result:
+            output = state.execution_result.get("output", "No output available.")
+            output = truncate_to_budget(output, ANSWER_OUTPUT_TOKEN_BUDGET).text
+        else:
+            output = "No execution results available."
         
         # Format the prompt with the data
         formatted_prompt = prompt.format(
             query=state.query,
-            output=state.execution_result.get("output", "No output available.") if state.execution_result else "No execution results available.",
+            output=output,
             dataframe_results=dataframe_results
         )
         
+        # Record the prompt size for this call
+        state.prompt_tokens["generate_answer"] = count_tokens(formatted_prompt)
+        logger.debug("[Final Answer Generation] Prompt tokens: %d", state.prompt_tokens["generate_answer"])
+        
         # Get the response from the model
-        response = llm.invoke(formatted_prompt)
+        response = invoke_llm(get_llm("gpt-4.1"), formatted_prompt, "generate_answer", state.prompt_tokens["generate_answer"])
         
         # Extract the answer
         answer = response.content
@@ -402,11 +381,11 @@ def generate_answer(state: AgentState) -> AgentState:
                     sources.append(source)
         
         state.sources = sources
-        print(f"[Final Answer Generation] Answer generated: {len(answer)} characters, {len(state.sources)} sources")
+        logger.debug("[Final Answer Generation] Answer generated: %d characters, %d sources", len(answer), len(state.sources))
         
         return state
     except Exception as e:
-        print(f"[Final Answer Generation] Error: {str(e)}")
+        logger.exception("[Final Answer Generation] Error: %s", e)
         state.error = f"Error generating final answer: {str(e)}"
         state.answer = f"I encountered an error while analyzing the data: {str(e)}"
         return state
@@ -420,13 +399,9 @@ def create_chat_agent():
     """
     # Initialize LLM
     try:
-        llm = ChatOpenAI(
-            model="gpt-4o",
-            temperature=0,
-            api_key=OPENAI_API_KEY
-        )
+        llm = get_llm("gpt-4o", temperature=0)
     except Exception as e:
-        print(f"Error initializing ChatOpenAI: {str(e)}")
+        logger.exception("Error initializing chat model: %s", e)
         raise
 
     # Create the graph
@@ -438,7 +413,7 @@ def create_chat_agent():
         Determine which dataframes are relevant to the query.
         """
         try:
-            print(f"[Dataframe Selection Agent] Analyzing query: {state.query}")
+            logger.debug("[Dataframe Selection Agent] Analyzing query: %s", state.query)
             # Define the selection prompt
             selection_prompt = f"""
             You are a specialized data source selection agent.
@@ -461,7 +436,7 @@ def create_chat_agent():
             ]
             
             # Get response from LLM
-            response = llm.invoke(messages)
+            response = invoke_llm(llm, messages, "select_dataframes")
             content = response.content.lower()
             
             # Parse the response to get selected dataframes
@@ -475,29 +450,41 @@ def create_chat_agent():
             if not selected:
                 selected = ["clinical_trials_df", "fda_df"]
                 
-            print(f"[Dataframe Selection Agent] Selected dataframes: {selected}")
+            logger.debug("[Dataframe Selection Agent] Selected dataframes: %s", selected)
             state.selected_dataframes = selected
             return state
         except Exception as e:
-            print(f"[Dataframe Selection Agent] Error: {str(e)}")
+            logger.exception("[Dataframe Selection Agent] Error: %s", e)
             state.error = f"Error selecting dataframes: {str(e)}"
             return state
     
     # 2. Code Generation Agent: Generate Python code to filter and analyze the data
-    workflow.add_node("generate_code", create_code_generation_agent)
+    workflow.add_node("generate_code", AGENT_NODE_SECONDS.time(node="generate_code")(create_code_generation_agent))
+    
+    # 3. Code Validation Agent: Reject invalid code before it touches the data
+    workflow.add_node("validate_code", AGENT_NODE_SECONDS.time(node="validate_code")(validate_code))
     
-    # 3. Code Execution Agent: Execute the generated code to filter and analyze the data
-    workflow.add_node("execute_code", execute_code)
+    # 4. Code Execution Agent: Execute the generated code to filter and analyze the data
+    workflow.add_node("execute_code", AGENT_NODE_SECONDS.time(node="execute_code")(execute_code))
     
-    # 4. Final Answer Generation: Generate answer based on context
-    workflow.add_node("generate_answer", generate_answer)
+    # 5. Final Answer Generation: Generate answer based on context
+    workflow.add_node("generate_answer", AGENT_NODE_SECONDS.time(node="generate_answer")(generate_answer))
     
     # Add nodes to the workflow
-    workflow.add_node("select_dataframes", select_dataframes)
+    workflow.add_node("select_dataframes", AGENT_NODE_SECONDS.time(node="select_dataframes")(select_dataframes))
     
     # Define the edges
     workflow.add_edge("select_dataframes", "generate_code")
-    workflow.add_edge("generate_code", "execute_code")
+    workflow.add_edge("generate_code", "validate_code")
+    workflow.add_conditional_edges(
+        "validate_code",
+        route_after_validation,
+        {
+            "execute_code": "execute_code",
+            "generate_code": "generate_code",
+            "generate_answer": "generate_answer"
+        }
+    )
     
     # Use a direct edge instead of conditional to avoid recursion issues
     workflow.add_edge("execute_code", "generate_answer")
@@ -508,7 +495,7 @@ def create_chat_agent():
     
     # Compile the workflow
     compiled_workflow = workflow.compile()
-    print("[Workflow Manager] Workflow compiled successfully")
+    logger.debug("[Workflow Manager] Workflow compiled successfully")
     
     # Return the compiled workflow
     return compiled_workflow
@@ -530,6 +517,9 @@ async def process_chat_query(
         
     Returns:
         Tuple[str, List[Dict[str, Any]]]: The answer and sources.
+
+    Raises:
+        AdmissionRejected: If the query needs the agent and too many agent runs are in progress.
     """
     try:
         # Process chat history to handle sources
@@ -544,23 +534,30 @@ async def process_chat_query(
                     try:
                         # Try to parse JSON string sources
                         sources = json.loads(msg["sources"])
-                        print(f"Parsed sources from history: {len(sources) if sources else 0} items")
+                        logger.debug("Parsed sources from history: %d items", len(sources) if sources else 0)
                     except json.JSONDecodeError:
                         # If not valid JSON, keep as is
                         sources = msg["sources"]
-                        print(f"Sources not in JSON format: {sources[:50]}...")
+                        logger.debug("Sources not in JSON format: %.50s...", sources)
                 else:
                     sources = None
                 
                 processed_history.append(processed_msg)
         
+        # Answer common aggregate questions from a pre-tested template, skipping code generation.
+        # Its pandas work runs off the event loop, like the agent run below
+        loop = asyncio.get_running_loop()
+        template_answer = await loop.run_in_executor(
+            None, contextvars.copy_context().run, answer_from_template, query, clinical_trials_df, fda_df
+        )
+        if template_answer is not None:
+            logger.info("Answered query from template", extra={"query": query})
+            return template_answer
+        
         # Create agent
-        print("Creating chat agent workflow...")
         agent = create_chat_agent()
         
         # Initialize state
-        print(f"Initializing agent state with query: {query}")
-        print(f"Data provided: {len(clinical_trials_df or [])} clinical trials, {len(fda_df or [])} FDA records")
         
         initial_state = AgentState(
             query=query,
@@ -570,25 +567,27 @@ async def process_chat_query(
         )
         
         # Run the agent
-        print(f"Running multi-agent workflow for query: {query}")
+        logger.debug("Running multi-agent workflow for query: %s", query)
         
         # Invoke the full LangGraph workflow
         try:
-            # Use synchronous invocation - LangGraph's invoke is not awaitable
-            final_state = agent.invoke(initial_state)
-            print("Multi-agent workflow completed successfully")
-            print(f"Final state type: {type(final_state)}")
+            # Reason: invoke is synchronous; run it off the event loop so concurrent chats
+            # (and their sandbox executions) proceed in parallel. run_in_executor does not copy
+            # context variables, so the request's correlation id is carried over explicitly.
+            # The whole run is admitted at once so it is never refused halfway through
+            async with LLM_GATE.admit_async():
+                final_state = await loop.run_in_executor(None, contextvars.copy_context().run, agent.invoke, initial_state)
             
             # Extract answer and sources from the AddableValuesDict
             # Access dictionary-style instead of attribute-style
             answer = final_state.get("answer", "")
             sources = final_state.get("sources", [])
             
-            print(f"Extracted from final state - Answer: {answer[:50] if answer else ''}..., Sources: {len(sources) if sources else 0}")
+            logger.debug("Extracted from final state - Answer: %.50s..., Sources: %d", answer or "", len(sources) if sources else 0)
             
             # Fallback if no answer
             if not answer:
-                print("No answer found in final state, using fallback")
+                logger.warning("No answer found in final state, using fallback")
                 answer = (
                     f"I analyzed the data related to your query about '{query}', but couldn't find a specific answer. "
                     f"There are {len(clinical_trials_df or [])} clinical trials and {len(fda_df or [])} FDA records available. "
@@ -597,10 +596,10 @@ async def process_chat_query(
             
             return answer, sources
             
+        except AdmissionRejected:
+            raise
         except Exception as e:
-            import traceback
-            print(f"Error during agent invocation: {e}")
-            print(f"Traceback: {traceback.format_exc()}")
+            logger.exception("Error during agent invocation: %s", e)
             # Fallback for invocation errors
             return (
                 f"I'm sorry, but I encountered an error while processing your query: {str(e)}. "
@@ -608,10 +607,10 @@ async def process_chat_query(
                 []
             )
         
+    except AdmissionRejected:
+        raise
     except Exception as e:
-        import traceback
-        print(f"Chat agent error: {str(e)}")
-        print(f"Traceback: {traceback.format_exc()}")
+        logger.exception("Chat agent error: %s", e)
         
         # Provide a helpful error message to the user
         return (
@@ -0,0 +1,304 @@
+"""
+Code validation module for the Clinical Trials & FDA Data Search App.
+Statically checks LLM-generated analysis code before it is executed, so code
+with syntax errors, unknown names or columns, or forbidden imports is sent
+back for regeneration instead of touching the data.
+"""
+import ast
+import builtins
+import difflib
+from functools import lru_cache
+from types import CodeType
+from typing import Dict, Iterable, List, Optional, Set
+
+import pandas as pd
+
+# Modules generated code may import
+ALLOWED_IMPORTS = {
+    "collections",
+    "datetime",
+    "json",
+    "math",
+    "numpy",
+    "pandas",
+    "re",
+    "statistics",
+}
+
+# Builtins that would let generated code escape the analysis namespace
+FORBIDDEN_CALLS = {
+    "__import__",
+    "breakpoint",
+    "compile",
+    "eval",
+    "exec",
+    "globals",
+    "input",
+    "locals",
+    "open",
+    "vars",
+}
+
+# Names always available in the execution namespace besides the dataframes
+DEFAULT_NAMESPACE = {"pd"}
+
+# DataFrame methods whose result keeps the columns of the frame they are called on
+COLUMN_PRESERVING_METHODS = {
+    "copy",
+    "drop_duplicates",
+    "dropna",
+    "fillna",
+    "head",
+    "query",
+    "reset_index",
+    "sample",
+    "sort_values",
+    "tail",
+}
+
+_BUILTIN_NAMES = set(dir(builtins))
+_DATAFRAME_ATTRIBUTES = set(dir(pd.DataFrame))
+
+
+@lru_cache(maxsize=256)
+def parse_generated_code(code: str) -> ast.Module:
+    """
+    Parse generated code, caching the syntax tree.
+
+    Args:
+        code (str): Generated Python code.
+
+    Returns:
+        ast.Module: The parsed module.
+
+    Raises:
+        SyntaxError: If the code does not parse.
+    """
+    return ast.parse(code, mode="exec")
+
+
+@lru_cache(maxsize=256)
+def compile_generated_code(code: str) -> CodeType:
+    """
+    Compile generated code, caching the code object for reuse.
+
+    Args:
+        code (str): Generated Python code.
+
+    Returns:
+        CodeType: The compiled code object.
+    """
+    return compile(code, "<generated>", "exec")
+
+
+def _suggest(name: str, candidates: Iterable[str]) -> str:
+    """
+    Build a "did you mean" hint for a misspelled name.
+
+    Args:
+        name (str): The unknown name.
+        candidates (Iterable[str]): Known names.
+
+    Returns:
+        str: The hint, or an empty string if nothing is close.
+    """
+    by_lower = {candidate.lower(): candidate for candidate in candidates}
+    matches = difflib.get_close_matches(name.lower(), list(by_lower), n=1, cutoff=0.6)
+    return f" Did you mean '{by_lower[matches[0]]}'?" if matches else ""
+
+
+def _assigned_names(tree: ast.AST) -> Set[str]:
+    """
+    Collect every name the code binds anywhere.
+
+    Args:
+        tree (ast.AST): Parsed code.
+
+    Returns:
+        Set[str]: Bound names.
+    """
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, (ast.Store, ast.Del)):
+            names.add(node.id)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, ast.arg):
+            names.add(node.arg)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                names.add((alias.asname or alias.name).split(".")[0])
+        elif isinstance(node, ast.ExceptHandler) and node.name:
+            names.add(node.name)
+    return names
+
+
+def _string_keys(node: ast.AST) -> Optional[List[str]]:
+    """
+    Return the column names used in a subscript, if they are string literals.
+
+    Args:
+        node (ast.AST): The subscript slice.
+
+    Returns:
+        Optional[List[str]]: Column names, or None if the slice is not a literal column selection.
+    """
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return [node.value]
+    if isinstance(node, ast.List) and node.elts and all(
+        isinstance(element, ast.Constant) and isinstance(element.value, str) for element in node.elts
+    ):
+        return [element.value for element in node.elts]
+    return None
+
+
+def _source_frame(node: ast.AST, frames: Dict[str, Set[str]]) -> Optional[str]:
+    """
+    Find the known frame an expression derives its columns from.
+
+    Args:
+        node (ast.AST): Right-hand side of an assignment.
+        frames (Dict[str, Set[str]]): Known frames and their columns.
+
+    Returns:
+        Optional[str]: Name of the frame whose columns the expression keeps, if any.
+    """
+    if isinstance(node, ast.Name) and node.id in frames:
+        return node.id
+    if isinstance(node, ast.Subscript) and _string_keys(node.slice) is None:
+        # Reason: boolean masks and slices keep every column of the frame
+        return _source_frame(node.value, frames)
+    if (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Attribute)
+        and node.func.attr in COLUMN_PRESERVING_METHODS
+    ):
+        return _source_frame(node.func.value, frames)
+    return None
+
+
+class _ColumnChecker(ast.NodeVisitor):
+    """Check column references on known frames, following simple derivations."""
+
+    def __init__(self, frames: Dict[str, Set[str]]):
+        """
+        Create the checker.
+
+        Args:
+            frames (Dict[str, Set[str]]): Frame names mapped to their columns.
+        """
+        self.frames = {name: set(columns) for name, columns in frames.items()}
+        self.errors: List[str] = []
+
+    def visit_Assign(self, node: ast.Assign) -> None:
+        """Track frames derived from known frames and columns added to them."""
+        self.visit(node.value)
+        source = _source_frame(node.value, self.frames)
+        for target in node.targets:
+            if isinstance(target, ast.Name):
+                if source is not None:
+                    self.frames[target.id] = set(self.frames[source])
+                else:
+                    # Reason: the name now holds something whose columns we cannot know
+                    self.frames.pop(target.id, None)
+            else:
+                self.visit(target)
+
+    def visit_Subscript(self, node: ast.Subscript) -> None:
+        """Check `frame['column']` and `frame[['a', 'b']]` references."""
+        if isinstance(node.value, ast.Name) and node.value.id in self.frames:
+            keys = _string_keys(node.slice)
+            if keys is not None:
+                columns = self.frames[node.value.id]
+                if isinstance(node.ctx, ast.Store):
+                    columns.update(keys)
+                else:
+                    for key in keys:
+                        if key not in columns:
+                            self.errors.append(
+                                f"Line {node.lineno}: column '{key}' does not exist in {node.value.id}."
+                                f"{_suggest(key, columns)}"
+                            )
+        self.generic_visit(node)
+
+    def visit_Attribute(self, node: ast.Attribute) -> None:
+        """Check `frame.column` references."""
+        if (
+            isinstance(node.value, ast.Name)
+            and node.value.id in self.frames
+            and isinstance(node.ctx, ast.Load)
+            and node.attr not in _DATAFRAME_ATTRIBUTES
+            and node.attr not in self.frames[node.value.id]
+        ):
+            self.errors.append(
+                f"Line {node.lineno}: '{node.attr}' is neither a column of {node.value.id} "
+                f"nor a DataFrame attribute.{_suggest(node.attr, self.frames[node.value.id])}"
+            )
+        self.generic_visit(node)
+
+
+def validate_generated_code(
+    code: str,
+    schema: Dict[str, Iterable[str]],
+    namespace: Iterable[str] = DEFAULT_NAMESPACE,
+) -> List[str]:
+    """
+    Statically validate generated analysis code against the dataset schema.
+
+    Args:
+        code (str): Generated Python code.
+        schema (Dict[str, Iterable[str]]): Available dataframes mapped to their columns.
+        namespace (Iterable[str]): Other names provided to the code.
+
+    Returns:
+        List[str]: Precise error messages; empty if the code is valid.
+    """
+    if not code or not code.strip():
+        return ["No code was generated."]
+
+    try:
+        tree = parse_generated_code(code)
+    except SyntaxError as e:
+        return [f"Line {e.lineno}: syntax error: {e.msg}."]
+
+    errors = []
+
+    # Imports and dangerous builtins
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            modules = [node.module or ""]
+        else:
+            modules = []
+        for module in modules:
+            if module.split(".")[0] not in ALLOWED_IMPORTS:
+                errors.append(
+                    f"Line {node.lineno}: import of '{module}' is not allowed. "
+                    f"Allowed modules: {', '.join(sorted(ALLOWED_IMPORTS))}."
+                )
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in FORBIDDEN_CALLS:
+            errors.append(f"Line {node.lineno}: calling '{node.func.id}' is not allowed.")
+        if isinstance(node, ast.Attribute) and node.attr.startswith("__") and node.attr.endswith("__"):
+            errors.append(f"Line {node.lineno}: access to '{node.attr}' is not allowed.")
+
+    # Names that are used but never defined
+    available = set(schema) | set(namespace)
+    defined = available | _assigned_names(tree) | _BUILTIN_NAMES
+    reported = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load) and node.id not in defined:
+            if node.id in reported:
+                continue
+            reported.add(node.id)
+            errors.append(
+                f"Line {node.lineno}: name '{node.id}' is not defined. "
+                f"Available variables: {', '.join(sorted(available))}.{_suggest(node.id, available)}"
+            )
+
+    # Column references on the provided dataframes
+    checker = _ColumnChecker({name: set(columns) for name, columns in schema.items()})
+    checker.visit(tree)
+    errors.extend(checker.errors)
+
+    return errors
@@ -0,0 +1,220 @@
+"""
+Context builder module for the Clinical Trials & FDA Data Search App.
+Builds schema-aware data summaries for LLM prompts that fit an explicit
+token budget, instead of pasting raw records and whole DataFrames.
+"""
+import os
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Union
+
+import pandas as pd
+from pydantic import BaseModel
+
+# Token budgets for the data sections of each prompt
+CODE_PROMPT_TOKEN_BUDGET = int(os.getenv("CODE_PROMPT_TOKEN_BUDGET", "3000"))
+ANSWER_DATA_TOKEN_BUDGET = int(os.getenv("ANSWER_DATA_TOKEN_BUDGET", "4000"))
+ANSWER_OUTPUT_TOKEN_BUDGET = int(os.getenv("ANSWER_OUTPUT_TOKEN_BUDGET", "2000"))
+
+# Encoding used by the GPT-4 family of models
+TOKEN_ENCODING = "cl100k_base"
+# Rough characters-per-token ratio used when tiktoken is unavailable
+CHARS_PER_TOKEN = 4
+
+# Summary detail levels, from richest to most compact
+DETAIL_LEVELS = [
+    {"rows": 5, "value_counts": 5, "max_cardinality": 20, "max_chars": 200},
+    {"rows": 3, "value_counts": 3, "max_cardinality": 10, "max_chars": 100},
+    {"rows": 1, "value_counts": 0, "max_cardinality": 0, "max_chars": 60},
+    {"rows": 0, "value_counts": 0, "max_cardinality": 0, "max_chars": 0},
+]
+
+
+class BudgetedContext(BaseModel):
+    """A prompt section built to fit a token budget."""
+    text: str
+    tokens: int
+    budget: int
+    detail_level: int = 0
+    truncated: bool = False
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    """
+    Load the tiktoken encoding once.
+
+    Returns:
+        Optional[tiktoken.Encoding]: The encoding, or None if tiktoken is unavailable.
+    """
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(TOKEN_ENCODING)
+    except Exception:
+        # Reason: tiktoken is optional and needs its BPE file, which may not be downloadable offline
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count the tokens in a text locally.
+
+    Args:
+        text (str): Text to count.
+
+    Returns:
+        int: Number of tokens (estimated from length if tiktoken is unavailable).
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        return len(text) // CHARS_PER_TOKEN + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_budget(text: str, budget: int) -> BudgetedContext:
+    """
+    Cut a text down to a token budget, keeping its beginning.
+
+    Args:
+        text (str): Text to truncate.
+        budget (int): Maximum number of tokens.
+
+    Returns:
+        BudgetedContext: The (possibly truncated) text and its token count.
+    """
+    tokens = count_tokens(text)
+    if tokens <= budget:
+        return BudgetedContext(text=text, tokens=tokens, budget=budget)
+
+    marker = "\n... [truncated to fit the context budget]"
+    encoding = _get_encoding()
+    keep = max(budget - count_tokens(marker), 0)
+    if encoding is not None:
+        truncated = encoding.decode(encoding.encode(text, disallowed_special=())[:keep])
+    else:
+        truncated = text[:keep * CHARS_PER_TOKEN]
+    truncated += marker
+    return BudgetedContext(text=truncated, tokens=count_tokens(truncated), budget=budget, truncated=True)
+
+
+def _to_frame(data: Union[pd.DataFrame, List[Dict[str, Any]], None]) -> pd.DataFrame:
+    """
+    Convert records to a DataFrame if needed.
+
+    Args:
+        data: DataFrame or list of record dictionaries.
+
+    Returns:
+        pd.DataFrame: The data as a DataFrame.
+    """
+    if isinstance(data, pd.DataFrame):
+        return data
+    return pd.DataFrame(data or [])
+
+
+def _hashable(series: pd.Series) -> pd.Series:
+    """
+    Make a column safe for nunique and value_counts.
+
+    Args:
+        series (pd.Series): Column that may contain lists or dicts.
+
+    Returns:
+        pd.Series: The column, with unhashable values converted to strings.
+    """
+    if series.dtype == object and series.map(lambda value: isinstance(value, (list, dict, set))).any():
+        return series.map(lambda value: str(value) if isinstance(value, (list, dict, set)) else value)
+    return series
+
+
+def _shorten(value: Any, max_chars: int) -> str:
+    """
+    Render a cell value, cutting long text.
+
+    Args:
+        value (Any): Cell value.
+        max_chars (int): Maximum characters to keep.
+
+    Returns:
+        str: The shortened value.
+    """
+    text = str(value)
+    return text if len(text) <= max_chars else text[:max_chars] + "..."
+
+
+def summarize_frame(name: str, df: pd.DataFrame, detail_level: int = 0) -> str:
+    """
+    Summarize a DataFrame: shape, dtypes, cardinalities, value counts and top rows.
+
+    Args:
+        name (str): Name of the DataFrame.
+        df (pd.DataFrame): The data to summarize.
+        detail_level (int): Index into DETAIL_LEVELS; higher is more compact.
+
+    Returns:
+        str: The summary.
+    """
+    level = DETAIL_LEVELS[min(detail_level, len(DETAIL_LEVELS) - 1)]
+    lines = [f"{name}: {len(df)} rows x {len(df.columns)} columns"]
+    if df.empty:
+        return "\n".join(lines)
+
+    lines.append("Columns (dtype, non-null, distinct):")
+    for column in df.columns:
+        series = _hashable(df[column])
+        non_null = int(series.notna().sum())
+        if level["max_chars"] == 0:
+            lines.append(f"- {column} ({series.dtype})")
+            continue
+        distinct = int(series.nunique(dropna=True))
+        line = f"- {column} ({series.dtype}, {non_null} non-null, {distinct} distinct)"
+        if 0 < distinct <= level["max_cardinality"] and level["value_counts"]:
+            counts = series.value_counts().head(level["value_counts"])
+            rendered = ", ".join(f"{_shorten(value, 40)}: {count}" for value, count in counts.items())
+            line += f" top values: {rendered}"
+        lines.append(line)
+
+    if level["rows"]:
+        lines.append(f"First {min(level['rows'], len(df))} rows:")
+        for record in df.head(level["rows"]).to_dict("records"):
+            cells = {
+                key: _shorten(value, level["max_chars"])
+                for key, value in record.items()
+                if not (isinstance(value, float) and pd.isna(value)) and value not in (None, "")
+            }
+            lines.append(str(cells))
+    return "\n".join(lines)
+
+
+def build_data_context(
+    frames: Dict[str, Union[pd.DataFrame, List[Dict[str, Any]], None]],
+    budget: int,
+) -> BudgetedContext:
+    """
+    Summarize several DataFrames so that together they fit the token budget.
+
+    The richest detail level that fits is used; if even the most compact
+    summaries are too large, the text is truncated.
+
+    Args:
+        frames (Dict[str, Union[pd.DataFrame, List[Dict[str, Any]], None]]): Named data.
+        budget (int): Maximum number of tokens for the whole section.
+
+    Returns:
+        BudgetedContext: The summaries and their token count.
+    """
+    data = {name: _to_frame(frame) for name, frame in frames.items()}
+    if not data:
+        return BudgetedContext(text="", tokens=0, budget=budget)
+
+    text = ""
+    for detail_level in range(len(DETAIL_LEVELS)):
+        text = "\n\n".join(summarize_frame(name, df, detail_level) for name, df in data.items())
+        tokens = count_tokens(text)
+        if tokens <= budget:
+            return BudgetedContext(text=text, tokens=tokens, budget=budget, detail_level=detail_level)
+
+    context = truncate_to_budget(text, budget)
+    context.detail_level = len(DETAIL_LEVELS) - 1
+    return context
@@ -0,0 +1,196 @@
+"""
+LLM module for the Clinical Trials & FDA Data Search App.
+Creates the chat models used by the agent. Setting CHAT_LLM_BACKEND=fake
+replaces OpenAI with a deterministic offline model that returns canned
+selections, code and answers after a configurable latency, so load tests and
+benchmarks run without API calls.
+"""
+import os
+import re
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from app.agents.context_builder import count_tokens
+from app.utils.log import get_logger
+from app.utils.metrics import LLM_REQUEST_SECONDS, LLM_TOKENS
+
+logger = get_logger(__name__)
+
+# Chat model backend: 'openai' or 'fake'
+CHAT_LLM_BACKEND = os.getenv("CHAT_LLM_BACKEND", "openai")
+
+# File with an OPENAI_API_KEY=... line, read when the first OpenAI model is created
+API_KEYS_PATH = Path(__file__).parent.parent.parent / "API_KEYS.txt"
+
+# Milliseconds the fake model takes per call, like a blocking API request
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "800"))
+
+# Rows kept by the fake model's generated code
+FAKE_RESULT_ROWS = 20
+
+# Query words that make the fake model select the FDA data
+FDA_QUERY_WORDS = {"drug", "drugs", "fda", "label", "labels", "medication", "medications", "warning", "warnings"}
+
+
+def fake_response(prompt: str) -> str:
+    """
+    Get the fake model's canned reply to a prompt of the chat agent.
+
+    Args:
+        prompt (str): The prompt's messages joined.
+
+    Returns:
+        str: A dataframe selection, a code block or an answer, depending on the prompt.
+    """
+    selection = re.search(r'answer this query: "(.*?)"', prompt, flags=re.DOTALL)
+    if selection is not None:
+        words = set(re.findall(r"\w+", selection.group(1).lower()))
+        return "['fda_df']" if words & FDA_QUERY_WORDS else "['clinical_trials_df']"
+
+    available = re.search(r"available dataframe are \[(.*?)\]", prompt)
+    if available is not None:
+        names = re.findall(r"'(\w+_df)'", available.group(1)) or ["clinical_trials_df"]
+        return f"```python\nresult_df = {names[0]}.head({FAKE_RESULT_ROWS})\nprint(len(result_df))\n```"
+
+    query = re.search(r"Query: (.*)", prompt)
+    subject = query.group(1).strip() if query is not None else "your question"
+    return f"## Answer\n- Offline answer for **{subject}** based on the data analysis results."
+
+
+class FakeChatModel(BaseChatModel):
+    """A deterministic chat model with canned replies for offline runs."""
+
+    latency_ms: float = FAKE_LLM_LATENCY_MS
+
+    @property
+    def _llm_type(self) -> str:
+        """Get the model type name."""
+        return "fake"
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        """
+        Reply to messages after the configured latency.
+
+        Args:
+            messages (List[BaseMessage]): The prompt.
+            stop (Optional[List[str]]): Ignored.
+            run_manager (Optional[Any]): Ignored.
+            **kwargs: Ignored.
+
+        Returns:
+            ChatResult: The canned reply.
+        """
+        time.sleep(self.latency_ms / 1000)
+        prompt = "\n".join(str(message.content) for message in messages)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=fake_response(prompt)))])
+
+
+@lru_cache(maxsize=1)
+def load_openai_api_key() -> str:
+    """
+    Get the OpenAI API key, copying it from API_KEYS.txt into the environment on first use.
+
+    Returns:
+        str: The key, or an empty string if it is not set.
+    """
+    if API_KEYS_PATH.exists():
+        with open(API_KEYS_PATH, 'r') as file:
+            for line in file:
+                line = line.strip()
+                if line.startswith('OPENAI_API_KEY'):
+                    parts = line.split('=', 1)
+                    if len(parts) == 2:
+                        os.environ['OPENAI_API_KEY'] = parts[1].strip().strip('"\'')
+                        logger.info("Set OPENAI_API_KEY from %s", API_KEYS_PATH)
+                        break
+    api_key = os.getenv("OPENAI_API_KEY", "")
+    if not api_key:
+        logger.warning("OPENAI_API_KEY environment variable is not set")
+    return api_key
+
+
+def get_llm(model: str, **kwargs: Any) -> BaseChatModel:
+    """
+    Create a chat model of the configured backend.
+
+    Args:
+        model (str): OpenAI model name.
+        **kwargs: Further ChatOpenAI arguments, e.g. temperature.
+
+    Returns:
+        BaseChatModel: A ChatOpenAI model, or a FakeChatModel when CHAT_LLM_BACKEND is 'fake'.
+
+    Raises:
+        ValueError: If CHAT_LLM_BACKEND is unknown.
+    """
+    if CHAT_LLM_BACKEND == "fake":
+        return FakeChatModel(latency_ms=FAKE_LLM_LATENCY_MS)
+    if CHAT_LLM_BACKEND != "openai":
+        raise ValueError(f"Unknown CHAT_LLM_BACKEND '{CHAT_LLM_BACKEND}'; use 'openai' or 'fake'")
+    from langchain_openai import ChatOpenAI
+
+    load_openai_api_key()
+    return ChatOpenAI(model=model, **kwargs)
+
+
+def _token_usage(response: BaseMessage) -> Dict[str, int]:
+    """
+    Get the token usage reported with a model response.
+
+    Args:
+        response (BaseMessage): The model's reply.
+
+    Returns:
+        Dict[str, int]: 'prompt' and 'completion' token counts the provider reported, if any.
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if usage:
+        return {"prompt": usage.get("input_tokens", 0), "completion": usage.get("output_tokens", 0)}
+    usage = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+    if usage:
+        return {"prompt": usage.get("prompt_tokens", 0), "completion": usage.get("completion_tokens", 0)}
+    return {}
+
+
+def invoke_llm(
+    llm: BaseChatModel,
+    prompt: Union[str, List[Dict[str, str]]],
+    step: str,
+    prompt_tokens: Optional[int] = None,
+) -> BaseMessage:
+    """
+    Call a chat model, recording the call's latency and token counts per agent step.
+
+    Args:
+        llm (BaseChatModel): The model.
+        prompt (Union[str, List[Dict[str, str]]]): A prompt text or role/content messages.
+        step (str): Agent step making the call, e.g. 'generate_code'.
+        prompt_tokens (Optional[int]): Prompt size already counted by the caller, used when the
+            provider reports no usage.
+
+    Returns:
+        BaseMessage: The model's reply.
+    """
+    with LLM_REQUEST_SECONDS.time(step=step):
+        response = llm.invoke(prompt)
+    usage = _token_usage(response)
+    if not usage:
+        if prompt_tokens is None:
+            text = prompt if isinstance(prompt, str) else "\n".join(message["content"] for message in prompt)
+            prompt_tokens = count_tokens(text)
+        usage = {"prompt": prompt_tokens, "completion": count_tokens(str(response.content))}
+    for kind, tokens in usage.items():
+        LLM_TOKENS.inc(tokens, step=step, kind=kind)
+    return response
@@ -0,0 +1,280 @@
+"""
+Query template module for the Clinical Trials & FDA Data Search App.
+Answers the most common aggregate chat questions with pre-tested pandas
+queries, so they never reach the code generation agent or `exec`.
+"""
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+from pydantic import BaseModel
+
+from app.agents.template_answers import (
+    count_by_column,
+    enrollment_total,
+    labels_mentioning_reaction,
+    top_sponsors,
+    trials_by_country,
+    trials_for_population,
+)
+from clinical_trials_module import AGE_COLUMNS
+
+# Query words naming the sexes accepted by a trial
+SEX_WORDS = {"women": "FEMALE", "woman": "FEMALE", "female": "FEMALE", "females": "FEMALE",
+             "men": "MALE", "man": "MALE", "male": "MALE", "males": "MALE"}
+
+# Verbs asking whether a trial accepts a population
+ACCEPTS_PATTERN = r"(?:are\s+)?(?:open to|accept|accepting|enroll|enrolling|include|including|recruit|recruiting|allow|allowing)"
+
+DEFAULT_TOP_N = 10
+MAX_TOP_N = 50
+
+
+class TemplateMatch(BaseModel):
+    """A user query matched to a query template and its arguments."""
+    template: str
+    args: Dict[str, Any] = {}
+
+
+class QueryTemplate:
+    """A parameterized analytical query with the patterns that trigger it."""
+
+    def __init__(
+        self,
+        name: str,
+        dataset: str,
+        patterns: List[str],
+        columns: List[str],
+        run: Callable[[pd.DataFrame, Dict[str, Any]], Optional[Tuple[str, List[Dict[str, Any]]]]],
+        parse_args: Optional[Callable[[re.Match], Dict[str, Any]]] = None,
+    ):
+        """
+        Create a query template.
+
+        Args:
+            name (str): Unique template name.
+            dataset (str): Dataset the template runs on ("clinical_trials_df" or "fda_df").
+            patterns (List[str]): Regular expressions matched against the lower-cased query.
+            columns (List[str]): Columns the template reads; all must be present to run it.
+            run (Callable): Function receiving the DataFrame and arguments, returning
+                (answer, sources), or None to fall through to code generation.
+            parse_args (Callable, optional): Function extracting arguments from the regex match.
+        """
+        self.name = name
+        self.dataset = dataset
+        self.patterns = [re.compile(pattern) for pattern in patterns]
+        self.columns = columns
+        self.run = run
+        self.parse_args = parse_args or (lambda match: {})
+
+    def match(self, query: str) -> Optional[Dict[str, Any]]:
+        """
+        Match a normalized query against the template patterns.
+
+        Args:
+            query (str): Lower-cased, whitespace-normalized user query.
+
+        Returns:
+            Optional[Dict[str, Any]]: Template arguments if matched, otherwise None.
+        """
+        for pattern in self.patterns:
+            match = pattern.search(query)
+            if match:
+                return self.parse_args(match)
+        return None
+
+
+def _normalize_query(query: str) -> str:
+    """
+    Lower-case a query and collapse whitespace and trailing punctuation.
+
+    Args:
+        query (str): Raw user query.
+
+    Returns:
+        str: Normalized query.
+    """
+    query = re.sub(r"\s+", " ", query.lower()).strip()
+    return query.rstrip("?.! ")
+
+
+def _parse_top_n(match: re.Match) -> Dict[str, Any]:
+    """
+    Extract the optional "top N" count from a match.
+
+    Args:
+        match (re.Match): Regex match with an optional `n` group.
+
+    Returns:
+        Dict[str, Any]: Arguments with the requested `n`.
+    """
+    n = match.groupdict().get("n")
+    return {"n": min(int(n), MAX_TOP_N) if n else DEFAULT_TOP_N}
+
+
+QUERY_TEMPLATES: List[QueryTemplate] = [
+    QueryTemplate(
+        name="count_by_status",
+        dataset="clinical_trials_df",
+        columns=["overallStatus"],
+        patterns=[
+            r"^(?:how many|number of|count(?: of)?|breakdown of|distribution of)\s+(?:the\s+)?(?:trials|studies)\s+(?:by|per|for each|in each)\s+(?:overall\s+)?(?:status|recruitment status)$",
+            r"^(?:what is the\s+)?(?:breakdown|distribution|count)\s+of\s+(?:trial\s+|study\s+)?(?:overall\s+)?status(?:es)?$",
+            r"^(?:trials|studies)\s+by\s+(?:overall\s+)?status$",
+        ],
+        run=count_by_column("overallStatus", "Status"),
+    ),
+    QueryTemplate(
+        name="count_by_phase",
+        dataset="clinical_trials_df",
+        columns=["phases"],
+        patterns=[
+            r"^(?:how many|number of|count(?: of)?|breakdown of|distribution of)\s+(?:the\s+)?(?:trials|studies)\s+(?:by|per|for each|in each)\s+phases?$",
+            r"^(?:what is the\s+)?(?:breakdown|distribution|count)\s+of\s+(?:trial\s+|study\s+)?phases?$",
+            r"^(?:trials|studies)\s+by\s+phases?$",
+        ],
+        run=count_by_column("phases", "Phase", multi_value=True),
+    ),
+    QueryTemplate(
+        name="top_sponsors",
+        dataset="clinical_trials_df",
+        columns=["leadSponsor"],
+        patterns=[
+            r"^(?:what are the |who are the |list the |show the )?top\s+(?:(?P<n>\d+)\s+)?(?:lead\s+)?sponsors$",
+            r"^(?:which|what)\s+(?:lead\s+)?sponsors\s+(?:have|run|sponsor)\s+the most\s+(?:trials|studies)$",
+        ],
+        run=top_sponsors,
+        parse_args=_parse_top_n,
+    ),
+    QueryTemplate(
+        name="enrollment_total",
+        dataset="clinical_trials_df",
+        columns=["enrollmentCount"],
+        patterns=[
+            r"^(?:what is the\s+)?total\s+enrollment(?:\s+(?:across|of|for)\s+(?:all\s+)?(?:the\s+)?(?:trials|studies))?$",
+            r"^how many\s+(?:participants|patients|subjects)\s+(?:are|were)\s+enrolled(?:\s+in total)?(?:\s+(?:across|in)\s+(?:all\s+)?(?:the\s+)?(?:trials|studies))?$",
+        ],
+        run=enrollment_total,
+    ),
+    QueryTemplate(
+        name="trials_for_age",
+        dataset="clinical_trials_df",
+        columns=AGE_COLUMNS,
+        patterns=[
+            rf"^(?:how many|which|what)\s+(?:trials|studies)\s+{ACCEPTS_PATTERN}\s+(?:an?\s+)?(?P<age>\d{{1,3}})[- ]years?[- ]olds?$",
+            rf"^(?:how many|which|what)\s+(?:trials|studies)\s+{ACCEPTS_PATTERN}\s+(?:patients|participants|people|children|adults)\s+(?:aged|of age)\s+(?P<age>\d{{1,3}})(?:\s+years?)?$",
+        ],
+        run=trials_for_population,
+        parse_args=lambda match: {"age": float(match.group("age"))},
+    ),
+    QueryTemplate(
+        name="trials_for_sex",
+        dataset="clinical_trials_df",
+        columns=["eligibilitySexCode"],
+        patterns=[
+            rf"^(?:how many|which|what)\s+(?:trials|studies)\s+{ACCEPTS_PATTERN}\s+(?P<sex>women|men|females?|males?)$",
+            rf"^(?:how many|which|what)\s+(?:trials|studies)\s+{ACCEPTS_PATTERN}\s+(?P<sex>female|male)\s+(?:patients|participants|subjects|volunteers)$",
+        ],
+        run=trials_for_population,
+        parse_args=lambda match: {"sex": SEX_WORDS[match.group("sex")]},
+    ),
+    QueryTemplate(
+        name="trials_by_country",
+        dataset="clinical_trials_df",
+        columns=["country"],
+        patterns=[
+            r"^(?:how many|number of|count(?: of)?|breakdown of|distribution of)\s+(?:the\s+)?(?:trials|studies)\s+(?:by|per|for each|in each)\s+country$",
+            r"^(?:trials|studies)\s+by\s+country$",
+            r"^(?:which|what)\s+countries\s+(?:have|host|run)\s+(?:the\s+)?(?:most\s+)?(?:trials|studies)$",
+            r"^how many\s+(?:trials|studies)\s+(?:are\s+)?(?:in|located in|running in)\s+(?:the\s+)?(?P<country>[a-z][a-z ,.'-]+)$",
+        ],
+        run=trials_by_country,
+        parse_args=lambda match: {"country": (match.groupdict().get("country") or "").strip() or None},
+    ),
+    QueryTemplate(
+        name="labels_mentioning_reaction",
+        dataset="fda_df",
+        columns=["adverse_reactions"],
+        patterns=[
+            r"^(?:which|what)\s+(?:drug\s+)?(?:labels|drugs)\s+(?:mention|list|report|include|have|cause)\s+(?P<reaction>[a-z0-9][a-z0-9 '-]*?)\s+as an?\s+(?:adverse reaction|side effect)$",
+            r"^(?:which|what)\s+(?:drug\s+)?(?:labels|drugs)\s+(?:mention|list|report|include|have)\s+(?P<reaction>[a-z0-9][a-z0-9 '-]*?)\s+in\s+(?:their|the)\s+adverse reactions(?: section)?$",
+        ],
+        run=labels_mentioning_reaction,
+        parse_args=lambda match: {"reaction": match.group("reaction").strip()},
+    ),
+]
+
+_TEMPLATES_BY_NAME = {template.name: template for template in QUERY_TEMPLATES}
+
+
+def match_query_template(query: str) -> Optional[TemplateMatch]:
+    """
+    Map a user query to a query template and its arguments.
+
+    Args:
+        query (str): The user's chat query.
+
+    Returns:
+        Optional[TemplateMatch]: The matched template, or None if no template applies.
+    """
+    normalized = _normalize_query(query)
+    for template in QUERY_TEMPLATES:
+        args = template.match(normalized)
+        if args is not None:
+            return TemplateMatch(template=template.name, args=args)
+    return None
+
+
+def run_query_template(
+    template_match: TemplateMatch,
+    clinical_trials_df: Optional[List[Dict[str, Any]]] = None,
+    fda_df: Optional[List[Dict[str, Any]]] = None,
+) -> Optional[Tuple[str, List[Dict[str, Any]]]]:
+    """
+    Run a matched query template against the chat data.
+
+    Args:
+        template_match (TemplateMatch): The matched template and arguments.
+        clinical_trials_df (Optional[List[Dict[str, Any]]]): Clinical trials records.
+        fda_df (Optional[List[Dict[str, Any]]]): FDA label records.
+
+    Returns:
+        Optional[Tuple[str, List[Dict[str, Any]]]]: The answer and sources, or None
+        if the data needed by the template is not available.
+    """
+    template = _TEMPLATES_BY_NAME.get(template_match.template)
+    if template is None:
+        return None
+
+    records = clinical_trials_df if template.dataset == "clinical_trials_df" else fda_df
+    if not records:
+        return None
+
+    df = pd.DataFrame(records)
+    if any(column not in df.columns for column in template.columns):
+        return None
+
+    return template.run(df, template_match.args)
+
+
+def answer_from_template(
+    query: str,
+    clinical_trials_df: Optional[List[Dict[str, Any]]] = None,
+    fda_df: Optional[List[Dict[str, Any]]] = None,
+) -> Optional[Tuple[str, List[Dict[str, Any]]]]:
+    """
+    Answer a query from a template if one matches and its data is available.
+
+    Args:
+        query (str): The user's chat query.
+        clinical_trials_df (Optional[List[Dict[str, Any]]]): Clinical trials records.
+        fda_df (Optional[List[Dict[str, Any]]]): FDA label records.
+
+    Returns:
+        Optional[Tuple[str, List[Dict[str, Any]]]]: The answer and sources, or None
+        if the query should fall through to code generation.
+    """
+    template_match = match_query_template(query)
+    if template_match is None:
+        return None
+    return run_query_template(template_match, clinical_trials_df, fda_df)
@@ -0,0 +1,434 @@
+"""
+Code execution sandbox for the Clinical Trials & FDA Data Search App.
+Runs LLM-generated analysis code in a pool of pre-warmed worker processes,
+so executions cannot corrupt each other's output or stall the server.
+"""
+import atexit
+import contextlib
+import io
+import multiprocessing
+import os
+import pickle
+import queue
+import re
+import threading
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from app.agents.code_validator import compile_generated_code
+
+# Sandbox configuration
+SANDBOX_WORKERS = int(os.getenv("SANDBOX_WORKERS", str(min(4, os.cpu_count() or 1))))
+SANDBOX_TIMEOUT_SECONDS = float(os.getenv("SANDBOX_TIMEOUT_SECONDS", "30"))
+SANDBOX_MEMORY_LIMIT_MB = int(os.getenv("SANDBOX_MEMORY_LIMIT_MB", "2048"))
+# How long an execution may wait for a free worker before giving up
+SANDBOX_QUEUE_TIMEOUT_SECONDS = float(os.getenv("SANDBOX_QUEUE_TIMEOUT_SECONDS", "60"))
+WORKER_START_TIMEOUT_SECONDS = 60
+# Rows printed per DataFrame; longer frames are shown as head and tail
+SANDBOX_DISPLAY_MAX_ROWS = int(os.getenv("SANDBOX_DISPLAY_MAX_ROWS", "50"))
+
+
+class SandboxError(Exception):
+    """Raised when the sandbox cannot accept an execution."""
+
+
+def _apply_memory_limit(memory_limit_mb: int) -> None:
+    """
+    Cap the address space of the current worker process.
+
+    Args:
+        memory_limit_mb (int): Limit in megabytes; 0 disables the limit.
+    """
+    if memory_limit_mb <= 0:
+        return
+    try:
+        import resource
+    except ImportError:
+        # Reason: the resource module does not exist on Windows
+        return
+    limit = memory_limit_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _pack_frames(frames: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Serialize DataFrames, placing their numeric buffers in shared memory.
+
+    Pickle protocol 5 hands column buffers out-of-band; they are copied once into a
+    shared memory block that the worker maps instead of receiving them through the pipe.
+
+    Args:
+        frames (Dict[str, Any]): Variables to expose to the generated code.
+
+    Returns:
+        Dict[str, Any]: Job payload with the pickle bytes, shared memory name and buffer sizes.
+    """
+    buffers: List[pickle.PickleBuffer] = []
+    data = pickle.dumps(frames, protocol=5, buffer_callback=buffers.append)
+    raw_buffers = [buffer.raw() for buffer in buffers]
+    sizes = [raw.nbytes for raw in raw_buffers]
+
+    shm = None
+    if sizes and sum(sizes) > 0:
+        shm = shared_memory.SharedMemory(create=True, size=sum(sizes))
+        offset = 0
+        for raw, size in zip(raw_buffers, sizes):
+            shm.buf[offset:offset + size] = raw
+            offset += size
+
+    return {"data": data, "shm": shm, "sizes": sizes}
+
+
+def _attach_frames(data: bytes, shm_name: Optional[str], sizes: List[int]):
+    """
+    Rebuild DataFrames in the worker, mapping numeric buffers from shared memory.
+
+    Args:
+        data (bytes): Pickled frames.
+        shm_name (Optional[str]): Name of the shared memory block, if any.
+        sizes (List[int]): Size of each out-of-band buffer.
+
+    Returns:
+        Tuple[Dict[str, Any], Optional[shared_memory.SharedMemory]]: Frames and the attached block.
+    """
+    if not shm_name:
+        return pickle.loads(data, buffers=[b"" for _ in sizes]), None
+
+    # Reason: spawned workers share the parent's resource tracker, so attaching here
+    # does not take ownership; the parent unlinks the block after the execution
+    shm = shared_memory.SharedMemory(name=shm_name)
+    views = []
+    offset = 0
+    for size in sizes:
+        views.append(shm.buf[offset:offset + size])
+        offset += size
+    return pickle.loads(data, buffers=views), shm
+
+
+def _run_generated_code(code: str, frames: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Execute generated code against the frames and capture its output.
+
+    Args:
+        code (str): Generated Python code.
+        frames (Dict[str, Any]): Variables to expose to the code.
+
+    Returns:
+        Dict[str, Any]: Execution result with output, error, last_df_name and dataframes.
+    """
+    local_vars = {
+        'pd': pd,
+        '__builtins__': __builtins__,
+        **frames,
+    }
+    output = io.StringIO()
+    error = None
+    last_df_name = None
+    df_vars = {}
+
+    # Reason: stdout and display options are per-process here, so no other execution sees them.
+    # Rows are capped so printing a large result cannot flood the answer prompt.
+    with contextlib.redirect_stdout(output), pd.option_context(
+        'display.max_rows', SANDBOX_DISPLAY_MAX_ROWS, 'display.max_columns', None, 'display.width', None
+    ):
+        try:
+            initial_vars = set(local_vars.keys())
+            # Reason: retries and repeated questions often produce identical code, so reuse its code object
+            exec(compile_generated_code(code), local_vars)
+
+            # Find all new DataFrame variables
+            new_vars = set(local_vars.keys()) - initial_vars
+            df_vars = {var: local_vars[var] for var in new_vars
+                       if isinstance(local_vars[var], pd.DataFrame)}
+
+            # Print information about all DataFrames created
+            if df_vars:
+                print(f"\n--- Created {len(df_vars)} DataFrames ---")
+                for df_name, df in df_vars.items():
+                    print(f"\nDataFrame: {df_name}")
+                    print(f"Shape: {df.shape}")
+                    print(f"Columns: {list(df.columns)}")
+                    print(f"Sample data:")
+                    print(df.head(5))
+                    print("-" * 50)
+
+                # Print the last DataFrame named in the code to capture it in the output
+                last_df_name = re.findall(r'\b\w+_df\b', code)[-1]
+                if last_df_name in local_vars:
+                    print(f"\n--- Final DataFrame ({last_df_name}) ---")
+                    print(local_vars[last_df_name])
+        except MemoryError:
+            error = "Code execution exceeded the sandbox memory limit"
+        except Exception as e:
+            error = str(e)
+
+    return {
+        "output": output.getvalue() if error is None else "",
+        "error": error,
+        "last_df_name": last_df_name,
+        "dataframes": {name: df.to_dict('records') for name, df in df_vars.items()},
+    }
+
+
+def _worker_main(conn, memory_limit_mb: int) -> None:
+    """
+    Entry point of a sandbox worker process.
+
+    Args:
+        conn: Pipe connection to the parent process.
+        memory_limit_mb (int): Address space limit for this worker.
+    """
+    _apply_memory_limit(memory_limit_mb)
+    # Pre-warm the pandas import so the first execution does not pay for it
+    pd.DataFrame({"warmup": [1]}).head()
+    conn.send("ready")
+
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+
+        shm = None
+        try:
+            frames, shm = _attach_frames(job["data"], job["shm_name"], job["sizes"])
+            result = _run_generated_code(job["code"], frames)
+            del frames
+        except Exception as e:
+            result = {"output": "", "error": f"Sandbox worker error: {str(e)}", "last_df_name": None, "dataframes": {}}
+        finally:
+            if shm is not None:
+                try:
+                    shm.close()
+                except BufferError:
+                    # Reason: a lingering view keeps the mapping alive until it is garbage collected
+                    pass
+        conn.send(result)
+
+
+class _SandboxWorker:
+    """A single pre-warmed worker process and its pipe."""
+
+    def __init__(self, context, memory_limit_mb: int):
+        """
+        Start a worker process.
+
+        Args:
+            context: Multiprocessing context used to spawn the process.
+            memory_limit_mb (int): Address space limit for the worker.
+        """
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn, memory_limit_mb), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+
+    def wait_ready(self, timeout: float) -> bool:
+        """
+        Wait for the worker to finish warming up.
+
+        Args:
+            timeout (float): Seconds to wait.
+
+        Returns:
+            bool: True if the worker is ready.
+        """
+        if not self.ready and self.conn.poll(timeout):
+            self.ready = self.conn.recv() == "ready"
+        return self.ready
+
+    def kill(self) -> None:
+        """Terminate the worker process immediately."""
+        self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+    def stop(self) -> None:
+        """Ask the worker to exit, killing it if it does not."""
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=2)
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+
+class CodeSandbox:
+    """
+    Pool of pre-warmed worker processes executing generated code in isolation.
+
+    Each execution runs in its own worker with captured stdout, a wall-clock
+    limit and a memory limit. A worker that times out or dies is replaced.
+    """
+
+    def __init__(
+        self,
+        workers: int = SANDBOX_WORKERS,
+        timeout: float = SANDBOX_TIMEOUT_SECONDS,
+        memory_limit_mb: int = SANDBOX_MEMORY_LIMIT_MB,
+        queue_timeout: float = SANDBOX_QUEUE_TIMEOUT_SECONDS,
+    ):
+        """
+        Create the sandbox and start its workers.
+
+        Args:
+            workers (int): Number of worker processes.
+            timeout (float): Wall-clock limit per execution in seconds.
+            memory_limit_mb (int): Address space limit per worker; 0 disables it.
+            queue_timeout (float): Seconds to wait for a free worker.
+        """
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.queue_timeout = queue_timeout
+        self._context = multiprocessing.get_context("spawn")
+        self._idle: "queue.Queue[_SandboxWorker]" = queue.Queue()
+        self._workers: List[_SandboxWorker] = []
+        self._lock = threading.Lock()
+        self._closed = False
+        for _ in range(max(1, workers)):
+            self._add_worker()
+
+    def _add_worker(self) -> None:
+        """Start a new worker and make it available."""
+        worker = _SandboxWorker(self._context, self.memory_limit_mb)
+        with self._lock:
+            self._workers.append(worker)
+        self._idle.put(worker)
+
+    def _replace_worker(self, worker: _SandboxWorker) -> None:
+        """
+        Kill a worker and start a fresh one in its place.
+
+        Args:
+            worker (_SandboxWorker): The worker to replace.
+        """
+        worker.kill()
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+            closed = self._closed
+        if not closed:
+            self._add_worker()
+
+    def execute(self, code: str, frames: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Execute generated code in a worker process.
+
+        Args:
+            code (str): Generated Python code.
+            frames (Dict[str, Any]): Variables (usually DataFrames) to expose to the code.
+
+        Returns:
+            Dict[str, Any]: Execution result with output, error, last_df_name and dataframes.
+
+        Raises:
+            SandboxError: If no worker becomes available in time.
+        """
+        if self._closed:
+            raise SandboxError("Sandbox is shut down")
+
+        packed = _pack_frames(frames)
+        try:
+            try:
+                worker = self._idle.get(timeout=self.queue_timeout)
+            except queue.Empty:
+                raise SandboxError("No sandbox worker available, try again later")
+            return self._execute_on(worker, code, packed)
+        finally:
+            if packed["shm"] is not None:
+                packed["shm"].close()
+                packed["shm"].unlink()
+
+    def _execute_on(self, worker: _SandboxWorker, code: str, packed: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run one job on a worker, replacing the worker if it hangs or dies.
+
+        Args:
+            worker (_SandboxWorker): An idle worker.
+            code (str): Generated Python code.
+            packed (Dict[str, Any]): Frames packed by _pack_frames.
+
+        Returns:
+            Dict[str, Any]: Execution result.
+        """
+        try:
+            if not worker.wait_ready(WORKER_START_TIMEOUT_SECONDS):
+                self._replace_worker(worker)
+                return self._failure("Sandbox worker failed to start")
+
+            worker.conn.send({
+                "code": code,
+                "data": packed["data"],
+                "shm_name": packed["shm"].name if packed["shm"] is not None else None,
+                "sizes": packed["sizes"],
+            })
+            if not worker.conn.poll(self.timeout):
+                self._replace_worker(worker)
+                return self._failure(f"Code execution exceeded the {self.timeout:g}s time limit")
+
+            result = worker.conn.recv()
+        except (EOFError, BrokenPipeError, ConnectionResetError, OSError):
+            # Reason: the worker died, most likely killed for exceeding its memory limit
+            self._replace_worker(worker)
+            return self._failure("Code execution worker crashed (memory limit exceeded?)")
+
+        self._idle.put(worker)
+        return result
+
+    @staticmethod
+    def _failure(error: str) -> Dict[str, Any]:
+        """
+        Build an execution result for a failed execution.
+
+        Args:
+            error (str): Error message.
+
+        Returns:
+            Dict[str, Any]: Execution result.
+        """
+        return {"output": "", "error": error, "last_df_name": None, "dataframes": {}}
+
+    def shutdown(self) -> None:
+        """Stop all worker processes."""
+        with self._lock:
+            self._closed = True
+            workers = list(self._workers)
+            self._workers.clear()
+        for worker in workers:
+            worker.stop()
+
+
+_sandbox: Optional[CodeSandbox] = None
+_sandbox_lock = threading.Lock()
+
+
+def get_sandbox() -> CodeSandbox:
+    """
+    Get the shared code sandbox, starting it on first use.
+
+    Returns:
+        CodeSandbox: The process-wide sandbox.
+    """
+    global _sandbox
+    with _sandbox_lock:
+        if _sandbox is None:
+            _sandbox = CodeSandbox()
+            atexit.register(_sandbox.shutdown)
+        return _sandbox
+
+
+def shutdown_sandbox() -> None:
+    """Stop the shared code sandbox if it was started."""
+    global _sandbox
+    with _sandbox_lock:
+        if _sandbox is not None:
+            _sandbox.shutdown()
+            _sandbox = None
@@ -0,0 +1,205 @@
+"""
+Schema registry module for the Clinical Trials & FDA Data Search App.
+Loads the column descriptions once from the package CSV files, merges them
+with the dtypes observed in live DataFrames, and serves precomputed prompt
+fragments for each combination of datasets.
+"""
+import csv
+import threading
+from functools import lru_cache
+from itertools import combinations
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+import pandas as pd
+from pydantic import BaseModel
+
+from app.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Column description files shipped at the project root
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+SCHEMA_FILES = {
+    "clinical_trials_df": PROJECT_ROOT / "clinical_trials_column.csv",
+    "fda_df": PROJECT_ROOT / "fda_column.csv",
+}
+DATASET_TITLES = {
+    "clinical_trials_df": "Clinical Trials",
+    "fda_df": "FDA",
+}
+
+# Observed-schema fragments kept per combination of live column signatures
+MAX_OBSERVED_FRAGMENTS = 64
+
+
+class ColumnInfo(BaseModel):
+    """Description of one dataset column."""
+    name: str
+    data_type: str
+    description: str = ""
+
+
+class SchemaRegistry:
+    """Column descriptions for each dataset and the prompt fragments built from them."""
+
+    def __init__(self, schema_files: Mapping[str, Path] = SCHEMA_FILES):
+        """
+        Load the schema files and precompute the fragment for every dataset combination.
+
+        Args:
+            schema_files (Mapping[str, Path]): Dataset names mapped to their column CSV files.
+        """
+        self._columns: Dict[str, Dict[str, ColumnInfo]] = {
+            dataset: self._load_columns(path) for dataset, path in schema_files.items()
+        }
+        self._lock = threading.Lock()
+        self._observed: Dict[tuple, str] = {}
+        self._fragments: Dict[Tuple[str, ...], str] = {}
+        datasets = sorted(self._columns)
+        for size in range(1, len(datasets) + 1):
+            for combination in combinations(datasets, size):
+                self._fragments[combination] = self._render(combination, {})
+
+    @staticmethod
+    def _load_columns(path: Path) -> Dict[str, ColumnInfo]:
+        """
+        Read a column description CSV file.
+
+        Args:
+            path (Path): CSV file with column_name, data_type and description columns.
+
+        Returns:
+            Dict[str, ColumnInfo]: Columns keyed by name, in file order.
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return {
+                    row["column_name"]: ColumnInfo(
+                        name=row["column_name"],
+                        data_type=row.get("data_type") or "",
+                        description=row.get("description") or "",
+                    )
+                    for row in csv.DictReader(f)
+                }
+        except OSError as e:
+            logger.error("Error reading column CSV file %s: %s", path, e)
+            return {}
+
+    def columns(self, dataset: str) -> List[ColumnInfo]:
+        """
+        Get the documented columns of a dataset.
+
+        Args:
+            dataset (str): Dataset name.
+
+        Returns:
+            List[ColumnInfo]: Documented columns.
+        """
+        return list(self._columns.get(dataset, {}).values())
+
+    def _render_dataset(self, dataset: str, observed: Optional[List[Tuple[str, str]]]) -> str:
+        """
+        Render the prompt section for one dataset.
+
+        Args:
+            dataset (str): Dataset name.
+            observed (Optional[List[Tuple[str, str]]]): Live (column, dtype) pairs, if known.
+
+        Returns:
+            str: The section text.
+        """
+        documented = self._columns.get(dataset, {})
+        title = DATASET_TITLES.get(dataset, dataset)
+        lines = [f"\n## {title} Data Structure ({dataset}):"]
+
+        if observed is None:
+            names = list(documented)
+            dtypes: Dict[str, str] = {}
+        else:
+            names = [name for name, _ in observed]
+            dtypes = dict(observed)
+        lines.append(f"Available fields: {', '.join(names)}")
+
+        lines.append("\nKey columns with descriptions:")
+        for name in names:
+            info = documented.get(name)
+            if info is None:
+                lines.append(f"- {name} ({dtypes[name]}): no description available")
+                continue
+            data_type = info.data_type
+            if name in dtypes and dtypes[name] != data_type:
+                data_type = f"{data_type}; pandas dtype {dtypes[name]}"
+            lines.append(f"- {name} ({data_type}): {info.description}")
+        return "\n".join(lines) + "\n"
+
+    def _render(self, combination: Tuple[str, ...], observed: Dict[str, List[Tuple[str, str]]]) -> str:
+        """
+        Render the fragment for a combination of datasets.
+
+        Args:
+            combination (Tuple[str, ...]): Sorted dataset names.
+            observed (Dict[str, List[Tuple[str, str]]]): Live column signatures by dataset.
+
+        Returns:
+            str: The fragment text.
+        """
+        return "".join(self._render_dataset(dataset, observed.get(dataset)) for dataset in combination)
+
+    @staticmethod
+    def signature(df: pd.DataFrame) -> Tuple[Tuple[str, str], ...]:
+        """
+        Describe a live DataFrame by its columns and dtypes.
+
+        Args:
+            df (pd.DataFrame): Live data.
+
+        Returns:
+            Tuple[Tuple[str, str], ...]: (column, dtype) pairs.
+        """
+        return tuple((str(column), str(dtype)) for column, dtype in df.dtypes.items())
+
+    def prompt_fragment(
+        self,
+        datasets: Iterable[str],
+        frames: Optional[Mapping[str, pd.DataFrame]] = None,
+    ) -> str:
+        """
+        Get the schema prompt fragment for a combination of datasets.
+
+        Without live frames this is a lookup of the fragment precomputed at load
+        time. With live frames the fragment lists the columns actually present and
+        their observed dtypes; it is rendered once per distinct schema and cached.
+
+        Args:
+            datasets (Iterable[str]): Selected dataset names.
+            frames (Optional[Mapping[str, pd.DataFrame]]): Live DataFrames by dataset name.
+
+        Returns:
+            str: The fragment text.
+        """
+        combination = tuple(sorted(dataset for dataset in set(datasets) if dataset in self._columns))
+        if not frames:
+            return self._fragments.get(combination, "")
+
+        observed = {dataset: list(self.signature(frames[dataset])) for dataset in combination if dataset in frames}
+        key = (combination, tuple(sorted((dataset, tuple(pairs)) for dataset, pairs in observed.items())))
+        fragment = self._observed.get(key)
+        if fragment is None:
+            fragment = self._render(combination, observed)
+            with self._lock:
+                if len(self._observed) >= MAX_OBSERVED_FRAGMENTS:
+                    self._observed.pop(next(iter(self._observed)))
+                self._observed[key] = fragment
+        return fragment
+
+
+@lru_cache(maxsize=1)
+def get_schema_registry() -> SchemaRegistry:
+    """
+    Get the shared schema registry, loading it on first use.
+
+    Returns:
+        SchemaRegistry: The process-wide registry.
+    """
+    return SchemaRegistry()
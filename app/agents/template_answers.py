@@ -0,0 +1,255 @@
+"""
+Template answers module for the Clinical Trials & FDA Data Search App.
+The pre-tested pandas queries run by the chat query templates, each taking
+the chat data as a DataFrame and the template arguments, and returning the
+answer and its sources.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from clinical_trials_module import LIST_COLUMNS, age_window_mask, sex_mask
+
+# Multi-valued trial fields are stored as comma-joined strings by normalize_study
+MULTI_VALUE_SEPARATOR = ", "
+
+MAX_LISTED_LABELS = 25
+
+
+def _row_values(df: pd.DataFrame, column: str) -> pd.Series:
+    """
+    Get the values of a multi-valued column as one list per row.
+
+    Rows are read from the column's list column (LIST_COLUMNS) when the data
+    has one, so values containing the separator, such as "Korea, Republic of",
+    stay whole. Data without it falls back to splitting the comma-joined strings.
+
+    Args:
+        df (pd.DataFrame): Clinical trials data.
+        column (str): Comma-joined column, e.g. "country".
+
+    Returns:
+        pd.Series: Lists of non-empty values, indexed like df.
+    """
+    list_column = LIST_COLUMNS.get(column)
+    listed = df[list_column] if list_column in df.columns else pd.Series(None, index=df.index, dtype=object)
+
+    def values(joined: Any, listed_values: Any) -> List[str]:
+        if isinstance(listed_values, (list, tuple)):
+            return [str(value) for value in listed_values if value]
+        if not isinstance(joined, str):
+            return []
+        return [part.strip() for part in joined.split(MULTI_VALUE_SEPARATOR) if part.strip()]
+
+    return pd.Series([values(joined, listed_values) for joined, listed_values in zip(df[column], listed)],
+                     index=df.index, dtype=object)
+
+
+def _counts_table(counts: pd.Series, label: str) -> str:
+    """
+    Render value counts as a markdown table.
+
+    Args:
+        counts (pd.Series): Counts indexed by value.
+        label (str): Header for the value column.
+
+    Returns:
+        str: Markdown table.
+    """
+    lines = [f"| {label} | Trials |", "|---|---|"]
+    lines += [f"| {value} | {count} |" for value, count in counts.items()]
+    return "\n".join(lines)
+
+
+def count_by_column(column: str, label: str, multi_value: bool = False):
+    """
+    Build a template runner that counts trials per value of a column.
+
+    Args:
+        column (str): Clinical trials column to group by.
+        label (str): Human-readable column label.
+        multi_value (bool): Whether the column holds several values per trial.
+
+    Returns:
+        Callable: Template runner.
+    """
+    def run(df: pd.DataFrame, args: Dict[str, Any]) -> Tuple[str, List[Dict[str, Any]]]:
+        values = _row_values(df, column).explode().dropna() if multi_value else df[column].dropna()
+        values = values[values.astype(str) != ""]
+        counts = values.value_counts()
+        if counts.empty:
+            return f"None of the **{len(df)}** trials have a recorded {label.lower()}.", []
+        answer = (
+            f"## Trials by {label}\n\n"
+            f"Across **{len(df)}** trials:\n\n{_counts_table(counts, label)}"
+        )
+        if multi_value:
+            answer += f"\n\nTrials listing several {label.lower()} values are counted once per value."
+        return answer, []
+    return run
+
+
+def top_sponsors(df: pd.DataFrame, args: Dict[str, Any]) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Rank lead sponsors by number of trials.
+
+    Args:
+        df (pd.DataFrame): Clinical trials data.
+        args (Dict[str, Any]): Template arguments with `n`.
+
+    Returns:
+        Tuple[str, List[Dict[str, Any]]]: Answer and sources.
+    """
+    sponsors = df["leadSponsor"].dropna()
+    counts = sponsors[sponsors != ""].value_counts().head(args["n"])
+    if counts.empty:
+        return "No lead sponsors are recorded for these trials.", []
+    answer = (
+        f"## Top {len(counts)} Lead Sponsors\n\n"
+        f"Across **{len(df)}** trials:\n\n{_counts_table(counts, 'Lead Sponsor')}"
+    )
+    return answer, []
+
+
+def enrollment_total(df: pd.DataFrame, args: Dict[str, Any]) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Summarize total and average enrollment.
+
+    Args:
+        df (pd.DataFrame): Clinical trials data.
+        args (Dict[str, Any]): Template arguments (unused).
+
+    Returns:
+        Tuple[str, List[Dict[str, Any]]]: Answer and sources.
+    """
+    enrollment = pd.to_numeric(df["enrollmentCount"], errors="coerce").dropna()
+    if enrollment.empty:
+        return "No enrollment counts are recorded for these trials.", []
+    answer = (
+        f"## Enrollment\n\n"
+        f"- Total enrollment: **{int(enrollment.sum()):,}** participants\n"
+        f"- Trials with an enrollment count: **{len(enrollment)}** of {len(df)}\n"
+        f"- Average per trial: **{enrollment.mean():,.1f}**\n"
+        f"- Median per trial: **{enrollment.median():,.0f}**"
+    )
+    return answer, []
+
+
+def trials_by_country(df: pd.DataFrame, args: Dict[str, Any]) -> Optional[Tuple[str, List[Dict[str, Any]]]]:
+    """
+    Count trials per country, or the trials running in one country.
+
+    Args:
+        df (pd.DataFrame): Clinical trials data.
+        args (Dict[str, Any]): Template arguments with an optional `country`.
+
+    Returns:
+        Optional[Tuple[str, List[Dict[str, Any]]]]: Answer and sources, or None if no
+        trial lists the requested country.
+    """
+    country = args.get("country")
+    if not country:
+        return count_by_column("country", "Country", multi_value=True)(df, args)
+
+    # Reason: match whole list entries so "niger" does not match "nigeria"
+    mask = _row_values(df, "country").map(lambda values: country in {value.lower() for value in values})
+    matched = df[mask]
+    if matched.empty:
+        # Reason: the phrase may not be a country at all ("in phase 3"), so let code generation handle it
+        return None
+    answer = f"**{len(matched)}** of {len(df)} trials have at least one site in {country.title()}."
+    return answer, _trial_sources(matched)
+
+
+def trials_for_population(df: pd.DataFrame, args: Dict[str, Any]) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Count the trials open to an age or a sex, from the numeric eligibility columns.
+
+    Args:
+        df (pd.DataFrame): Clinical trials data.
+        args (Dict[str, Any]): Template arguments with an `age` in years or a `sex`.
+
+    Returns:
+        Tuple[str, List[Dict[str, Any]]]: Answer and sources.
+    """
+    if args.get("age") is not None:
+        mask = age_window_mask(df, args["age"], args["age"])
+        population = f"{args['age']:g}-year-olds"
+    else:
+        mask = sex_mask(df, args["sex"])
+        population = "women" if args["sex"] == "FEMALE" else "men"
+    matched = df[mask]
+    answer = f"**{len(matched)}** of {len(df)} trials are open to {population}."
+    if args.get("age") is not None:
+        answer += " Trials without a minimum or maximum age are counted as having no limit on that side."
+    return answer, _trial_sources(matched)
+
+
+def labels_mentioning_reaction(df: pd.DataFrame, args: Dict[str, Any]) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    List drug labels whose adverse reactions section mentions a term.
+
+    Args:
+        df (pd.DataFrame): FDA label data.
+        args (Dict[str, Any]): Template arguments with `reaction`.
+
+    Returns:
+        Tuple[str, List[Dict[str, Any]]]: Answer and sources.
+    """
+    reaction = args["reaction"]
+    mask = df["adverse_reactions"].fillna("").astype(str).str.contains(reaction, case=False, regex=False)
+    matched = df[mask]
+    if matched.empty:
+        return f"None of the **{len(df)}** FDA labels mention {reaction} in their adverse reactions.", []
+
+    answer = (
+        f"**{len(matched)}** of {len(df)} FDA labels mention **{reaction}** in their adverse reactions:\n\n"
+        "| Brand Name | Generic Name | Manufacturer |\n|---|---|---|\n"
+    )
+    for _, row in matched.head(MAX_LISTED_LABELS).iterrows():
+        answer += f"| {row.get('brand_name', '')} | {row.get('generic_name', '')} | {row.get('manufacturer_name', '')} |\n"
+    if len(matched) > MAX_LISTED_LABELS:
+        answer += f"\n... and {len(matched) - MAX_LISTED_LABELS} more labels."
+    return answer, _fda_sources(matched)
+
+
+def _trial_sources(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Build chat sources for matched trials, in the format used by generate_answer.
+
+    Args:
+        df (pd.DataFrame): Matched clinical trials.
+
+    Returns:
+        List[Dict[str, Any]]: Up to 5 sources.
+    """
+    sources = []
+    for record in df.head(5).to_dict("records"):
+        nct_id = record.get("nctId") or "Unknown"
+        sources.append({
+            "type": "clinical_trial",
+            "id": nct_id,
+            "name": record.get("briefTitle") or "Unknown Trial",
+            "url": f"https://clinicaltrials.gov/study/{nct_id}" if nct_id != "Unknown" else None,
+        })
+    return sources
+
+
+def _fda_sources(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Build chat sources for matched FDA labels, in the format used by generate_answer.
+
+    Args:
+        df (pd.DataFrame): Matched FDA labels.
+
+    Returns:
+        List[Dict[str, Any]]: Up to 5 sources.
+    """
+    return [
+        {
+            "type": "fda_df",
+            "id": record.get("product_ndc", "Unknown"),
+            "name": record.get("brand_name") or "Unknown Drug",
+        }
+        for record in df.head(5).to_dict("records")
+    ]
@@ -4,16 +4,46 @@ Handles chat requests using LangGraph for LLM-powered natural language queries.
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import os
 import json
 from app.models.user import User
 from app.api.auth import get_current_user
-from app.agents.chat_agent import create_chat_agent, process_chat_query
+from app.utils.admission import AdmissionRejected, admission_context
+from app.utils.log import get_logger
 
 # Initialize router
 chat_router = APIRouter()
 
+logger = get_logger(__name__)
+
+# Import the chat agent at startup rather than on the first chat request
+CHAT_PRELOAD = os.getenv("CHAT_PRELOAD", "0") == "1"
+
+async def process_chat_query(**kwargs: Any) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Answer a chat query with the chat agent.
+
+    Args:
+        **kwargs: Arguments of app.agents.chat_agent.process_chat_query.
+
+    Returns:
+        Tuple[str, List[Dict[str, Any]]]: The answer and its sources.
+    """
+    # Reason: the agent pulls in LangChain and LangGraph, so it is imported on the first chat request
+    from app.agents.chat_agent import process_chat_query as run_chat_agent
+
+    return await run_chat_agent(**kwargs)
+
+
+def preload_chat_agent() -> None:
+    """Import the chat agent and load the schema registry, so the first chat request does not pay for them."""
+    import app.agents.chat_agent  # noqa: F401
+    from app.agents.schema_registry import get_schema_registry
+
+    get_schema_registry()
+
+
 class ChatMessage(BaseModel):
     """Chat message model for history."""
     role: str
@@ -49,20 +79,22 @@ async def chat(
         
     Raises:
         HTTPException: If the chat processing fails.
+        AdmissionRejected: If the query needs the agent and too many agent runs are in progress.
     """
     try:
-        # Log the incoming request for debugging
-        print(f"Processing chat query: {request.query}")
-        print(f"Clinical trials data: {len(request.clinical_trials_df) if request.clinical_trials_df else 0} items")
-        print(f"FDA data: {len(request.fda_df) if request.fda_df else 0} items")
+        # Log the incoming request
+        logger.info("Chat request received", extra={"query": request.query, "user_id": current_user.id,
+                                                     "clinical_trials": len(request.clinical_trials_df or []),
+                                                     "fda_data": len(request.fda_df or [])})
         
-        # Process the chat query
-        response, sources = await process_chat_query(
-            query=request.query,
-            clinical_trials_df=request.clinical_trials_df,
-            fda_df=request.fda_df,
-            chat_history=[{"role": message.role, "content": message.content, "sources": message.sources} for message in request.chat_history]
-        )
+        # Process the chat query; template answers skip the model gate, agent runs are admitted per user
+        with admission_context(current_user.id):
+            response, sources = await process_chat_query(
+                query=request.query,
+                clinical_trials_df=request.clinical_trials_df,
+                fda_df=request.fda_df,
+                chat_history=[{"role": message.role, "content": message.content, "sources": message.sources} for message in request.chat_history]
+            )
         
         # Ensure response is a string
         if not isinstance(response, str):
@@ -72,8 +104,7 @@ async def chat(
         if not isinstance(sources, list):
             sources = []
         
-        # Log the response for debugging
-        print(f"Chat response generated. Length: {len(response)}, Sources: {len(sources)}")
+        logger.info("Chat response generated", extra={"response_chars": len(response), "sources": len(sources)})
         
         # Create a valid response object
         chat_response = ChatResponse(
@@ -82,11 +113,10 @@ async def chat(
         )
         
         return chat_response
+    except AdmissionRejected:
+        raise
     except Exception as e:
-        import traceback
-        error_trace = traceback.format_exc()
-        print(f"Chat error: {str(e)}")
-        print(f"Error trace: {error_trace}")
+        logger.exception("Chat error: %s", e)
         
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
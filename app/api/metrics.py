@@ -0,0 +1,81 @@
+"""
+Metrics module for the Clinical Trials & FDA Data Search App.
+Serves the process's metrics in the Prometheus text format for scraping.
+"""
+import asyncio
+import os
+from typing import Dict, Optional, Tuple
+
+import anyio.to_thread
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from app.api.search_jobs import get_search_job_manager
+from app.utils.metrics import CONTENT_TYPE, EXECUTOR_BUSY_THREADS, EXECUTOR_QUEUE_DEPTH, REGISTRY
+from app.utils.profiling import token_matches
+
+# Scrape secret, sent as a bearer token; empty disables the endpoint
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Initialize router
+metrics_router = APIRouter()
+
+scrape_security = HTTPBearer(auto_error=False)
+
+
+async def require_metrics_token(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(scrape_security)
+) -> None:
+    """
+    Check the scrape token.
+
+    Args:
+        credentials (Optional[HTTPAuthorizationCredentials]): The bearer token of the Authorization header.
+
+    Raises:
+        HTTPException: If no scrape token is configured or the token does not match.
+    """
+    # Reason: Prometheus scrapers hold a static bearer token, not a user session, so the
+    # endpoint has its own secret instead of get_current_user
+    if not token_matches(credentials.credentials if credentials else None, METRICS_TOKEN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Metrics access denied")
+
+
+def executor_load() -> Dict[str, Tuple[int, int]]:
+    """
+    Get the queued and running tasks of the app's worker pools.
+
+    Must be called from the event loop, which owns the default executor and
+    the thread pool running sync endpoints and dependencies.
+
+    Returns:
+        Dict[str, Tuple[int, int]]: (queued, running) by executor: 'default' runs chat agents,
+        'threadpool' runs sync endpoints and 'search_jobs' runs background searches once started.
+    """
+    load = {}
+    # Reason: asyncio has no public view of its default executor's backlog
+    executor = getattr(asyncio.get_running_loop(), "_default_executor", None)
+    if executor is not None:
+        queued = executor._work_queue.qsize()
+        load["default"] = (queued, len(executor._threads) - executor._idle_semaphore._value)
+    else:
+        load["default"] = (0, 0)
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    load["threadpool"] = (limiter.statistics().tasks_waiting, limiter.borrowed_tokens)
+    if get_search_job_manager.cache_info().currsize:
+        load["search_jobs"] = get_search_job_manager().load()
+    return load
+
+
+@metrics_router.get("", include_in_schema=False, dependencies=[Depends(require_metrics_token)])
+async def metrics() -> Response:
+    """
+    Get the metrics in the Prometheus text format.
+
+    Returns:
+        Response: The exposition text.
+    """
+    for name, (queued, running) in executor_load().items():
+        EXECUTOR_QUEUE_DEPTH.set(queued, executor=name)
+        EXECUTOR_BUSY_THREADS.set(running, executor=name)
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
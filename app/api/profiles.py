@@ -0,0 +1,94 @@
+"""
+Profiles module for the Clinical Trials & FDA Data Search App.
+Lists and serves the request profiles recorded by the profiling middleware.
+Every endpoint requires the admin X-Profile-Token header.
+"""
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+
+from app.utils.profiling import PROFILE_TOKEN, PROFILE_TOKEN_HEADER, ProfileStore, token_matches
+
+# Initialize router
+profiles_router = APIRouter()
+
+
+def get_profile_store() -> ProfileStore:
+    """
+    Get the store of recorded profiles.
+
+    Returns:
+        ProfileStore: Profiles under PROFILE_DIR.
+    """
+    return ProfileStore()
+
+
+async def require_profile_token(token: Optional[str] = Header(None, alias=PROFILE_TOKEN_HEADER)) -> None:
+    """
+    Check the admin profiling token.
+
+    Args:
+        token (Optional[str]): The X-Profile-Token header.
+
+    Raises:
+        HTTPException: If profiling has no token configured or the token does not match.
+    """
+    if not token_matches(token, PROFILE_TOKEN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Profiling access denied")
+
+
+@profiles_router.get("", dependencies=[Depends(require_profile_token)])
+async def list_profiles(store: ProfileStore = Depends(get_profile_store)) -> List[Dict[str, Any]]:
+    """
+    List the recorded profiles, newest first.
+
+    Args:
+        store (ProfileStore): The profile store.
+
+    Returns:
+        List[Dict[str, Any]]: Id, request, trigger, duration and sample count per profile.
+    """
+    return store.list()
+
+
+@profiles_router.get("/{profile_id}", dependencies=[Depends(require_profile_token)])
+async def get_profile(profile_id: str, store: ProfileStore = Depends(get_profile_store)) -> Dict[str, Any]:
+    """
+    Get a profile's summary.
+
+    Args:
+        profile_id (str): The id from the X-Profile-ID response header.
+        store (ProfileStore): The profile store.
+
+    Returns:
+        Dict[str, Any]: The summary with top functions and memory use.
+
+    Raises:
+        HTTPException: If the profile does not exist.
+    """
+    summary = store.load(profile_id)
+    if summary is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return summary
+
+
+@profiles_router.get("/{profile_id}/folded", dependencies=[Depends(require_profile_token)])
+async def get_profile_stacks(profile_id: str, store: ProfileStore = Depends(get_profile_store)) -> Response:
+    """
+    Download a profile's collapsed stacks, for flame graph tools.
+
+    Args:
+        profile_id (str): The id from the X-Profile-ID response header.
+        store (ProfileStore): The profile store.
+
+    Returns:
+        Response: The stacks as a text attachment.
+
+    Raises:
+        HTTPException: If the profile does not exist.
+    """
+    folded = store.folded(profile_id)
+    if folded is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return Response(folded, media_type="text/plain",
+                    headers={"Content-Disposition": f'attachment; filename="{profile_id}.folded"'})
@@ -2,9 +2,10 @@
 Search module for the Clinical Trials & FDA Data Search App.
 Handles search requests for clinical trials and FDA data.
 """
-from fastapi import APIRouter, Depends, HTTPException, status
-from pydantic import BaseModel
-from typing import Optional, List, Dict, Any, Union
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict, Any, Callable, Tuple, Union
 import sys
 import os
 from pathlib import Path
@@ -14,18 +15,38 @@ import pandas as pd
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
 # Import the data fetching modules
-from clinical_trials_module import get_clinical_trials_data
+from clinical_trials_module import get_clinical_trials_candidates, get_clinical_trials_data
 from openfda import Open_FDA
+from app.data import ct_mirror, fda_mirror
+from app.data.ranking import candidate_pool_size, rank_trials
 from app.models.user import User
 from app.api.auth import get_current_user
+from app.api.search_jobs import SearchJobQueueFull, SearchJobStatus, get_search_job_manager
+from app.api.search_cache import get_search_cache
+from app.api.serialization import safe_convert_types, safe_dataframe_to_dict
+from app.utils.admission import (
+    CTGOV_GATE,
+    OPENFDA_GATE,
+    PRIORITY_BACKGROUND,
+    PRIORITY_FULL_FETCH,
+    PRIORITY_INTERACTIVE,
+    AdmissionRejected,
+    admission_context,
+)
+from app.utils.log import Lazy, frame_info, get_logger
+from app.utils.metrics import SEARCH_FETCH_SECONDS, STAGE_SECONDS
 
 # Initialize router
 search_router = APIRouter()
 
+logger = get_logger(__name__)
+
 class SearchRequest(BaseModel):
     """Search request model."""
     keyword: str
     searchType: str = "disease"  # 'disease' or 'drug'
+    max_results: Optional[int] = Field(None, ge=1)  # None returns every matching trial
+    collapse_fda_labels: bool = False  # One row per product instead of one per repackager label
 
 class SearchResponse(BaseModel):
     """Search response model."""
@@ -33,140 +54,75 @@ class SearchResponse(BaseModel):
     fda_data: List[Dict[str, Any]]
     total_clinical_trials: int
     total_fda_data: int
+    clinical_trials_truncated: bool = False
+    search_id: Optional[str] = None  # Refine the results through the facets and filter endpoints
 
-# Helper function to safely convert data types
-def safe_convert_types(df, column_types=None):
+class SearchJobResults(BaseModel):
+    """A page of the results of a completed search job."""
+    job_id: str
+    clinical_trials: List[Dict[str, Any]]
+    fda_data: List[Dict[str, Any]]
+    total_clinical_trials: int
+    total_fda_data: int
+    offset: int
+    limit: int
+
+def fetch_clinical_trials(
+    keyword: str,
+    max_results: Optional[int] = None,
+    progress: Optional[Callable[..., None]] = None
+) -> Tuple[pd.DataFrame, int]:
     """
-    Safely convert DataFrame column types with detailed error reporting.
-    
+    Fetch clinical trials for a keyword, from the local mirror when it has been built.
+
     Args:
-        df: pandas DataFrame to convert
-        column_types: dictionary mapping column names to their target types
-    
+        keyword: Search keyword.
+        max_results: Return only this many of the most relevant trials (None returns all).
+        progress: Optional callback receiving pages_fetched, rows_normalized and total updates.
+
     Returns:
-        Converted DataFrame
+        Tuple of the DataFrame of matching clinical trials and the exact number of matches.
     """
-    if df is None or len(df) == 0:
-        return df
-    
-    if column_types is None:
-        column_types = {}
-    
-    # Default type conversions based on schema
-    default_conversions = {
-        # Clinical trials columns
-        'enrollmentCount': 'int',
-        'hasExpandedAccess': 'bool',
-        'HasResults': 'bool',
-        'healthyVolunteers': 'bool',
-        
-        # FDA columns
-        'is_original_packager': 'bool'
-    }
-    
-    # Merge with provided column types
-    column_types = {**default_conversions, **column_types}
-    
-    # Fill NaN values with appropriate defaults
-    default_values = {
-        'int': 0,
-        'bool': False,
-        'str': '',
-        'float': 0.0
-    }
-    
-    # Process each column
-    for column, dtype in column_types.items():
-        if column in df.columns:
-            try:
-                print(f"Converting column '{column}' to {dtype}")
-                
-                # Fill NaN values with appropriate defaults
-                if dtype == 'int':
-                    # For integer columns, first convert to float, then to int
-                    df[column] = df[column].fillna(default_values['float'])
-                    # Check if values are actually integers
-                    if df[column].apply(lambda x: x != int(x) if pd.notna(x) else False).any():
-                        print(f"WARNING: Column '{column}' contains non-integer values: {df[column].unique()}")
-                    df[column] = df[column].astype(float).astype(int)
-                elif dtype == 'bool':
-                    df[column] = df[column].fillna(default_values['bool']).astype(bool)
-                elif dtype == 'str':
-                    df[column] = df[column].fillna(default_values['str']).astype(str)
-                elif dtype == 'float':
-                    df[column] = df[column].fillna(default_values['float']).astype(float)
-            except Exception as e:
-                print(f"ERROR converting column '{column}' to {dtype}: {str(e)}")
-                print(f"Column values: {df[column].unique()}")
-                # If conversion fails, convert to string as a fallback
-                df[column] = df[column].fillna('').astype(str)
-    
-    return df
+    if ct_mirror.mirror_available():
+        logger.debug("Searching local ClinicalTrials.gov mirror for keyword: '%s'", keyword)
+        with SEARCH_FETCH_SECONDS.time(source="ct_mirror"):
+            df, total = ct_mirror.search_local_trials(keyword, max_results)
+        if progress is not None:
+            progress(rows_normalized=len(df), total=total)
+        return df, total
+    # Full downloads page through every match, so top-N searches are admitted first
+    with CTGOV_GATE.admit(PRIORITY_FULL_FETCH if max_results is None else PRIORITY_INTERACTIVE), \
+            SEARCH_FETCH_SECONDS.time(source="ctgov"):
+        if max_results is None:
+            df = get_clinical_trials_data(keyword, progress)
+            return df, 0 if df is None else len(df)
+        candidates, total = get_clinical_trials_candidates(keyword, candidate_pool_size(max_results), progress)
+    with STAGE_SECONDS.time(stage="ranking"):
+        return rank_trials(candidates, keyword, max_results), total
 
-# Helper function to safely convert DataFrames to dictionaries
-def safe_dataframe_to_dict(df):
+def fetch_fda_data(keyword: str, domain: str, collapse: bool = False) -> pd.DataFrame:
     """
-    Safely convert DataFrame to list of dictionaries with proper type handling.
-    
+    Fetch FDA drug labels for a keyword and domain, from the local mirror when it has been built.
+
     Args:
-        df: pandas DataFrame to convert
-    
+        keyword: Search keyword.
+        domain: 'disease' or 'drug'.
+        collapse: Collapse repackager labels of the same product into one row.
+
     Returns:
-        List of dictionaries
+        DataFrame of matching drug labels.
     """
-    if df is None or len(df) == 0:
-        return []
-    
-    try:
-        # First attempt: convert directly to dict
-        records = df.to_dict(orient="records")
-        
-        # Validate each record
-        clean_records = []
-        for record in records:
-            clean_record = {}
-            for key, value in record.items():
-                try:
-                    # Check if value is JSON serializable
-                    import json
-                    json.dumps({key: value})
-                    clean_record[key] = value
-                except (TypeError, OverflowError):
-                    # If not serializable, convert to string
-                    print(f"Converting non-serializable value in column '{key}' to string: {type(value)}")
-                    clean_record[key] = str(value)
-            clean_records.append(clean_record)
-        
-        return clean_records
-    except Exception as e:
-        print(f"Error in safe_dataframe_to_dict: {str(e)}")
-        import traceback
-        print(traceback.format_exc())
-        
-        # Fallback: convert row by row
-        clean_records = []
-        for _, row in df.iterrows():
-            clean_record = {}
-            for key, value in row.items():
-                try:
-                    # Try to use the value as is
-                    if pd.isna(value):
-                        if key in ['enrollmentCount', 'total_clinical_trials', 'total_fda_data']:
-                            clean_record[key] = 0
-                        elif key in ['hasExpandedAccess', 'HasResults', 'healthyVolunteers', 'is_original_packager']:
-                            clean_record[key] = False
-                        else:
-                            clean_record[key] = ""
-                    elif isinstance(value, float) and key in ['enrollmentCount', 'total_clinical_trials', 'total_fda_data']:
-                        clean_record[key] = int(value)
-                    else:
-                        clean_record[key] = value
-                except Exception:
-                    # If all else fails, convert to string
-                    clean_record[key] = str(value)
-            clean_records.append(clean_record)
-        
-        return clean_records
+    if fda_mirror.mirror_available():
+        logger.debug("Searching local openFDA mirror for keyword: '%s', domain: '%s'", keyword, domain)
+        with SEARCH_FETCH_SECONDS.time(source="fda_mirror"):
+            df = fda_mirror.search_local_labels(keyword, domain)
+    else:
+        with OPENFDA_GATE.admit(), SEARCH_FETCH_SECONDS.time(source="openfda"):
+            df = Open_FDA.open_fda_main(keyword, domain)
+    if not collapse:
+        return df
+    with STAGE_SECONDS.time(stage="label_collapse"):
+        return Open_FDA.collapse_repackager_labels(df)
 
 @search_router.post("", response_model=SearchResponse)
 async def search(
@@ -185,122 +141,258 @@ async def search(
         
     Raises:
         HTTPException: If the search fails.
+        AdmissionRejected: If the user or the upstream services have too many searches running.
     """
     # Initialize empty results
     clinical_trials_data = []
     fda_data = []
+    clinical_trials_df = None
+    fda_df = None
+    total_clinical_trials = 0
     clinical_trials_error = None
     fda_error = None
     
     try:
-        print(f"Search request received: keyword='{request.keyword}', domain='{request.searchType}'")
-        print(f"User: {current_user.email}")
+        logger.info("Search request received", extra={"keyword": request.keyword, "domain": request.searchType,
+                                                       "user_id": current_user.id})
         
-        # Fetch clinical trials data
+        # Fetch clinical trials data off the event loop, admitted against the user's share of the upstream
         try:
-            print(f"Fetching clinical trials data for keyword: '{request.keyword}'")
-            clinical_trials_df = get_clinical_trials_data(request.keyword)
+            with admission_context(current_user.id):
+                clinical_trials_df, total_clinical_trials = await run_in_threadpool(
+                    fetch_clinical_trials, request.keyword, request.max_results
+                )
             
             if clinical_trials_df is not None and not clinical_trials_df.empty:
-                print(f"Clinical trials data fetched: {len(clinical_trials_df)} records")
-                
-                # Print DataFrame info for debugging
-                print("Clinical trials DataFrame info:")
-                clinical_trials_df.info()
-                
-                # Check for problematic columns
-                for col in clinical_trials_df.columns:
-                    if clinical_trials_df[col].dtype == 'float64':
-                        print(f"Potential problematic column (float): {col}")
-                        print(f"Sample values: {clinical_trials_df[col].head()}")
+                logger.debug("Clinical trials data fetched: %d records\n%s", len(clinical_trials_df), Lazy(frame_info, clinical_trials_df))
                 
                 # Convert clinical trials DataFrame to dictionaries with proper type handling
                 try:
-                    # Apply safe type conversion
-                    clinical_trials_df = safe_convert_types(clinical_trials_df)
+                    # Apply safe type conversion, off the event loop like the fetch
+                    clinical_trials_df = await run_in_threadpool(safe_convert_types, clinical_trials_df)
                     
                     # Convert to dictionaries
-                    clinical_trials_data = safe_dataframe_to_dict(clinical_trials_df)
-                    print(f"Converted {len(clinical_trials_data)} clinical trials records to dictionaries")
+                    clinical_trials_data = await run_in_threadpool(safe_dataframe_to_dict, clinical_trials_df)
                 except Exception as e:
-                    print(f"Error converting clinical trials DataFrame to dictionaries: {str(e)}")
+                    logger.exception("Error converting clinical trials DataFrame to dictionaries: %s", e)
                     clinical_trials_error = f"Error processing clinical trials data: {str(e)}"
                     clinical_trials_data = []
             else:
-                print("No clinical trials data found or empty DataFrame returned")
+                logger.info("No clinical trials data found", extra={"keyword": request.keyword})
                 clinical_trials_data = []
+        except AdmissionRejected:
+            raise
         except Exception as e:
-            import traceback
-            print(f"Error fetching clinical trials data: {str(e)}")
-            print(f"Traceback: {traceback.format_exc()}")
+            logger.exception("Error fetching clinical trials data: %s", e)
             clinical_trials_error = f"Error fetching clinical trials data: {str(e)}"
             clinical_trials_data = []
         
         # Fetch FDA data
         try:
-            print(f"Fetching FDA data for keyword: '{request.keyword}', domain: '{request.searchType}'")
-            fda_df = Open_FDA.open_fda_main(request.keyword, request.searchType)
+            with admission_context(current_user.id):
+                fda_df = await run_in_threadpool(fetch_fda_data, request.keyword, request.searchType, request.collapse_fda_labels)
             
             if fda_df is not None and not fda_df.empty:
-                print(f"FDA data fetched: {len(fda_df)} records")
-                
-                # Print DataFrame info for debugging
-                print("FDA DataFrame info:")
-                fda_df.info()
+                logger.debug("FDA data fetched: %d records\n%s", len(fda_df), Lazy(frame_info, fda_df))
                 
                 # Convert FDA DataFrame to dictionaries with proper type handling
                 try:
-                    # Apply safe type conversion
-                    fda_df = safe_convert_types(fda_df)
+                    # Apply safe type conversion, off the event loop like the fetch
+                    fda_df = await run_in_threadpool(safe_convert_types, fda_df)
                     
                     # Convert to dictionaries
-                    fda_data = safe_dataframe_to_dict(fda_df)
-                    print(f"Converted {len(fda_data)} FDA records to dictionaries")
+                    fda_data = await run_in_threadpool(safe_dataframe_to_dict, fda_df)
                 except Exception as e:
-                    print(f"Error converting FDA DataFrame to dictionaries: {str(e)}")
+                    logger.exception("Error converting FDA DataFrame to dictionaries: %s", e)
                     fda_error = f"Error processing FDA data: {str(e)}"
                     fda_data = []
             else:
-                print("No FDA data found or empty DataFrame returned")
+                logger.info("No FDA data found", extra={"keyword": request.keyword, "domain": request.searchType})
                 fda_data = []
+        except AdmissionRejected:
+            raise
         except Exception as e:
-            import traceback
-            print(f"Error fetching FDA data: {str(e)}")
-            print(f"Traceback: {traceback.format_exc()}")
+            logger.exception("Error fetching FDA data: %s", e)
             fda_error = f"Error fetching FDA data: {str(e)}"
             fda_data = []
         
         # Check if both data sources failed
         if clinical_trials_error and fda_error:
             error_message = f"Search failed: {clinical_trials_error}; {fda_error}"
-            print(error_message)
+            logger.error(error_message)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=error_message
             )
         
+        # Cache the result frames so facets and filters can refine them without searching again.
+        # Reason: a shared cache writes the frames as Arrow files, so this runs off the event loop too
+        search_id = await run_in_threadpool(
+            get_search_cache().put,
+            current_user.id,
+            request.model_dump(),
+            {"clinical_trials": clinical_trials_df, "fda_data": fda_df}
+        )
+        
         # Create response
         response = SearchResponse(
             clinical_trials=clinical_trials_data,
             fda_data=fda_data,
-            total_clinical_trials=len(clinical_trials_data),
-            total_fda_data=len(fda_data)
+            total_clinical_trials=max(total_clinical_trials, len(clinical_trials_data)),
+            total_fda_data=len(fda_data),
+            clinical_trials_truncated=total_clinical_trials > len(clinical_trials_data),
+            search_id=search_id
         )
         
-        print(f"Search completed successfully: {len(clinical_trials_data)} clinical trials, {len(fda_data)} FDA records")
+        logger.info("Search completed", extra={"clinical_trials": len(clinical_trials_data), "fda_data": len(fda_data)})
         return response
         
-    except HTTPException as he:
-        # Re-raise HTTP exceptions
-        raise he
+    except (HTTPException, AdmissionRejected):
+        # Re-raise HTTP exceptions and admission refusals, answered with Retry-After
+        raise
     except Exception as e:
-        import traceback
-        error_trace = traceback.format_exc()
         error_message = f"Unexpected error during search: {str(e)}"
-        print(error_message)
-        print(f"Error trace: {error_trace}")
+        logger.exception(error_message)
         
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=error_message
         )
+
+def run_search_job(request: SearchRequest, progress: Callable[..., None]):
+    """
+    Run a search for a background job.
+
+    Args:
+        request: The search request.
+        progress: Progress callback of the job.
+
+    Returns:
+        Tuple of the result tables with their totals, and the errors of any failed sources.
+    """
+    results = {}
+    errors = []
+    # Reason: jobs are already bounded by their pool, so they queue behind interactive searches without a per-user limit
+    with admission_context(None, PRIORITY_BACKGROUND):
+        try:
+            clinical_trials_df, total = fetch_clinical_trials(request.keyword, request.max_results, progress)
+            results["clinical_trials"] = (safe_convert_types(clinical_trials_df), total)
+        except Exception as e:
+            logger.exception("Error fetching clinical trials data for search job: %s", e)
+            errors.append(f"Error fetching clinical trials data: {str(e)}")
+        try:
+            fda_df = fetch_fda_data(request.keyword, request.searchType, request.collapse_fda_labels)
+            results["fda_data"] = (safe_convert_types(fda_df), 0 if fda_df is None else len(fda_df))
+        except Exception as e:
+            logger.exception("Error fetching FDA data for search job: %s", e)
+            errors.append(f"Error fetching FDA data: {str(e)}")
+    return results, errors
+
+def get_owned_job(job_id: str, current_user: User) -> SearchJobStatus:
+    """
+    Get a search job, checking that it belongs to the current user.
+
+    Args:
+        job_id: The job id.
+        current_user: The authenticated user.
+
+    Returns:
+        SearchJobStatus: The job.
+
+    Raises:
+        HTTPException: If the job does not exist or belongs to another user.
+    """
+    job = get_search_job_manager().get(job_id)
+    if job is None or job.owner_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Search job not found")
+    return job
+
+@search_router.post("/jobs", response_model=SearchJobStatus, status_code=status.HTTP_202_ACCEPTED)
+async def submit_search_job(
+    request: SearchRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Submit a search to run in the background.
+
+    Args:
+        request: Search request containing keyword and domain.
+        current_user: The authenticated user.
+
+    Returns:
+        SearchJobStatus: The queued job; poll it by its job_id.
+
+    Raises:
+        HTTPException: If too many search jobs are already running.
+    """
+    logger.info("Search job submitted", extra={"keyword": request.keyword, "domain": request.searchType, "user_id": current_user.id})
+    try:
+        return get_search_job_manager().submit(
+            current_user.id,
+            request.model_dump(),
+            lambda progress: run_search_job(request, progress)
+        )
+    except SearchJobQueueFull as e:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e))
+
+@search_router.get("/jobs/{job_id}", response_model=SearchJobStatus)
+def get_search_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get the status and progress of a search job.
+
+    A plain function, since another worker's job status is read from disk.
+
+    Args:
+        job_id: The job id.
+        current_user: The authenticated user.
+
+    Returns:
+        SearchJobStatus: The job status.
+    """
+    return get_owned_job(job_id, current_user)
+
+@search_router.get("/jobs/{job_id}/results", response_model=SearchJobResults)
+def get_search_job_results(
+    job_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1, le=10000),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get a page of the results of a completed search job.
+
+    A plain function, so FastAPI runs the Parquet reads and serialization in its
+    threadpool instead of on the event loop.
+
+    Args:
+        job_id: The job id.
+        offset: First row of each result table to return.
+        limit: Maximum number of rows of each result table to return.
+        current_user: The authenticated user.
+
+    Returns:
+        SearchJobResults: The requested rows and the result totals.
+
+    Raises:
+        HTTPException: If the job is not found or has not completed.
+    """
+    job = get_owned_job(job_id, current_user)
+    if job.status != "completed":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Search job is {job.status}" + (f": {'; '.join(job.errors)}" if job.errors else "")
+        )
+
+    store = get_search_job_manager().store
+    return SearchJobResults(
+        job_id=job_id,
+        clinical_trials=safe_dataframe_to_dict(store.read_table(job_id, "clinical_trials", offset, limit)),
+        fda_data=safe_dataframe_to_dict(store.read_table(job_id, "fda_data", offset, limit)),
+        total_clinical_trials=job.totals.get("clinical_trials", 0),
+        total_fda_data=job.totals.get("fda_data", 0),
+        offset=offset,
+        limit=limit
+    )
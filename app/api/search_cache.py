@@ -0,0 +1,287 @@
+"""
+Search result cache module for the Clinical Trials & FDA Data Search App.
+Keeps the result frames of recent searches in memory under a search id, with
+their facet and drug link indexes, so refinements, facet counts and drug
+lookups never re-run the upstream ClinicalTrials.gov or openFDA search.
+With several worker processes, the frames are also written as Arrow files
+that the other workers memory-map when a follow-up request reaches them.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+from app.data.columnar import ARROW_SUFFIX, frame_to_table, map_arrow, table_to_pandas, write_arrow
+from app.data.drug_linkage import DrugLinkIndex
+from app.data.facets import FACET_COLUMNS, FACET_LIST_COLUMNS, FacetIndex
+from app.utils.log import get_logger
+from app.utils.metrics import CACHE_REQUESTS
+
+logger = get_logger(__name__)
+
+# Number of searches kept and how long they stay usable
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "32"))
+SEARCH_CACHE_TTL_MINUTES = float(os.getenv("SEARCH_CACHE_TTL_MINUTES", "30"))
+
+# Directory shared by the worker processes, used when SEARCH_CACHE_SHARED is 1
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+SEARCH_CACHE_DIR = Path(os.getenv("SEARCH_CACHE_DIR", str(PROJECT_ROOT / "data" / "search_cache")))
+SEARCH_CACHE_SHARED = os.getenv("SEARCH_CACHE_SHARED", "0") == "1"
+
+META_FILE = "meta.json"
+
+
+class CachedSearch:
+    """The result frames of one search and their lazily built facet and drug link indexes."""
+
+    def __init__(self, search_id: str, owner_id: str, params: Dict[str, Any], frames: Dict[str, pd.DataFrame]):
+        """
+        Wrap a search's results.
+
+        Args:
+            search_id (str): The search id.
+            owner_id (str): Id of the user who ran the search.
+            params (Dict[str, Any]): Search parameters.
+            frames (Dict[str, pd.DataFrame]): Dataset names mapped to their result frames.
+        """
+        self.search_id = search_id
+        self.owner_id = owner_id
+        self.params = params
+        self.frames = {name: (df if df is not None else pd.DataFrame()).reset_index(drop=True) for name, df in frames.items()}
+        self.created = time.monotonic()
+        self._indexes: Dict[str, FacetIndex] = {}
+        self._drug_links: Optional[DrugLinkIndex] = None
+        self._lock = threading.Lock()
+
+    def frame(self, dataset: str) -> pd.DataFrame:
+        """
+        Get a dataset's result frame.
+
+        Args:
+            dataset (str): Dataset name.
+
+        Returns:
+            pd.DataFrame: The results, or an empty frame if the search did not return the dataset.
+        """
+        return self.frames.get(dataset, pd.DataFrame())
+
+    def facet_index(self, dataset: str) -> FacetIndex:
+        """
+        Get a dataset's facet index, building it on first use.
+
+        Args:
+            dataset (str): Dataset name, a key of FACET_COLUMNS.
+
+        Returns:
+            FacetIndex: The index over the dataset's result frame.
+        """
+        with self._lock:
+            if dataset not in self._indexes:
+                self._indexes[dataset] = FacetIndex(self.frame(dataset), FACET_COLUMNS[dataset], FACET_LIST_COLUMNS[dataset])
+            return self._indexes[dataset]
+
+    def drug_links(self) -> DrugLinkIndex:
+        """
+        Get the links between the search's trials and FDA labels, building them on first use.
+
+        Returns:
+            DrugLinkIndex: The linkage table and its lookups.
+        """
+        with self._lock:
+            if self._drug_links is None:
+                self._drug_links = DrugLinkIndex(self.frame("clinical_trials"), self.frame("fda_data"))
+            return self._drug_links
+
+
+class SharedSearchStore:
+    """Search result frames as Arrow files, one directory per search, shared by the worker processes."""
+
+    def __init__(self, root: Path = SEARCH_CACHE_DIR, max_entries: int = SEARCH_CACHE_SIZE,
+                 ttl_minutes: float = SEARCH_CACHE_TTL_MINUTES):
+        """
+        Open the store.
+
+        Args:
+            root (Path): Directory holding the search directories.
+            max_entries (int): Maximum number of searches kept.
+            ttl_minutes (float): Minutes a search stays usable after it ran.
+        """
+        self.root = Path(root)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_minutes * 60
+
+    def _search_dir(self, search_id: str) -> Path:
+        """
+        Get the directory of a search.
+
+        Raises:
+            ValueError: If the id is not a search id.
+        """
+        return self.root / str(uuid.UUID(search_id))
+
+    def save(self, entry: CachedSearch) -> None:
+        """
+        Write a search's frames, then delete expired searches and the oldest beyond max_entries.
+
+        Args:
+            entry (CachedSearch): The search.
+        """
+        search_dir = self._search_dir(entry.search_id)
+        search_dir.mkdir(parents=True, exist_ok=True)
+        for name, df in entry.frames.items():
+            write_arrow(frame_to_table(df), search_dir / f"{name}{ARROW_SUFFIX}")
+        meta = {"owner_id": entry.owner_id, "params": entry.params, "created_at": time.time(), "frames": list(entry.frames)}
+        # Reason: the metadata is written last, so other workers only load complete searches
+        tmp_path = search_dir / f"{META_FILE}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, default=str)
+        os.replace(tmp_path, search_dir / META_FILE)
+        self.prune()
+
+    def load(self, search_id: str) -> Optional[CachedSearch]:
+        """
+        Load a search written by any worker, mapping its frames.
+
+        Args:
+            search_id (str): The search id.
+
+        Returns:
+            Optional[CachedSearch]: The search, or None if it is unknown or expired.
+        """
+        try:
+            search_dir = self._search_dir(search_id)
+            with open(search_dir / META_FILE, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            age = time.time() - meta["created_at"]
+            if age > self.ttl_seconds:
+                return None
+            frames = {name: table_to_pandas(map_arrow(search_dir / f"{name}{ARROW_SUFFIX}")) for name in meta["frames"]}
+        except (ValueError, KeyError, OSError):
+            return None
+        entry = CachedSearch(search_id, meta["owner_id"], meta["params"], frames)
+        entry.created = time.monotonic() - age
+        return entry
+
+    def prune(self) -> int:
+        """
+        Delete expired searches and the oldest beyond max_entries.
+
+        Returns:
+            int: Number of searches deleted.
+        """
+        if not self.root.is_dir():
+            return 0
+        searches = []
+        for search_dir in self.root.iterdir():
+            try:
+                searches.append(((search_dir / META_FILE).stat().st_mtime, search_dir))
+            except OSError:
+                continue
+        searches.sort(reverse=True)
+        cutoff = time.time() - self.ttl_seconds
+        stale = [search_dir for i, (mtime, search_dir) in enumerate(searches) if i >= self.max_entries or mtime < cutoff]
+        for search_dir in stale:
+            shutil.rmtree(search_dir, ignore_errors=True)
+        return len(stale)
+
+
+class SearchResultCache:
+    """A bounded, expiring, least recently used cache of search results."""
+
+    def __init__(
+        self,
+        max_entries: int = SEARCH_CACHE_SIZE,
+        ttl_minutes: float = SEARCH_CACHE_TTL_MINUTES,
+        shared: Optional[SharedSearchStore] = None,
+    ):
+        """
+        Create an empty cache.
+
+        Args:
+            max_entries (int): Maximum number of searches kept.
+            ttl_minutes (float): Minutes a search stays usable after it ran.
+            shared (Optional[SharedSearchStore]): Store shared with other worker processes, if any.
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_minutes * 60
+        self.shared = shared
+        self._entries: "OrderedDict[str, CachedSearch]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, owner_id: str, params: Dict[str, Any], frames: Dict[str, pd.DataFrame], search_id: Optional[str] = None) -> str:
+        """
+        Cache the results of a search.
+
+        Args:
+            owner_id (str): Id of the user who ran the search.
+            params (Dict[str, Any]): Search parameters.
+            frames (Dict[str, pd.DataFrame]): Dataset names mapped to their result frames.
+            search_id (Optional[str]): Id to cache the results under (a new id by default).
+
+        Returns:
+            str: The search id.
+        """
+        entry = CachedSearch(search_id or str(uuid.uuid4()), owner_id, params, frames)
+        self._add(entry)
+        if self.shared is not None:
+            try:
+                self.shared.save(entry)
+            except (OSError, ValueError) as e:
+                logger.warning("Could not share search %s with other workers: %s", entry.search_id, e)
+        return entry.search_id
+
+    def _add(self, entry: CachedSearch) -> None:
+        """Keep a search in memory, evicting the least recently used beyond max_entries."""
+        with self._lock:
+            self._entries[entry.search_id] = entry
+            self._entries.move_to_end(entry.search_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, search_id: str, owner_id: str) -> Optional[CachedSearch]:
+        """
+        Get a cached search of a user.
+
+        Args:
+            search_id (str): The search id.
+            owner_id (str): Id of the requesting user.
+
+        Returns:
+            Optional[CachedSearch]: The search, or None if it is unknown, expired or owned by another user.
+        """
+        with self._lock:
+            entry = self._entries.get(search_id)
+            if entry is not None and time.monotonic() - entry.created > self.ttl_seconds:
+                del self._entries[search_id]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(search_id)
+        if entry is None and self.shared is not None:
+            # Reason: the search may have run in another worker process
+            entry = self.shared.load(search_id)
+            CACHE_REQUESTS.inc(cache="search_results_shared", result="hit" if entry is not None else "miss")
+            if entry is not None:
+                self._add(entry)
+        CACHE_REQUESTS.inc(cache="search_results", result="hit" if entry is not None else "miss")
+        if entry is None:
+            return None
+        return entry if entry.owner_id == owner_id else None
+
+
+@lru_cache(maxsize=1)
+def get_search_cache() -> SearchResultCache:
+    """
+    Get the shared search result cache.
+
+    Returns:
+        SearchResultCache: The process-wide cache, backed by SEARCH_CACHE_DIR when SEARCH_CACHE_SHARED is set.
+    """
+    return SearchResultCache(shared=SharedSearchStore() if SEARCH_CACHE_SHARED else None)
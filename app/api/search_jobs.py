@@ -0,0 +1,397 @@
+"""
+Search jobs module for the Clinical Trials & FDA Data Search App.
+Runs large searches in a bounded pool of background workers, persisting job
+status and result tables to disk so that long downloads do not tie up
+request workers and survive client disconnects.
+"""
+import contextvars
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+import pyarrow.parquet as pq
+from pydantic import BaseModel
+
+from app.data.columnar import frame_to_table, table_to_pandas
+from app.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Job store location and pool limits
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+SEARCH_JOBS_DIR = Path(os.getenv("SEARCH_JOBS_DIR", str(PROJECT_ROOT / "data" / "search_jobs")))
+SEARCH_JOB_WORKERS = int(os.getenv("SEARCH_JOB_WORKERS", "2"))
+SEARCH_JOB_MAX_PENDING = int(os.getenv("SEARCH_JOB_MAX_PENDING", "16"))
+SEARCH_JOB_TTL_HOURS = float(os.getenv("SEARCH_JOB_TTL_HOURS", "24"))
+
+# Minimum seconds between persisted progress updates of a running job
+PROGRESS_SAVE_INTERVAL = 0.5
+
+STATUS_FILE = "status.json"
+
+# A job function receives a progress callback and returns its result tables with
+# their totals, plus the errors of any sources that failed
+JobFunction = Callable[[Callable[..., None]], Tuple[Dict[str, Tuple[pd.DataFrame, int]], List[str]]]
+
+
+class SearchJobQueueFull(Exception):
+    """Raised when too many search jobs are already queued or running."""
+
+
+class SearchJobStatus(BaseModel):
+    """Status and progress of a background search job."""
+    job_id: str
+    owner_id: str
+    status: str = "queued"  # 'queued', 'running', 'completed' or 'failed'
+    params: Dict[str, Any] = {}
+    pages_fetched: int = 0
+    rows_normalized: int = 0
+    expected_total: Optional[int] = None
+    totals: Dict[str, int] = {}
+    errors: List[str] = []
+    worker_pid: Optional[int] = None
+    created_at: str
+    updated_at: str
+
+
+def _now() -> str:
+    """Get the current UTC time as an ISO string."""
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _process_alive(pid: Optional[int]) -> bool:
+    """
+    Check whether a process is still running.
+
+    Args:
+        pid (Optional[int]): Process id.
+
+    Returns:
+        bool: True if the process exists.
+    """
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SearchJobStore:
+    """Job status files and result tables, one directory per job."""
+
+    def __init__(self, root: Path = SEARCH_JOBS_DIR):
+        """
+        Open the store.
+
+        Args:
+            root (Path): Directory holding the job directories.
+        """
+        self.root = Path(root)
+
+    def _job_dir(self, job_id: str) -> Path:
+        """Get the directory of a job."""
+        return self.root / job_id
+
+    def save_status(self, job: SearchJobStatus) -> None:
+        """
+        Persist a job's status atomically.
+
+        Args:
+            job (SearchJobStatus): The job status.
+        """
+        job_dir = self._job_dir(job.job_id)
+        job_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = job_dir / f"{STATUS_FILE}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(job.model_dump_json())
+        os.replace(tmp_path, job_dir / STATUS_FILE)
+
+    def load_status(self, job_id: str) -> Optional[SearchJobStatus]:
+        """
+        Load a job's persisted status.
+
+        Args:
+            job_id (str): The job id.
+
+        Returns:
+            Optional[SearchJobStatus]: The status, or None if the job is unknown.
+        """
+        try:
+            uuid.UUID(job_id)
+            with open(self._job_dir(job_id) / STATUS_FILE, "r", encoding="utf-8") as f:
+                return SearchJobStatus.model_validate(json.load(f))
+        except (ValueError, OSError):
+            return None
+
+    def write_table(self, job_id: str, name: str, df: pd.DataFrame) -> None:
+        """
+        Persist a result table as Parquet.
+
+        Args:
+            job_id (str): The job id.
+            name (str): Table name.
+            df (pd.DataFrame): The results.
+        """
+        pq.write_table(frame_to_table(df), self._job_dir(job_id) / f"{name}.parquet")
+
+    def read_table(self, job_id: str, name: str, offset: int = 0, limit: Optional[int] = None) -> pd.DataFrame:
+        """
+        Read a slice of a result table.
+
+        Args:
+            job_id (str): The job id.
+            name (str): Table name.
+            offset (int): First row to read.
+            limit (Optional[int]): Maximum number of rows (None reads to the end).
+
+        Returns:
+            pd.DataFrame: The rows, or an empty frame if the table does not exist.
+        """
+        path = self._job_dir(job_id) / f"{name}.parquet"
+        if not path.is_file():
+            return pd.DataFrame()
+        table = pq.read_table(path, memory_map=True)
+        return table_to_pandas(table.slice(offset, limit))
+
+    def delete_expired(self, ttl_hours: float = SEARCH_JOB_TTL_HOURS) -> int:
+        """
+        Delete finished jobs older than the retention period.
+
+        Args:
+            ttl_hours (float): Retention period in hours.
+
+        Returns:
+            int: Number of jobs deleted.
+        """
+        if not self.root.is_dir():
+            return 0
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=ttl_hours)
+        deleted = 0
+        for job_dir in self.root.iterdir():
+            job = self.load_status(job_dir.name)
+            if job is None or job.status not in ("completed", "failed"):
+                continue
+            if datetime.fromisoformat(job.updated_at) < cutoff:
+                shutil.rmtree(job_dir, ignore_errors=True)
+                deleted += 1
+        return deleted
+
+    def fail_interrupted(self) -> int:
+        """
+        Mark jobs left queued or running by a server process that has exited as failed.
+
+        Returns:
+            int: Number of jobs marked.
+        """
+        if not self.root.is_dir():
+            return 0
+        marked = 0
+        for job_dir in self.root.iterdir():
+            job = self.load_status(job_dir.name)
+            if job is not None and job.status in ("queued", "running") and not _process_alive(job.worker_pid):
+                job.status = "failed"
+                job.errors = job.errors + ["Interrupted by a server restart"]
+                job.updated_at = _now()
+                self.save_status(job)
+                marked += 1
+        return marked
+
+
+class SearchJobManager:
+    """A bounded pool of background workers running search jobs."""
+
+    def __init__(
+        self,
+        store: Optional[SearchJobStore] = None,
+        workers: int = SEARCH_JOB_WORKERS,
+        max_pending: int = SEARCH_JOB_MAX_PENDING,
+    ):
+        """
+        Start the worker pool.
+
+        Args:
+            store (Optional[SearchJobStore]): Job store (defaults to SEARCH_JOBS_DIR).
+            workers (int): Number of jobs run at the same time.
+            max_pending (int): Maximum number of queued and running jobs.
+        """
+        self.store = store or SearchJobStore()
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="search-job")
+        self._lock = threading.Lock()
+        self._active: Dict[str, SearchJobStatus] = {}
+        self.store.fail_interrupted()
+
+    def submit(self, owner_id: str, params: Dict[str, Any], run: JobFunction) -> SearchJobStatus:
+        """
+        Queue a search job.
+
+        Args:
+            owner_id (str): Id of the user submitting the job.
+            params (Dict[str, Any]): Search parameters, kept with the status.
+            run (JobFunction): The search to run.
+
+        Returns:
+            SearchJobStatus: The queued job.
+
+        Raises:
+            SearchJobQueueFull: If max_pending jobs are already queued or running.
+        """
+        self.store.delete_expired()
+        with self._lock:
+            if len(self._active) >= self.max_pending:
+                raise SearchJobQueueFull(f"{len(self._active)} search jobs are already queued or running")
+            now = _now()
+            job = SearchJobStatus(
+                job_id=str(uuid.uuid4()),
+                owner_id=owner_id,
+                params=params,
+                worker_pid=os.getpid(),
+                created_at=now,
+                updated_at=now,
+            )
+            self._active[job.job_id] = job
+            queued = job.model_copy()
+        self.store.save_status(queued)
+        # Reason: executor threads do not inherit context variables; the job keeps the submitting request's correlation id
+        self._executor.submit(contextvars.copy_context().run, self._run, job.job_id, run)
+        return queued
+
+    def get(self, job_id: str) -> Optional[SearchJobStatus]:
+        """
+        Get a job's current status.
+
+        Args:
+            job_id (str): The job id.
+
+        Returns:
+            Optional[SearchJobStatus]: The status, or None if the job is unknown.
+        """
+        with self._lock:
+            job = self._active.get(job_id)
+            if job is not None:
+                return job.model_copy()
+        return self.store.load_status(job_id)
+
+    def _update(self, job_id: str, save: bool = True, **changes: Any) -> None:
+        """
+        Update an active job's status.
+
+        Args:
+            job_id (str): The job id.
+            save (bool): Persist the status now.
+            **changes: Status fields to set.
+        """
+        with self._lock:
+            job = self._active[job_id]
+            for key, value in changes.items():
+                setattr(job, key, value)
+            job.updated_at = _now()
+            snapshot = job.model_copy()
+        if save:
+            self.store.save_status(snapshot)
+
+    def _finish(self, job_id: str, **changes: Any) -> None:
+        """
+        Persist a job's final status and retire it from the active jobs.
+
+        The status is saved before the job leaves the active set, so pollers
+        never see it go back to an earlier persisted state.
+
+        Args:
+            job_id (str): The job id.
+            **changes: Status fields to set.
+        """
+        with self._lock:
+            final = self._active[job_id].model_copy(update={**changes, "updated_at": _now()})
+        self.store.save_status(final)
+        with self._lock:
+            self._active.pop(job_id, None)
+
+    def _run(self, job_id: str, run: JobFunction) -> None:
+        """
+        Run a job in a worker thread and persist its results.
+
+        Args:
+            job_id (str): The job id.
+            run (JobFunction): The search to run.
+        """
+        last_save = [0.0]
+
+        def progress(pages_fetched: Optional[int] = None, rows_normalized: Optional[int] = None, total: Optional[int] = None) -> None:
+            changes = {}
+            if pages_fetched is not None:
+                changes["pages_fetched"] = pages_fetched
+            if rows_normalized is not None:
+                changes["rows_normalized"] = rows_normalized
+            if total is not None:
+                changes["expected_total"] = total
+            save = time.monotonic() - last_save[0] >= PROGRESS_SAVE_INTERVAL
+            if save:
+                last_save[0] = time.monotonic()
+            self._update(job_id, save=save, **changes)
+
+        self._update(job_id, status="running")
+        try:
+            results, errors = run(progress)
+            totals = {}
+            for name, (df, total) in results.items():
+                self.store.write_table(job_id, name, df)
+                totals[name] = total
+            status = "completed" if totals or not errors else "failed"
+            self._finish(job_id, status=status, totals=totals, errors=errors)
+        except Exception as e:
+            logger.exception("Search job %s failed: %s", job_id, e)
+            self._finish(job_id, status="failed", errors=[str(e)])
+
+    def load(self) -> Tuple[int, int]:
+        """
+        Get the number of queued and running jobs.
+
+        Returns:
+            Tuple[int, int]: (jobs waiting for a worker, jobs running).
+        """
+        # Reason: ThreadPoolExecutor has no public view of its backlog
+        queued = self._executor._work_queue.qsize()
+        with self._lock:
+            active = len(self._active)
+        return queued, max(active - queued, 0)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stop the worker pool.
+
+        Args:
+            wait (bool): Wait for running jobs to finish.
+        """
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+@lru_cache(maxsize=1)
+def get_search_job_manager() -> SearchJobManager:
+    """
+    Get the shared search job manager, starting it on first use.
+
+    Returns:
+        SearchJobManager: The process-wide manager.
+    """
+    return SearchJobManager()
+
+
+def shutdown_search_jobs() -> None:
+    """Stop the shared search job manager if it was started."""
+    if get_search_job_manager.cache_info().currsize:
+        get_search_job_manager().shutdown(wait=False)
+        get_search_job_manager.cache_clear()
@@ -0,0 +1,249 @@
+"""
+Search refinement module for the Clinical Trials & FDA Data Search App.
+Facet counts, facet and eligibility filters, and drug links over the cached
+results of a search, without searching again.
+"""
+from enum import Enum
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from pydantic import BaseModel, Field
+
+from app.api.auth import get_current_user
+from app.api.search_cache import CachedSearch, get_search_cache
+from app.api.search_jobs import get_search_job_manager
+from app.api.serialization import safe_dataframe_to_dict
+from app.models.user import User
+from clinical_trials_module import age_window_mask, sex_mask
+
+# Reason: these endpoints index, filter and serialize whole result frames, so they
+# are plain functions that FastAPI runs in its threadpool instead of on the event loop
+search_refine_router = APIRouter()
+
+class SearchDataset(str, Enum):
+    """Result datasets of a search."""
+    clinical_trials = "clinical_trials"
+    fda_data = "fda_data"
+
+class PopulationFilter(BaseModel):
+    """Eligibility filters on clinical trials."""
+    min_age_years: Optional[float] = Field(None, ge=0)  # Keep trials whose age range overlaps the window
+    max_age_years: Optional[float] = Field(None, ge=0)
+    sex: Optional[str] = Field(None, pattern="^(FEMALE|MALE|ALL)$")  # ALL keeps trials accepting both
+
+class FacetRequest(PopulationFilter):
+    """Facet count request over cached search results."""
+    search_id: str
+    filters: Dict[str, List[str]] = {}  # Facet column -> accepted values
+    columns: Optional[List[str]] = None  # Facet columns to count; None counts all
+
+class FacetResponse(BaseModel):
+    """Facet counts over cached search results."""
+    search_id: str
+    dataset: str
+    total: int
+    matched: int
+    facets: Dict[str, Dict[str, int]]
+
+class FilterRequest(PopulationFilter):
+    """Filter request over cached search results."""
+    search_id: str
+    filters: Dict[str, List[str]] = {}
+    offset: int = Field(0, ge=0)
+    limit: int = Field(1000, ge=1, le=10000)
+
+class DrugLinkResponse(BaseModel):
+    """Links between the trials and FDA labels of a cached search."""
+    search_id: str
+    links: List[Dict[str, Any]]
+    total: int
+    linked_trials: int
+    linked_labels: int
+    offset: int
+    limit: int
+
+class FilterResponse(BaseModel):
+    """A page of filtered cached search results."""
+    search_id: str
+    dataset: str
+    rows: List[Dict[str, Any]]
+    total: int
+    matched: int
+    offset: int
+    limit: int
+
+def get_cached_search(search_id: str, current_user: User) -> CachedSearch:
+    """
+    Get the cached results of a search, or of a completed search job, of the current user.
+
+    Args:
+        search_id: A search id from POST /api/search, or a search job id.
+        current_user: The authenticated user.
+
+    Returns:
+        CachedSearch: The cached results.
+
+    Raises:
+        HTTPException: If the results are unknown, expired or belong to another user.
+    """
+    cache = get_search_cache()
+    cached = cache.get(search_id, current_user.id)
+    if cached is not None:
+        return cached
+
+    # Completed search jobs keep their results on disk; load them once
+    manager = get_search_job_manager()
+    job = manager.get(search_id)
+    if job is not None and job.owner_id == current_user.id and job.status == "completed":
+        frames = {dataset.value: manager.store.read_table(search_id, dataset.value) for dataset in SearchDataset}
+        cache.put(current_user.id, job.params, frames, search_id=search_id)
+        return cache.get(search_id, current_user.id)
+
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Search results not found or expired; run the search again"
+    )
+
+def population_rows(df: pd.DataFrame, dataset: SearchDataset, request: PopulationFilter) -> Optional[np.ndarray]:
+    """
+    Select the rows matching a request's eligibility filters.
+
+    Args:
+        df: The cached result frame.
+        dataset: The result dataset.
+        request: Request with optional age window and sex filters.
+
+    Returns:
+        Boolean mask over the rows, or None if the request has no eligibility filters.
+
+    Raises:
+        ValueError: If eligibility filters are used on FDA data or on results without the eligibility columns.
+    """
+    if request.min_age_years is None and request.max_age_years is None and request.sex is None:
+        return None
+    if dataset != SearchDataset.clinical_trials:
+        raise ValueError("Age and sex filters apply to clinical trials only")
+    try:
+        mask = age_window_mask(df, request.min_age_years, request.max_age_years)
+        if request.sex is not None:
+            mask &= sex_mask(df, request.sex)
+    except KeyError as e:
+        raise ValueError(f"These results have no {e} column; run the search again")
+    return mask.to_numpy(dtype=bool)
+
+@search_refine_router.post("/{dataset}/facets", response_model=FacetResponse)
+def get_search_facets(
+    dataset: SearchDataset,
+    request: FacetRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Count cached search results per value of the dataset's facet columns.
+
+    Each column is counted over the rows matching the filters on the other columns
+    and the age and sex filters.
+
+    Args:
+        dataset: 'clinical_trials' or 'fda_data'.
+        request: Search id, filters and facet columns.
+        current_user: The authenticated user.
+
+    Returns:
+        FacetResponse: The facet counts and the number of rows matching every filter.
+
+    Raises:
+        HTTPException: If the search is not cached or a column is not a facet column.
+    """
+    cached = get_cached_search(request.search_id, current_user)
+    index = cached.facet_index(dataset.value)
+    try:
+        rows = population_rows(cached.frame(dataset.value), dataset, request)
+        facets = index.counts(request.filters, request.columns, rows)
+        matched = int(index.mask(request.filters, rows).sum())
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return FacetResponse(
+        search_id=request.search_id,
+        dataset=dataset.value,
+        total=index.num_rows,
+        matched=matched,
+        facets=facets
+    )
+
+@search_refine_router.post("/{dataset}/filter", response_model=FilterResponse)
+def filter_search_results(
+    dataset: SearchDataset,
+    request: FilterRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get a page of the cached search results matching facet filters.
+
+    Args:
+        dataset: 'clinical_trials' or 'fda_data'.
+        request: Search id, filters and the page to return.
+        current_user: The authenticated user.
+
+    Returns:
+        FilterResponse: The matching rows, in result order.
+
+    Raises:
+        HTTPException: If the search is not cached or a filter column is not a facet column.
+    """
+    cached = get_cached_search(request.search_id, current_user)
+    index = cached.facet_index(dataset.value)
+    try:
+        rows = population_rows(cached.frame(dataset.value), dataset, request)
+        positions = np.flatnonzero(index.mask(request.filters, rows))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    page = cached.frame(dataset.value).iloc[positions[request.offset:request.offset + request.limit]]
+    return FilterResponse(
+        search_id=request.search_id,
+        dataset=dataset.value,
+        rows=safe_dataframe_to_dict(page),
+        total=index.num_rows,
+        matched=len(positions),
+        offset=request.offset,
+        limit=request.limit
+    )
+
+@search_refine_router.get("/drug_links", response_model=DrugLinkResponse)
+def get_drug_links(
+    search_id: str,
+    drug: Optional[str] = None,
+    nct_id: Optional[str] = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1, le=10000),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get the links between a cached search's trial drug interventions and its FDA labels.
+
+    Drug names are matched on normalized keys, without case, salts, dosage forms,
+    strengths and known synonyms, so "Metformin HCl 500 mg" links to METFORMIN HYDROCHLORIDE.
+
+    Args:
+        search_id: A search id from POST /api/search, or a search job id.
+        drug: Only the links of this drug name.
+        nct_id: Only the links of this trial.
+        offset: First link to return.
+        limit: Maximum number of links to return.
+        current_user: The authenticated user.
+
+    Returns:
+        DrugLinkResponse: The requested links and the number of linked trials and labels.
+    """
+    cached = get_cached_search(search_id, current_user)
+    links = cached.drug_links().lookup(drug, nct_id)
+    return DrugLinkResponse(
+        search_id=search_id,
+        links=safe_dataframe_to_dict(links.iloc[offset:offset + limit]),
+        total=len(links),
+        linked_trials=links["nctId"].nunique(),
+        linked_labels=links["label_row"].nunique(),
+        offset=offset,
+        limit=limit
+    )
@@ -0,0 +1,148 @@
+"""
+Serialization module for the Clinical Trials & FDA Data Search App.
+Converts result frames to the column types and JSON-ready records returned
+by the search, refinement and search job endpoints.
+"""
+import math
+
+import pandas as pd
+
+from app.utils.log import Lazy, get_logger
+from app.utils.metrics import STAGE_SECONDS
+
+logger = get_logger(__name__)
+
+# Helper function to safely convert data types
+@STAGE_SECONDS.time(stage="type_conversion")
+def safe_convert_types(df, column_types=None):
+    """
+    Safely convert DataFrame column types with detailed error reporting.
+    
+    Args:
+        df: pandas DataFrame to convert
+        column_types: dictionary mapping column names to their target types
+    
+    Returns:
+        Converted DataFrame
+    """
+    if df is None or len(df) == 0:
+        return df
+    
+    if column_types is None:
+        column_types = {}
+    
+    # Default type conversions based on schema
+    default_conversions = {
+        # Clinical trials columns
+        'enrollmentCount': 'int',
+        'hasExpandedAccess': 'bool',
+        'HasResults': 'bool',
+        'healthyVolunteers': 'bool',
+        
+        # FDA columns
+        'is_original_packager': 'bool'
+    }
+    
+    # Merge with provided column types
+    column_types = {**default_conversions, **column_types}
+    
+    # Fill NaN values with appropriate defaults
+    default_values = {
+        'int': 0,
+        'bool': False,
+        'str': '',
+        'float': 0.0
+    }
+    
+    # Process each column
+    for column, dtype in column_types.items():
+        if column in df.columns:
+            try:
+                # Fill NaN values with appropriate defaults
+                if dtype == 'int':
+                    # For integer columns, first convert to float, then to int
+                    df[column] = df[column].fillna(default_values['float'])
+                    # Check if values are actually integers
+                    if df[column].apply(lambda x: x != int(x) if pd.notna(x) else False).any():
+                        logger.warning("Column '%s' contains non-integer values: %s", column, Lazy(df[column].unique))
+                    df[column] = df[column].astype(float).astype(int)
+                elif dtype == 'bool':
+                    df[column] = df[column].fillna(default_values['bool']).astype(bool)
+                elif dtype == 'str':
+                    df[column] = df[column].fillna(default_values['str']).astype(str)
+                elif dtype == 'float':
+                    df[column] = df[column].fillna(default_values['float']).astype(float)
+            except Exception as e:
+                logger.error("Error converting column '%s' to %s: %s; column values: %s", column, dtype, e, Lazy(df[column].unique))
+                # If conversion fails, convert to string as a fallback
+                df[column] = df[column].fillna('').astype(str)
+    
+    return df
+
+# Helper function to safely convert DataFrames to dictionaries
+@STAGE_SECONDS.time(stage="serialization")
+def safe_dataframe_to_dict(df):
+    """
+    Safely convert DataFrame to list of dictionaries with proper type handling.
+    
+    Args:
+        df: pandas DataFrame to convert
+    
+    Returns:
+        List of dictionaries
+    """
+    if df is None or len(df) == 0:
+        return []
+    
+    try:
+        # First attempt: convert directly to dict
+        records = df.to_dict(orient="records")
+        
+        # Validate each record
+        clean_records = []
+        for record in records:
+            clean_record = {}
+            for key, value in record.items():
+                try:
+                    # Missing numeric values (NaN) are not valid JSON
+                    if isinstance(value, float) and not math.isfinite(value):
+                        clean_record[key] = None
+                        continue
+                    # Check if value is JSON serializable
+                    import json
+                    json.dumps({key: value})
+                    clean_record[key] = value
+                except (TypeError, OverflowError):
+                    # If not serializable, convert to string
+                    logger.debug("Converting non-serializable value in column '%s' to string: %s", key, type(value))
+                    clean_record[key] = str(value)
+            clean_records.append(clean_record)
+        
+        return clean_records
+    except Exception as e:
+        logger.exception("Error in safe_dataframe_to_dict: %s", e)
+        
+        # Fallback: convert row by row
+        clean_records = []
+        for _, row in df.iterrows():
+            clean_record = {}
+            for key, value in row.items():
+                try:
+                    # Try to use the value as is
+                    if pd.isna(value):
+                        if key in ['enrollmentCount', 'total_clinical_trials', 'total_fda_data']:
+                            clean_record[key] = 0
+                        elif key in ['hasExpandedAccess', 'HasResults', 'healthyVolunteers', 'is_original_packager']:
+                            clean_record[key] = False
+                        else:
+                            clean_record[key] = ""
+                    elif isinstance(value, float) and key in ['enrollmentCount', 'total_clinical_trials', 'total_fda_data']:
+                        clean_record[key] = int(value)
+                    else:
+                        clean_record[key] = value
+                except Exception:
+                    # If all else fails, convert to string
+                    clean_record[key] = str(value)
+            clean_records.append(clean_record)
+        
+        return clean_records
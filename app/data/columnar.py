@@ -0,0 +1,156 @@
+"""
+Columnar helpers for the Clinical Trials & FDA Data Search App.
+Converts Arrow tables read from the local Parquet stores back into the
+DataFrames produced by the API modules, and keeps uncompressed Arrow copies
+of cached tables that every worker process memory-maps, so the processes
+share one copy of the data through the page cache.
+"""
+import contextlib
+import os
+from pathlib import Path
+from typing import Iterator
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+try:
+    import fcntl
+except ImportError:
+    # Reason: the fcntl module does not exist on Windows, where locks only hold within a process
+    fcntl = None
+
+ARROW_SUFFIX = ".arrow"
+LOCK_SUFFIX = ".lock"
+
+
+def table_to_pandas(table: pa.Table) -> pd.DataFrame:
+    """
+    Convert an Arrow table to a DataFrame, keeping list cells as Python lists.
+
+    Arrow converts list columns to NumPy arrays, which are not JSON
+    serializable; the API modules produce plain lists.
+
+    Args:
+        table (pa.Table): The table to convert.
+
+    Returns:
+        pd.DataFrame: The rows as a DataFrame.
+    """
+    df = table.to_pandas()
+    for field in table.schema:
+        if pa.types.is_list(field.type) or pa.types.is_large_list(field.type):
+            df[field.name] = pd.Series(table.column(field.name).to_pylist(), index=df.index, dtype=object)
+    return df
+
+
+def frame_to_table(df: pd.DataFrame) -> pa.Table:
+    """
+    Convert a result frame to an Arrow table.
+
+    Args:
+        df (pd.DataFrame): The frame; None converts as an empty frame.
+
+    Returns:
+        pa.Table: The rows, with columns mixing value types stored as strings.
+    """
+    df = df if df is not None else pd.DataFrame()
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Reason: columns mixing value types cannot be stored as one Arrow type
+        mixed = {column: str for column in df.columns if df[column].dtype == object}
+        return pa.Table.from_pandas(df.fillna("").astype(mixed), preserve_index=False)
+
+
+@contextlib.contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """
+    Hold an exclusive lock shared by every process locking the same file.
+
+    Args:
+        path (Path): The lock file, created if missing.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def write_arrow(table: pa.Table, path: Path) -> None:
+    """
+    Write a table as an uncompressed Arrow IPC file, replacing the file atomically.
+
+    Args:
+        table (pa.Table): The table.
+        path (Path): The file.
+    """
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with pa.OSFile(str(tmp_path), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+def map_arrow(path: Path) -> pa.Table:
+    """
+    Memory-map an Arrow IPC file without copying it.
+
+    The table's buffers point into the mapping, which stays valid while the
+    table is referenced, even after the file is replaced or deleted.
+
+    Args:
+        path (Path): The file.
+
+    Returns:
+        pa.Table: The mapped table.
+    """
+    return pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+
+
+def mapped_copy(parquet_path: Path) -> Path:
+    """
+    Get the Arrow copy of a Parquet file, writing it first if it is missing.
+
+    The copy is named after the Parquet file's modification time, so a rebuilt
+    Parquet file gets a new copy. One process writes it under a file lock while
+    the others wait, and older copies are then deleted.
+
+    Args:
+        parquet_path (Path): The Parquet file.
+
+    Returns:
+        Path: The Arrow copy.
+    """
+    mtime = parquet_path.stat().st_mtime_ns
+    arrow_path = parquet_path.with_name(f"{parquet_path.stem}.{mtime}{ARROW_SUFFIX}")
+    if arrow_path.is_file():
+        return arrow_path
+    with file_lock(parquet_path.with_name(parquet_path.name + LOCK_SUFFIX)):
+        if not arrow_path.is_file():
+            write_arrow(pq.read_table(parquet_path), arrow_path)
+            for stale in parquet_path.parent.glob(f"{parquet_path.stem}.*{ARROW_SUFFIX}"):
+                if stale != arrow_path:
+                    stale.unlink(missing_ok=True)
+    return arrow_path
+
+
+def mapped_table(parquet_path: Path) -> pa.Table:
+    """
+    Memory-map the Arrow copy of a Parquet file.
+
+    Reading the Parquet file itself decompresses it into each process's own
+    memory; the mapped copy is shared by every process through the page cache.
+
+    Args:
+        parquet_path (Path): The Parquet file.
+
+    Returns:
+        pa.Table: The mapped table.
+    """
+    return map_arrow(mapped_copy(parquet_path))
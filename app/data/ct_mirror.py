@@ -0,0 +1,364 @@
+"""
+ClinicalTrials.gov mirror module for the Clinical Trials & FDA Data Search App.
+Ingests the ClinicalTrials.gov bulk study export (a zip of per-study JSON files)
+in parallel into a local Parquet store, and searches that store instead of
+paging through the studies API.
+
+Usage:
+    python -m app.data.ct_mirror path/to/ctg-studies.json.zip [--workers N]
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import threading
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import ContextManager, Dict, List, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Add project root to path to import the clinical trials module
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from clinical_trials_module import DATE_COLUMNS, studies_to_dataframe
+from app.data.columnar import LOCK_SUFFIX, file_lock, mapped_table, table_to_pandas
+from app.data.ranking import RANK_COLUMNS, candidate_pool_size, top_positions
+from app.data.text_index import InvertedIndex, build_index
+from app.utils.metrics import CACHE_REQUESTS
+
+# Location of the mirror files
+CT_MIRROR_DIR = Path(os.getenv("CT_MIRROR_DIR", str(PROJECT_ROOT / "data" / "ct_mirror")))
+TRIALS_FILE = "trials.parquet"
+MANIFEST_FILE = "manifest.json"
+INDEX_DIR = "index"
+
+# Parquet schema metadata key holding the mirror build's version, which its index also records
+VERSION_KEY = b"mirror_version"
+
+# Number of study files normalized per worker task
+INGEST_CHUNK_SIZE = 1000
+
+# Text columns covered by the full-text index
+INDEX_FIELDS = [
+    "nctId", "briefTitle", "officialTitle", "conditions", "interventionDrug",
+    "briefSummary", "eligibilityCriteria", "leadSponsor",
+]
+
+
+def _resolve(mirror_dir: Optional[Path]) -> Path:
+    """
+    Resolve the mirror directory, reading CT_MIRROR_DIR at call time.
+
+    Args:
+        mirror_dir (Optional[Path]): Explicit mirror directory, if any.
+
+    Returns:
+        Path: The mirror directory.
+    """
+    return Path(mirror_dir) if mirror_dir is not None else CT_MIRROR_DIR
+
+
+def _normalize_members(zip_path: str, names: List[str]) -> pd.DataFrame:
+    """
+    Normalize a chunk of study files from the export zip.
+
+    Runs in a worker process, which opens its own handle on the zip.
+
+    Args:
+        zip_path (str): Path to the bulk export zip.
+        names (List[str]): Member names of the study JSON files.
+
+    Returns:
+        pd.DataFrame: One normalized row per study.
+    """
+    studies = []
+    with zipfile.ZipFile(zip_path) as archive:
+        for name in names:
+            with archive.open(name) as f:
+                studies.append(json.load(f))
+    return studies_to_dataframe(studies)
+
+
+def _index_documents(df: pd.DataFrame) -> List[List[Optional[str]]]:
+    """
+    Get the indexed field texts of every mirrored study.
+
+    Args:
+        df (pd.DataFrame): The mirrored studies, in row order.
+
+    Returns:
+        List[List[Optional[str]]]: The INDEX_FIELDS texts of each row.
+    """
+    columns = [column for column in INDEX_FIELDS if column in df.columns]
+    return df[columns].astype(object).where(df[columns].notna(), None).values.tolist()
+
+
+def ingest_bulk_export(
+    zip_path: Path,
+    mirror_dir: Optional[Path] = None,
+    workers: Optional[int] = None,
+    chunk_size: int = INGEST_CHUNK_SIZE,
+) -> int:
+    """
+    Build the local mirror from a ClinicalTrials.gov bulk JSON export.
+
+    Study files are normalized in parallel across worker processes with the
+    same normalize_study semantics as get_clinical_trials_data, then written to
+    a single Parquet file together with a full-text index over it. Both are
+    built next to the previous mirror and then swapped in.
+
+    Args:
+        zip_path (Path): Path to the bulk export zip.
+        mirror_dir (Optional[Path]): Directory to write the mirror to (defaults to CT_MIRROR_DIR).
+        workers (Optional[int]): Number of worker processes (defaults to the CPU count).
+        chunk_size (int): Number of study files per worker task.
+
+    Returns:
+        int: Number of studies ingested.
+    """
+    zip_path = Path(zip_path)
+    mirror_dir = _resolve(mirror_dir)
+    with zipfile.ZipFile(zip_path) as archive:
+        names = sorted(name for name in archive.namelist() if name.endswith(".json"))
+    chunks = [names[i:i + chunk_size] for i in range(0, len(names), chunk_size)]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        frames = list(executor.map(_normalize_members, [str(zip_path)] * len(chunks), chunks))
+
+    df = pd.concat(frames, ignore_index=True) if frames else studies_to_dataframe([])
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+
+    mirror_dir.mkdir(parents=True, exist_ok=True)
+    version = uuid.uuid4().hex
+    tmp_index = _tmp_index_dir(mirror_dir)
+    build_index(_index_documents(df), tmp_index, workers, version)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), VERSION_KEY: version.encode()})
+    tmp_path = mirror_dir / f"{TRIALS_FILE}.tmp"
+    pq.write_table(table, tmp_path)
+
+    # Swap in the Parquet file and its index together; readers load both under the same lock
+    with _mirror_lock(mirror_dir):
+        os.replace(tmp_path, mirror_dir / TRIALS_FILE)
+        _swap_index(tmp_index, mirror_dir / INDEX_DIR)
+
+    manifest = {
+        "source": zip_path.name,
+        "studies": len(df),
+        "ingested_at": datetime.now(timezone.utc).isoformat(),
+    }
+    with open(mirror_dir / MANIFEST_FILE, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"Ingested {len(df)} studies from {zip_path} into {mirror_dir}")
+    return len(df)
+
+
+def _mirror_lock(mirror_dir: Path) -> ContextManager[None]:
+    """
+    Lock a mirror against concurrent swaps and index builds in any process.
+
+    Args:
+        mirror_dir (Path): Mirror directory.
+
+    Returns:
+        ContextManager[None]: The held lock.
+    """
+    return file_lock(mirror_dir / f"{INDEX_DIR}{LOCK_SUFFIX}")
+
+
+def _tmp_index_dir(mirror_dir: Path) -> Path:
+    """
+    Get an empty directory to build an index in before it is swapped in.
+
+    Args:
+        mirror_dir (Path): Mirror directory.
+
+    Returns:
+        Path: A directory name private to this process and thread.
+    """
+    tmp_index = mirror_dir / f"{INDEX_DIR}.{os.getpid()}.{threading.get_ident()}.tmp"
+    shutil.rmtree(tmp_index, ignore_errors=True)
+    return tmp_index
+
+
+def _swap_index(tmp_index: Path, index_dir: Path) -> None:
+    """
+    Replace the index directory with a newly built one. Called under the mirror lock.
+
+    Readers keep their mapping of the old files.
+
+    Args:
+        tmp_index (Path): The new index.
+        index_dir (Path): The index directory.
+    """
+    if index_dir.exists():
+        old_index = index_dir.with_name(f"{INDEX_DIR}.old")
+        shutil.rmtree(old_index, ignore_errors=True)
+        os.rename(index_dir, old_index)
+        shutil.rmtree(old_index, ignore_errors=True)
+    os.rename(tmp_index, index_dir)
+
+
+def mirror_available(mirror_dir: Optional[Path] = None) -> bool:
+    """
+    Check whether a local mirror has been built.
+
+    Args:
+        mirror_dir (Optional[Path]): Mirror directory (defaults to CT_MIRROR_DIR).
+
+    Returns:
+        bool: True if the mirror's Parquet file exists.
+    """
+    return (_resolve(mirror_dir) / TRIALS_FILE).is_file()
+
+
+class _MirrorCache:
+    """The loaded mirror table and index, reloaded when the Parquet file changes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[Path, tuple] = {}
+
+    def get(self, mirror_dir: Path) -> tuple:
+        """
+        Get the mirror table and its full-text index.
+
+        Both are loaded under the mirror lock, so a concurrent ingest never
+        pairs one with the other's previous version. An index that is missing
+        from an older mirror, or does not match the table, is built in a
+        temporary directory and swapped in.
+
+        Args:
+            mirror_dir (Path): Mirror directory.
+
+        Returns:
+            tuple: (pa.Table, InvertedIndex).
+        """
+        path = mirror_dir / TRIALS_FILE
+        mtime = path.stat().st_mtime_ns
+        with self._lock:
+            entry = self._entries.get(path)
+            hit = entry is not None and entry[0] == mtime
+            CACHE_REQUESTS.inc(cache="ct_mirror", result="hit" if hit else "miss")
+            if not hit:
+                with _mirror_lock(mirror_dir):
+                    mtime = path.stat().st_mtime_ns
+                    table = mapped_table(path)
+                    index = self._load_index(mirror_dir, table)
+                entry = (mtime, table, index)
+                self._entries[path] = entry
+        return entry[1], entry[2]
+
+    @staticmethod
+    def _load_index(mirror_dir: Path, table: pa.Table) -> InvertedIndex:
+        """
+        Open the index of a mirror table, rebuilding it if it does not match. Called under the mirror lock.
+
+        Args:
+            mirror_dir (Path): Mirror directory.
+            table (pa.Table): The mirror table.
+
+        Returns:
+            InvertedIndex: The table's index.
+        """
+        version = (table.schema.metadata or {}).get(VERSION_KEY)
+        version = version.decode() if version is not None else None
+        index_dir = mirror_dir / INDEX_DIR
+        if InvertedIndex.exists(index_dir):
+            index = InvertedIndex(index_dir)
+            if index.version == version and index.num_docs == table.num_rows:
+                return index
+        columns = [column for column in INDEX_FIELDS if column in table.column_names]
+        tmp_index = _tmp_index_dir(mirror_dir)
+        build_index(_index_documents(table.select(columns).to_pandas()), tmp_index, version=version)
+        _swap_index(tmp_index, index_dir)
+        return InvertedIndex(index_dir)
+
+
+_cache = _MirrorCache()
+
+
+def load_mirror(mirror_dir: Optional[Path] = None) -> pd.DataFrame:
+    """
+    Load the whole mirror as a DataFrame.
+
+    Args:
+        mirror_dir (Optional[Path]): Mirror directory (defaults to CT_MIRROR_DIR).
+
+    Returns:
+        pd.DataFrame: All mirrored studies.
+    """
+    table, _ = _cache.get(_resolve(mirror_dir))
+    return table_to_pandas(table)
+
+
+def search_local_trials(
+    keyword: str,
+    max_results: Optional[int] = None,
+    mirror_dir: Optional[Path] = None,
+) -> Tuple[pd.DataFrame, int]:
+    """
+    Search the local mirror through its full-text index.
+
+    Every word or "quoted phrase" of the keyword must appear in the titles,
+    conditions, drug interventions, summary, eligibility criteria, sponsor or
+    NCT id. Without a limit every match is returned in BM25 order. With a
+    limit, the best BM25 candidates are re-ranked by title and condition
+    match, recency and status, and only the top studies are gathered.
+
+    Args:
+        keyword (str): Search keyword.
+        max_results (Optional[int]): Maximum number of studies to return (None returns all).
+        mirror_dir (Optional[Path]): Mirror directory (defaults to CT_MIRROR_DIR).
+
+    Returns:
+        Tuple[pd.DataFrame, int]: Matching studies with the same columns as
+        get_clinical_trials_data, and the exact number of matches.
+    """
+    table, index = _cache.get(_resolve(mirror_dir))
+    if max_results is None:
+        result = index.search(str(keyword))
+        return table_to_pandas(table.take(pa.array(result.doc_ids, type=pa.int64()))), result.total
+
+    result = index.search(str(keyword), limit=candidate_pool_size(max_results))
+    doc_ids = pa.array(result.doc_ids, type=pa.int64())
+    columns = [column for column in RANK_COLUMNS if column in table.column_names]
+    candidates = table.select(columns).take(doc_ids).to_pandas()
+    top = top_positions(candidates, str(keyword), max_results, result.scores)
+    return table_to_pandas(table.take(pa.array(result.doc_ids[top], type=pa.int64()))), result.total
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command line entry point for building the mirror.
+
+    Args:
+        argv (Optional[List[str]]): Command line arguments.
+
+    Returns:
+        int: Process exit code.
+    """
+    parser = argparse.ArgumentParser(description="Build the local ClinicalTrials.gov mirror from the bulk JSON export.")
+    parser.add_argument("zip_path", type=Path, help="Path to the bulk export zip (ctg-studies.json.zip)")
+    parser.add_argument("--mirror-dir", type=Path, default=None, help="Directory to write the mirror to")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes")
+    parser.add_argument("--chunk-size", type=int, default=INGEST_CHUNK_SIZE, help="Study files per worker task")
+    args = parser.parse_args(argv)
+
+    ingest_bulk_export(args.zip_path, args.mirror_dir, args.workers, args.chunk_size)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+"""
+Drug linkage module for the Clinical Trials & FDA Data Search App.
+Normalizes drug names from trial interventions and FDA labels to shared keys
+(case-folded, without salts, dosage forms, strengths or known synonyms) and
+joins the two datasets on those keys, so "which trials test labeled drugs"
+is a keyed lookup instead of fuzzy string matching.
+"""
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Label columns matched against trial drugs, in order of preference
+LABEL_NAME_COLUMNS = ["generic_name", "substance_name", "brand_name"]
+
+# Columns of the linkage table
+DRUG_LINK_COLUMNS = ["nctId", "trial_drug", "drug_key", "brand_name", "generic_name", "matched_on", "label_row"]
+
+# Salt and ester words dropped from drug names, unless the name is only salt words
+SALT_WORDS = {
+    "acetate", "besylate", "bitartrate", "bromide", "calcium", "carbonate", "chloride", "citrate",
+    "dihydrate", "dihydrochloride", "disodium", "fumarate", "gluconate", "hcl", "hydrobromide",
+    "hydrochloride", "hyclate", "lactate", "magnesium", "maleate", "mesylate", "monohydrate",
+    "nitrate", "phosphate", "potassium", "propionate", "sodium", "succinate", "sulfate",
+    "tartrate", "trihydrate", "tromethamine", "valerate",
+}
+
+# Dosage form and route words dropped from drug names
+FORM_WORDS = {
+    "capsule", "capsules", "cream", "delayed", "drops", "er", "extended", "film", "gel", "inhalation",
+    "injectable", "injection", "intravenous", "iv", "oral", "ointment", "patch", "powder", "release",
+    "solution", "spray", "suspension", "syrup", "tablet", "tablets", "topical", "xr",
+}
+
+# Strength units dropped together with their amounts
+UNIT_PATTERN = re.compile(r"\b\d+(?:[.,]\d+)?\s*(?:mg|mcg|µg|ug|g|ml|meq|mmol|iu|units?|%)(?:/\w+)?\b")
+
+# Alternative names mapped to the name used on US labels
+DRUG_SYNONYMS = {
+    "paracetamol": "acetaminophen",
+    "adrenaline": "epinephrine",
+    "noradrenaline": "norepinephrine",
+    "salbutamol": "albuterol",
+    "glibenclamide": "glyburide",
+    "frusemide": "furosemide",
+    "lignocaine": "lidocaine",
+    "acetylsalicylic acid": "aspirin",
+    "ciclosporin": "cyclosporine",
+    "rifampicin": "rifampin",
+    "amoxycillin": "amoxicillin",
+    "cholecalciferol": "vitamin d3",
+}
+
+# Intervention names that are not drugs with labels
+NON_DRUG_KEYS = {"", "placebo", "saline", "normal saline", "standard of care", "vehicle", "sham"}
+
+# Separators between the drugs of a combination
+COMPONENT_PATTERN = re.compile(r"\s+and\s+|\s*\+\s*|\s*/\s*|\s*,\s*|\s+with\s+", re.IGNORECASE)
+
+
+def normalize_drug_name(name: Optional[str]) -> str:
+    """
+    Reduce a drug name to its linkage key.
+
+    Args:
+        name (Optional[str]): Drug name, e.g. "Metformin Hydrochloride 500 mg Tablets".
+
+    Returns:
+        str: The key, e.g. "metformin", "potassium chloride" for a name of salt words only, or "" for an empty name.
+    """
+    if not isinstance(name, str):
+        return ""
+    text = name.casefold()
+    text = re.sub(r"\([^)]*\)|\[[^\]]*\]", " ", text)
+    text = UNIT_PATTERN.sub(" ", text)
+    text = re.sub(r"[^\w\s-]", " ", text).replace("-", " ")
+    words = []
+    # Reason: salts such as potassium chloride are the drug itself, so salt words are
+    # only dropped from a component when another of its words names the active moiety
+    for component in re.split(r"\s+(and|with)\s+", " ".join(text.split())):
+        component_words = [word for word in component.split() if word not in FORM_WORDS]
+        if any(word not in SALT_WORDS for word in component_words):
+            component_words = [word for word in component_words if word not in SALT_WORDS]
+        words += component_words
+    key = " ".join(words)
+    return DRUG_SYNONYMS.get(key, key)
+
+
+def drug_keys(name: Optional[str]) -> List[str]:
+    """
+    Get the linkage keys of a drug name: the whole name and each combination component.
+
+    Args:
+        name (Optional[str]): Drug name, e.g. "Acetaminophen and Codeine Phosphate".
+
+    Returns:
+        List[str]: Distinct keys, without non-drug names such as placebo.
+    """
+    if not isinstance(name, str):
+        return []
+    keys = [normalize_drug_name(name)]
+    parts = COMPONENT_PATTERN.split(name)
+    if len(parts) > 1:
+        keys += [normalize_drug_name(part) for part in parts]
+    return [key for key in dict.fromkeys(keys) if key not in NON_DRUG_KEYS]
+
+
+def _trial_drug_keys(trials_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Explode the trials' drug interventions into (trial, drug, key) rows.
+
+    Args:
+        trials_df (pd.DataFrame): Trials with nctId and interventionDrug.
+
+    Returns:
+        pd.DataFrame: nctId, trial_drug and drug_key columns.
+    """
+    if trials_df is None or trials_df.empty or "interventionDrug" not in trials_df.columns:
+        return pd.DataFrame(columns=["nctId", "trial_drug", "drug_key"])
+    drugs = trials_df[["nctId", "interventionDrug"]].copy()
+    drugs["trial_drug"] = drugs["interventionDrug"].fillna("").astype(str).str.split(", ")
+    drugs = drugs.explode("trial_drug")
+    drugs["drug_key"] = drugs["trial_drug"].map(drug_keys)
+    drugs = drugs.explode("drug_key").dropna(subset=["drug_key"])
+    return drugs[["nctId", "trial_drug", "drug_key"]].drop_duplicates()
+
+
+def _label_drug_keys(fda_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Explode the labels' names into (label, key) rows.
+
+    openFDA joins repeated values with "/", and combination generics list
+    their components, so every part and component becomes a key.
+
+    Args:
+        fda_df (pd.DataFrame): Drug labels.
+
+    Returns:
+        pd.DataFrame: label_row, drug_key and matched_on columns, one row per label and key.
+    """
+    frames = []
+    for priority, column in enumerate(LABEL_NAME_COLUMNS):
+        if fda_df is None or column not in fda_df.columns:
+            continue
+        keys = fda_df[column].map(drug_keys)
+        frame = pd.DataFrame({"label_row": np.arange(len(fda_df)), "drug_key": keys.to_numpy(), "matched_on": column,
+                              "priority": priority})
+        frames.append(frame.explode("drug_key").dropna(subset=["drug_key"]))
+    if not frames:
+        return pd.DataFrame(columns=["label_row", "drug_key", "matched_on"])
+    keys = pd.concat(frames, ignore_index=True).sort_values("priority", kind="stable")
+    return keys.drop_duplicates(["label_row", "drug_key"])[["label_row", "drug_key", "matched_on"]]
+
+
+def build_drug_links(trials_df: pd.DataFrame, fda_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Join trial drug interventions to FDA labels on normalized drug keys.
+
+    Args:
+        trials_df (pd.DataFrame): Trials with nctId and interventionDrug.
+        fda_df (pd.DataFrame): Drug labels with brand, generic and substance names.
+
+    Returns:
+        pd.DataFrame: One row per linked trial drug and label, with DRUG_LINK_COLUMNS;
+        label_row is the label's position in fda_df.
+    """
+    return _join_drug_keys(_trial_drug_keys(trials_df), _label_drug_keys(fda_df), fda_df)
+
+
+def _join_drug_keys(trial_keys: pd.DataFrame, label_keys: pd.DataFrame, fda_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Join exploded trial and label keys into the linkage table.
+
+    Args:
+        trial_keys (pd.DataFrame): Rows from _trial_drug_keys.
+        label_keys (pd.DataFrame): Rows from _label_drug_keys.
+        fda_df (pd.DataFrame): The labels the keys were taken from.
+
+    Returns:
+        pd.DataFrame: The linkage table, as returned by build_drug_links.
+    """
+    links = trial_keys.merge(label_keys, on="drug_key", how="inner")
+    if links.empty:
+        return pd.DataFrame(columns=DRUG_LINK_COLUMNS)
+    rows = links["label_row"].to_numpy(dtype=np.int64)
+    for column in ("brand_name", "generic_name"):
+        links[column] = fda_df[column].to_numpy()[rows] if column in fda_df.columns else None
+    links["label_row"] = rows
+    links = links.sort_values(["nctId", "trial_drug", "label_row"], kind="stable")
+    return links.drop_duplicates(["nctId", "trial_drug", "label_row"])[DRUG_LINK_COLUMNS].reset_index(drop=True)
+
+
+class DrugLinkIndex:
+    """The linkage table of a pair of result sets, with keyed lookups by drug and trial."""
+
+    def __init__(self, trials_df: pd.DataFrame, fda_df: pd.DataFrame):
+        """
+        Build the linkage table.
+
+        Args:
+            trials_df (pd.DataFrame): Trials with nctId and interventionDrug.
+            fda_df (pd.DataFrame): Drug labels.
+        """
+        label_keys = _label_drug_keys(fda_df)
+        self.table = _join_drug_keys(_trial_drug_keys(trials_df), label_keys, fda_df)
+        self._by_key: Dict[str, np.ndarray] = self.table.groupby("drug_key").indices if len(self.table) else {}
+        self._by_trial: Dict[str, np.ndarray] = self.table.groupby("nctId").indices if len(self.table) else {}
+        self._by_label: Dict[int, np.ndarray] = self.table.groupby("label_row").indices if len(self.table) else {}
+        # Every key of a label, including its brand names, resolves to the label's links
+        self._label_rows: Dict[str, np.ndarray] = label_keys.groupby("drug_key")["label_row"].unique().to_dict() if len(label_keys) else {}
+
+    def lookup(self, drug: Optional[str] = None, nct_id: Optional[str] = None) -> pd.DataFrame:
+        """
+        Get the links of a drug, of a trial, or of both.
+
+        Args:
+            drug (Optional[str]): Generic, substance or brand name in any form; it is normalized before the lookup.
+            nct_id (Optional[str]): Trial id.
+
+        Returns:
+            pd.DataFrame: The matching links (all links when neither is given).
+        """
+        empty = np.array([], dtype=np.int64)
+        positions = None
+        if drug is not None:
+            key = normalize_drug_name(drug)
+            label_positions = [self._by_label.get(row, empty) for row in self._label_rows.get(key, [])]
+            positions = np.unique(np.concatenate([self._by_key.get(key, empty), *label_positions]))
+        if nct_id is not None:
+            trial_positions = self._by_trial.get(nct_id, empty)
+            positions = trial_positions if positions is None else np.intersect1d(positions, trial_positions)
+        if positions is None:
+            return self.table
+        return self.table.iloc[np.sort(positions)].reset_index(drop=True)
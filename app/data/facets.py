@@ -0,0 +1,207 @@
+"""
+Facets module for the Clinical Trials & FDA Data Search App.
+Categorical-code indexes over a search result frame, so facet counts and
+filter refinements are computed with vectorized numpy operations instead of
+re-running the upstream search.
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from clinical_trials_module import LIST_COLUMNS
+
+# Facet columns of each result dataset, mapped to the separator of multi-valued cells
+FACET_COLUMNS = {
+    "clinical_trials": {
+        "overallStatus": None,
+        "phases": ",",
+        "studyType": None,
+        "country": ",",
+        "leadSponsorType": None,
+    },
+    "fda_data": {
+        "route": "/",
+        "product_type": None,
+    },
+}
+
+# Facet columns read from per-row value lists when the frame has them, since joined values
+# such as "Korea, Republic of" contain the separator; the separator covers older frames
+FACET_LIST_COLUMNS = {
+    "clinical_trials": LIST_COLUMNS,
+    "fda_data": {},
+}
+
+# Facet value of empty and missing cells
+MISSING_FACET_VALUE = "Unknown"
+
+
+class FacetIndex:
+    """
+    Per-column value codes of a result frame.
+
+    Each facet column is stored as (row, value code) pairs sorted by code,
+    with offsets into the pairs per value, so a filter gathers the rows of the
+    selected values and a facet count is one bincount over the masked pairs.
+    Multi-valued cells and list cells contribute one pair per distinct value.
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        columns: Dict[str, Optional[str]],
+        list_columns: Optional[Dict[str, str]] = None,
+    ):
+        """
+        Build the index.
+
+        Args:
+            df (pd.DataFrame): The result frame; rows are addressed by position.
+            columns (Dict[str, Optional[str]]): Facet columns mapped to their value separator (None for single-valued).
+            list_columns (Optional[Dict[str, str]]): Facet columns mapped to a column holding each row's
+                values as a list, read instead of splitting the facet column when the frame has it.
+        """
+        self.num_rows = len(df)
+        self.columns = list(columns)
+        self._values: Dict[str, np.ndarray] = {}
+        self._rows: Dict[str, np.ndarray] = {}
+        self._codes: Dict[str, np.ndarray] = {}
+        self._offsets: Dict[str, np.ndarray] = {}
+        list_columns = list_columns or {}
+        for column, separator in columns.items():
+            list_column = list_columns.get(column)
+            if list_column in df.columns:
+                cells = df[list_column].map(lambda values: list(values) if isinstance(values, (list, tuple, np.ndarray)) else [])
+                cells = cells.reset_index(drop=True).explode()
+                separator = None
+            else:
+                cells = df[column] if column in df.columns else pd.Series([None] * self.num_rows)
+                cells = cells.reset_index(drop=True)
+            self._index_column(column, cells, separator)
+
+    def _index_column(self, column: str, cells: pd.Series, separator: Optional[str]) -> None:
+        """
+        Index one facet column.
+
+        Args:
+            column (str): Column name.
+            cells (pd.Series): The column with a positional index, repeated once per value for list columns.
+            separator (Optional[str]): Value separator of multi-valued cells.
+        """
+        text = cells.astype(object).where(cells.notna(), "").astype(str)
+        if separator is not None:
+            text = text.str.split(separator).explode()
+        text = text.str.strip().replace("", MISSING_FACET_VALUE)
+        codes, values = pd.factorize(text, sort=True)
+        rows = text.index.to_numpy(dtype=np.int64)
+
+        # Drop repeated values within a cell, then sort the pairs by code
+        keys = np.unique(codes.astype(np.int64) * max(self.num_rows, 1) + rows)
+        codes, rows = keys // max(self.num_rows, 1), keys % max(self.num_rows, 1)
+        self._values[column] = np.asarray(values, dtype=object)
+        self._rows[column] = rows
+        self._codes[column] = codes
+        self._offsets[column] = np.searchsorted(codes, np.arange(len(values) + 1))
+
+    def values(self, column: str) -> List[str]:
+        """
+        Get the distinct values of a facet column.
+
+        Args:
+            column (str): Facet column.
+
+        Returns:
+            List[str]: The values, sorted.
+        """
+        self._check_column(column)
+        return list(self._values[column])
+
+    def _check_column(self, column: str) -> None:
+        """Raise ValueError for a column that is not indexed."""
+        if column not in self._values:
+            raise ValueError(f"'{column}' is not a facet column; use one of {self.columns}")
+
+    def column_mask(self, column: str, values: List[str]) -> np.ndarray:
+        """
+        Select the rows having any of the given values in a facet column.
+
+        Args:
+            column (str): Facet column.
+            values (List[str]): Accepted values.
+
+        Returns:
+            np.ndarray: A boolean mask over the rows.
+
+        Raises:
+            ValueError: If the column is not a facet column.
+        """
+        self._check_column(column)
+        known = self._values[column]
+        selected = np.flatnonzero(np.isin(known, np.asarray(values, dtype=object)))
+        offsets, rows = self._offsets[column], self._rows[column]
+        mask = np.zeros(self.num_rows, dtype=bool)
+        for code in selected:
+            mask[rows[offsets[code]:offsets[code + 1]]] = True
+        return mask
+
+    def mask(self, filters: Dict[str, List[str]], rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Select the rows matching every filter.
+
+        Args:
+            filters (Dict[str, List[str]]): Facet columns mapped to their accepted values.
+            rows (Optional[np.ndarray]): Boolean mask of the rows to select from (None selects from all).
+
+        Returns:
+            np.ndarray: A boolean mask over the rows.
+
+        Raises:
+            ValueError: If a filter column is not a facet column.
+        """
+        mask = np.ones(self.num_rows, dtype=bool) if rows is None else rows.copy()
+        for column, values in filters.items():
+            mask &= self.column_mask(column, values)
+        return mask
+
+    def counts(
+        self,
+        filters: Optional[Dict[str, List[str]]] = None,
+        columns: Optional[List[str]] = None,
+        rows: Optional[np.ndarray] = None,
+    ) -> Dict[str, Dict[str, int]]:
+        """
+        Count the rows per value of facet columns.
+
+        Each column is counted over the rows matching the filters on the other
+        columns, so the counts show what selecting another value would yield.
+
+        Args:
+            filters (Optional[Dict[str, List[str]]]): Facet columns mapped to their accepted values.
+            columns (Optional[List[str]]): Columns to count (None counts every facet column).
+            rows (Optional[np.ndarray]): Boolean mask of the rows to count (None counts all).
+
+        Returns:
+            Dict[str, Dict[str, int]]: Per column, the non-zero counts by value, largest first.
+
+        Raises:
+            ValueError: If a filter or count column is not a facet column.
+        """
+        filters = filters or {}
+        for column in list(filters) + list(columns or []):
+            self._check_column(column)
+        masks = {column: self.column_mask(column, values) for column, values in filters.items()}
+        base = np.ones(self.num_rows, dtype=bool) if rows is None else rows
+        all_filters = np.logical_and.reduce([base, *masks.values()])
+
+        facets = {}
+        for column in columns or self.columns:
+            if column in masks:
+                mask = np.logical_and.reduce([base, *(mask for name, mask in masks.items() if name != column)])
+            else:
+                mask = all_filters
+            codes = self._codes[column][mask[self._rows[column]]]
+            counts = np.bincount(codes, minlength=len(self._values[column]))
+            order = np.lexsort((self._values[column].astype(str), -counts))
+            facets[column] = {self._values[column][i]: int(counts[i]) for i in order if counts[i] > 0}
+        return facets
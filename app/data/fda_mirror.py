@@ -0,0 +1,335 @@
+"""
+openFDA drug label mirror module for the Clinical Trials & FDA Data Search App.
+Ingests the openFDA drug label bulk download files in parallel into a local
+Parquet store, with in-memory indexes on the drug identifier columns, so that
+FDA searches no longer hit api.fda.gov or its 1000 result cap.
+
+Usage:
+    python -m app.data.fda_mirror path/to/drug-label-0001-of-0013.json.zip [...] [--workers N]
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import zipfile
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Add project root to path to import the openFDA module
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from openfda import Open_FDA
+from app.data.columnar import mapped_table
+from app.utils.metrics import CACHE_REQUESTS
+
+# Location of the mirror files
+FDA_MIRROR_DIR = Path(os.getenv("FDA_MIRROR_DIR", str(PROJECT_ROOT / "data" / "fda_mirror")))
+LABELS_FILE = "labels.parquet"
+MANIFEST_FILE = "manifest.json"
+
+# Columns with an exact-value lookup index
+INDEXED_COLUMNS = ["brand_name", "generic_name", "substance_name", "application_number"]
+# Column scanned by disease-domain searches
+DISEASE_COLUMN = "indications_and_usage"
+
+
+def _resolve(mirror_dir: Optional[Path]) -> Path:
+    """
+    Resolve the mirror directory, reading FDA_MIRROR_DIR at call time.
+
+    Args:
+        mirror_dir (Optional[Path]): Explicit mirror directory, if any.
+
+    Returns:
+        Path: The mirror directory.
+    """
+    return Path(mirror_dir) if mirror_dir is not None else FDA_MIRROR_DIR
+
+
+def _read_results(path: Path) -> List[dict]:
+    """
+    Read the label results from a bulk download file.
+
+    Args:
+        path (Path): A drug label .json file, or the .json.zip it is distributed as.
+
+    Returns:
+        List[dict]: The raw label results.
+    """
+    if path.suffix == ".zip":
+        with zipfile.ZipFile(path) as archive:
+            results = []
+            for name in archive.namelist():
+                if name.endswith(".json"):
+                    with archive.open(name) as f:
+                        results.extend(json.load(f).get("results", []))
+            return results
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("results", [])
+
+
+def _extract_file(path: str) -> pd.DataFrame:
+    """
+    Extract and clean the labels of one bulk download file.
+
+    Runs in a worker process and applies the same column selection, value
+    cleaning and header stripping as Open_FDA.open_fda_main.
+
+    Args:
+        path (str): Path to the bulk download file.
+
+    Returns:
+        pd.DataFrame: One row per label.
+    """
+    df = pd.DataFrame([Open_FDA.extract_label_record(result) for result in _read_results(Path(path))])
+    return Open_FDA.remove_column_headers_from_text(df)
+
+
+def ingest_label_files(
+    paths: List[Path],
+    mirror_dir: Optional[Path] = None,
+    workers: Optional[int] = None,
+) -> int:
+    """
+    Build the local mirror from the openFDA drug label bulk download files.
+
+    Files are extracted in parallel across worker processes and written to a
+    single Parquet file. The previous mirror is replaced atomically.
+
+    Args:
+        paths (List[Path]): Bulk download files (.json or .json.zip).
+        mirror_dir (Optional[Path]): Directory to write the mirror to (defaults to FDA_MIRROR_DIR).
+        workers (Optional[int]): Number of worker processes (defaults to the CPU count).
+
+    Returns:
+        int: Number of labels ingested.
+    """
+    paths = [Path(path) for path in paths]
+    mirror_dir = _resolve(mirror_dir)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        frames = list(executor.map(_extract_file, [str(path) for path in paths]))
+
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    for column in Open_FDA.needed_column_names:
+        if column not in df.columns:
+            df[column] = None
+    df = df[sorted(df.columns)].astype(object).where(df.notna(), None)
+
+    mirror_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = mirror_dir / f"{LABELS_FILE}.tmp"
+    schema = pa.schema([(column, pa.string()) for column in df.columns])
+    pq.write_table(pa.Table.from_pandas(df, schema=schema, preserve_index=False), tmp_path)
+    os.replace(tmp_path, mirror_dir / LABELS_FILE)
+
+    manifest = {
+        "sources": [path.name for path in paths],
+        "labels": len(df),
+        "ingested_at": datetime.now(timezone.utc).isoformat(),
+    }
+    with open(mirror_dir / MANIFEST_FILE, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"Ingested {len(df)} drug labels from {len(paths)} files into {mirror_dir}")
+    return len(df)
+
+
+def mirror_available(mirror_dir: Optional[Path] = None) -> bool:
+    """
+    Check whether a local mirror has been built.
+
+    Args:
+        mirror_dir (Optional[Path]): Mirror directory (defaults to FDA_MIRROR_DIR).
+
+    Returns:
+        bool: True if the mirror's Parquet file exists.
+    """
+    return (_resolve(mirror_dir) / LABELS_FILE).is_file()
+
+
+def _index_values(value: Optional[str]) -> set:
+    """
+    Get the lookup keys of a cleaned label value.
+
+    Args:
+        value (Optional[str]): A "/"-joined value from Filter_Parser_Data.clean_openfda_value.
+
+    Returns:
+        set: The lower-cased whole value and each of its parts.
+    """
+    if not value:
+        return set()
+    keys = {value.strip().lower()}
+    keys.update(part.strip().lower() for part in value.split("/") if part.strip())
+    return keys
+
+
+class LabelMirror:
+    """A loaded label mirror with its lookup indexes."""
+
+    def __init__(self, path: Path):
+        """
+        Load the mirror table and build the indexes.
+
+        Args:
+            path (Path): Path to the mirror's Parquet file.
+        """
+        self.table = mapped_table(path)
+        self.indexes: Dict[str, Dict[str, np.ndarray]] = {}
+        for column in INDEXED_COLUMNS:
+            postings = defaultdict(list)
+            if column in self.table.column_names:
+                for row, value in enumerate(self.table.column(column).to_pylist()):
+                    for key in _index_values(value):
+                        postings[key].append(row)
+            self.indexes[column] = {key: np.array(rows, dtype=np.int64) for key, rows in postings.items()}
+        if DISEASE_COLUMN in self.table.column_names:
+            self.disease_text = self.table.column(DISEASE_COLUMN).to_pandas().fillna("").str.lower()
+        else:
+            self.disease_text = pd.Series([""] * self.table.num_rows)
+
+    def rows(self, indices: np.ndarray) -> pd.DataFrame:
+        """
+        Gather rows of the mirror.
+
+        Args:
+            indices (np.ndarray): Row positions.
+
+        Returns:
+            pd.DataFrame: The rows, in the order given.
+        """
+        return self.table.take(pa.array(indices, type=pa.int64())).to_pandas()
+
+    def lookup(self, column: str, value: str) -> np.ndarray:
+        """
+        Find the rows whose indexed column contains a value.
+
+        Args:
+            column (str): One of INDEXED_COLUMNS.
+            value (str): Value to look up, case-insensitively.
+
+        Returns:
+            np.ndarray: Matching row positions.
+        """
+        if column not in self.indexes:
+            raise ValueError(f"Column '{column}' is not indexed; choose one of {INDEXED_COLUMNS}")
+        return self.indexes[column].get(str(value).strip().lower(), np.array([], dtype=np.int64))
+
+
+class _MirrorCache:
+    """Loaded label mirrors, reloaded when the Parquet file changes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[Path, tuple] = {}
+
+    def get(self, mirror_dir: Path) -> LabelMirror:
+        """
+        Get the loaded mirror.
+
+        Args:
+            mirror_dir (Path): Mirror directory.
+
+        Returns:
+            LabelMirror: The mirror and its indexes.
+        """
+        path = mirror_dir / LABELS_FILE
+        mtime = path.stat().st_mtime_ns
+        with self._lock:
+            entry = self._entries.get(path)
+            hit = entry is not None and entry[0] == mtime
+            CACHE_REQUESTS.inc(cache="fda_mirror", result="hit" if hit else "miss")
+            if not hit:
+                entry = (mtime, LabelMirror(path))
+                self._entries[path] = entry
+        return entry[1]
+
+
+_cache = _MirrorCache()
+
+
+def get_label_mirror(mirror_dir: Optional[Path] = None) -> LabelMirror:
+    """
+    Get the loaded label mirror.
+
+    Args:
+        mirror_dir (Optional[Path]): Mirror directory (defaults to FDA_MIRROR_DIR).
+
+    Returns:
+        LabelMirror: The mirror and its indexes.
+    """
+    return _cache.get(_resolve(mirror_dir))
+
+
+def lookup_labels(column: str, value: str, mirror_dir: Optional[Path] = None) -> pd.DataFrame:
+    """
+    Look up labels by brand name, generic name, substance name or application number.
+
+    Args:
+        column (str): One of INDEXED_COLUMNS.
+        value (str): Value to look up, case-insensitively.
+        mirror_dir (Optional[Path]): Mirror directory (defaults to FDA_MIRROR_DIR).
+
+    Returns:
+        pd.DataFrame: Matching labels.
+    """
+    mirror = get_label_mirror(mirror_dir)
+    return Open_FDA.order_label_columns(mirror.rows(mirror.lookup(column, value)))
+
+
+def search_local_labels(keyword: str, domain: str, mirror_dir: Optional[Path] = None) -> pd.DataFrame:
+    """
+    Search the local mirror the way Open_FDA.open_fda_main searches the API.
+
+    Drug searches are index lookups on brand_name and generic_name; disease
+    searches scan only the indications_and_usage column.
+
+    Args:
+        keyword (str): Search keyword.
+        domain (str): "disease" or "drug".
+        mirror_dir (Optional[Path]): Mirror directory (defaults to FDA_MIRROR_DIR).
+
+    Returns:
+        pd.DataFrame: Matching labels with the key columns first.
+    """
+    mirror = get_label_mirror(mirror_dir)
+    if domain == "drug":
+        indices = np.union1d(mirror.lookup("brand_name", keyword), mirror.lookup("generic_name", keyword))
+    else:
+        mask = mirror.disease_text.str.contains(str(keyword).lower(), regex=False)
+        indices = mask.to_numpy().nonzero()[0]
+    return Open_FDA.order_label_columns(mirror.rows(indices))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command line entry point for building the mirror.
+
+    Args:
+        argv (Optional[List[str]]): Command line arguments.
+
+    Returns:
+        int: Process exit code.
+    """
+    parser = argparse.ArgumentParser(description="Build the local openFDA drug label mirror from the bulk download files.")
+    parser.add_argument("paths", type=Path, nargs="+", help="Drug label bulk download files (.json or .json.zip)")
+    parser.add_argument("--mirror-dir", type=Path, default=None, help="Directory to write the mirror to")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes")
+    args = parser.parse_args(argv)
+
+    ingest_label_files(args.paths, args.mirror_dir, args.workers)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+"""
+Relevance ranking module for the Clinical Trials & FDA Data Search App.
+Ranks candidate trials for a keyword by text relevance, title and condition
+match strength, recency and recruitment status, so broad searches can return
+only the top results.
+"""
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from app.data.text_index import parse_query
+
+# Candidates ranked per returned trial; the pool comes from the API or index order
+RANK_POOL_FACTOR = 3
+
+# Columns read to rank candidates
+RANK_COLUMNS = ["briefTitle", "officialTitle", "conditions", "lastUpdatePostDate", "overallStatus"]
+
+# Weight of each signal in the final score
+RANK_WEIGHTS = {
+    "text": 0.4,
+    "title": 0.25,
+    "conditions": 0.15,
+    "recency": 0.1,
+    "status": 0.1,
+}
+
+# Recency score halves for every this many years since the last update
+RECENCY_HALF_LIFE_YEARS = 2.0
+
+# Preference of each overall status; unknown statuses score 0.3
+STATUS_WEIGHTS = {
+    "RECRUITING": 1.0,
+    "NOT_YET_RECRUITING": 0.9,
+    "ENROLLING_BY_INVITATION": 0.8,
+    "ACTIVE_NOT_RECRUITING": 0.7,
+    "AVAILABLE": 0.7,
+    "COMPLETED": 0.6,
+    "SUSPENDED": 0.2,
+    "TERMINATED": 0.1,
+    "WITHDRAWN": 0.0,
+}
+
+
+def candidate_pool_size(max_results: int) -> int:
+    """
+    Get the number of candidates to rank for a bounded search.
+
+    Args:
+        max_results (int): Number of trials to return.
+
+    Returns:
+        int: Number of candidates to fetch.
+    """
+    return max_results * RANK_POOL_FACTOR
+
+
+def _match_strength(text: pd.Series, clauses: list) -> np.ndarray:
+    """
+    Score how strongly a text column matches the query.
+
+    The score is the fraction of query clauses found as whole words or
+    phrases, plus a bonus when the whole query appears as one phrase.
+
+    Args:
+        text (pd.Series): Column to match.
+        clauses (list): Token sequences from parse_query.
+
+    Returns:
+        np.ndarray: A score between 0 and 1 per row.
+    """
+    text = text.fillna("").astype(str).str.casefold()
+    hits = np.zeros(len(text))
+    for tokens in clauses:
+        pattern = r"\b" + r"\W+".join(tokens) + r"\b"
+        hits += text.str.contains(pattern, regex=True).to_numpy(dtype=float)
+    score = hits / len(clauses)
+    if len(clauses) > 1:
+        whole = r"\b" + r"\W+".join(token for tokens in clauses for token in tokens) + r"\b"
+        score = 0.8 * score + 0.2 * text.str.contains(whole, regex=True).to_numpy(dtype=float)
+    return score
+
+
+def _recency(dates: pd.Series, now: pd.Timestamp) -> np.ndarray:
+    """
+    Score how recently each trial was updated.
+
+    Args:
+        dates (pd.Series): Last update dates.
+        now (pd.Timestamp): Reference time.
+
+    Returns:
+        np.ndarray: A score between 0 and 1 per row; missing dates score 0.
+    """
+    dates = pd.to_datetime(dates, errors="coerce")
+    age_years = ((now - dates).dt.days / 365.25).clip(lower=0)
+    return (0.5 ** (age_years / RECENCY_HALF_LIFE_YEARS)).fillna(0.0).to_numpy(dtype=float)
+
+
+def relevance_scores(
+    df: pd.DataFrame,
+    keyword: str,
+    text_scores: Optional[np.ndarray] = None,
+    now: Optional[pd.Timestamp] = None,
+) -> np.ndarray:
+    """
+    Score candidate trials for a keyword.
+
+    Args:
+        df (pd.DataFrame): Candidate trials with the RANK_COLUMNS that are available.
+        keyword (str): Search keyword.
+        text_scores (Optional[np.ndarray]): Full-text scores such as BM25, one per row;
+            without them the candidates' order is used, as the API returns them by relevance.
+        now (Optional[pd.Timestamp]): Reference time for recency.
+
+    Returns:
+        np.ndarray: A score per row; higher is better.
+    """
+    n = len(df)
+    if n == 0:
+        return np.zeros(0)
+    now = now if now is not None else pd.Timestamp.now()
+    clauses = parse_query(keyword)
+
+    if text_scores is not None and len(text_scores) and np.max(text_scores) > 0:
+        text = np.asarray(text_scores, dtype=float) / np.max(text_scores)
+    else:
+        text = 1.0 - np.arange(n) / n
+
+    def column(name: str) -> pd.Series:
+        return df[name] if name in df.columns else pd.Series([None] * n, index=df.index)
+
+    if clauses:
+        title = np.maximum(_match_strength(column("briefTitle"), clauses), _match_strength(column("officialTitle"), clauses))
+        conditions = _match_strength(column("conditions"), clauses)
+    else:
+        title = conditions = np.zeros(n)
+    recency = _recency(column("lastUpdatePostDate"), now)
+    status = column("overallStatus").map(STATUS_WEIGHTS).fillna(0.3).to_numpy(dtype=float)
+
+    return (
+        RANK_WEIGHTS["text"] * text
+        + RANK_WEIGHTS["title"] * title
+        + RANK_WEIGHTS["conditions"] * conditions
+        + RANK_WEIGHTS["recency"] * recency
+        + RANK_WEIGHTS["status"] * status
+    )
+
+
+def top_positions(
+    df: pd.DataFrame,
+    keyword: str,
+    max_results: int,
+    text_scores: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Get the row positions of the best candidates, best first.
+
+    Args:
+        df (pd.DataFrame): Candidate trials.
+        keyword (str): Search keyword.
+        max_results (int): Number of trials to keep.
+        text_scores (Optional[np.ndarray]): Full-text scores, one per row.
+
+    Returns:
+        np.ndarray: Row positions of the top trials.
+    """
+    scores = relevance_scores(df, keyword, text_scores)
+    # Stable sort keeps the incoming relevance order between equal scores
+    return np.argsort(-scores, kind="stable")[:max_results]
+
+
+def rank_trials(
+    df: pd.DataFrame,
+    keyword: str,
+    max_results: int,
+    text_scores: Optional[np.ndarray] = None,
+) -> pd.DataFrame:
+    """
+    Keep the best candidate trials for a keyword, best first.
+
+    Args:
+        df (pd.DataFrame): Candidate trials.
+        keyword (str): Search keyword.
+        max_results (int): Number of trials to keep.
+        text_scores (Optional[np.ndarray]): Full-text scores, one per row.
+
+    Returns:
+        pd.DataFrame: The top trials.
+    """
+    if df is None or df.empty:
+        return df
+    return df.iloc[top_positions(df, keyword, max_results, text_scores)].reset_index(drop=True)
@@ -0,0 +1,337 @@
+"""
+Full-text index module for the Clinical Trials & FDA Data Search App.
+An on-disk inverted index with positional postings over the local trial
+mirror, supporting BM25-ranked keyword queries and quoted phrase queries.
+Results are row positions ("doc ids") that the Parquet store can gather.
+"""
+import json
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from pydantic import BaseModel, ConfigDict
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Longer tokens are truncated, which keeps the fixed-width vocabulary small
+MAX_TOKEN_LENGTH = 32
+# Position gap between fields, so phrases never match across two fields
+FIELD_POSITION_GAP = 1
+# Documents tokenized per worker task while building
+BUILD_CHUNK_SIZE = 5000
+
+# Arrays making up an index directory
+ARRAY_FILES = ["vocab", "term_offsets", "doc_ids", "tfs", "pos_offsets", "positions", "doc_lengths"]
+META_FILE = "meta.json"
+
+TOKEN_PATTERN = re.compile(r"\w+")
+QUERY_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """
+    Split text into case-folded word tokens, truncated to MAX_TOKEN_LENGTH.
+
+    Args:
+        text (Optional[str]): Text to tokenize.
+
+    Returns:
+        List[str]: The tokens, in order.
+    """
+    if not text:
+        return []
+    return [token[:MAX_TOKEN_LENGTH] for token in TOKEN_PATTERN.findall(str(text).casefold())]
+
+
+def parse_query(query: str) -> List[List[str]]:
+    """
+    Split a query into clauses that must all match.
+
+    A quoted phrase, or a bare word that tokenizes into several tokens (such
+    as "covid-19"), is a phrase clause; any other word is a single-term clause.
+
+    Args:
+        query (str): The query text.
+
+    Returns:
+        List[List[str]]: The token sequence of each clause.
+    """
+    clauses = []
+    for phrase, word in QUERY_PATTERN.findall(query or ""):
+        tokens = tokenize(phrase or word)
+        if tokens:
+            clauses.append(tokens)
+    return clauses
+
+
+def _intersect_sorted(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Intersect two sorted arrays of unique values without re-sorting them.
+
+    Args:
+        a (np.ndarray): Sorted unique values.
+        b (np.ndarray): Sorted unique values.
+
+    Returns:
+        np.ndarray: The values in both, sorted.
+    """
+    small, large = (a, b) if len(a) <= len(b) else (b, a)
+    if len(small) == 0:
+        return small
+    found = np.searchsorted(large, small)
+    found[found == len(large)] = 0
+    return small[large[found] == small]
+
+
+class SearchResult(BaseModel):
+    """Documents matching a query, best first."""
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    doc_ids: np.ndarray
+    scores: np.ndarray
+    total: int
+
+
+def _tokenize_chunk(documents: List[Sequence[Optional[str]]], doc_offset: int) -> Tuple[np.ndarray, ...]:
+    """
+    Tokenize a chunk of documents into (term, doc, position) triples.
+
+    Args:
+        documents (List[Sequence[Optional[str]]]): Field texts of each document.
+        doc_offset (int): Doc id of the first document in the chunk.
+
+    Returns:
+        Tuple[np.ndarray, ...]: Chunk vocabulary, and the term index, doc id and position of every token.
+    """
+    vocabulary = {}
+    terms, docs, positions = [], [], []
+    for i, fields in enumerate(documents):
+        position = 0
+        for text in fields:
+            tokens = tokenize(text)
+            terms.extend(vocabulary.setdefault(token, len(vocabulary)) for token in tokens)
+            positions.extend(range(position, position + len(tokens)))
+            docs.extend([doc_offset + i] * len(tokens))
+            position += len(tokens) + FIELD_POSITION_GAP
+    vocab = np.array(list(vocabulary), dtype=str) if vocabulary else np.array([], dtype="<U1")
+    return (
+        vocab,
+        np.array(terms, dtype=np.int64),
+        np.array(docs, dtype=np.int32),
+        np.array(positions, dtype=np.int32),
+    )
+
+
+def build_index(
+    documents: List[Sequence[Optional[str]]],
+    index_dir: Path,
+    workers: Optional[int] = 1,
+    version: Optional[str] = None,
+) -> "InvertedIndex":
+    """
+    Build an index over documents and write it to a directory.
+
+    Args:
+        documents (List[Sequence[Optional[str]]]): Field texts of each document; the doc id is the list position.
+        index_dir (Path): Directory to write the index to.
+        workers (Optional[int]): Worker processes for tokenizing (1 tokenizes in this process).
+        version (Optional[str]): Version of the indexed documents, recorded so readers can check
+            that the index belongs to the table they gather rows from.
+
+    Returns:
+        InvertedIndex: The loaded index.
+    """
+    chunks = [(documents[i:i + BUILD_CHUNK_SIZE], i) for i in range(0, len(documents), BUILD_CHUNK_SIZE)]
+    if workers == 1 or len(chunks) <= 1:
+        parts = [_tokenize_chunk(chunk, offset) for chunk, offset in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parts = list(executor.map(_tokenize_chunk, *zip(*chunks)))
+
+    # Merge the chunk vocabularies into one sorted vocabulary
+    vocab = np.unique(np.concatenate([part[0] for part in parts])) if parts else np.array([], dtype="<U1")
+    terms = np.concatenate([np.searchsorted(vocab, part[0])[part[1]] for part in parts]) if parts else np.array([], dtype=np.int64)
+    docs = np.concatenate([part[2] for part in parts]) if parts else np.array([], dtype=np.int32)
+    positions = np.concatenate([part[3] for part in parts]) if parts else np.array([], dtype=np.int32)
+
+    # Sort tokens by term, then doc, then position, and cut them into postings
+    order = np.lexsort((positions, docs, terms))
+    terms, docs, positions = terms[order], docs[order], positions[order]
+    boundaries = np.ones(len(terms), dtype=bool)
+    boundaries[1:] = (terms[1:] != terms[:-1]) | (docs[1:] != docs[:-1])
+    starts = np.flatnonzero(boundaries)
+    pos_offsets = np.append(starts, len(terms)).astype(np.int64)
+
+    arrays = {
+        "vocab": vocab,
+        "term_offsets": np.searchsorted(terms[starts], np.arange(len(vocab) + 1)).astype(np.int64),
+        "doc_ids": docs[starts].astype(np.int32),
+        "tfs": np.diff(pos_offsets).astype(np.int32),
+        "pos_offsets": pos_offsets,
+        "positions": positions.astype(np.int32),
+        "doc_lengths": np.bincount(docs, minlength=len(documents)).astype(np.int32),
+    }
+
+    index_dir = Path(index_dir)
+    index_dir.mkdir(parents=True, exist_ok=True)
+    for name in ARRAY_FILES:
+        np.save(index_dir / f"{name}.npy", arrays[name])
+    with open(index_dir / META_FILE, "w", encoding="utf-8") as f:
+        json.dump({"documents": len(documents), "terms": len(vocab), "tokens": len(terms), "version": version}, f)
+    return InvertedIndex(index_dir)
+
+
+class InvertedIndex:
+    """A memory-mapped inverted index with positional postings."""
+
+    def __init__(self, index_dir: Path):
+        """
+        Open an index directory written by build_index.
+
+        Args:
+            index_dir (Path): The index directory.
+        """
+        index_dir = Path(index_dir)
+        for name in ARRAY_FILES:
+            setattr(self, name, np.load(index_dir / f"{name}.npy", mmap_mode="r"))
+        with open(index_dir / META_FILE, "r", encoding="utf-8") as f:
+            self.version: Optional[str] = json.load(f).get("version")
+        self.num_docs = len(self.doc_lengths)
+        self.avg_doc_length = float(np.mean(self.doc_lengths)) if self.num_docs else 0.0
+
+    @staticmethod
+    def exists(index_dir: Path) -> bool:
+        """
+        Check whether an index has been written to a directory.
+
+        Args:
+            index_dir (Path): The index directory.
+
+        Returns:
+            bool: True if every index file is present.
+        """
+        index_dir = Path(index_dir)
+        return (index_dir / META_FILE).is_file() and all((index_dir / f"{name}.npy").is_file() for name in ARRAY_FILES)
+
+    def _term_id(self, term: str) -> int:
+        """
+        Look up a term in the sorted vocabulary.
+
+        Args:
+            term (str): A token.
+
+        Returns:
+            int: The term id, or -1 if the term is not indexed.
+        """
+        i = int(np.searchsorted(self.vocab, term))
+        return i if i < len(self.vocab) and self.vocab[i] == term else -1
+
+    def postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the documents containing a term.
+
+        Args:
+            term (str): A token.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Doc ids and term frequencies.
+        """
+        term_id = self._term_id(term)
+        if term_id < 0:
+            return np.array([], dtype=np.int32), np.array([], dtype=np.int32)
+        start, end = self.term_offsets[term_id], self.term_offsets[term_id + 1]
+        return np.asarray(self.doc_ids[start:end]), np.asarray(self.tfs[start:end])
+
+    def _position_keys(self, term: str, shift: int) -> np.ndarray:
+        """
+        Encode every occurrence of a term as doc id and position in one integer.
+
+        Args:
+            term (str): A token.
+            shift (int): Offset of the term within its phrase, subtracted from each position.
+
+        Returns:
+            np.ndarray: Sorted (doc << 32) + (position - shift) keys.
+        """
+        term_id = self._term_id(term)
+        if term_id < 0:
+            return np.array([], dtype=np.int64)
+        start, end = self.term_offsets[term_id], self.term_offsets[term_id + 1]
+        positions = np.asarray(self.positions[self.pos_offsets[start]:self.pos_offsets[end]], dtype=np.int64)
+        docs = np.repeat(np.asarray(self.doc_ids[start:end], dtype=np.int64), np.asarray(self.tfs[start:end]))
+        return (docs << 32) + (positions - shift)
+
+    def phrase_docs(self, tokens: List[str]) -> np.ndarray:
+        """
+        Find the documents containing tokens as a consecutive phrase.
+
+        Args:
+            tokens (List[str]): The phrase tokens.
+
+        Returns:
+            np.ndarray: Sorted doc ids.
+        """
+        if len(tokens) == 1:
+            return self.postings(tokens[0])[0]
+        keys = self._position_keys(tokens[0], 0)
+        for shift, token in enumerate(tokens[1:], start=1):
+            if len(keys) == 0:
+                break
+            keys = _intersect_sorted(keys, self._position_keys(token, shift))
+        return np.unique(keys >> 32).astype(np.int32)
+
+    def bm25(self, terms: Iterable[str]) -> np.ndarray:
+        """
+        Score every document against query terms with BM25.
+
+        Args:
+            terms (Iterable[str]): Query tokens; repeated tokens count once.
+
+        Returns:
+            np.ndarray: A score per doc id.
+        """
+        scores = np.zeros(self.num_docs, dtype=np.float64)
+        for term in set(terms):
+            docs, tfs = self.postings(term)
+            if len(docs) == 0:
+                continue
+            idf = np.log(1.0 + (self.num_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = BM25_K1 * (1.0 - BM25_B + BM25_B * np.asarray(self.doc_lengths)[docs] / self.avg_doc_length)
+            scores[docs] += idf * tfs * (BM25_K1 + 1.0) / (tfs + norm)
+        return scores
+
+    def search(self, query: str, limit: Optional[int] = None) -> SearchResult:
+        """
+        Find the documents matching every clause of a query, ranked by BM25.
+
+        Args:
+            query (str): Words and "quoted phrases".
+            limit (Optional[int]): Maximum number of doc ids to return (None returns all).
+
+        Returns:
+            SearchResult: Matching doc ids best first, their scores and the total number of matches.
+        """
+        clauses = parse_query(query)
+        if not clauses:
+            doc_ids = np.arange(self.num_docs if limit is None else min(limit, self.num_docs))
+            return SearchResult(doc_ids=doc_ids, scores=np.zeros(len(doc_ids)), total=self.num_docs)
+
+        # Rarest clauses first, so the candidate set shrinks quickly
+        candidates = None
+        for clause in sorted(clauses, key=lambda tokens: min(len(self.postings(token)[0]) for token in tokens)):
+            docs = self.phrase_docs(clause)
+            candidates = docs if candidates is None else _intersect_sorted(candidates, docs)
+            if len(candidates) == 0:
+                break
+
+        scores = self.bm25(token for clause in clauses for token in clause)[candidates]
+        total = len(candidates)
+        if limit is not None and limit < total:
+            top = np.argpartition(-scores, limit)[:limit]
+            candidates, scores = candidates[top], scores[top]
+        order = np.lexsort((candidates, -scores))
+        return SearchResult(doc_ids=candidates[order].astype(np.int64), scores=scores[order], total=total)
@@ -0,0 +1,259 @@
+"""
+Trial tables module for the Clinical Trials & FDA Data Search App.
+Normalizes ClinicalTrials.gov study records into a trials table plus child
+tables keyed by nctId, one row per value of each multi-valued field, so
+filters and group-bys are joins instead of substring matches on the
+comma-joined flat view.
+"""
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+from clinical_trials_module import convert_numeric_columns, fetch_studies, normalize_study
+
+# Comma-joined columns of the flat view that are stored in child tables
+MULTI_VALUED_COLUMNS = [
+    "collaborators", "collaboratorsType", "conditions", "phases", "arms", "interventions",
+    "interventionDrug", "interventionBiological", "interventioOthers", "interventionDescription",
+    "primaryOutcomes", "secondaryOutcomes", "LocationName", "city", "state", "country",
+]
+
+# Child tables keyed by nctId, with their columns
+CHILD_TABLES = {
+    "conditions": ["nctId", "condition"],
+    "phases": ["nctId", "phase"],
+    "collaborators": ["nctId", "name", "class"],
+    "arm_groups": ["nctId", "label", "type", "description"],
+    "arm_interventions": ["nctId", "armLabel", "interventionName"],
+    "interventions": ["nctId", "type", "name", "description"],
+    "locations": ["nctId", "facility", "city", "state", "zip", "country"],
+    "outcomes": ["nctId", "kind", "ordinal", "measure", "timeFrame", "description"],
+}
+
+# List columns of the flat view (clinical_trials_module.LIST_COLUMNS), mapped to the child
+# table and column they list and whether normalize_study keeps each value once
+LIST_COLUMN_SOURCES = {
+    "phaseList": ("phases", "phase", False),
+    "countryList": ("locations", "country", True),
+}
+
+# Low-cardinality columns stored as categorical codes
+CATEGORICAL_COLUMNS = {
+    "trials": ["organizationType", "overallStatus", "completionDateType", "lastUpdatePostDateType",
+               "leadSponsorType", "studyType", "allocation", "interventionModel", "primaryPurpose",
+               "masking", "enrollmentType", "eligibilityGender"],
+    "phases": ["phase"],
+    "collaborators": ["class"],
+    "arm_groups": ["type"],
+    "interventions": ["type"],
+    "locations": ["state", "country"],
+    "outcomes": ["kind"],
+}
+
+
+def normalize_study_tables(study: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Split one study record into a trial row and rows of its child tables.
+
+    Unlike normalize_study, multi-valued fields are kept as one row per value
+    instead of comma-joined strings, and locations keep their facility, city,
+    state and country together.
+
+    Args:
+        study (Dict[str, Any]): Study JSON as returned by the studies API or the bulk export.
+
+    Returns:
+        Dict[str, List[Dict[str, Any]]]: 'trials' mapped to a one-row list, and each CHILD_TABLES name mapped to its rows.
+    """
+    protocol = study.get("protocolSection", {})
+    flat_data = normalize_study(study)
+    nct_id = flat_data["nctId"]
+    derived = set(MULTI_VALUED_COLUMNS) | set(LIST_COLUMN_SOURCES)
+    rows = {"trials": [{key: value for key, value in flat_data.items() if key not in derived}]}
+
+    rows["conditions"] = [{"nctId": nct_id, "condition": condition}
+                          for condition in protocol.get("conditionsModule", {}).get("conditions", [])]
+    rows["phases"] = [{"nctId": nct_id, "phase": phase}
+                      for phase in protocol.get("designModule", {}).get("phases", [])]
+    rows["collaborators"] = [{"nctId": nct_id, "name": collab.get("name"), "class": collab.get("class")}
+                             for collab in protocol.get("sponsorCollaboratorsModule", {}).get("collaborators", [])]
+
+    arms_module = protocol.get("armsInterventionsModule", {})
+    arms = arms_module.get("armGroups", [])
+    rows["arm_groups"] = [{"nctId": nct_id, "label": arm.get("label"), "type": arm.get("type"),
+                           "description": arm.get("description")} for arm in arms]
+    rows["arm_interventions"] = [{"nctId": nct_id, "armLabel": arm.get("label"), "interventionName": name}
+                                 for arm in arms for name in arm.get("interventionNames", [])]
+    rows["interventions"] = [{"nctId": nct_id, "type": intervention.get("type"), "name": intervention.get("name"),
+                              "description": intervention.get("description")}
+                             for intervention in arms_module.get("interventions", [])]
+
+    locations = protocol.get("contactsLocationsModule", {}).get("locations") or []
+    rows["locations"] = [{"nctId": nct_id, "facility": location.get("facility"), "city": location.get("city"),
+                          "state": location.get("state"), "zip": location.get("zip"),
+                          "country": location.get("country")} for location in locations]
+
+    outcomes = protocol.get("outcomesModule", {})
+    rows["outcomes"] = [{"nctId": nct_id, "kind": kind, "ordinal": i + 1, "measure": outcome.get("measure"),
+                         "timeFrame": outcome.get("timeFrame"), "description": outcome.get("description")}
+                        for kind, key in (("primary", "primaryOutcomes"), ("secondary", "secondaryOutcomes"))
+                        for i, outcome in enumerate(outcomes.get(key, []))]
+    return rows
+
+
+def studies_to_tables(studies: List[Dict[str, Any]]) -> Dict[str, pd.DataFrame]:
+    """
+    Normalize study records into a trials table and child tables keyed by nctId.
+
+    Args:
+        studies (List[Dict[str, Any]]): Study JSON records.
+
+    Returns:
+        Dict[str, pd.DataFrame]: 'trials' and each CHILD_TABLES name mapped to a DataFrame.
+    """
+    rows = {name: [] for name in ["trials", *CHILD_TABLES]}
+    for study in studies:
+        for name, table_rows in normalize_study_tables(study).items():
+            rows[name].extend(table_rows)
+
+    tables = {"trials": convert_numeric_columns(pd.DataFrame(rows["trials"]))}
+    for name, columns in CHILD_TABLES.items():
+        tables[name] = pd.DataFrame(rows[name], columns=columns)
+    return categorize_tables(tables)
+
+
+def categorize_tables(tables: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+    """
+    Store the low-cardinality columns of trial tables as categorical codes.
+
+    Args:
+        tables (Dict[str, pd.DataFrame]): Table names mapped to DataFrames.
+
+    Returns:
+        Dict[str, pd.DataFrame]: The same tables with CATEGORICAL_COLUMNS converted to the category dtype.
+    """
+    for name, columns in CATEGORICAL_COLUMNS.items():
+        df = tables.get(name)
+        if df is None:
+            continue
+        for col in columns:
+            if col in df.columns:
+                df[col] = df[col].astype("category")
+    return tables
+
+
+def filter_trials(tables: Dict[str, pd.DataFrame], child: str, column: str, values: List[str]) -> pd.DataFrame:
+    """
+    Select the trials with at least one child row whose column is in values.
+
+    For example, filter_trials(tables, 'locations', 'country', ['Germany'])
+    or filter_trials(tables, 'phases', 'phase', ['PHASE2', 'PHASE3']).
+
+    Args:
+        tables (Dict[str, pd.DataFrame]): Tables from studies_to_tables.
+        child (str): Child table name.
+        column (str): Column of the child table to match.
+        values (List[str]): Accepted values.
+
+    Returns:
+        pd.DataFrame: The matching rows of the trials table.
+    """
+    child_df = tables[child]
+    nct_ids = child_df.loc[child_df[column].isin(values), "nctId"].unique()
+    trials = tables["trials"]
+    return trials[trials["nctId"].isin(nct_ids)]
+
+
+def child_lists(tables: Dict[str, pd.DataFrame], child: str, column: str, unique: bool = False) -> pd.Series:
+    """
+    Collect each trial's values of a child table column as a list.
+
+    Args:
+        tables (Dict[str, pd.DataFrame]): Tables from studies_to_tables.
+        child (str): Child table name.
+        column (str): Column of the child table.
+        unique (bool): Keep each value once, sorted, instead of in record order.
+
+    Returns:
+        pd.Series: One list per row of the trials table, empty for trials without values.
+    """
+    df = tables[child]
+    values = df[column].astype(object)
+    present = values.notna() & (values != "")
+    grouped = values[present].groupby(df.loc[present, "nctId"], sort=False)
+    lists = grouped.agg(lambda parts: sorted(set(parts)) if unique else list(parts))
+    return tables["trials"]["nctId"].map(lists).map(lambda value: value if isinstance(value, list) else [])
+
+
+def tables_to_flat(tables: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Derive the flat view produced by studies_to_dataframe from the normalized tables.
+
+    Values that normalize_study joins from sets (arm interventions and
+    location fields) are joined in sorted order here.
+
+    Args:
+        tables (Dict[str, pd.DataFrame]): Tables from studies_to_tables.
+
+    Returns:
+        pd.DataFrame: One row per trial with comma-joined multi-valued columns and their list columns.
+    """
+    trials = tables["trials"].copy()
+    for name in CATEGORICAL_COLUMNS["trials"]:
+        if name in trials.columns:
+            trials[name] = trials[name].astype(object).where(trials[name].notna(), None)
+
+    def joined(child: str, value: str, separator: str = ", ", unique: bool = False,
+               mask: Optional[pd.Series] = None) -> pd.Series:
+        df = tables[child] if mask is None else tables[child][mask]
+        values = df[value].astype(object).where(df[value].notna(), "").astype(str)
+        grouped = values.groupby(df["nctId"], sort=False)
+        aggregate: Callable = (lambda parts: separator.join(sorted(set(parts)))) if unique else separator.join
+        return trials["nctId"].map(grouped.agg(aggregate)).fillna("")
+
+    interventions = tables["interventions"]
+    intervention_type = interventions["type"].astype(object).fillna("").str.lower()
+    outcomes = tables["outcomes"]
+    outcome_text = outcomes["measure"].astype(object).where(outcomes["measure"].notna() & (outcomes["measure"] != ""), "None")
+    outcome_text = outcomes["kind"].astype(str).str.capitalize() + " Outcome " + outcomes["ordinal"].astype(str) + ": " + outcome_text.astype(str)
+
+    trials["collaborators"] = joined("collaborators", "name")
+    trials["collaboratorsType"] = joined("collaborators", "class")
+    trials["conditions"] = joined("conditions", "condition")
+    trials["phases"] = joined("phases", "phase")
+    trials["arms"] = joined("arm_groups", "label")
+    trials["interventions"] = joined("arm_interventions", "interventionName", unique=True)
+    trials["interventionDrug"] = joined("interventions", "name", mask=intervention_type == "drug")
+    trials["interventionBiological"] = joined("interventions", "name", mask=intervention_type == "biological")
+    trials["interventioOthers"] = joined("interventions", "name", mask=~intervention_type.isin(["drug", "biological"]))
+    described = interventions["name"].fillna("").astype(str) + ": " + interventions["description"].fillna("").astype(str)
+    trials["interventionDescription"] = trials["nctId"].map(described.groupby(interventions["nctId"], sort=False).agg("\n".join)).fillna("")
+    for kind, column in (("primary", "primaryOutcomes"), ("secondary", "secondaryOutcomes")):
+        mask = outcomes["kind"] == kind
+        text = outcome_text[mask].groupby(outcomes.loc[mask, "nctId"], sort=False).agg("\n".join)
+        trials[column] = trials["nctId"].map(text).fillna("")
+    trials["LocationName"] = joined("locations", "facility", unique=True)
+    trials["city"] = joined("locations", "city", unique=True)
+    trials["state"] = joined("locations", "state", unique=True)
+    trials["country"] = joined("locations", "country", unique=True)
+    for name, (child, column, unique) in LIST_COLUMN_SOURCES.items():
+        trials[name] = child_lists(tables, child, column, unique)
+
+    flat_columns = list(normalize_study({}).keys())
+    return trials[[col for col in flat_columns if col in trials.columns] +
+                  [col for col in trials.columns if col not in flat_columns]]
+
+
+def get_clinical_trials_tables(COND: str, progress: Optional[Callable[..., None]] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Fetch every study matching a search term as normalized tables.
+
+    Args:
+        COND (str): Search term.
+        progress (Optional[Callable[..., None]]): Progress callback, as for fetch_studies.
+
+    Returns:
+        Dict[str, pd.DataFrame]: 'trials' and each CHILD_TABLES name mapped to a DataFrame; see studies_to_tables.
+    """
+    studies, _ = fetch_studies(COND, progress=progress)
+    return studies_to_tables(studies)
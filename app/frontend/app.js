@@ -5,6 +5,9 @@ const SUPABASE_ANON_KEY = 'eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.eyJpc3MiOiJzdXBh
 // API base URL
 const API_BASE_URL = '/api';
 
+// Most relevant clinical trials returned per search (null returns every match)
+const SEARCH_MAX_RESULTS = 500;
+
 // Initialize Supabase client
 const supabaseClient = supabase.createClient(SUPABASE_URL, SUPABASE_ANON_KEY);
 
@@ -12,7 +15,8 @@ const supabaseClient = supabase.createClient(SUPABASE_URL, SUPABASE_ANON_KEY);
 let currentUser = null;
 let searchResults = {
     clinicalTrials: [],
-    fdaData: []
+    fdaData: [],
+    searchId: null
 };
 let chatHistory = [];
 
@@ -43,6 +47,7 @@ const logoutBtn = document.getElementById('logout-btn');
 const searchForm = document.getElementById('search-form');
 const keywordInput = document.getElementById('keyword');
 const searchTypeRadios = document.querySelectorAll('input[name="searchType"]');
+const collapseLabelsCheckbox = document.getElementById('collapseLabels');
 const searchBtn = document.getElementById('search-btn');
 const searchSpinner = document.getElementById('search-spinner');
 const clinicalTrialsContainer = document.getElementById('clinical-trials-container');
@@ -318,7 +323,7 @@ async function handleSearch(e) {
         console.log("Got authentication token, preparing to make API request");
         
         // Prepare request payload
-        const payload = { keyword, searchType };
+        const payload = { keyword, searchType, max_results: SEARCH_MAX_RESULTS, collapse_fda_labels: collapseLabelsCheckbox.checked };
         console.log("Request payload:", payload);
         
         // Make API request
@@ -355,12 +360,15 @@ async function handleSearch(e) {
         // Store results
         searchResults.clinicalTrials = responseData.clinical_trials || [];
         searchResults.fdaData = responseData.fda_data || [];
+        searchResults.searchId = responseData.search_id || null;
         
         console.log("Clinical trials data:", searchResults.clinicalTrials.length, "records");
         console.log("FDA data:", searchResults.fdaData.length, "records");
         
         // Update counts
-        clinicalTrialsCount.textContent = searchResults.clinicalTrials.length;
+        clinicalTrialsCount.textContent = responseData.clinical_trials_truncated
+            ? `${searchResults.clinicalTrials.length} of ${responseData.total_clinical_trials}`
+            : searchResults.clinicalTrials.length;
         fdaCount.textContent = searchResults.fdaData.length;
         
         // Render results
@@ -517,7 +525,9 @@ function renderFdaData() {
             const safeDrugData = {
                 brand_name: drug.brand_name || 'Unnamed Drug',
                 generic_name: drug.generic_name || 'N/A',
-                manufacturer_name: drug.manufacturer_name || 'Not specified',
+                manufacturer_name: Array.isArray(drug.manufacturers) && drug.manufacturers.length > 1
+                    ? `${drug.manufacturer_name || 'Not specified'} and ${drug.label_count - 1} other label(s) from ${drug.manufacturers.length} manufacturers`
+                    : drug.manufacturer_name || 'Not specified',
                 dosage_form: drug.dosage_form || 'Not specified',
                 route: drug.route || 'Not specified',
                 product_type: drug.product_type || 'Not specified',
@@ -637,6 +647,40 @@ function generateDashboardCharts() {
     
     // Generate Top Interventions Table
     generateTopInterventionsTable(interventionsData, totalTrials);
+    
+    // Replace the status and phase counts with server-side facets of the cached results
+    loadServerFacets();
+}
+
+async function loadServerFacets() {
+    if (!searchResults.searchId) {
+        return;
+    }
+    
+    try {
+        const { data } = await supabaseClient.auth.getSession();
+        const response = await fetch(`${API_BASE_URL}/search/clinical_trials/facets`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Authorization': `Bearer ${data.session.access_token}`
+            },
+            body: JSON.stringify({
+                search_id: searchResults.searchId,
+                columns: ['overallStatus', 'phases']
+            })
+        });
+        if (!response.ok) {
+            return;
+        }
+        
+        const { facets } = await response.json();
+        generateStatusChart(facets.overallStatus);
+        generatePhasesChart(facets.phases);
+    } catch (error) {
+        // Keep the client-side counts
+        console.error('Failed to load search facets:', error);
+    }
 }
 
 function generateStatusChart(statusData) {
@@ -4,7 +4,15 @@ from fastapi.staticfiles import StaticFiles
 import uvicorn
 from app.api.auth import auth_router, get_current_user
 from app.api.search import search_router
-from app.api.chat import chat_router
+from app.api.search_refine import search_refine_router
+from app.api.chat import CHAT_PRELOAD, chat_router, preload_chat_agent
+from app.api.metrics import metrics_router
+from app.api.profiles import profiles_router
+from app.api.search_jobs import shutdown_search_jobs
+from app.utils.admission import AdmissionRejected, admission_rejected_handler
+from app.utils.log import RequestContextMiddleware
+from app.utils.metrics import MetricsMiddleware
+from app.utils.profiling import ProfilingMiddleware, profiling_enabled
 
 app = FastAPI(title="Clinical Trials & FDA Data Search App")
 
@@ -16,11 +24,30 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Record in-flight requests and latency per route for /metrics
+app.add_middleware(MetricsMiddleware)
+# Profile requested or sampled search and chat requests; not installed unless configured
+if profiling_enabled():
+    app.add_middleware(ProfilingMiddleware)
+# Tag each request's log records with a correlation id, echoed in the X-Request-ID header
+app.add_middleware(RequestContextMiddleware)
+
+# Import the chat agent and load its schema registry at startup, instead of on the first chat request
+if CHAT_PRELOAD:
+    app.add_event_handler("startup", preload_chat_agent)
+# Stop the background search job workers on shutdown
+app.add_event_handler("shutdown", shutdown_search_jobs)
+
+# Answer calls refused by admission control with 429/503 and a Retry-After header
+app.add_exception_handler(AdmissionRejected, admission_rejected_handler)
 
 # Include routers
 app.include_router(auth_router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(search_router, prefix="/api/search", tags=["Search"], dependencies=[Depends(get_current_user)])
+app.include_router(search_refine_router, prefix="/api/search", tags=["Search"], dependencies=[Depends(get_current_user)])
 app.include_router(chat_router, prefix="/api/chat", tags=["Chat"], dependencies=[Depends(get_current_user)])
+app.include_router(metrics_router, prefix="/metrics", tags=["Metrics"])
+app.include_router(profiles_router, prefix="/api/profiles", tags=["Profiling"])
 
 # Mount static files for frontend
 app.mount("/", StaticFiles(directory="app/frontend", html=True), name="frontend")
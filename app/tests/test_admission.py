@@ -0,0 +1,182 @@
+"""
+Tests for admission control of the upstream services.
+"""
+import asyncio
+import threading
+import time
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from app.main import app
+from app.api.auth import get_current_user
+from app.models.user import User
+from app.utils.admission import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_FULL_FETCH,
+    PRIORITY_INTERACTIVE,
+    AdmissionRejected,
+    Gate,
+    admission_context,
+)
+from app.utils.metrics import ADMISSION_REJECTED
+
+def wait_until(condition, timeout=5):
+    """Poll until a condition holds."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return
+        time.sleep(0.01)
+    raise AssertionError("Condition not reached")
+
+def test_queued_calls_are_admitted_in_priority_order():
+    """Test that a freed slot goes to interactive calls before full fetches and background calls."""
+    gate = Gate("test", limit=1, max_queue=4, per_user=0)
+    release = threading.Event()
+    admitted = []
+
+    def hold():
+        with gate.admit():
+            release.wait(5)
+
+    def call(name, priority, background=False):
+        with admission_context(None, PRIORITY_BACKGROUND if background else PRIORITY_INTERACTIVE):
+            with gate.admit(priority):
+                admitted.append(name)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    wait_until(lambda: gate._active == 1)
+    callers = [
+        threading.Thread(target=call, args=("background", PRIORITY_INTERACTIVE, True)),
+        threading.Thread(target=call, args=("full", PRIORITY_FULL_FETCH)),
+        threading.Thread(target=call, args=("interactive", PRIORITY_INTERACTIVE)),
+    ]
+    for count, thread in enumerate(callers, start=1):
+        thread.start()
+        wait_until(lambda: gate._queued == count)
+    release.set()
+    for thread in [holder] + callers:
+        thread.join(5)
+
+    assert admitted == ["interactive", "full", "background"]
+    assert gate._active == 0
+    assert gate._queued == 0
+
+def test_user_over_their_share_gets_429():
+    """Test that the per-user limit refuses a user's extra call but not other users' calls."""
+    gate = Gate("test", limit=4, max_queue=4, per_user=1)
+    with admission_context("user-1"), gate.admit():
+        with pytest.raises(AdmissionRejected) as rejected:
+            with gate.admit():
+                pass
+        with admission_context("user-2"), gate.admit():
+            pass
+        with admission_context(None), gate.admit():
+            pass
+
+    assert rejected.value.status_code == 429
+    assert rejected.value.reason == "user_limit"
+    assert rejected.value.retry_after >= 1
+    with admission_context("user-1"), gate.admit():
+        pass
+
+def test_full_queue_and_queue_timeout_get_503():
+    """Test that calls are refused with 503 when the queue is full or they wait too long."""
+    full = Gate("test_full", limit=0, max_queue=0, per_user=0)
+    with pytest.raises(AdmissionRejected) as rejected:
+        with full.admit():
+            pass
+    assert rejected.value.status_code == 503
+    assert rejected.value.reason == "queue_full"
+    assert ADMISSION_REJECTED.value(gate="test_full", reason="queue_full") == 1
+
+    slow = Gate("test_slow", limit=0, max_queue=1, per_user=1, queue_timeout=0.05)
+    with admission_context("user-1"), pytest.raises(AdmissionRejected) as rejected:
+        with slow.admit():
+            pass
+    assert rejected.value.status_code == 503
+    assert rejected.value.reason == "queue_timeout"
+    assert slow._queued == 0
+    assert not slow._users
+
+def test_async_admit_frees_its_place_when_cancelled():
+    """Test that a chat call waiting without blocking the loop leaves the queue when cancelled."""
+    gate = Gate("test", limit=1, max_queue=2, per_user=0)
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def hold():
+            async with gate.admit_async():
+                await release.wait()
+
+        async def wait():
+            async with gate.admit_async():
+                pass
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(wait())
+        await asyncio.sleep(0.01)
+        assert gate._queued == 1
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert gate._queued == 0
+        release.set()
+        await holder
+        async with gate.admit_async():
+            assert gate._active == 1
+
+    asyncio.run(scenario())
+    assert gate._active == 0
+
+def test_search_endpoint_answers_busy_upstream_with_retry_after():
+    """Test that a refused ClinicalTrials.gov call returns 503 with Retry-After instead of empty results."""
+    app.dependency_overrides[get_current_user] = lambda: User(id="user-1", email="test@example.com")
+    client = TestClient(app)
+    try:
+        with patch("app.api.search.CTGOV_GATE", Gate("ctgov", limit=0, max_queue=0)), \
+             patch("app.data.ct_mirror.mirror_available", return_value=False), \
+             patch("app.api.search.get_clinical_trials_data") as api:
+            response = client.post("/api/search", json={"keyword": "diabetes"})
+    finally:
+        app.dependency_overrides.clear()
+
+    api.assert_not_called()
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+    assert "busy" in response.json()["detail"]
+
+def test_chat_endpoint_answers_busy_model_with_retry_after():
+    """Test that a chat refused by the model gate returns 503 without running the agent."""
+    app.dependency_overrides[get_current_user] = lambda: User(id="user-1", email="test@example.com")
+    client = TestClient(app)
+    try:
+        with patch("app.agents.chat_agent.LLM_GATE", Gate("llm", limit=0, max_queue=0)), \
+             patch("app.agents.chat_agent.answer_from_template", return_value=None), \
+             patch("app.agents.chat_agent.create_chat_agent") as agent:
+            response = client.post("/api/chat", json={"query": "Why did these trials stop?", "clinical_trials_df": [], "fda_df": []})
+    finally:
+        app.dependency_overrides.clear()
+
+    agent.return_value.invoke.assert_not_called()
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
+
+def test_chat_template_answers_skip_model_gate():
+    """Test that a question answered from a template is served while the model gate is full."""
+    app.dependency_overrides[get_current_user] = lambda: User(id="user-1", email="test@example.com")
+    client = TestClient(app)
+    try:
+        with patch("app.agents.chat_agent.LLM_GATE", Gate("llm", limit=0, max_queue=0)), \
+             patch("app.agents.chat_agent.answer_from_template", return_value=("There are 2 trials.", [])), \
+             patch("app.agents.chat_agent.create_chat_agent") as agent:
+            response = client.post("/api/chat", json={"query": "How many trials?", "clinical_trials_df": [], "fda_df": []})
+    finally:
+        app.dependency_overrides.clear()
+
+    agent.assert_not_called()
+    assert response.status_code == 200
+    assert response.json()["response"] == "There are 2 trials."
@@ -0,0 +1,37 @@
+"""
+Tests for the search pipeline benchmark.
+"""
+import json
+from perf.bench import STAGES, api_pages, compare, main, run_benchmarks, scale_studies
+from perf.synthetic_trials import synthetic_study
+
+def test_pages_link_scaled_studies():
+    """Test that scaled studies get distinct ids and are paged like the API."""
+    studies = scale_studies([synthetic_study(0)], 5)
+    assert len({study["protocolSection"]["identificationModule"]["nctId"] for study in studies}) == 5
+
+    pages = [json.loads(body) for body in api_pages(studies, page_size=2)]
+    assert [len(page["studies"]) for page in pages] == [2, 2, 1]
+    assert pages[0]["totalCount"] == 5
+    assert [page.get("nextPageToken") for page in pages] == ["page-2", "page-4", None]
+
+def test_every_stage_is_timed_and_measured():
+    """Test that each stage reports its time and peak memory per scale."""
+    results = run_benchmarks([3, 10])
+    assert list(results["scales"]) == ["3", "10"]
+    stages = results["scales"]["10"]["stages"]
+    assert list(stages) == STAGES
+    assert all(stage["seconds"] >= 0 and stage["peak_mb"] >= 0 for stage in stages.values())
+
+def test_compare_flags_regressions(tmp_path):
+    """Test that only stages clearly slower than the baseline are regressions."""
+    def result(seconds):
+        return {"scales": {"100": {"stages": {"normalize_study": {"seconds": seconds[0]}, "fetch": {"seconds": seconds[1]}}}}}
+
+    rows = compare(result([1.0, 0.002]), result([0.5, 0.001]))
+    assert {row["stage"]: row["regression"] for row in rows} == {"normalize_study": True, "fetch": False}
+
+    baseline = tmp_path / "baseline.json"
+    assert main(["--scales", "3", "--no-memory", "--output", str(tmp_path / "latest.json"),
+                 "--baseline", str(baseline), "--update-baseline"]) == 0
+    assert json.loads(baseline.read_text())["scales"]["3"]["studies"] == 3
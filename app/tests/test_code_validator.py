@@ -0,0 +1,89 @@
+"""
+Tests for the generated-code validator and the validation step of the chat agent.
+"""
+import os
+import pytest
+
+# The chat agent builds an OpenAI client at import time
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from app.agents.code_validator import compile_generated_code, validate_generated_code
+from app.agents.chat_agent import AgentState, MAX_CODE_RETRIES, route_after_validation, validate_code
+
+@pytest.fixture
+def schema():
+    """Return a sample dataset schema."""
+    return {
+        "clinical_trials_df": ["nctId", "overallStatus", "phases", "enrollmentCount"],
+        "fda_df": ["brand_name", "generic_name"]
+    }
+
+def test_valid_code_passes(schema):
+    """Test that code using known frames, columns and allowed imports is accepted."""
+    code = (
+        "import numpy as np\n"
+        "recruiting_df = clinical_trials_df[clinical_trials_df['overallStatus'].str.contains('recruit', case=False)]\n"
+        "recruiting_df['large'] = recruiting_df['enrollmentCount'] > 100\n"
+        "summary_df = recruiting_df[['nctId', 'large']].copy()\n"
+        "counts = {phase: len(group) for phase, group in recruiting_df.groupby('phases')}\n"
+        "print(np.mean(recruiting_df.enrollmentCount), counts)"
+    )
+    assert validate_generated_code(code, schema) == []
+
+def test_unknown_column_is_reported_with_suggestion(schema):
+    """Test that a misspelled column is rejected with a hint."""
+    errors = validate_generated_code("x_df = clinical_trials_df[clinical_trials_df['status'] == 'RECRUITING']", schema)
+    assert errors == ["Line 1: column 'status' does not exist in clinical_trials_df. Did you mean 'overallStatus'?"]
+
+def test_unknown_column_on_derived_frame(schema):
+    """Test that columns are checked on frames filtered from a provided frame."""
+    code = "filtered_df = fda_df[fda_df['brand_name'].notna()]\nprint(filtered_df['manufacturer'])"
+    errors = validate_generated_code(code, schema)
+    assert len(errors) == 1
+    assert "column 'manufacturer' does not exist in filtered_df" in errors[0]
+
+def test_unknown_dataframe_is_reported(schema):
+    """Test that a dataframe that was not provided is rejected."""
+    errors = validate_generated_code("result_df = trials_df.head()", {"clinical_trials_df": ["nctId"]})
+    assert len(errors) == 1
+    assert "name 'trials_df' is not defined" in errors[0]
+
+def test_forbidden_imports_and_calls(schema):
+    """Test that dangerous imports and builtins are rejected."""
+    code = "import os\nfrom subprocess import run\ndata = open('/etc/passwd').read()\nx = pd.__class__"
+    errors = validate_generated_code(code, schema)
+    assert any("import of 'os' is not allowed" in error for error in errors)
+    assert any("import of 'subprocess' is not allowed" in error for error in errors)
+    assert any("calling 'open' is not allowed" in error for error in errors)
+    assert any("access to '__class__' is not allowed" in error for error in errors)
+
+def test_syntax_error_and_empty_code(schema):
+    """Test that unparsable or empty code is rejected."""
+    assert validate_generated_code("result_df = clinical_trials_df[", schema)[0].startswith("Line 1: syntax error")
+    assert validate_generated_code("   ", schema) == ["No code was generated."]
+
+def test_compile_cache_reuses_code_objects():
+    """Test that identical code compiles to the same cached code object."""
+    assert compile_generated_code("x = 1") is compile_generated_code("x = 1")
+
+def test_validate_code_routes_back_for_regeneration():
+    """Test that invalid code loops back to generation until retries run out."""
+    state = AgentState(
+        query="recruiting trials",
+        clinical_trials_df=[{"nctId": "NCT01234567", "overallStatus": "RECRUITING"}],
+        selected_dataframes=["clinical_trials_df"],
+        generated_code="result_df = clinical_trials_df[clinical_trials_df['status'] == 'RECRUITING']"
+    )
+
+    for attempt in range(1, MAX_CODE_RETRIES + 1):
+        state = validate_code(state)
+        assert state.retry_count == attempt
+        assert route_after_validation(state) == "generate_code"
+
+    state = validate_code(state)
+    assert route_after_validation(state) == "generate_answer"
+    assert "status" in state.execution_result["error"]
+
+    state.generated_code = "result_df = clinical_trials_df[clinical_trials_df['overallStatus'] == 'RECRUITING']"
+    state = validate_code(state)
+    assert route_after_validation(state) == "execute_code"
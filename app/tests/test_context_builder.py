@@ -0,0 +1,60 @@
+"""
+Tests for the token-budgeted prompt context builder.
+"""
+import pytest
+import pandas as pd
+from app.agents.context_builder import (
+    build_data_context,
+    count_tokens,
+    summarize_frame,
+    truncate_to_budget,
+)
+
+@pytest.fixture
+def large_trials_df():
+    """Return a large clinical trials frame with long text columns."""
+    statuses = ["COMPLETED", "RECRUITING", "TERMINATED"]
+    return pd.DataFrame({
+        "nctId": [f"NCT{i:08d}" for i in range(2000)],
+        "overallStatus": [statuses[i % 3] for i in range(2000)],
+        "enrollmentCount": list(range(2000)),
+        "eligibilityCriteria": ["Inclusion criteria: adults aged 18 or older. " * 40] * 2000,
+        "eligibilityStandardAges": [["ADULT", "OLDER_ADULT"]] * 2000
+    })
+
+def test_summary_includes_schema_details(large_trials_df):
+    """Test that the richest summary lists dtypes, cardinalities, value counts and rows."""
+    summary = summarize_frame("clinical_trials_df", large_trials_df)
+    assert "clinical_trials_df: 2000 rows x 5 columns" in summary
+    assert "- overallStatus (object, 2000 non-null, 3 distinct) top values:" in summary
+    assert "COMPLETED: 667" in summary
+    assert "First 5 rows:" in summary
+
+def test_build_data_context_fits_budget(large_trials_df):
+    """Test that the context never exceeds its budget and reports its token count."""
+    for budget in (2000, 300, 40):
+        context = build_data_context({"clinical_trials_df": large_trials_df}, budget)
+        assert context.tokens <= budget
+        assert context.tokens == count_tokens(context.text)
+
+def test_build_data_context_prefers_richest_fitting_level(large_trials_df):
+    """Test that a generous budget keeps full detail and a tight one degrades it."""
+    generous = build_data_context({"clinical_trials_df": large_trials_df}, 100000)
+    tight = build_data_context({"clinical_trials_df": large_trials_df}, 150)
+    assert generous.detail_level == 0
+    assert not generous.truncated
+    assert tight.detail_level > 0
+
+def test_build_data_context_accepts_records_and_empty_input():
+    """Test records input and the empty edge case."""
+    context = build_data_context({"fda_df": [{"brand_name": "Test Brand 1"}]}, 500)
+    assert "fda_df: 1 rows x 1 columns" in context.text
+    assert build_data_context({}, 500).text == ""
+
+def test_truncate_to_budget():
+    """Test that long text is cut to the budget and short text is untouched."""
+    assert truncate_to_budget("short text", 100).truncated is False
+    long_context = truncate_to_budget("word " * 5000, 100)
+    assert long_context.truncated
+    assert long_context.tokens <= 100
+    assert long_context.text.endswith("[truncated to fit the context budget]")
@@ -0,0 +1,167 @@
+"""
+Tests for the local ClinicalTrials.gov mirror.
+"""
+import json
+import shutil
+import threading
+import zipfile
+import pytest
+import pandas as pd
+import pyarrow as pa
+from unittest.mock import patch
+from app.data import ct_mirror
+from app.data.columnar import mapped_copy, mapped_table
+from app.data.text_index import build_index
+from app.api.search import fetch_clinical_trials
+from clinical_trials_module import studies_to_dataframe
+
+def make_study(nct_id, title, condition, status="RECRUITING"):
+    """Build a minimal study record in the studies API format."""
+    return {
+        "protocolSection": {
+            "identificationModule": {
+                "nctId": nct_id,
+                "briefTitle": title,
+                "organization": {"fullName": "Test Org", "class": "INDUSTRY"}
+            },
+            "statusModule": {
+                "overallStatus": status,
+                "startDateStruct": {"date": "2021-03"},
+                "studyFirstSubmitDate": "2021-02-15"
+            },
+            "conditionsModule": {"conditions": [condition]},
+            "designModule": {"phases": ["PHASE2"], "enrollmentInfo": {"count": 120}},
+            "eligibilityModule": {"sex": "ALL", "minimumAge": "18 Years", "stdAges": ["ADULT"]},
+            "contactsLocationsModule": {"locations": [{"facility": "Site A", "city": "Boston", "country": "United States"}]}
+        },
+        "hasResults": False
+    }
+
+@pytest.fixture
+def studies():
+    """Return a handful of study records."""
+    return [
+        make_study("NCT00000001", "Metformin in Type 2 Diabetes", "Type 2 Diabetes"),
+        make_study("NCT00000002", "Insulin Glargine Study", "Diabetes Mellitus", "COMPLETED"),
+        make_study("NCT00000003", "Pembrolizumab in Melanoma", "Melanoma"),
+    ]
+
+@pytest.fixture
+def export_zip(tmp_path, studies):
+    """Write the studies as a bulk export zip of per-study JSON files."""
+    path = tmp_path / "ctg-studies.json.zip"
+    with zipfile.ZipFile(path, "w") as archive:
+        for study in studies:
+            nct_id = study["protocolSection"]["identificationModule"]["nctId"]
+            archive.writestr(f"{nct_id}.json", json.dumps(study))
+    return path
+
+def test_ingest_matches_api_normalization(tmp_path, export_zip, studies):
+    """Test that parallel ingestion yields the same rows as the API path."""
+    mirror_dir = tmp_path / "mirror"
+    assert not ct_mirror.mirror_available(mirror_dir)
+
+    count = ct_mirror.ingest_bulk_export(export_zip, mirror_dir, workers=2, chunk_size=1)
+
+    assert count == 3
+    assert ct_mirror.mirror_available(mirror_dir)
+    mirrored = ct_mirror.load_mirror(mirror_dir)
+    expected = studies_to_dataframe(studies)
+    assert list(mirrored["nctId"]) == list(expected["nctId"])
+    assert list(mirrored["conditions"]) == list(expected["conditions"])
+    assert list(mirrored["startDate"]) == list(expected["startDate"])
+    assert list(mirrored["eligibilityStandardAges"].map(list)) == [["ADULT"]] * 3
+    manifest = json.loads((mirror_dir / ct_mirror.MANIFEST_FILE).read_text())
+    assert manifest["studies"] == 3
+
+def test_search_local_trials(tmp_path, export_zip):
+    """Test case-insensitive keyword search over the mirror."""
+    mirror_dir = tmp_path / "mirror"
+    ct_mirror.ingest_bulk_export(export_zip, mirror_dir, workers=1)
+
+    diabetes, total = ct_mirror.search_local_trials("DIABETES", mirror_dir=mirror_dir)
+    assert set(diabetes["nctId"]) == {"NCT00000001", "NCT00000002"}
+    assert total == 2
+    assert ct_mirror.search_local_trials("no such keyword", mirror_dir=mirror_dir)[0].empty
+
+def test_search_local_trials_top_n(tmp_path, export_zip):
+    """Test that a bounded search returns the best match and the exact total."""
+    mirror_dir = tmp_path / "mirror"
+    ct_mirror.ingest_bulk_export(export_zip, mirror_dir, workers=1)
+
+    top, total = ct_mirror.search_local_trials("diabetes", max_results=1, mirror_dir=mirror_dir)
+    assert total == 2
+    # The recruiting trial with diabetes in its title ranks first
+    assert list(top["nctId"]) == ["NCT00000001"]
+
+def test_search_path_prefers_mirror(tmp_path, export_zip):
+    """Test that the search API reads from the mirror when it is present."""
+    mirror_dir = tmp_path / "mirror"
+    ct_mirror.ingest_bulk_export(export_zip, mirror_dir, workers=1)
+
+    with patch("app.data.ct_mirror.CT_MIRROR_DIR", mirror_dir), \
+         patch("app.api.search.get_clinical_trials_data") as api:
+        df, total = fetch_clinical_trials("melanoma")
+    api.assert_not_called()
+    assert list(df["nctId"]) == ["NCT00000003"]
+    assert total == 1
+
+def test_search_path_falls_back_to_api(tmp_path):
+    """Test that the API is used when no mirror has been built."""
+    with patch("app.data.ct_mirror.mirror_available", return_value=False), \
+         patch("app.api.search.get_clinical_trials_data", return_value=pd.DataFrame()) as api:
+        fetch_clinical_trials("melanoma")
+    api.assert_called_once_with("melanoma", None)
+
+def test_mirror_is_mapped_from_shared_arrow_copy(tmp_path, export_zip):
+    """Test that the mirror table is memory-mapped from one Arrow copy, replaced when the mirror is rebuilt."""
+    mirror_dir = tmp_path / "mirror"
+    ct_mirror.ingest_bulk_export(export_zip, mirror_dir, workers=1)
+    parquet_path = mirror_dir / ct_mirror.TRIALS_FILE
+
+    mapped_copy(parquet_path)
+    allocated = pa.total_allocated_bytes()
+    table = mapped_table(parquet_path)
+    assert pa.total_allocated_bytes() == allocated
+    assert table.num_rows == 3
+    copies = list(mirror_dir.glob("trials.*.arrow"))
+    assert len(copies) == 1
+
+    ct_mirror.ingest_bulk_export(export_zip, mirror_dir, workers=1)
+    assert mapped_table(parquet_path).num_rows == 3
+    assert list(mirror_dir.glob("trials.*.arrow")) != copies
+    assert len(list(mirror_dir.glob("trials.*.arrow"))) == 1
+    assert table.column("nctId").to_pylist() == ["NCT00000001", "NCT00000002", "NCT00000003"]
+
+def test_index_of_another_mirror_version_is_rebuilt(tmp_path, export_zip):
+    """Test that an index left from another build is not paired with the table, but rebuilt for it."""
+    mirror_dir = tmp_path / "mirror"
+    ct_mirror.ingest_bulk_export(export_zip, mirror_dir, workers=1)
+    index_dir = mirror_dir / ct_mirror.INDEX_DIR
+    shutil.rmtree(index_dir)
+    build_index([["NCT00000003", "Melanoma"], ["NCT00000001", "Diabetes"], ["NCT00000002", "Diabetes"]], index_dir,
+                version="previous")
+
+    table, index = ct_mirror._MirrorCache().get(mirror_dir)
+    assert index.version == table.schema.metadata[ct_mirror.VERSION_KEY].decode()
+    with patch("app.data.ct_mirror._cache", ct_mirror._MirrorCache()):
+        melanoma, _ = ct_mirror.search_local_trials("melanoma", mirror_dir=mirror_dir)
+    assert list(melanoma["nctId"]) == ["NCT00000003"]
+
+def test_missing_index_is_built_once_across_workers(tmp_path, export_zip):
+    """Test that workers loading a mirror without an index build it in turn, swapping in a complete directory."""
+    mirror_dir = tmp_path / "mirror"
+    ct_mirror.ingest_bulk_export(export_zip, mirror_dir, workers=1)
+    shutil.rmtree(mirror_dir / ct_mirror.INDEX_DIR)
+
+    results = []
+    workers = [threading.Thread(target=lambda: results.append(ct_mirror._MirrorCache().get(mirror_dir)[1].num_docs))
+               for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(30)
+
+    assert results == [3] * 4
+    assert sorted(path.name for path in mirror_dir.iterdir() if path.name.startswith(ct_mirror.INDEX_DIR)) == [
+        ct_mirror.INDEX_DIR, f"{ct_mirror.INDEX_DIR}.lock"]
@@ -0,0 +1,130 @@
+"""
+Tests for the drug linkage between trials and FDA labels.
+"""
+import pytest
+import pandas as pd
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from app.main import app
+from app.api.auth import get_current_user
+from app.api.search_cache import SearchResultCache
+from app.data.drug_linkage import DrugLinkIndex, drug_keys, normalize_drug_name
+from app.models.user import User
+
+@pytest.fixture
+def trials_df():
+    """Return trials with drug interventions in assorted spellings."""
+    return pd.DataFrame({
+        "nctId": ["NCT1", "NCT2", "NCT3", "NCT4"],
+        "interventionDrug": ["Metformin HCl 500 mg, Placebo", "Paracetamol", "Sitagliptin + Metformin XR", ""],
+    })
+
+@pytest.fixture
+def fda_df():
+    """Return labels with salts, repeated brand names and a combination generic."""
+    return pd.DataFrame({
+        "brand_name": ["Glucophage", "Tylenol/Tylenol Extra Strength", "Janumet", "Lipitor"],
+        "generic_name": ["METFORMIN HYDROCHLORIDE", "ACETAMINOPHEN", "SITAGLIPTIN AND METFORMIN HYDROCHLORIDE", "ATORVASTATIN CALCIUM"],
+        "substance_name": ["METFORMIN HYDROCHLORIDE", "ACETAMINOPHEN", "METFORMIN HYDROCHLORIDE/SITAGLIPTIN PHOSPHATE", "ATORVASTATIN CALCIUM TRIHYDRATE"],
+    })
+
+@pytest.mark.parametrize("name,key", [
+    ("Metformin Hydrochloride 500 mg Tablets", "metformin"),
+    ("ATORVASTATIN CALCIUM", "atorvastatin"),
+    ("Paracetamol", "acetaminophen"),
+    ("Insulin glargine (Lantus)", "insulin glargine"),
+    ("Extended-Release Niacin", "niacin"),
+    ("Potassium Chloride 20 mEq Extended-Release Tablets", "potassium chloride"),
+    ("CALCIUM CARBONATE", "calcium carbonate"),
+    ("Magnesium Sulfate Injection", "magnesium sulfate"),
+    (None, ""),
+])
+def test_normalize_drug_name(name, key):
+    """Test case folding and salt, form, strength and synonym handling."""
+    assert normalize_drug_name(name) == key
+
+def test_drug_keys_split_combinations():
+    """Test that combinations yield their components and placebo yields nothing."""
+    assert drug_keys("ACETAMINOPHEN AND CODEINE PHOSPHATE") == ["acetaminophen and codeine", "acetaminophen", "codeine"]
+    assert drug_keys("Placebo") == []
+
+def test_drug_keys_keep_salt_only_names():
+    """Test that drugs named only by salt words keep their name as the key."""
+    assert drug_keys("Potassium Chloride") == ["potassium chloride"]
+    assert drug_keys("Calcium Carbonate") == ["calcium carbonate"]
+    assert drug_keys("Magnesium Sulfate") == ["magnesium sulfate"]
+    assert drug_keys("Calcium Carbonate and Vitamin D3") == ["calcium carbonate and vitamin d3", "calcium carbonate", "vitamin d3"]
+
+def test_links_and_lookups(trials_df, fda_df):
+    """Test the linkage table and its keyed lookups."""
+    index = DrugLinkIndex(trials_df, fda_df)
+    links = index.table
+    assert set(zip(links["nctId"], links["brand_name"])) == {
+        ("NCT1", "Glucophage"), ("NCT1", "Janumet"), ("NCT2", "Tylenol/Tylenol Extra Strength"),
+        ("NCT3", "Glucophage"), ("NCT3", "Janumet"),
+    }
+    assert links.loc[links["brand_name"] == "Glucophage", "matched_on"].unique().tolist() == ["generic_name"]
+    assert index.lookup(drug="Metformin Hydrochloride")["nctId"].unique().tolist() == ["NCT1", "NCT3"]
+    assert index.lookup(drug="metformin", nct_id="NCT3")["label_row"].tolist() == [0, 2]
+    assert index.lookup(drug="Glucophage")["nctId"].tolist() == ["NCT1", "NCT3"]
+    assert index.lookup(drug="atorvastatin").empty
+    assert DrugLinkIndex(trials_df, pd.DataFrame()).table.empty
+
+def test_drug_links_endpoint(trials_df, fda_df):
+    """Test drug lookups over a cached search."""
+    app.dependency_overrides[get_current_user] = lambda: User(id="user-1", email="test@example.com")
+    client = TestClient(app)
+    try:
+        cache = SearchResultCache()
+        with patch("app.api.search.get_search_cache", return_value=cache), \
+             patch("app.api.search_refine.get_search_cache", return_value=cache), \
+             patch("app.api.search.fetch_clinical_trials", return_value=(trials_df, 4)), \
+             patch("app.api.search.fetch_fda_data", return_value=fda_df):
+            search_id = client.post("/api/search", json={"keyword": "diabetes"}).json()["search_id"]
+            response = client.get("/api/search/drug_links", params={"search_id": search_id})
+            assert response.status_code == 200
+            assert response.json()["linked_trials"] == 3
+            assert response.json()["linked_labels"] == 3
+
+            for drug in ("acetaminophen", "Tylenol"):
+                response = client.get("/api/search/drug_links", params={"search_id": search_id, "drug": drug})
+                assert [link["nctId"] for link in response.json()["links"]] == ["NCT2"]
+    finally:
+        app.dependency_overrides.clear()
+
+def test_chat_namespace_includes_links(trials_df, fda_df):
+    """Test that generated code may use drug_links_df when both datasets are loaded."""
+    from app.agents.chat_agent import AgentState, _dataframe_schema
+    state = AgentState(
+        query="Which trials test drugs with FDA labels?",
+        clinical_trials_df=trials_df.to_dict("records"),
+        fda_df=fda_df.to_dict("records"),
+        selected_dataframes=["clinical_trials_df", "fda_df"],
+    )
+    assert "label_row" in _dataframe_schema(state)["drug_links_df"]
+    state.selected_dataframes = ["fda_df"]
+    assert "drug_links_df" not in _dataframe_schema(state)
+
+def test_chat_builds_links_once_and_only_when_used(trials_df, fda_df):
+    """Test that executions build drug_links_df only for code that uses it, and once per request."""
+    from app.agents import chat_agent
+    state = chat_agent.AgentState(
+        query="Which trials test drugs with FDA labels?",
+        clinical_trials_df=trials_df.to_dict("records"),
+        fda_df=fda_df.to_dict("records"),
+        selected_dataframes=["clinical_trials_df", "fda_df"],
+        generated_code="result = len(clinical_trials_df)",
+    )
+    with patch("app.agents.chat_agent.get_sandbox") as sandbox, \
+         patch("app.agents.chat_agent.build_drug_links", wraps=chat_agent.build_drug_links) as build:
+        sandbox.return_value.execute.return_value = {"error": None}
+        chat_agent.execute_code(state)
+        assert "drug_links_df" not in sandbox.return_value.execute.call_args.args[1]
+        assert build.call_count == 0
+
+        state.generated_code = "result = drug_links_df['nctId'].nunique()"
+        for _ in range(2):
+            chat_agent.execute_code(state)
+            links = sandbox.return_value.execute.call_args.args[1]["drug_links_df"]
+            assert links["nctId"].nunique() == 3
+        assert build.call_count == 1
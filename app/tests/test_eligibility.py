@@ -0,0 +1,60 @@
+"""
+Tests for the numeric eligibility columns.
+"""
+import math
+import pytest
+import pandas as pd
+from clinical_trials_module import age_window_mask, parse_age_years, sex_mask, studies_to_dataframe
+
+def make_study(nct_id, sex=None, minimum_age=None, maximum_age=None):
+    """Build a study with an eligibility module."""
+    eligibility = {key: value for key, value in
+                   (("sex", sex), ("minimumAge", minimum_age), ("maximumAge", maximum_age)) if value is not None}
+    return {"protocolSection": {"identificationModule": {"nctId": nct_id}, "eligibilityModule": eligibility}}
+
+@pytest.fixture
+def trials_df():
+    """Return normalized trials with a range of eligibility windows."""
+    return studies_to_dataframe([
+        make_study("NCT1", "ALL", "18 Years", "65 Years"),
+        make_study("NCT2", "FEMALE", "6 Months", "17 Years"),
+        make_study("NCT3", "MALE", "50 Years"),
+        make_study("NCT4"),
+    ])
+
+@pytest.mark.parametrize("text,years", [
+    ("18 Years", 18.0),
+    ("1 Year", 1.0),
+    ("6 Months", 0.5),
+    ("2 Weeks", 14 / 365.25),
+    ("28 Days", 28 / 365.25),
+    ("N/A", None),
+    (None, None),
+])
+def test_parse_age_years(text, years):
+    """Test converting eligibility ages to years."""
+    result = parse_age_years(text)
+    assert result == pytest.approx(years) if years is not None else result is None
+
+def test_normalized_columns(trials_df):
+    """Test that normalization adds float ages and sex codes."""
+    assert trials_df["eligibilityMinimumAgeYears"].dtype == float
+    assert trials_df["eligibilityMaximumAgeYears"].tolist()[:2] == [65.0, 17.0]
+    assert math.isnan(trials_df["eligibilityMaximumAgeYears"][2])
+    assert trials_df["eligibilitySexCode"].tolist() == [3, 1, 2, 0]
+
+def test_age_window_and_sex_masks(trials_df):
+    """Test range queries with missing bounds treated as no limit."""
+    def selected(mask):
+        return trials_df.loc[mask, "nctId"].tolist()
+
+    assert selected(age_window_mask(trials_df, 10, 10)) == ["NCT2", "NCT4"]
+    assert selected(age_window_mask(trials_df, 60, 80)) == ["NCT1", "NCT3", "NCT4"]
+    assert selected(age_window_mask(trials_df, max_years=1)) == ["NCT2", "NCT4"]
+    assert selected(sex_mask(trials_df, "female")) == ["NCT1", "NCT2"]
+    assert selected(sex_mask(trials_df, "ALL")) == ["NCT1"]
+
+def test_masks_accept_json_records(trials_df):
+    """Test that masks work on frames rebuilt from JSON records, with None for missing ages."""
+    records = pd.DataFrame(trials_df.astype(object).where(trials_df.notna(), None).to_dict("records"))
+    assert records.loc[age_window_mask(records, 70, 70), "nctId"].tolist() == ["NCT3", "NCT4"]
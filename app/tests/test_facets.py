@@ -0,0 +1,164 @@
+"""
+Tests for facet counts and filters over cached search results.
+"""
+import pytest
+import pandas as pd
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from app.main import app
+from app.api.auth import get_current_user
+from app.api.search_cache import SearchResultCache, SharedSearchStore
+from app.data.facets import FACET_COLUMNS, FACET_LIST_COLUMNS, FacetIndex
+from app.models.user import User
+
+@pytest.fixture
+def trials_df():
+    """Return trials with single- and multi-valued facet columns."""
+    return pd.DataFrame({
+        "nctId": ["NCT1", "NCT2", "NCT3", "NCT4"],
+        "overallStatus": ["RECRUITING", "COMPLETED", "RECRUITING", None],
+        "phases": ["PHASE2, PHASE3", "PHASE3", "", "PHASE1"],
+        "studyType": ["INTERVENTIONAL"] * 4,
+        "country": ["Germany, France", "United States", "Germany", "France, France"],
+        "leadSponsorType": ["INDUSTRY", "OTHER", "INDUSTRY", "NIH"],
+    })
+
+@pytest.fixture
+def fda_df():
+    """Return drug labels with slash-joined routes."""
+    return pd.DataFrame({
+        "brand_name": ["A", "B", "C"],
+        "route": ["ORAL", "ORAL/TOPICAL", "INTRAVENOUS"],
+        "product_type": ["HUMAN PRESCRIPTION DRUG", "HUMAN OTC DRUG", "HUMAN PRESCRIPTION DRUG"],
+    })
+
+def test_counts_split_multi_valued_cells(trials_df):
+    """Test counting single- and multi-valued columns, with missing values as Unknown."""
+    facets = FacetIndex(trials_df, FACET_COLUMNS["clinical_trials"]).counts()
+    assert facets["overallStatus"] == {"RECRUITING": 2, "COMPLETED": 1, "Unknown": 1}
+    assert facets["phases"] == {"PHASE3": 2, "PHASE1": 1, "PHASE2": 1, "Unknown": 1}
+    assert facets["country"] == {"France": 2, "Germany": 2, "United States": 1}
+
+def test_country_names_containing_commas_stay_whole(trials_df):
+    """Test that countries and phases are read from the per-trial lists when the frame has them."""
+    trials_df["country"] = ["Germany, Korea, Republic of", "United States", "Germany", ""]
+    trials_df["countryList"] = [["Germany", "Korea, Republic of"], ["United States"], ["Germany"], []]
+    trials_df["phaseList"] = [["PHASE2", "PHASE3"], ["PHASE3"], [], ["PHASE1"]]
+    index = FacetIndex(trials_df, FACET_COLUMNS["clinical_trials"], FACET_LIST_COLUMNS["clinical_trials"])
+
+    assert index.column_mask("country", ["Korea, Republic of"]).tolist() == [True, False, False, False]
+    facets = index.counts()
+    assert facets["country"] == {"Germany": 2, "Korea, Republic of": 1, "United States": 1, "Unknown": 1}
+    assert facets["phases"] == {"PHASE3": 2, "PHASE1": 1, "PHASE2": 1, "Unknown": 1}
+    assert "Republic of" not in index.values("country")
+
+def test_filters_and_disjunctive_counts(trials_df):
+    """Test that filters combine across columns but not within the counted column."""
+    index = FacetIndex(trials_df, FACET_COLUMNS["clinical_trials"])
+    filters = {"country": ["Germany"], "overallStatus": ["RECRUITING", "COMPLETED"]}
+    assert list(trials_df["nctId"][index.mask(filters)]) == ["NCT1", "NCT3"]
+
+    facets = index.counts(filters, ["country", "phases"])
+    # Countries are counted over the status filter only
+    assert facets["country"] == {"Germany": 2, "France": 1, "United States": 1}
+    assert facets["phases"] == {"PHASE2": 1, "PHASE3": 1, "Unknown": 1}
+    with pytest.raises(ValueError):
+        index.counts({"briefTitle": ["x"]})
+
+def test_cache_expires_and_checks_owner(trials_df):
+    """Test owner checks, expiry and the entry limit."""
+    cache = SearchResultCache(max_entries=1, ttl_minutes=10)
+    first = cache.put("user-1", {}, {"clinical_trials": trials_df})
+    assert cache.get(first, "user-2") is None
+    assert cache.get(first, "user-1").frame("clinical_trials") is not None
+    cache.put("user-1", {}, {"clinical_trials": trials_df})
+    assert cache.get(first, "user-1") is None
+
+    expired = SearchResultCache(ttl_minutes=0)
+    assert expired.get(expired.put("user-1", {}, {}), "user-1") is None
+
+def test_shared_cache_serves_other_workers(tmp_path, trials_df):
+    """Test that a search cached by one worker's cache is loaded by another's, with owner checks and pruning."""
+    worker_1 = SearchResultCache(shared=SharedSearchStore(tmp_path, max_entries=2))
+    worker_2 = SearchResultCache(shared=SharedSearchStore(tmp_path, max_entries=2))
+    search_id = worker_1.put("user-1", {"keyword": "asthma"}, {"clinical_trials": trials_df})
+
+    cached = worker_2.get(search_id, "user-1")
+    assert cached.params == {"keyword": "asthma"}
+    assert cached.frame("clinical_trials").equals(trials_df)
+    assert cached.facet_index("clinical_trials").counts()["overallStatus"]["RECRUITING"] == 2
+    assert worker_2.get(search_id, "user-2") is None
+    assert worker_2.get("not-a-search-id", "user-1") is None
+
+    worker_1.put("user-1", {}, {})
+    worker_1.put("user-1", {}, {})
+    assert SearchResultCache(shared=SharedSearchStore(tmp_path)).get(search_id, "user-1") is None
+
+def test_facet_and_filter_endpoints(trials_df, fda_df):
+    """Test refining a search through the API without searching again."""
+    app.dependency_overrides[get_current_user] = lambda: User(id="user-1", email="test@example.com")
+    client = TestClient(app)
+    try:
+        cache = SearchResultCache()
+        with patch("app.api.search.get_search_cache", return_value=cache), \
+             patch("app.api.search_refine.get_search_cache", return_value=cache), \
+             patch("app.api.search.fetch_clinical_trials", return_value=(trials_df, 4)) as fetch_trials, \
+             patch("app.api.search.fetch_fda_data", return_value=fda_df):
+            search_id = client.post("/api/search", json={"keyword": "cancer"}).json()["search_id"]
+
+            response = client.post("/api/search/fda_data/facets", json={"search_id": search_id})
+            assert response.status_code == 200
+            assert response.json()["facets"]["route"] == {"ORAL": 2, "INTRAVENOUS": 1, "TOPICAL": 1}
+
+            response = client.post("/api/search/clinical_trials/facets",
+                                   json={"search_id": search_id, "filters": {"phases": ["PHASE3"]}})
+            assert response.json()["matched"] == 2
+            assert response.json()["total"] == 4
+
+            response = client.post("/api/search/clinical_trials/filter",
+                                   json={"search_id": search_id, "filters": {"country": ["France"]}, "limit": 1})
+            assert response.json()["matched"] == 2
+            assert [row["nctId"] for row in response.json()["rows"]] == ["NCT1"]
+            assert fetch_trials.call_count == 1
+
+            bad_column = client.post("/api/search/clinical_trials/facets",
+                                     json={"search_id": search_id, "filters": {"briefTitle": ["x"]}})
+            assert bad_column.status_code == 400
+            assert client.post("/api/search/trials/facets", json={"search_id": search_id}).status_code == 422
+
+            app.dependency_overrides[get_current_user] = lambda: User(id="user-2", email="other@example.com")
+            assert client.post("/api/search/clinical_trials/facets", json={"search_id": search_id}).status_code == 404
+    finally:
+        app.dependency_overrides.clear()
+
+def test_eligibility_filters(trials_df, fda_df):
+    """Test age and sex filters on the cached trials, with missing ages returned as null."""
+    trials_df = trials_df.assign(
+        eligibilityMinimumAgeYears=[18.0, 0.5, 65.0, None],
+        eligibilityMaximumAgeYears=[None, 17.0, None, 40.0],
+        eligibilitySexCode=[3, 1, 2, 3],
+    )
+    app.dependency_overrides[get_current_user] = lambda: User(id="user-1", email="test@example.com")
+    client = TestClient(app)
+    try:
+        cache = SearchResultCache()
+        with patch("app.api.search.get_search_cache", return_value=cache), \
+             patch("app.api.search_refine.get_search_cache", return_value=cache), \
+             patch("app.api.search.fetch_clinical_trials", return_value=(trials_df, 4)), \
+             patch("app.api.search.fetch_fda_data", return_value=fda_df):
+            search = client.post("/api/search", json={"keyword": "cancer"})
+            assert search.status_code == 200
+            search_id = search.json()["search_id"]
+
+            response = client.post("/api/search/clinical_trials/filter",
+                                   json={"search_id": search_id, "min_age_years": 30, "max_age_years": 50, "sex": "FEMALE"})
+            assert [row["nctId"] for row in response.json()["rows"]] == ["NCT1", "NCT4"]
+            assert response.json()["rows"][0]["eligibilityMaximumAgeYears"] is None
+
+            response = client.post("/api/search/clinical_trials/facets",
+                                   json={"search_id": search_id, "min_age_years": 70, "columns": ["overallStatus"]})
+            assert response.json()["facets"]["overallStatus"] == {"RECRUITING": 2}
+            assert client.post("/api/search/fda_data/facets",
+                               json={"search_id": search_id, "sex": "MALE"}).status_code == 400
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,36 @@
+"""
+Tests for collapsing repackager FDA labels.
+"""
+import pandas as pd
+from unittest.mock import patch
+from openfda import Open_FDA
+from app.api.search import fetch_fda_data
+
+INDICATIONS = "Metformin hydrochloride tablets are indicated as an adjunct to diet and exercise " * 5
+
+def labels():
+    """Return labels of one product from three packagers, plus two other labels."""
+    return pd.DataFrame({
+        "brand_name": ["Metformin", "Glucophage", "Metformin", "Januvia", "Home Remedy"],
+        "generic_name": ["METFORMIN HYDROCHLORIDE", "Metformin  Hydrochloride", "METFORMIN HYDROCHLORIDE", "SITAGLIPTIN", "ZINC"],
+        "manufacturer_name": ["Bryant Ranch Prepack", "Merck", "A-S Medication Solutions", "Merck", "Acme"],
+        "application_number": ["NDA020357", "NDA020357", "NDA020357", "NDA021995", None],
+        "is_original_packager": [None, "True", None, "True", None],
+        "indications_and_usage": [INDICATIONS, "".join(INDICATIONS), INDICATIONS, "Sitagliptin is indicated", "Zinc"],
+    })
+
+def test_collapse_keeps_original_packager_per_product():
+    """Test that a product's labels collapse to the original packager's label."""
+    collapsed = Open_FDA.collapse_repackager_labels(labels())
+
+    assert list(collapsed["brand_name"]) == ["Glucophage", "Januvia", "Home Remedy"]
+    assert list(collapsed["label_count"]) == [3, 1, 1]
+    assert collapsed.loc[0, "manufacturers"] == ["A-S Medication Solutions", "Bryant Ranch Prepack", "Merck"]
+    assert collapsed.loc[2, "manufacturers"] == ["Acme"]
+
+def test_fetch_fda_data_collapses_on_request():
+    """Test that searches collapse labels only when asked to."""
+    with patch("app.api.search.fda_mirror.mirror_available", return_value=False), \
+         patch("app.api.search.Open_FDA.open_fda_main", return_value=labels()):
+        assert len(fetch_fda_data("metformin", "drug")) == 5
+        assert len(fetch_fda_data("metformin", "drug", collapse=True)) == 3
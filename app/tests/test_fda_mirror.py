@@ -0,0 +1,83 @@
+"""
+Tests for the local openFDA drug label mirror.
+"""
+import json
+import zipfile
+import pytest
+from unittest.mock import patch
+from app.data import fda_mirror
+from app.api.search import fetch_fda_data
+
+def make_label(brand, generic, substance, application, indications):
+    """Build a minimal drug label in the openFDA format."""
+    return {
+        "indications_and_usage": [indications],
+        "adverse_reactions": ["ADVERSE REACTIONS: Nausea and headache."],
+        "effective_time": "20230101",
+        "openfda": {
+            "brand_name": [brand],
+            "generic_name": [generic],
+            "substance_name": [substance],
+            "application_number": [application],
+            "manufacturer_name": ["Test Pharma"],
+            "spl_id": ["ignored"]
+        }
+    }
+
+@pytest.fixture
+def label_files(tmp_path):
+    """Write labels as two bulk download files, one zipped and one plain."""
+    first = tmp_path / "drug-label-0001-of-0002.json.zip"
+    with zipfile.ZipFile(first, "w") as archive:
+        archive.writestr("drug-label-0001-of-0002.json", json.dumps({"meta": {}, "results": [
+            make_label("GLUCOPHAGE", "METFORMIN HYDROCHLORIDE", "METFORMIN HYDROCHLORIDE", "NDA020357",
+                       "Indications and Usage: GLUCOPHAGE is indicated for type 2 diabetes mellitus."),
+            make_label("TYLENOL", "ACETAMINOPHEN", "ACETAMINOPHEN", "NDA019872", "For the temporary relief of minor aches."),
+        ]}))
+    second = tmp_path / "drug-label-0002-of-0002.json"
+    second.write_text(json.dumps({"meta": {}, "results": [
+        make_label("METFORMIN ER", "METFORMIN HYDROCHLORIDE", "METFORMIN HYDROCHLORIDE", "ANDA090692",
+                   "Extended-release metformin for adults with Type 2 Diabetes."),
+    ]}))
+    return [first, second]
+
+@pytest.fixture
+def mirror_dir(tmp_path, label_files):
+    """Build the mirror from the label files."""
+    path = tmp_path / "mirror"
+    fda_mirror.ingest_label_files(label_files, path, workers=2)
+    return path
+
+def test_ingest_applies_openfda_cleaning(mirror_dir):
+    """Test that ingestion keeps only the needed columns and strips section headers."""
+    labels = fda_mirror.lookup_labels("brand_name", "glucophage", mirror_dir)
+    assert len(labels) == 1
+    label = labels.iloc[0]
+    assert label["indications_and_usage"] == "GLUCOPHAGE is indicated for type 2 diabetes mellitus."
+    assert label["adverse_reactions"] == "Nausea and headache."
+    assert "spl_id" not in labels.columns
+    assert list(labels.columns[:5]) == ["brand_name", "generic_name", "manufacturer_name", "application_number", "indications_and_usage"]
+
+def test_indexed_lookups(mirror_dir):
+    """Test case-insensitive lookups on each indexed column."""
+    assert len(fda_mirror.lookup_labels("generic_name", "Metformin Hydrochloride", mirror_dir)) == 2
+    assert len(fda_mirror.lookup_labels("substance_name", "acetaminophen", mirror_dir)) == 1
+    assert list(fda_mirror.lookup_labels("application_number", "ANDA090692", mirror_dir)["brand_name"]) == ["METFORMIN ER"]
+    assert fda_mirror.lookup_labels("brand_name", "unknown", mirror_dir).empty
+    with pytest.raises(ValueError):
+        fda_mirror.lookup_labels("route", "ORAL", mirror_dir)
+
+def test_search_local_labels_by_domain(mirror_dir):
+    """Test drug searches by name and disease searches over indications."""
+    drug = fda_mirror.search_local_labels("tylenol", "drug", mirror_dir)
+    assert list(drug["brand_name"]) == ["TYLENOL"]
+    disease = fda_mirror.search_local_labels("type 2 diabetes", "disease", mirror_dir)
+    assert set(disease["brand_name"]) == {"GLUCOPHAGE", "METFORMIN ER"}
+
+def test_search_path_prefers_mirror(mirror_dir):
+    """Test that the search API reads from the mirror when it is present."""
+    with patch("app.data.fda_mirror.FDA_MIRROR_DIR", mirror_dir), \
+         patch("app.api.search.Open_FDA.open_fda_main") as api:
+        df = fetch_fda_data("acetaminophen", "drug")
+    api.assert_not_called()
+    assert list(df["brand_name"]) == ["TYLENOL"]
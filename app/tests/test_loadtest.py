@@ -0,0 +1,41 @@
+"""
+Tests for the load test harness and the offline chat model.
+"""
+import pytest
+from app.agents import llm
+from app.agents.llm import FakeChatModel, fake_response, get_llm
+from perf.loadtest import summarize
+
+def test_fake_model_follows_the_agent_prompts():
+    """Test that the fake model answers each agent step in the expected format."""
+    assert fake_response('answer this query: "Which drug labels warn about liver damage?"') == "['fda_df']"
+    assert fake_response('answer this query: "How many trials are recruiting?"') == "['clinical_trials_df']"
+
+    code = fake_response("The available dataframe are ['fda_df']")
+    assert "result_df = fda_df.head(" in code and code.startswith("```python")
+
+    assert "**How many trials?**" in fake_response("Query: How many trials?\nResults: 3")
+
+def test_get_llm_backend(monkeypatch):
+    """Test that the backend setting selects the chat model."""
+    monkeypatch.setattr(llm, "CHAT_LLM_BACKEND", "fake")
+    monkeypatch.setattr(llm, "FAKE_LLM_LATENCY_MS", 0)
+    model = get_llm("gpt-4.1", temperature=0)
+    assert isinstance(model, FakeChatModel)
+    assert model.invoke('answer this query: "trials"').content == "['clinical_trials_df']"
+
+    monkeypatch.setattr(llm, "CHAT_LLM_BACKEND", "other")
+    with pytest.raises(ValueError):
+        get_llm("gpt-4.1")
+
+def test_summarize_per_endpoint():
+    """Test that samples are summarized per endpoint with throughput and error rate."""
+    samples = [{"endpoint": "/search", "started": i * 0.5, "latency": 0.5, "status": 200, "error": None} for i in range(4)]
+    samples.append({"endpoint": "/chat", "started": 0.0, "latency": 2.0, "status": 503, "error": "HTTP 503"})
+    report = summarize(samples)
+
+    assert report["/search"]["requests"] == 4
+    assert report["/search"]["throughput_rps"] == pytest.approx(2.0)
+    assert report["/search"]["p50_ms"] == pytest.approx(500.0)
+    assert report["/search"]["error_rate"] == 0
+    assert report["/chat"]["errors"] == {"HTTP 503": 1}
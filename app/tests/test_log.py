@@ -0,0 +1,52 @@
+"""
+Tests for structured logging and request correlation ids.
+"""
+import json
+import logging
+from fastapi.testclient import TestClient
+from app.main import app
+from app.utils.log import JsonFormatter, Lazy, RequestIdFilter, SamplingFilter, request_context
+
+def _record(level=logging.INFO, message="Search completed", **extra):
+    record = logging.LogRecord("app.api.search", level, __file__, 1, message, None, None)
+    record.__dict__.update(extra)
+    RequestIdFilter().filter(record)
+    return record
+
+def test_json_records_carry_request_id_and_fields():
+    """Test that JSON records include the correlation id and extra fields."""
+    with request_context("req-1"):
+        record = _record(clinical_trials=3)
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["request_id"] == "req-1"
+    assert entry["level"] == "INFO"
+    assert entry["message"] == "Search completed"
+    assert entry["clinical_trials"] == 3
+
+def test_sampling_keeps_whole_requests_and_warnings():
+    """Test that sampling drops or keeps a request's records together but keeps every warning."""
+    sampler = SamplingFilter(rate=0.5)
+    kept = set()
+    for i in range(200):
+        with request_context(f"request-{i}"):
+            decisions = {sampler.filter(_record(logging.DEBUG)) for _ in range(3)}
+            assert len(decisions) == 1
+            kept |= decisions
+            assert sampler.filter(_record(logging.WARNING))
+    assert kept == {True, False}
+    assert SamplingFilter(rate=0.0).filter(_record(logging.ERROR))
+
+def test_lazy_arguments_are_not_formatted_when_disabled():
+    """Test that a disabled debug record never computes its lazy arguments."""
+    calls = []
+    logger = logging.getLogger("app.tests.lazy")
+    logger.setLevel(logging.INFO)
+    logger.debug("Frame:\n%s", Lazy(calls.append, "formatted"))
+    assert calls == []
+    assert str(Lazy(lambda value: value * 2, 21)) == "42"
+
+def test_request_id_header_is_echoed():
+    """Test that responses carry the sent or a generated correlation id."""
+    client = TestClient(app)
+    assert client.get("/metrics", headers={"X-Request-ID": "abc-123"}).headers["X-Request-ID"] == "abc-123"
+    assert len(client.get("/metrics").headers["X-Request-ID"]) == 32
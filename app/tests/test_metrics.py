@@ -0,0 +1,82 @@
+"""
+Tests for the metrics registry and the /metrics endpoint.
+"""
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from app.main import app
+from app.api.search_cache import SearchResultCache
+from app.utils.metrics import CACHE_REQUESTS, Counter, Gauge, Histogram, MetricsRegistry
+
+def test_histogram_renders_cumulative_buckets():
+    """Test that histogram observations render as cumulative buckets with their sum and count."""
+    histogram = Histogram("stage_seconds", "Stage latency.", ["stage"], buckets=[0.1, 1.0])
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value, stage="parse")
+    with histogram.time(stage="timed"):
+        pass
+
+    text = histogram.render()
+    assert '# TYPE stage_seconds histogram' in text
+    assert 'stage_seconds_bucket{stage="parse",le="0.1"} 2' in text
+    assert 'stage_seconds_bucket{stage="parse",le="1"} 3' in text
+    assert 'stage_seconds_bucket{stage="parse",le="+Inf"} 4' in text
+    assert 'stage_seconds_sum{stage="parse"} 2.65' in text
+    assert 'stage_seconds_count{stage="parse"} 4' in text
+    assert histogram.count(stage="timed") == 1
+
+def test_counters_gauges_and_labels():
+    """Test counter and gauge values per label set, label escaping and label checks."""
+    registry = MetricsRegistry()
+    counter = registry.register(Counter("retries_total", "Retries.", ["source"]))
+    gauge = registry.register(Gauge("in_flight", "In flight."))
+    counter.inc(source='say "hi"')
+    counter.inc(2, source="openfda")
+    gauge.inc()
+    gauge.inc()
+    gauge.dec()
+
+    text = registry.render()
+    assert 'retries_total{source="say \\"hi\\""} 1' in text
+    assert 'retries_total{source="openfda"} 2' in text
+    assert 'in_flight 1' in text
+    with pytest.raises(ValueError):
+        counter.inc(source="openfda", extra="x")
+    with pytest.raises(ValueError):
+        counter.inc(-1, source="openfda")
+    with pytest.raises(ValueError):
+        registry.register(Counter("retries_total", "Again."))
+
+def test_search_cache_counts_hits_and_misses():
+    """Test that search cache lookups are counted as hits and misses."""
+    cache = SearchResultCache()
+    hits = CACHE_REQUESTS.value(cache="search_results", result="hit")
+    misses = CACHE_REQUESTS.value(cache="search_results", result="miss")
+    search_id = cache.put("user", {}, {})
+    cache.get(search_id, "user")
+    cache.get("unknown", "user")
+    assert CACHE_REQUESTS.value(cache="search_results", result="hit") == hits + 1
+    assert CACHE_REQUESTS.value(cache="search_results", result="miss") == misses + 1
+
+def test_metrics_endpoint_reports_routes_and_executors():
+    """Test that /metrics serves request latency by route template and executor load."""
+    client = TestClient(app)
+    client.get("/api/search/jobs/some-job-id")
+    with patch("app.api.metrics.METRICS_TOKEN", "scrape-secret"):
+        response = client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/search/jobs/{job_id}",status="403"} 1' in text
+    assert 'executor_queue_depth{executor="threadpool"}' in text
+    assert 'http_requests_in_flight 1' in text
+
+def test_metrics_endpoint_requires_scrape_token():
+    """Test that /metrics is refused without the scrape token, or when none is configured."""
+    client = TestClient(app)
+    with patch("app.api.metrics.METRICS_TOKEN", "scrape-secret"):
+        assert client.get("/metrics").status_code == 403
+        assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 403
+    with patch("app.api.metrics.METRICS_TOKEN", ""):
+        assert client.get("/metrics", headers={"Authorization": "Bearer "}).status_code == 403
@@ -0,0 +1,99 @@
+"""
+Tests for request profiling and the profile endpoints.
+"""
+import time
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import app.api.profiles as profiles_module
+from app.main import app
+from app.api.profiles import get_profile_store
+from app.utils.profiling import PROFILE_ID_HEADER, PROFILE_TOKEN_HEADER, ProfileStore, ProfilingMiddleware, StackSampler
+
+def busy_search() -> dict:
+    """Spin for a while so the sampler sees the endpoint."""
+    deadline = time.perf_counter() + 0.1
+    rows = []
+    while time.perf_counter() < deadline:
+        rows.append([0] * 100)
+    return {"rows": len(rows)}
+
+def profiled_app(store: ProfileStore, sample_rate: float = 0) -> FastAPI:
+    """Build an app with a slow search endpoint behind the profiling middleware."""
+    inner = FastAPI()
+    inner.get("/api/search/slow")(busy_search)
+    inner.get("/api/other")(busy_search)
+    inner.add_middleware(ProfilingMiddleware, store=store, token="secret", sample_rate=sample_rate, interval=0.001)
+    return inner
+
+def test_header_trigger_saves_profile(tmp_path):
+    """Test that the admin header profiles a search request and stores its stacks and memory use."""
+    store = ProfileStore(tmp_path)
+    client = TestClient(profiled_app(store))
+
+    response = client.get("/api/search/slow", headers={PROFILE_TOKEN_HEADER: "secret"})
+    profile_id = response.headers[PROFILE_ID_HEADER]
+    summary = store.load(profile_id)
+
+    assert response.status_code == 200
+    assert summary["path"] == "/api/search/slow"
+    assert summary["status"] == 200
+    assert summary["trigger"] == "header"
+    assert summary["samples"] > 0
+    assert summary["memory"]["peak_mb"] > 0
+    assert any("busy_search" in entry["function"] for entry in summary["top_functions"])
+    assert "busy_search (test_profiling.py" in store.folded(profile_id)
+
+def test_requests_not_profiled_without_trigger(tmp_path):
+    """Test that wrong tokens, unprofiled paths and unsampled requests are not profiled."""
+    store = ProfileStore(tmp_path)
+    client = TestClient(profiled_app(store))
+
+    assert PROFILE_ID_HEADER not in client.get("/api/search/slow").headers
+    assert PROFILE_ID_HEADER not in client.get("/api/search/slow", headers={PROFILE_TOKEN_HEADER: "wrong"}).headers
+    assert PROFILE_ID_HEADER not in client.get("/api/other", headers={PROFILE_TOKEN_HEADER: "secret"}).headers
+    assert store.list() == []
+
+    sampled = TestClient(profiled_app(store, sample_rate=1.0)).get("/api/search/slow")
+    assert store.load(sampled.headers[PROFILE_ID_HEADER])["trigger"] == "sampled"
+
+def test_store_prunes_oldest_and_rejects_bad_ids(tmp_path):
+    """Test that the store keeps the newest profiles and refuses ids that are not profile ids."""
+    store = ProfileStore(tmp_path, max_files=2)
+    ids = [f"{i:032x}" for i in range(3)]
+    for i, profile_id in enumerate(ids):
+        store.save(profile_id, {"profile_id": profile_id, "created_at": i}, "main;f 1\n")
+        time.sleep(0.01)
+
+    assert [profile["profile_id"] for profile in store.list()] == ids[:0:-1]
+    assert store.load(ids[0]) is None
+    assert store.load("../secrets") is None
+    assert store.folded("../secrets") is None
+
+def test_sampler_folds_stacks():
+    """Test that collapsed stacks and top functions count self and total samples."""
+    sampler = StackSampler()
+    sampler.stacks[("MainThread", "handler", "parse")] += 3
+    sampler.stacks[("MainThread", "handler")] += 1
+
+    assert sampler.folded() == "MainThread;handler;parse 3\nMainThread;handler 1\n"
+    assert sampler.top_functions() == [{"function": "handler", "self": 1, "total": 4},
+                                       {"function": "parse", "self": 3, "total": 3}]
+
+def test_profile_endpoints_require_token(tmp_path, monkeypatch):
+    """Test that the profile endpoints serve stored profiles only with the admin token."""
+    store = ProfileStore(tmp_path)
+    profile_id = "a" * 32
+    store.save(profile_id, {"profile_id": profile_id, "path": "/api/chat", "top_functions": []}, "main;f 1\n")
+    monkeypatch.setattr(profiles_module, "PROFILE_TOKEN", "secret")
+    app.dependency_overrides[get_profile_store] = lambda: store
+    try:
+        client = TestClient(app)
+        headers = {PROFILE_TOKEN_HEADER: "secret"}
+        assert client.get("/api/profiles").status_code == 403
+        assert client.get("/api/profiles", headers={PROFILE_TOKEN_HEADER: "wrong"}).status_code == 403
+        assert client.get("/api/profiles", headers=headers).json() == [{"profile_id": profile_id, "path": "/api/chat"}]
+        assert client.get(f"/api/profiles/{profile_id}", headers=headers).json()["path"] == "/api/chat"
+        assert client.get(f"/api/profiles/{profile_id}/folded", headers=headers).text == "main;f 1\n"
+        assert client.get(f"/api/profiles/{'b' * 32}", headers=headers).status_code == 404
+    finally:
+        app.dependency_overrides.pop(get_profile_store, None)
@@ -0,0 +1,148 @@
+"""
+Tests for the chat query templates.
+"""
+import pytest
+from app.agents.query_templates import (
+    answer_from_template,
+    match_query_template,
+    run_query_template,
+)
+
+@pytest.fixture
+def sample_clinical_trials_df():
+    """Return sample clinical trials data for testing."""
+    return [
+        {
+            "nctId": "NCT01234567",
+            "briefTitle": "Test Trial 1",
+            "overallStatus": "COMPLETED",
+            "phases": "PHASE2, PHASE3",
+            "leadSponsor": "Sponsor A",
+            "enrollmentCount": 100,
+            "country": "Germany, France",
+            "eligibilityMinimumAgeYears": 18.0,
+            "eligibilityMaximumAgeYears": 65.0,
+            "eligibilitySexCode": 3
+        },
+        {
+            "nctId": "NCT89012345",
+            "briefTitle": "Test Trial 2",
+            "overallStatus": "RECRUITING",
+            "phases": "PHASE2",
+            "leadSponsor": "Sponsor A",
+            "enrollmentCount": 50,
+            "country": "United States",
+            "eligibilityMinimumAgeYears": 0.5,
+            "eligibilityMaximumAgeYears": 17.0,
+            "eligibilitySexCode": 1
+        },
+        {
+            "nctId": "NCT55555555",
+            "briefTitle": "Test Trial 3",
+            "overallStatus": "RECRUITING",
+            "phases": "",
+            "leadSponsor": "Sponsor B",
+            "enrollmentCount": None,
+            "country": "Germany",
+            "eligibilityMinimumAgeYears": 50.0,
+            "eligibilityMaximumAgeYears": None,
+            "eligibilitySexCode": 2
+        }
+    ]
+
+@pytest.fixture
+def sample_fda_df():
+    """Return sample FDA data for testing."""
+    return [
+        {
+            "brand_name": "Test Brand 1",
+            "generic_name": "Test Generic 1",
+            "manufacturer_name": "Test Manufacturer 1",
+            "adverse_reactions": "Nausea, headache and dizziness were reported."
+        },
+        {
+            "brand_name": "Test Brand 2",
+            "generic_name": "Test Generic 2",
+            "manufacturer_name": "Test Manufacturer 2",
+            "adverse_reactions": "Rash."
+        }
+    ]
+
+@pytest.mark.parametrize("query,template,args", [
+    ("How many trials by status?", "count_by_status", {}),
+    ("distribution of phases", "count_by_phase", {}),
+    ("What are the top 5 sponsors?", "top_sponsors", {"n": 5}),
+    ("Top sponsors", "top_sponsors", {"n": 10}),
+    ("What is the total enrollment across all trials?", "enrollment_total", {}),
+    ("trials by country", "trials_by_country", {"country": None}),
+    ("How many trials are in Germany?", "trials_by_country", {"country": "germany"}),
+    ("Which labels mention nausea as an adverse reaction?", "labels_mentioning_reaction", {"reaction": "nausea"}),
+    ("How many trials accept 8 year olds?", "trials_for_age", {"age": 8.0}),
+    ("Which studies enroll patients aged 70?", "trials_for_age", {"age": 70.0}),
+    ("How many trials are open to women?", "trials_for_sex", {"sex": "FEMALE"}),
+])
+def test_match_query_template(query, template, args):
+    """Test that common questions map to the right template and arguments."""
+    match = match_query_template(query)
+    assert match is not None
+    assert match.template == template
+    assert match.args == args
+
+def test_match_query_template_no_match():
+    """Test that open-ended questions fall through to code generation."""
+    assert match_query_template("Summarize the eligibility criteria of the recruiting trials") is None
+
+def test_count_by_phase_explodes_multi_values(sample_clinical_trials_df):
+    """Test that comma-joined phases are counted once per value."""
+    answer, sources = answer_from_template("trials by phase", sample_clinical_trials_df)
+    assert "| PHASE2 | 2 |" in answer
+    assert "| PHASE3 | 1 |" in answer
+    assert sources == []
+
+def test_enrollment_total_ignores_missing(sample_clinical_trials_df):
+    """Test that enrollment totals skip trials without a count."""
+    answer, _ = answer_from_template("total enrollment", sample_clinical_trials_df)
+    assert "**150**" in answer
+    assert "**2** of 3" in answer
+
+def test_trials_in_country_returns_sources(sample_clinical_trials_df):
+    """Test country filtering matches whole entries and returns trial sources."""
+    answer, sources = answer_from_template("how many trials are in germany", sample_clinical_trials_df)
+    assert answer.startswith("**2** of 3")
+    assert [source["id"] for source in sources] == ["NCT01234567", "NCT55555555"]
+
+def test_trials_in_unknown_country_falls_through(sample_clinical_trials_df):
+    """Test that a phrase matching no country falls through to code generation."""
+    assert answer_from_template("how many trials are in phase 3", sample_clinical_trials_df) is None
+
+def test_trials_for_population(sample_clinical_trials_df):
+    """Test age and sex questions over the numeric eligibility columns."""
+    answer, sources = answer_from_template("how many trials accept 70 year olds", sample_clinical_trials_df)
+    assert answer.startswith("**1** of 3")
+    assert [source["id"] for source in sources] == ["NCT55555555"]
+    answer, _ = answer_from_template("how many trials are open to women", sample_clinical_trials_df)
+    assert answer.startswith("**2** of 3")
+
+def test_labels_mentioning_reaction(sample_fda_df):
+    """Test adverse reaction search over FDA labels."""
+    answer, sources = answer_from_template("Which drugs list nausea as a side effect?", fda_df=sample_fda_df)
+    assert "**1** of 2" in answer
+    assert sources == [{"type": "fda_df", "id": "Unknown", "name": "Test Brand 1"}]
+
+def test_template_without_data_falls_through(sample_clinical_trials_df):
+    """Test that a matched template needing missing data returns None."""
+    match = match_query_template("Which labels mention rash as an adverse reaction?")
+    assert run_query_template(match, clinical_trials_df=sample_clinical_trials_df, fda_df=[]) is None
+    assert run_query_template(match_query_template("top sponsors"), clinical_trials_df=[{"nctId": "NCT1"}]) is None
+
+def test_country_names_containing_commas_stay_whole(sample_clinical_trials_df):
+    """Test that countries are counted and matched from the per-trial lists, not split on commas."""
+    sample_clinical_trials_df[0]["country"] = "Germany, Korea, Republic of"
+    sample_clinical_trials_df[0]["countryList"] = ["Germany", "Korea, Republic of"]
+    answer, _ = answer_from_template("trials by country", sample_clinical_trials_df)
+    assert "| Korea, Republic of | 1 |" in answer
+    assert "| Republic of |" not in answer
+    assert "| Germany | 2 |" in answer
+    answer, sources = answer_from_template("How many trials are in Korea, Republic of?", sample_clinical_trials_df)
+    assert answer.startswith("**1** of 3")
+    assert [source["id"] for source in sources] == ["NCT01234567"]
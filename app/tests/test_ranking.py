@@ -0,0 +1,51 @@
+"""
+Tests for relevance ranking of oversized trial result sets.
+"""
+import pytest
+import pandas as pd
+from unittest.mock import patch
+from app.data.ranking import rank_trials, relevance_scores
+from app.api.search import fetch_clinical_trials
+
+NOW = pd.Timestamp("2026-01-01")
+
+@pytest.fixture
+def candidates():
+    """Return candidate trials in API relevance order."""
+    return pd.DataFrame({
+        "nctId": ["NCT1", "NCT2", "NCT3", "NCT4"],
+        "briefTitle": ["Exercise and Mood", "Metformin in Type 2 Diabetes", "Insulin Study", "Diabetes Prevention"],
+        "conditions": ["Depression", "Type 2 Diabetes", "Type 2 Diabetes", "Prediabetes"],
+        "lastUpdatePostDate": pd.to_datetime(["2025-06-01", "2025-06-01", "2015-01-01", "2025-06-01"]),
+        "overallStatus": ["RECRUITING", "RECRUITING", "RECRUITING", "WITHDRAWN"],
+    })
+
+def test_title_and_condition_matches_rank_first(candidates):
+    """Test that a title and condition match beats the incoming order."""
+    scores = relevance_scores(candidates, "type 2 diabetes", now=NOW)
+    assert scores.argmax() == 1
+    assert scores[1] > scores[0]
+
+def test_recency_and_status_break_ties(candidates):
+    """Test that stale and withdrawn trials rank below fresh recruiting ones."""
+    scores = relevance_scores(candidates, "diabetes", now=NOW)
+    assert scores[1] > scores[2]  # same matches, older update
+    assert scores[1] > scores[3]  # withdrawn
+
+def test_rank_trials_keeps_top_n(candidates):
+    """Test that only the requested number of trials is kept, best first."""
+    top = rank_trials(candidates, "type 2 diabetes", 2)
+    assert len(top) == 2
+    assert top["nctId"][0] == "NCT2"
+    assert rank_trials(candidates.iloc[0:0], "diabetes", 2).empty
+
+def test_bounded_api_search_reports_exact_total(candidates):
+    """Test that the API path fetches a bounded pool and reports the API's total."""
+    with patch("app.data.ct_mirror.mirror_available", return_value=False), \
+         patch("app.api.search.get_clinical_trials_candidates", return_value=(candidates, 48213)) as api, \
+         patch("app.api.search.get_clinical_trials_data") as exhaustive:
+        df, total = fetch_clinical_trials("type 2 diabetes", max_results=1)
+    exhaustive.assert_not_called()
+    api.assert_called_once_with("type 2 diabetes", 3, None)
+    assert total == 48213
+    assert list(df["nctId"]) == ["NCT2"]
@@ -0,0 +1,137 @@
+"""
+Tests for the upstream record/replay stand-in.
+"""
+import json
+import time
+import httpx
+import pytest
+import requests
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from clinical_trials_module import fetch_studies
+from app.utils.metrics import UPSTREAM_ERRORS, UPSTREAM_RETRIES, UPSTREAM_TIMEOUTS
+from perf.loadtest import BackgroundServer
+from perf.replay import Cassette, ReplaySettings, create_replay_app, offline_environment
+from perf.synthetic import write_cassette
+
+def ctgov_page(token, next_token):
+    """Return a ClinicalTrials.gov page of one study, linking to the next page if any."""
+    return {"studies": [{"protocolSection": {"identificationModule": {"nctId": f"NCT-{token}"}}}],
+            "totalCount": 2, **({"nextPageToken": next_token} if next_token else {})}
+
+@pytest.fixture
+def upstream_calls():
+    """Return the list of requests seen by the fake upstream."""
+    return []
+
+@pytest.fixture
+def upstream(upstream_calls):
+    """Return an HTTP client whose upstream serves two pages of studies and a Supabase user."""
+    def handler(request):
+        upstream_calls.append(request)
+        if request.url.path.endswith("/auth/v1/user"):
+            return httpx.Response(200, json={"id": "user-1", "email": "test@example.com"})
+        token = request.url.params.get("pageToken")
+        return httpx.Response(200, json=ctgov_page(token or "first", None if token else "page-2"))
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+def test_record_then_replay_offline(tmp_path, upstream, upstream_calls):
+    """Test that recorded pages replay without reaching upstream, keeping the page tokens."""
+    cassette = Cassette(tmp_path)
+    recorder = TestClient(create_replay_app(cassette, "record", client=upstream,
+                                            upstreams={"ctgov": "https://ctgov.test/api/v2", "supabase": "https://supabase.test"}))
+    first = recorder.get("/ctgov/studies", params={"query.term": "diabetes", "pageSize": 1}).json()
+    recorder.get("/ctgov/studies", params={"query.term": "diabetes", "pageSize": 1, "pageToken": first["nextPageToken"]})
+    recorder.get("/supabase/auth/v1/user", headers={"Authorization": "Bearer token"})
+    assert upstream_calls[-1].headers["authorization"] == "Bearer token"
+    assert len(upstream_calls) == 3
+
+    player = TestClient(create_replay_app(cassette, "replay", ReplaySettings(latency_ms=0),
+                                          upstreams={"ctgov": "", "supabase": ""}))
+    page = player.get("/ctgov/studies", params={"pageSize": 1, "query.term": "diabetes"})
+    assert page.status_code == 200
+    assert page.json()["nextPageToken"] == "page-2"
+    second = player.get("/ctgov/studies", params={"query.term": "diabetes", "pageSize": 1, "pageToken": "page-2"}).json()
+    assert second["studies"][0]["protocolSection"]["identificationModule"]["nctId"] == "NCT-page-2"
+    assert player.get("/supabase/auth/v1/user").json()["email"] == "test@example.com"
+    assert player.get("/ctgov/studies", params={"query.term": "asthma"}).status_code == 404
+    assert len(upstream_calls) == 3
+
+def test_replay_latency_and_error_injection(tmp_path, upstream):
+    """Test that replays wait the configured latency and inject errors at the configured rate."""
+    cassette = Cassette(tmp_path)
+    TestClient(create_replay_app(cassette, "record", client=upstream, upstreams={"supabase": "https://supabase.test"})) \
+        .get("/supabase/auth/v1/user")
+
+    slow = TestClient(create_replay_app(cassette, "replay", ReplaySettings(latency_ms=200), upstreams={"supabase": ""}))
+    started = time.perf_counter()
+    assert slow.get("/supabase/auth/v1/user").status_code == 200
+    assert time.perf_counter() - started >= 0.2
+
+    failing = TestClient(create_replay_app(cassette, "replay", ReplaySettings(latency_ms=0, error_rate=1, error_status=429),
+                                           upstreams={"supabase": ""}))
+    response = failing.get("/supabase/auth/v1/user")
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "1"
+
+def test_offline_environment_switches_base_urls():
+    """Test that the app's upstream base URLs point at the stand-in."""
+    env = offline_environment("http://127.0.0.1:8001/")
+    assert env == {
+        "CLINICAL_TRIALS_API_URL": "http://127.0.0.1:8001/ctgov",
+        "OPENFDA_API_URL": "http://127.0.0.1:8001/openfda",
+        "SUPABASE_URL": "http://127.0.0.1:8001/supabase",
+    }
+    with patch("openfda.OPENFDA_API_URL", env["OPENFDA_API_URL"]):
+        from openfda import Open_FDA
+        assert Open_FDA.open_fda_url_selection("aspirin", "drug").startswith("http://127.0.0.1:8001/openfda/drug/label.json?")
+
+def ctgov_counts():
+    """Return the ClinicalTrials.gov retry, timeout and error counts."""
+    return [counter.value(source="ctgov") for counter in (UPSTREAM_RETRIES, UPSTREAM_TIMEOUTS, UPSTREAM_ERRORS)]
+
+@pytest.mark.parametrize("settings,timeout,error,moved", [
+    (ReplaySettings(latency_ms=0, error_rate=1), 5, requests.exceptions.HTTPError, [2, 0, 1]),
+    (ReplaySettings(latency_ms=300), 0.05, requests.exceptions.Timeout, [2, 3, 1]),
+])
+def test_ctgov_fetch_retries_injected_faults(tmp_path, settings, timeout, error, moved):
+    """Test that failing studies pages are retried, counted and raised instead of truncating the download."""
+    cassette = Cassette(tmp_path)
+    write_cassette(cassette, "asthma", studies=5, labels=0, seed=1)
+    server = BackgroundServer(create_replay_app(cassette, "replay", settings))
+    before = ctgov_counts()
+    try:
+        with patch("clinical_trials_module.CLINICAL_TRIALS_API_URL", f"{server.url}/ctgov"), \
+             patch("clinical_trials_module.CTGOV_TIMEOUT_SECONDS", timeout), \
+             pytest.raises(error):
+            fetch_studies("asthma")
+    finally:
+        server.stop()
+
+    assert [after - start for after, start in zip(ctgov_counts(), before)] == moved
+
+def test_ctgov_fetch_recovers_after_a_timeout(tmp_path):
+    """Test that a page that times out once is fetched on the retry."""
+    cassette = Cassette(tmp_path)
+    write_cassette(cassette, "asthma", studies=5, labels=0, seed=1)
+    server = BackgroundServer(create_replay_app(cassette, "replay", ReplaySettings(latency_ms=0)))
+    get = requests.get
+    calls = []
+
+    def stall_once(*args, **kwargs):
+        calls.append(kwargs["timeout"])
+        if len(calls) == 1:
+            raise requests.exceptions.ReadTimeout("stalled")
+        return get(*args, **kwargs)
+
+    before = ctgov_counts()
+    try:
+        with patch("clinical_trials_module.CLINICAL_TRIALS_API_URL", f"{server.url}/ctgov"), \
+             patch("clinical_trials_module.requests.get", side_effect=stall_once):
+            studies, total = fetch_studies("asthma")
+    finally:
+        server.stop()
+
+    assert len(studies) == 5 and total == 5
+    assert len(calls) == 2 and all(timeout > 0 for timeout in calls)
+    assert [after - start for after, start in zip(ctgov_counts(), before)] == [1, 1, 0]
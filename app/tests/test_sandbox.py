@@ -0,0 +1,92 @@
+"""
+Tests for the generated-code execution sandbox.
+"""
+import os
+import threading
+import pytest
+import pandas as pd
+from app.agents.sandbox import CodeSandbox
+
+@pytest.fixture(scope="module")
+def sandbox():
+    """Start a small sandbox shared by the tests in this module."""
+    code_sandbox = CodeSandbox(workers=2, timeout=5, memory_limit_mb=2048, queue_timeout=30)
+    yield code_sandbox
+    code_sandbox.shutdown()
+
+@pytest.fixture
+def sample_frames():
+    """Return sample frames to expose to generated code."""
+    return {
+        "clinical_trials_df": pd.DataFrame({
+            "nctId": ["NCT01234567", "NCT89012345"],
+            "overallStatus": ["COMPLETED", "RECRUITING"],
+            "enrollmentCount": [100, 50]
+        })
+    }
+
+def test_execute_captures_output_and_dataframes(sandbox, sample_frames):
+    """Test that generated code runs against the frames and its output is captured."""
+    code = (
+        "print('filtering')\n"
+        "recruiting_df = clinical_trials_df[clinical_trials_df['overallStatus'] == 'RECRUITING']\n"
+        "print(len(recruiting_df))"
+    )
+    result = sandbox.execute(code, sample_frames)
+
+    assert result["error"] is None
+    assert result["output"].startswith("filtering")
+    assert result["last_df_name"] == "recruiting_df"
+    assert result["dataframes"]["recruiting_df"] == [
+        {"nctId": "NCT89012345", "overallStatus": "RECRUITING", "enrollmentCount": 50}
+    ]
+
+def test_execute_does_not_touch_server_state(sandbox, sample_frames):
+    """Test that execution leaves the server's stdout and pandas options alone."""
+    max_rows = pd.get_option("display.max_rows")
+    result = sandbox.execute("import pandas as pd\npd.set_option('display.max_rows', 3)\nx = 1", sample_frames)
+
+    assert result["error"] is None
+    assert pd.get_option("display.max_rows") == max_rows
+
+def test_concurrent_executions_keep_separate_output(sandbox, sample_frames):
+    """Test that parallel executions each capture only their own stdout."""
+    results = {}
+
+    def run(label):
+        code = f"import time\nfor _ in range(3):\n    print('{label}')\n    time.sleep(0.05)"
+        results[label] = sandbox.execute(code, sample_frames)
+
+    threads = [threading.Thread(target=run, args=(label,)) for label in ("alpha", "beta")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results["alpha"]["output"] == "alpha\n" * 3
+    assert results["beta"]["output"] == "beta\n" * 3
+
+def test_execute_reports_code_errors(sandbox, sample_frames):
+    """Test that exceptions in generated code come back as errors."""
+    result = sandbox.execute("missing_df = clinical_trials_df['no_such_column']", sample_frames)
+    assert result["error"] == "'no_such_column'"
+    assert result["dataframes"] == {}
+
+def test_execute_enforces_time_limit(sample_frames):
+    """Test that a runaway execution is stopped and its worker replaced."""
+    code_sandbox = CodeSandbox(workers=1, timeout=1, memory_limit_mb=0)
+    try:
+        result = code_sandbox.execute("while True:\n    pass", sample_frames)
+        assert "time limit" in result["error"]
+
+        # The replacement worker serves the next execution
+        result = code_sandbox.execute("ok_df = clinical_trials_df.head(1)", sample_frames)
+        assert result["error"] is None
+    finally:
+        code_sandbox.shutdown()
+
+@pytest.mark.skipif(os.name != "posix", reason="memory limits rely on the resource module")
+def test_execute_enforces_memory_limit(sandbox, sample_frames):
+    """Test that an execution allocating past the memory limit fails cleanly."""
+    result = sandbox.execute("blob = bytearray(4 * 1024 ** 3)", sample_frames)
+    assert "memory limit" in result["error"]
@@ -0,0 +1,47 @@
+"""
+Tests for the chat schema registry.
+"""
+import pytest
+import pandas as pd
+from app.agents.schema_registry import SchemaRegistry, get_schema_registry
+
+@pytest.fixture
+def registry():
+    """Return a registry loaded from the project's column CSV files."""
+    return SchemaRegistry()
+
+def test_registry_loads_package_csvs(registry):
+    """Test that the column descriptions load from the package-relative CSV files."""
+    columns = {column.name: column for column in registry.columns("clinical_trials_df")}
+    assert columns["nctId"].data_type == "string"
+    assert "brand_name" in {column.name for column in registry.columns("fda_df")}
+
+def test_precomputed_fragment_lookup(registry):
+    """Test that fragments are precomputed per dataset combination regardless of order."""
+    both = registry.prompt_fragment(["fda_df", "clinical_trials_df"])
+    assert both is registry.prompt_fragment(["clinical_trials_df", "fda_df"])
+    assert "## Clinical Trials Data Structure (clinical_trials_df):" in both
+    assert "## FDA Data Structure (fda_df):" in both
+    assert "FDA Data Structure" not in registry.prompt_fragment(["clinical_trials_df"])
+
+def test_fragment_merges_observed_dtypes(registry):
+    """Test that live frames restrict the columns and add observed dtypes."""
+    df = pd.DataFrame({"nctId": ["NCT01234567"], "enrollmentCount": [10], "extraColumn": [1.5]})
+    fragment = registry.prompt_fragment(["clinical_trials_df"], {"clinical_trials_df": df})
+
+    assert "Available fields: nctId, enrollmentCount, extraColumn" in fragment
+    assert "- enrollmentCount (number; pandas dtype int64):" in fragment
+    assert "- extraColumn (float64): no description available" in fragment
+    assert "briefTitle" not in fragment
+    # The same schema is served from the cache
+    assert fragment is registry.prompt_fragment(["clinical_trials_df"], {"clinical_trials_df": df.copy()})
+
+def test_missing_schema_file_and_unknown_dataset(tmp_path):
+    """Test that a missing CSV or unknown dataset yields an empty schema instead of failing."""
+    registry = SchemaRegistry({"clinical_trials_df": tmp_path / "missing.csv"})
+    assert registry.columns("clinical_trials_df") == []
+    assert registry.prompt_fragment(["unknown_df"]) == ""
+
+def test_get_schema_registry_is_shared():
+    """Test that the registry is loaded once per process."""
+    assert get_schema_registry() is get_schema_registry()
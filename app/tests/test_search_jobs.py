@@ -0,0 +1,157 @@
+"""
+Tests for background search jobs.
+"""
+import asyncio
+import os
+import time
+import threading
+import uuid
+import pytest
+import pandas as pd
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from app.main import app
+from app.api.auth import get_current_user
+from app.api.search_jobs import SearchJobManager, SearchJobQueueFull, SearchJobStatus, SearchJobStore
+from app.models.user import User
+
+def wait_for(manager, job_id, timeout=10):
+    """Poll a job until it finishes."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager.get(job_id)
+        if job.status in ("completed", "failed"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"Search job {job_id} did not finish")
+
+@pytest.fixture
+def manager(tmp_path):
+    """Return a manager with a store in a temporary directory."""
+    manager = SearchJobManager(SearchJobStore(tmp_path / "jobs"), workers=1, max_pending=2)
+    yield manager
+    manager.shutdown()
+
+@pytest.fixture
+def trials_df():
+    """Return a small clinical trials frame."""
+    return pd.DataFrame({
+        "nctId": [f"NCT{i:08d}" for i in range(5)],
+        "enrollmentCount": [10, 20, None, 40, 50],
+        "eligibilityStandardAges": [["ADULT"]] * 5,
+    })
+
+def test_job_reports_progress_and_persists_results(manager, trials_df, tmp_path):
+    """Test that progress is visible while running and results are stored on completion."""
+    release = threading.Event()
+
+    def run(progress):
+        progress(pages_fetched=1, total=5)
+        progress(rows_normalized=5)
+        release.wait(5)
+        return {"clinical_trials": (trials_df, 5)}, []
+
+    job = manager.submit("user-1", {"keyword": "diabetes"}, run)
+    assert job.status == "queued"
+    time.sleep(0.1)
+    running = manager.get(job.job_id)
+    assert running.status == "running"
+    assert running.pages_fetched == 1
+    assert running.rows_normalized == 5
+    assert running.expected_total == 5
+    release.set()
+
+    done = wait_for(manager, job.job_id)
+    assert done.status == "completed"
+    assert done.totals == {"clinical_trials": 5}
+
+    # A new manager reads the persisted status and results
+    reopened = SearchJobStore(tmp_path / "jobs")
+    assert reopened.load_status(job.job_id).status == "completed"
+    page = reopened.read_table(job.job_id, "clinical_trials", offset=3, limit=10)
+    assert list(page["nctId"]) == ["NCT00000003", "NCT00000004"]
+
+def test_failed_job_and_queue_limit(manager):
+    """Test that errors are recorded and the queue is bounded."""
+    job = manager.submit("user-1", {}, lambda progress: ({}, ["Error fetching FDA data: boom"]))
+    failed = wait_for(manager, job.job_id)
+    assert failed.status == "failed"
+    assert failed.errors == ["Error fetching FDA data: boom"]
+
+    release = threading.Event()
+    slow = lambda progress: (release.wait(5), ({}, []))[1]
+    manager.submit("user-1", {}, slow)
+    manager.submit("user-1", {}, slow)
+    with pytest.raises(SearchJobQueueFull):
+        manager.submit("user-1", {}, slow)
+    release.set()
+
+def test_interrupted_jobs_are_failed_on_restart(tmp_path):
+    """Test that jobs left running by an exited process are marked failed."""
+    store = SearchJobStore(tmp_path / "jobs")
+    now = "2026-01-01T00:00:00+00:00"
+    store.save_status(SearchJobStatus(job_id=str(uuid.uuid4()), owner_id="user-1", status="running",
+                                      worker_pid=999999999, created_at=now, updated_at=now))
+    alive = SearchJobStatus(job_id=str(uuid.uuid4()), owner_id="user-1", status="running",
+                            worker_pid=os.getpid(), created_at=now, updated_at=now)
+    store.save_status(alive)
+
+    assert store.fail_interrupted() == 1
+    assert store.load_status(alive.job_id).status == "running"
+
+def test_job_endpoints(manager, trials_df):
+    """Test submitting, polling and paging through results over HTTP."""
+    app.dependency_overrides[get_current_user] = lambda: User(id="user-1", email="test@example.com")
+    client = TestClient(app)
+    try:
+        with patch("app.api.search.get_search_job_manager", return_value=manager), \
+             patch("app.api.search.fetch_clinical_trials", return_value=(trials_df, 5)), \
+             patch("app.api.search.fetch_fda_data", side_effect=RuntimeError("openFDA unavailable")):
+            response = client.post("/api/search/jobs", json={"keyword": "diabetes"})
+            assert response.status_code == 202
+            job_id = response.json()["job_id"]
+
+            wait_for(manager, job_id)
+            status_response = client.get(f"/api/search/jobs/{job_id}")
+            assert status_response.json()["status"] == "completed"
+            assert status_response.json()["errors"] == ["Error fetching FDA data: openFDA unavailable"]
+
+            results = client.get(f"/api/search/jobs/{job_id}/results", params={"offset": 0, "limit": 2}).json()
+            assert results["total_clinical_trials"] == 5
+            assert [trial["nctId"] for trial in results["clinical_trials"]] == ["NCT00000000", "NCT00000001"]
+            assert results["clinical_trials"][0]["eligibilityStandardAges"] == ["ADULT"]
+            assert results["fda_data"] == []
+
+            app.dependency_overrides[get_current_user] = lambda: User(id="user-2", email="other@example.com")
+            assert client.get(f"/api/search/jobs/{job_id}").status_code == 404
+    finally:
+        app.dependency_overrides.clear()
+
+def test_job_results_are_paged_off_the_event_loop(manager, trials_df):
+    """Test paging a completed job's results, read and serialized outside the event loop."""
+    job = manager.submit("user-1", {"keyword": "diabetes"}, lambda progress: ({"clinical_trials": (trials_df, 5)}, []))
+    wait_for(manager, job.job_id)
+    read_table = manager.store.read_table
+    loops = []
+
+    def record_loop(*args):
+        try:
+            loops.append(asyncio.get_running_loop())
+        except RuntimeError:
+            loops.append(None)
+        return read_table(*args)
+
+    app.dependency_overrides[get_current_user] = lambda: User(id="user-1", email="test@example.com")
+    client = TestClient(app)
+    try:
+        with patch("app.api.search.get_search_job_manager", return_value=manager), \
+             patch.object(manager.store, "read_table", side_effect=record_loop):
+            pages = [client.get(f"/api/search/jobs/{job.job_id}/results", params={"offset": offset, "limit": 2}).json()
+                     for offset in (0, 2, 4)]
+    finally:
+        app.dependency_overrides.clear()
+
+    assert [[trial["nctId"] for trial in page["clinical_trials"]] for page in pages] == [
+        ["NCT00000000", "NCT00000001"], ["NCT00000002", "NCT00000003"], ["NCT00000004"]]
+    assert pages[2]["offset"] == 4 and pages[2]["total_clinical_trials"] == 5
+    assert loops and all(loop is None for loop in loops)
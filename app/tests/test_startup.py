@@ -0,0 +1,24 @@
+"""
+Tests for lazy chat agent loading and the startup time check.
+"""
+from perf.startup import deferred_loaded, main, measure_import, parse_importtime
+
+def test_parse_importtime():
+    """Test that importtime lines are parsed into module, timings and depth."""
+    report = ("import time: self [us] | cumulative | imported package\n"
+              "import time:       120 |        389 |   fastapi.middleware.cors\n"
+              "import time:     23370 |    1909439 | app.main\n")
+    assert parse_importtime(report) == [("fastapi.middleware.cors", 120, 389, 1), ("app.main", 23370, 1909439, 0)]
+
+def test_app_import_defers_chat_agent():
+    """Test that importing the app leaves the chat agent and its LLM packages unloaded."""
+    result = measure_import("app.main")
+    assert result["seconds"] > 0
+    assert "app.agents.chat_agent" not in result["modules"]
+    assert deferred_loaded(result["modules"]) == []
+    assert deferred_loaded(["langgraph.graph", "langgraph"]) == ["langgraph"]
+
+def test_startup_check_enforces_budget():
+    """Test that the startup check passes within the budget and fails over it."""
+    assert main(["--runs", "1"]) == 0
+    assert main(["--runs", "1", "--budget", "0"]) == 1
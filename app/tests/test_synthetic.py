@@ -0,0 +1,62 @@
+"""
+Tests for the synthetic data generator.
+"""
+import pandas as pd
+from fastapi.testclient import TestClient
+from clinical_trials_module import studies_to_dataframe
+from openfda import Open_FDA
+from app.data import ct_mirror, fda_mirror
+from perf.replay import Cassette, ReplaySettings, create_replay_app
+from perf.synthetic import write_cassette
+from perf.synthetic_labels import synthetic_label, synthetic_labels, write_fda_bulk
+from perf.synthetic_trials import study_pages, synthetic_studies, synthetic_study, write_ct_export
+
+def test_records_are_reproducible_by_position():
+    """Test that a record depends only on the seed and its index."""
+    assert synthetic_study(7, seed=1) == list(synthetic_studies(3, seed=1, start=5))[2]
+    assert synthetic_study(7, seed=1) != synthetic_study(7, seed=2)
+    assert synthetic_label(3, seed=1, products=2) == list(synthetic_labels(8, seed=1))[3]
+
+def test_studies_normalize_with_realistic_values():
+    """Test that generated studies go through normalization with varied values."""
+    df = studies_to_dataframe(list(synthetic_studies(300, seed=4)))
+    assert df["nctId"].is_unique
+    assert df["overallStatus"].nunique() >= 5
+    assert df["phases"].nunique() >= 5
+    assert (df["country"].str.count(", ") > 0).any()
+    assert df["eligibilityCriteria"].str.len().max() > 1500
+    assert df["startDate"].notna().all()
+
+def test_labels_repeat_product_texts_across_repackagers():
+    """Test that labels of one product share their sections and collapse to one row."""
+    df = pd.DataFrame([Open_FDA.extract_label_record(label) for label in synthetic_labels(40, seed=2, products=5)])
+    collapsed = Open_FDA.collapse_repackager_labels(df)
+    assert len(collapsed) <= 5
+    assert collapsed["label_count"].sum() == 40
+    assert df["adverse_reactions"].str.len().mean() > 1000
+
+def test_pages_and_cassette_answer_an_api_search(tmp_path):
+    """Test that generated pages link like the API and replay for fetch_studies's requests."""
+    pages = list(study_pages(25, seed=1, page_size=10, condition="Asthma"))
+    assert [len(page["studies"]) for page in pages] == [10, 10, 5]
+    assert pages[0]["totalCount"] == 25 and "nextPageToken" not in pages[-1]
+    assert {study["protocolSection"]["conditionsModule"]["conditions"][0] for page in pages for study in page["studies"]} == {"Asthma"}
+
+    cassette = Cassette(tmp_path)
+    write_cassette(cassette, "asthma", studies=25, labels=3, seed=1, page_size=10)
+    client = TestClient(create_replay_app(cassette, "replay", ReplaySettings(latency_ms=0)))
+    params = {"query.term": "asthma", "pageSize": 10, "countTotal": "true"}
+    first = client.get("/ctgov/studies", params=params).json()
+    last = client.get("/ctgov/studies", params={**params, "pageToken": pages[1]["nextPageToken"]}).json()
+    assert first["totalCount"] == 25 and first["nextPageToken"] == pages[0]["nextPageToken"]
+    assert len(last["studies"]) == 5
+
+    total = client.get("/openfda/drug/label.json", params={"search": 'indications_and_usage:"asthma"', "limit": 1}).json()
+    assert total["meta"]["results"]["total"] == 3
+
+def test_bulk_layouts_ingest_into_the_mirrors(tmp_path):
+    """Test that the bulk export and download files build the local mirrors."""
+    assert ct_mirror.ingest_bulk_export(write_ct_export(tmp_path / "ctg-studies.json.zip", 30), tmp_path / "ct", workers=1) == 30
+    paths = write_fda_bulk(tmp_path / "fda", 25, labels_per_file=10)
+    assert [path.name for path in paths][-1] == "drug-label-0003-of-0003.json.zip"
+    assert fda_mirror.ingest_label_files(paths, tmp_path / "fda_mirror", workers=1) == 25
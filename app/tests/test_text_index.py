@@ -0,0 +1,71 @@
+"""
+Tests for the full-text index over the local trial mirror.
+"""
+import pytest
+import numpy as np
+from app.data.text_index import InvertedIndex, build_index, parse_query, tokenize
+
+@pytest.fixture
+def documents():
+    """Return documents as lists of field texts."""
+    return [
+        ["Metformin in Type 2 Diabetes", "Type 2 Diabetes Mellitus", "Adults with diabetes"],
+        ["Breast Cancer Screening", "Breast Cancer", "Women over 40 with a family history of cancer"],
+        ["Insulin Pump Study", "Diabetes Mellitus, Type 1", "Children with type 1 diabetes"],
+        ["Cancer of the breast: a registry", "Neoplasms", None],
+        ["COVID-19 Vaccine Trial", "COVID-19", "Healthy volunteers"],
+    ]
+
+@pytest.fixture
+def index(tmp_path, documents):
+    """Build the index on disk and open it."""
+    build_index(documents, tmp_path / "index")
+    return InvertedIndex(tmp_path / "index")
+
+def test_tokenize_and_parse_query():
+    """Test case folding, phrase clauses and multi-token words."""
+    assert tokenize("Type 2 DIABETES") == ["type", "2", "diabetes"]
+    assert parse_query('"breast cancer" screening covid-19') == [["breast", "cancer"], ["screening"], ["covid", "19"]]
+    assert parse_query("  ") == []
+
+def test_index_files_and_postings(index, tmp_path):
+    """Test that the index is written to disk with positional postings."""
+    assert InvertedIndex.exists(tmp_path / "index")
+    docs, tfs = index.postings("diabetes")
+    assert list(docs) == [0, 2]
+    assert list(tfs) == [3, 2]
+    assert len(index.postings("unknown")[0]) == 0
+
+def test_keyword_search_ranks_by_bm25(index):
+    """Test that every term must match and denser matches rank first."""
+    result = index.search("diabetes")
+    assert list(result.doc_ids) == [0, 2]
+    assert result.total == 2
+    assert result.scores[0] > result.scores[1] > 0
+    assert list(index.search("type diabetes mellitus").doc_ids) == [0, 2]
+    assert index.search("diabetes cancer").total == 0
+
+def test_phrase_queries(index):
+    """Test that phrases match consecutive tokens within one field."""
+    assert set(index.search("breast cancer").doc_ids) == {1, 3}
+    assert list(index.search('"breast cancer"').doc_ids) == [1]
+    assert list(index.search('"type 2 diabetes"').doc_ids) == [0]
+    assert list(index.search("covid-19").doc_ids) == [4]
+    # "mellitus adults" spans the end of one field and the start of the next
+    assert index.search('"mellitus adults"').total == 0
+
+def test_limit_keeps_exact_total(index):
+    """Test that a limit trims the ids but not the total."""
+    result = index.search("cancer", limit=1)
+    assert result.total == 2
+    assert len(result.doc_ids) == 1
+    assert result.doc_ids[0] == index.search("cancer").doc_ids[0]
+
+def test_parallel_build_matches_serial(tmp_path, documents, monkeypatch):
+    """Test that tokenizing in worker processes yields the same index."""
+    monkeypatch.setattr("app.data.text_index.BUILD_CHUNK_SIZE", 2)
+    serial = build_index(documents, tmp_path / "serial")
+    parallel = build_index(documents, tmp_path / "parallel", workers=2)
+    for name in ("vocab", "doc_ids", "tfs", "positions", "doc_lengths"):
+        assert np.array_equal(getattr(serial, name), getattr(parallel, name))
+    assert list(parallel.search('"breast cancer"').doc_ids) == [1]
@@ -0,0 +1,87 @@
+"""
+Tests for the normalized trial tables.
+"""
+import pytest
+import pandas as pd
+from clinical_trials_module import studies_to_dataframe
+from app.data.trial_tables import filter_trials, studies_to_tables, tables_to_flat
+
+SET_JOINED_COLUMNS = ["interventions", "LocationName", "city", "state", "country"]
+
+def make_study(nct_id, phases, countries, interventions):
+    """Build a study with multi-valued fields in the studies API format."""
+    return {
+        "protocolSection": {
+            "identificationModule": {"nctId": nct_id, "briefTitle": f"Study {nct_id}",
+                                     "organization": {"fullName": "Org", "class": "INDUSTRY"}},
+            "statusModule": {"overallStatus": "RECRUITING", "startDateStruct": {"date": "2022-01"}},
+            "sponsorCollaboratorsModule": {"leadSponsor": {"name": "Sponsor", "class": "INDUSTRY"},
+                                           "collaborators": [{"name": "Uni A", "class": "OTHER"}]},
+            "conditionsModule": {"conditions": ["Type 2 Diabetes", "Obesity"]},
+            "designModule": {"phases": phases, "enrollmentInfo": {"count": 100}},
+            "armsInterventionsModule": {
+                "armGroups": [{"label": "Arm A", "type": "EXPERIMENTAL", "interventionNames": [f"Drug: {name}" for name, _ in interventions]},
+                              {"label": "Arm B", "type": "PLACEBO_COMPARATOR", "interventionNames": ["Drug: Placebo"]}],
+                "interventions": [{"type": kind, "name": name, "description": f"{name} daily"} for name, kind in interventions]
+            },
+            "outcomesModule": {"primaryOutcomes": [{"measure": "HbA1c", "timeFrame": "12 weeks"}],
+                               "secondaryOutcomes": [{"measure": "Weight"}, {"measure": None}]},
+            "contactsLocationsModule": {"locations": [
+                {"facility": f"Site {i}", "city": f"City {i}", "state": None, "country": country}
+                for i, country in enumerate(countries)
+            ]}
+        }
+    }
+
+@pytest.fixture
+def studies():
+    """Return studies across phases and countries."""
+    return [
+        make_study("NCT1", ["PHASE2"], ["Germany", "France"], [("Metformin", "DRUG"), ("Placebo", "DRUG")]),
+        make_study("NCT2", ["PHASE2", "PHASE3"], ["United States"], [("Vaccine X", "BIOLOGICAL")]),
+        make_study("NCT3", ["PHASE3"], ["Germany"], [("Diet", "BEHAVIORAL")]),
+    ]
+
+def test_child_tables_keep_one_row_per_value(studies):
+    """Test that multi-valued fields are exploded and locations keep their pairing."""
+    tables = studies_to_tables(studies)
+    assert len(tables["trials"]) == 3
+    assert "conditions" not in tables["trials"].columns
+    assert len(tables["conditions"]) == 6
+    locations = tables["locations"]
+    assert locations.loc[locations["facility"] == "Site 1", ["nctId", "city", "country"]].values.tolist() == [["NCT1", "City 1", "France"]]
+    assert str(locations["country"].dtype) == "category"
+    assert list(tables["outcomes"]["kind"]) == ["primary", "secondary", "secondary"] * 3
+
+def test_filter_trials_is_a_join(studies):
+    """Test that filters on child tables select the matching trials."""
+    tables = studies_to_tables(studies)
+    assert set(filter_trials(tables, "locations", "country", ["Germany"])["nctId"]) == {"NCT1", "NCT3"}
+    assert set(filter_trials(tables, "phases", "phase", ["PHASE2"])["nctId"]) == {"NCT1", "NCT2"}
+    per_phase = tables["phases"].groupby("phase", observed=True)["nctId"].nunique()
+    assert per_phase.to_dict() == {"PHASE2": 2, "PHASE3": 2}
+
+def test_flat_view_is_derivable(studies):
+    """Test that the flat view matches studies_to_dataframe."""
+    flat = tables_to_flat(studies_to_tables(studies))
+    expected = studies_to_dataframe(studies)
+    assert list(flat.columns) == list(expected.columns)
+    for column in expected.columns:
+        if column in SET_JOINED_COLUMNS:
+            # normalize_study joins these from sets, so only their parts are comparable
+            actual_parts = flat[column].map(lambda text: sorted(text.split(", ")))
+            expected_parts = expected[column].map(lambda text: sorted(text.split(", ")))
+            assert actual_parts.tolist() == expected_parts.tolist(), column
+        else:
+            pd.testing.assert_series_equal(flat[column], expected[column], check_dtype=False, check_names=False)
+
+def test_list_columns_keep_whole_values(studies):
+    """Test that country and phase lists keep names containing the separator whole in both views."""
+    studies.append(make_study("NCT4", ["PHASE3"], ["Korea, Republic of", "Germany", "Germany"], []))
+    expected = studies_to_dataframe(studies)
+    assert expected.loc[3, "countryList"] == ["Germany", "Korea, Republic of"]
+    assert expected.loc[1, "phaseList"] == ["PHASE2", "PHASE3"]
+    flat = tables_to_flat(studies_to_tables(studies))
+    assert flat["countryList"].tolist() == expected["countryList"].tolist()
+    assert flat["phaseList"].tolist() == expected["phaseList"].tolist()
+    assert tables_to_flat(studies_to_tables([make_study("NCT5", [], [], [])]))["countryList"].tolist() == [[]]
@@ -0,0 +1,332 @@
+"""
+Admission control module for the Clinical Trials & FDA Data Search App.
+Bounds the concurrent calls to each upstream service (ClinicalTrials.gov,
+openFDA and the chat model) per worker and per user. Calls over the limit
+wait in a bounded queue, where interactive searches go before full downloads
+and background jobs. When the queue is full or a call waits too long, the
+request is refused with 503, or 429 for a user over their share, and a
+Retry-After estimate. Cheap requests such as cache lookups and auth never
+pass a gate, so they are served while upstream calls queue.
+"""
+import asyncio
+import contextlib
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import AsyncIterator, Callable, Iterator, List, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+
+from app.utils.metrics import ADMISSION_ACTIVE, ADMISSION_QUEUED, ADMISSION_QUEUE_SECONDS, ADMISSION_REJECTED
+
+# Concurrent calls and queued calls allowed per upstream in each worker
+ADMISSION_CTGOV_CONCURRENCY = int(os.getenv("ADMISSION_CTGOV_CONCURRENCY", "4"))
+ADMISSION_CTGOV_QUEUE = int(os.getenv("ADMISSION_CTGOV_QUEUE", "16"))
+ADMISSION_OPENFDA_CONCURRENCY = int(os.getenv("ADMISSION_OPENFDA_CONCURRENCY", "4"))
+ADMISSION_OPENFDA_QUEUE = int(os.getenv("ADMISSION_OPENFDA_QUEUE", "16"))
+ADMISSION_LLM_CONCURRENCY = int(os.getenv("ADMISSION_LLM_CONCURRENCY", "8"))
+ADMISSION_LLM_QUEUE = int(os.getenv("ADMISSION_LLM_QUEUE", "16"))
+
+# Admitted and queued calls one user may have per upstream (0 disables the limit)
+ADMISSION_PER_USER = int(os.getenv("ADMISSION_PER_USER", "2"))
+
+# Seconds an interactive call waits for admission before it is refused
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "30"))
+
+# Queue priorities; lower values are admitted first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_FULL_FETCH = 1
+PRIORITY_BACKGROUND = 2
+
+# Bounds of the Retry-After estimate, and the weight of each call in the average slot hold time
+MAX_RETRY_AFTER_SECONDS = 60
+HOLD_TIME_SMOOTHING = 0.2
+
+# User and base priority of the calls made while handling the current request
+_caller: ContextVar[Tuple[Optional[str], int]] = ContextVar("admission_caller", default=(None, PRIORITY_INTERACTIVE))
+
+
+@contextlib.contextmanager
+def admission_context(user_id: Optional[str], priority: int = PRIORITY_INTERACTIVE) -> Iterator[None]:
+    """
+    Attribute the gated calls made inside the block to a user and priority.
+
+    The context follows the work into threads that copy context variables,
+    such as the thread pool, the chat agent executor and search jobs.
+
+    Args:
+        user_id (Optional[str]): The user; None exempts the calls from the per-user limit.
+        priority (int): Lowest priority the calls get, e.g. PRIORITY_BACKGROUND.
+    """
+    token = _caller.set((user_id, priority))
+    try:
+        yield
+    finally:
+        _caller.reset(token)
+
+
+class AdmissionRejected(Exception):
+    """A call refused by a gate, answered with its status code and a Retry-After header."""
+
+    def __init__(self, gate: str, reason: str, status_code: int, retry_after: int):
+        """
+        Describe the refusal.
+
+        Args:
+            gate (str): Name of the gate.
+            reason (str): 'user_limit', 'queue_full' or 'queue_timeout'.
+            status_code (int): 429 for a user over their share, else 503.
+            retry_after (int): Seconds after which a retry is likely to be admitted.
+        """
+        if reason == "user_limit":
+            detail = f"Too many concurrent {gate} requests for this user; retry after {retry_after}s"
+        else:
+            detail = f"The {gate} service is busy; retry after {retry_after}s"
+        super().__init__(detail)
+        self.gate = gate
+        self.reason = reason
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.detail = detail
+
+
+class _Waiter:
+    """A queued call, woken when a slot is handed to it."""
+
+    __slots__ = ("user_id", "wake", "granted", "cancelled")
+
+    def __init__(self, user_id: Optional[str], wake: Callable[[], None]):
+        self.user_id = user_id
+        self.wake = wake
+        self.granted = False
+        self.cancelled = False
+
+
+class Gate:
+    """Bounds the concurrent calls to one upstream, with a per-user limit and a bounded priority queue."""
+
+    def __init__(
+        self,
+        name: str,
+        limit: int,
+        max_queue: int,
+        per_user: int = ADMISSION_PER_USER,
+        queue_timeout: float = ADMISSION_QUEUE_TIMEOUT_SECONDS,
+    ):
+        """
+        Create an idle gate.
+
+        Args:
+            name (str): Upstream name, used in metrics and errors.
+            limit (int): Calls admitted at the same time.
+            max_queue (int): Calls allowed to wait for admission.
+            per_user (int): Admitted and queued calls per user (0 disables the limit).
+            queue_timeout (float): Seconds an interactive call waits before it is refused.
+        """
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.per_user = per_user
+        self.queue_timeout = queue_timeout
+        self._lock = threading.Lock()
+        self._active = 0
+        self._queued = 0
+        self._queue: List[Tuple[int, int, _Waiter]] = []
+        self._users: Counter = Counter()
+        self._sequence = itertools.count()
+        self._hold_seconds = 1.0
+
+    def _identify(self, priority: int) -> Tuple[Optional[str], int]:
+        """Get the calling user and the effective priority of a call."""
+        user_id, base = _caller.get()
+        return user_id, max(priority, base)
+
+    def _publish(self) -> None:
+        """Update the gate's gauges. Called under the lock."""
+        ADMISSION_ACTIVE.set(self._active, gate=self.name)
+        ADMISSION_QUEUED.set(self._queued, gate=self.name)
+
+    def retry_after(self) -> int:
+        """
+        Estimate when a new call would be admitted.
+
+        Returns:
+            int: Seconds for the queued calls ahead, at the average slot hold time.
+        """
+        rounds = (self._queued + 1) / max(self.limit, 1)
+        return max(1, min(MAX_RETRY_AFTER_SECONDS, math.ceil(self._hold_seconds * rounds)))
+
+    def _reject(self, reason: str) -> AdmissionRejected:
+        """Count and build a refusal. Called under the lock."""
+        ADMISSION_REJECTED.inc(gate=self.name, reason=reason)
+        return AdmissionRejected(self.name, reason, 429 if reason == "user_limit" else 503, self.retry_after())
+
+    def _enter(self, user_id: Optional[str], priority: int, wake: Callable[[], None]) -> Optional[_Waiter]:
+        """
+        Admit a call or queue it. Called under the lock.
+
+        Returns:
+            Optional[_Waiter]: The queued waiter, or None if the call was admitted.
+
+        Raises:
+            AdmissionRejected: If the user is over their share or the queue is full.
+        """
+        if user_id is not None and self.per_user and self._users[user_id] >= self.per_user:
+            raise self._reject("user_limit")
+        if self._active < self.limit and not self._queued:
+            self._active += 1
+            waiter = None
+        elif self._queued >= self.max_queue:
+            raise self._reject("queue_full")
+        else:
+            waiter = _Waiter(user_id, wake)
+            heapq.heappush(self._queue, (priority, next(self._sequence), waiter))
+            self._queued += 1
+        if user_id is not None:
+            self._users[user_id] += 1
+        self._publish()
+        return waiter
+
+    def _leave(self, user_id: Optional[str], held: Optional[float]) -> None:
+        """Free a slot, handing it to the first queued call. Called under the lock."""
+        if user_id is not None:
+            self._users[user_id] -= 1
+            if not self._users[user_id]:
+                del self._users[user_id]
+        if held is not None:
+            self._hold_seconds += HOLD_TIME_SMOOTHING * (held - self._hold_seconds)
+        while self._queue:
+            _, _, waiter = heapq.heappop(self._queue)
+            if waiter.cancelled:
+                continue
+            self._queued -= 1
+            waiter.granted = True
+            waiter.wake()
+            self._publish()
+            return
+        self._active -= 1
+        self._publish()
+
+    def _abandon(self, waiter: _Waiter) -> bool:
+        """
+        Withdraw a queued call that stopped waiting. Called under the lock.
+
+        Returns:
+            bool: True if a slot was handed to the call before it stopped waiting.
+        """
+        if waiter.granted:
+            return True
+        waiter.cancelled = True
+        self._queued -= 1
+        if waiter.user_id is not None:
+            self._users[waiter.user_id] -= 1
+            if not self._users[waiter.user_id]:
+                del self._users[waiter.user_id]
+        self._publish()
+        return False
+
+    @contextlib.contextmanager
+    def admit(self, priority: int = PRIORITY_INTERACTIVE) -> Iterator[None]:
+        """
+        Hold a slot while the block runs, waiting for one if needed.
+
+        For blocking code running in worker threads. Background calls wait
+        without a time limit.
+
+        Args:
+            priority (int): Priority of the call; the caller's context may lower it.
+
+        Raises:
+            AdmissionRejected: If the call is refused.
+        """
+        user_id, priority = self._identify(priority)
+        started = time.perf_counter()
+        event = threading.Event()
+        with self._lock:
+            waiter = self._enter(user_id, priority, event.set)
+        if waiter is not None:
+            timeout = None if priority >= PRIORITY_BACKGROUND else self.queue_timeout
+            if not event.wait(timeout):
+                with self._lock:
+                    if not self._abandon(waiter):
+                        raise self._reject("queue_timeout")
+        admitted = time.perf_counter()
+        ADMISSION_QUEUE_SECONDS.observe(admitted - started, gate=self.name)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._leave(user_id, time.perf_counter() - admitted)
+
+    @contextlib.asynccontextmanager
+    async def admit_async(self, priority: int = PRIORITY_INTERACTIVE) -> AsyncIterator[None]:
+        """
+        Hold a slot while the block runs, waiting for one without blocking the event loop.
+
+        Args:
+            priority (int): Priority of the call; the caller's context may lower it.
+
+        Raises:
+            AdmissionRejected: If the call is refused.
+        """
+        user_id, priority = self._identify(priority)
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def resolve() -> None:
+            if not future.done():
+                future.set_result(None)
+
+        def wake() -> None:
+            loop.call_soon_threadsafe(resolve)
+
+        with self._lock:
+            waiter = self._enter(user_id, priority, wake)
+        if waiter is not None:
+            timeout = None if priority >= PRIORITY_BACKGROUND else self.queue_timeout
+            try:
+                await asyncio.wait_for(asyncio.shield(future), timeout)
+            except asyncio.TimeoutError:
+                with self._lock:
+                    if not self._abandon(waiter):
+                        raise self._reject("queue_timeout")
+            except asyncio.CancelledError:
+                # Reason: a client that disconnects while queued must not keep a slot handed to it
+                with self._lock:
+                    if self._abandon(waiter):
+                        self._leave(user_id, None)
+                raise
+        admitted = time.perf_counter()
+        ADMISSION_QUEUE_SECONDS.observe(admitted - started, gate=self.name)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._leave(user_id, time.perf_counter() - admitted)
+
+
+# Gates of the upstream services
+CTGOV_GATE = Gate("ctgov", ADMISSION_CTGOV_CONCURRENCY, ADMISSION_CTGOV_QUEUE)
+OPENFDA_GATE = Gate("openfda", ADMISSION_OPENFDA_CONCURRENCY, ADMISSION_OPENFDA_QUEUE)
+LLM_GATE = Gate("llm", ADMISSION_LLM_CONCURRENCY, ADMISSION_LLM_QUEUE)
+
+
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected) -> JSONResponse:
+    """
+    Answer a refused call with its status code and a Retry-After header.
+
+    Args:
+        request (Request): The request.
+        exc (AdmissionRejected): The refusal.
+
+    Returns:
+        JSONResponse: The error response.
+    """
+    return JSONResponse({"detail": exc.detail}, status_code=exc.status_code, headers={"Retry-After": str(exc.retry_after)})
@@ -0,0 +1,224 @@
+"""
+Logging module for the Clinical Trials & FDA Data Search App.
+Configures leveled, structured logging with a correlation id per request.
+Records are written to stderr as JSON lines (or text), carry the id of the
+request that emitted them, and below WARNING can be sampled per request.
+Debug dumps are passed as lazy arguments, so they cost nothing unless
+their record is emitted.
+"""
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import uuid
+import zlib
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, Optional
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Level, format ('json' or 'text') and share of requests whose records below WARNING are kept
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+
+# Header carrying the correlation id in requests and responses
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# Correlation id of the request being handled
+_request_id: ContextVar[str] = ContextVar("request_id", default="-")
+
+# Attributes every LogRecord has; anything else was passed through extra and is logged as a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", logging.INFO, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+_handler: Optional[logging.Handler] = None
+
+
+def get_request_id() -> str:
+    """
+    Get the correlation id of the current request.
+
+    Returns:
+        str: The id, or '-' outside a request.
+    """
+    return _request_id.get()
+
+
+@contextlib.contextmanager
+def request_context(request_id: Optional[str] = None) -> Iterator[str]:
+    """
+    Tag the records logged inside the block with a correlation id.
+
+    Args:
+        request_id (Optional[str]): The id (a new one by default).
+
+    Yields:
+        str: The id.
+    """
+    request_id = request_id or uuid.uuid4().hex
+    token = _request_id.set(request_id)
+    try:
+        yield request_id
+    finally:
+        _request_id.reset(token)
+
+
+class RequestIdFilter(logging.Filter):
+    """Adds the current correlation id to records."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps the records below WARNING of a share of requests, and every WARNING and above."""
+
+    def __init__(self, rate: float = LOG_SAMPLE_RATE):
+        """
+        Create the filter.
+
+        Args:
+            rate (float): Share of requests whose records below WARNING are kept, from 0 to 1.
+        """
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate >= 1 or record.levelno >= logging.WARNING:
+            return True
+        # Reason: sampling by request id keeps or drops a request's records together
+        request_id = getattr(record, "request_id", None) or _request_id.get()
+        return zlib.crc32(request_id.encode("utf-8")) / 2**32 < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line, with extra fields as keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT, sample_rate: float = LOG_SAMPLE_RATE) -> None:
+    """
+    Configure the root logger, replacing an earlier configuration by this function.
+
+    Args:
+        level (str): Level name, e.g. 'INFO'.
+        fmt (str): 'json' or 'text'.
+        sample_rate (float): Share of requests whose records below WARNING are kept.
+
+    Raises:
+        ValueError: If the format is unknown.
+    """
+    global _handler
+    if fmt not in ("json", "text"):
+        raise ValueError(f"Unknown LOG_FORMAT '{fmt}'; use 'json' or 'text'")
+    handler = logging.StreamHandler(sys.stderr)
+    handler.addFilter(RequestIdFilter())
+    handler.addFilter(SamplingFilter(sample_rate))
+    if fmt == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+    root = logging.getLogger()
+    if _handler is not None:
+        root.removeHandler(_handler)
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+    _handler = handler
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Get a module's logger, configuring logging on first use.
+
+    Args:
+        name (str): Logger name, usually __name__.
+
+    Returns:
+        logging.Logger: The logger.
+    """
+    if _handler is None:
+        configure_logging()
+    return logging.getLogger(name)
+
+
+class Lazy:
+    """A log argument computed only when its record is formatted."""
+
+    def __init__(self, function: Callable[..., Any], *args: Any, **kwargs: Any):
+        """
+        Wrap a call.
+
+        Args:
+            function (Callable[..., Any]): Computes the logged value.
+            *args: Positional arguments of the call.
+            **kwargs: Keyword arguments of the call.
+        """
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+
+    def __str__(self) -> str:
+        return str(self.function(*self.args, **self.kwargs))
+
+
+def frame_info(df: "pd.DataFrame") -> str:
+    """
+    Describe a DataFrame's columns, dtypes and memory use, for debug records.
+
+    Args:
+        df (pd.DataFrame): The frame.
+
+    Returns:
+        str: The output of DataFrame.info.
+    """
+    buffer = io.StringIO()
+    df.info(buf=buffer)
+    return buffer.getvalue()
+
+
+class RequestContextMiddleware:
+    """ASGI middleware giving each request a correlation id, taken from X-Request-ID when sent."""
+
+    def __init__(self, app: Callable):
+        """
+        Wrap an ASGI app.
+
+        Args:
+            app (Callable): The wrapped app.
+        """
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        header = REQUEST_ID_HEADER.lower().encode("latin-1")
+        sent = next((value.decode("latin-1") for name, value in scope["headers"] if name == header), None)
+
+        async def send_with_id(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(header, request_id.encode("latin-1"))]
+            await send(message)
+
+        # Reason: ids are echoed in headers and logs, so only short header-safe ids are reused
+        with request_context(sent if sent and len(sent) <= 128 and sent.isprintable() else None) as request_id:
+            await self.app(scope, receive, send_with_id)
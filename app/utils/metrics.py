@@ -0,0 +1,386 @@
+"""
+Metrics module for the Clinical Trials & FDA Data Search App.
+Keeps in-process counters, gauges and latency histograms of the search and
+chat pipelines, rendered in the Prometheus text format by the /metrics
+endpoint. Recording a value costs a dict lookup under a per-metric lock, so
+the instrumentation can stay on the hot path.
+"""
+import bisect
+import functools
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+# Latency histogram buckets in seconds, from fast in-memory stages to slow upstream fetches
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Content type of the Prometheus text format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelKey = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value as Prometheus expects."""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """Format a label set, escaping the values."""
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Metric:
+    """A named metric with one value per label set."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        """
+        Create a metric without values.
+
+        Args:
+            name (str): Metric name.
+            documentation (str): Help text.
+            labelnames (Sequence[str]): Names of the labels every value is recorded with.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelKey, Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelKey:
+        """
+        Get the label values of a label set, in labelnames order.
+
+        Raises:
+            ValueError: If the labels do not match labelnames.
+        """
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes the labels {list(self.labelnames)}, got {sorted(labels)}")
+        try:
+            return tuple(str(labels[name]) for name in self.labelnames)
+        except KeyError:
+            raise ValueError(f"{self.name} takes the labels {list(self.labelnames)}, got {sorted(labels)}") from None
+
+    def samples(self) -> List[Tuple[str, LabelKey, float]]:
+        """
+        Get the current samples.
+
+        Returns:
+            List[Tuple[str, LabelKey, float]]: Sample name suffix, label values and value.
+        """
+        with self._lock:
+            return [("", key, value) for key, value in self._values.items()]
+
+    def render(self) -> str:
+        """
+        Render the metric in the Prometheus text format.
+
+        Returns:
+            str: The HELP and TYPE lines and one line per sample.
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, key, value in self.samples():
+            names = self.labelnames
+            if suffix == "_bucket":
+                # Reason: the bucket bound is carried as the last label value
+                names = self.labelnames + ("le",)
+            lines.append(f"{self.name}{suffix}{_format_labels(names, key)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """A monotonically increasing count."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        """
+        Add to the count of a label set.
+
+        Args:
+            amount (float): Non-negative amount to add.
+            **labels: Label values.
+
+        Raises:
+            ValueError: If the amount is negative or the labels do not match.
+        """
+        if amount < 0:
+            raise ValueError(f"{self.name} can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        """Get the count of a label set."""
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+
+class Gauge(Metric):
+    """A value that goes up and down."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        """Set the value of a label set."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        """Add to the value of a label set."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        """Subtract from the value of a label set."""
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: Any) -> float:
+        """Get the set value of a label set."""
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+
+class Histogram(Metric):
+    """Observed values counted into cumulative buckets, with their sum and count."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        Create a histogram.
+
+        Args:
+            name (str): Metric name.
+            documentation (str): Help text.
+            labelnames (Sequence[str]): Label names.
+            buckets (Sequence[float]): Increasing upper bounds of the buckets; +Inf is added.
+        """
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(bound) for bound in buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        """
+        Record an observation.
+
+        Args:
+            value (float): Observed value, e.g. seconds.
+            **labels: Label values.
+        """
+        key = self._key(labels)
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # Per-bucket counts including +Inf, then the sum
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[position] += 1
+            counts[-1] += value
+
+    def time(self, **labels: Any) -> "Timer":
+        """
+        Time a block or function into the histogram.
+
+        Args:
+            **labels: Label values.
+
+        Returns:
+            Timer: A context manager and decorator observing the elapsed seconds.
+        """
+        return Timer(self, labels)
+
+    def count(self, **labels: Any) -> int:
+        """Get the number of observations of a label set."""
+        with self._lock:
+            counts = self._values.get(self._key(labels))
+        return sum(counts[:-1]) if counts is not None else 0
+
+    def samples(self) -> List[Tuple[str, LabelKey, float]]:
+        """Get the cumulative bucket, sum and count samples."""
+        with self._lock:
+            values = [(key, list(counts)) for key, counts in self._values.items()]
+        samples = []
+        bounds = [_format_value(bound) for bound in self.buckets] + ["+Inf"]
+        for key, counts in values:
+            cumulative = 0
+            for bound, count in zip(bounds, counts[:-1]):
+                cumulative += count
+                samples.append(("_bucket", key + (bound,), cumulative))
+            samples.append(("_sum", key, counts[-1]))
+            samples.append(("_count", key, cumulative))
+        return samples
+
+
+class Timer:
+    """Observes elapsed seconds into a histogram, as a context manager or a decorator."""
+
+    def __init__(self, histogram: Histogram, labels: Dict[str, Any]):
+        """
+        Create a timer.
+
+        Args:
+            histogram (Histogram): Histogram receiving the elapsed seconds.
+            labels (Dict[str, Any]): Label values of the observations.
+        """
+        self._histogram = histogram
+        self._labels = labels
+        self._started = 0.0
+
+    def __enter__(self) -> "Timer":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._histogram.observe(time.perf_counter() - self._started, **self._labels)
+
+    def __call__(self, function: Callable) -> Callable:
+        """Wrap a function so each call is timed."""
+        @functools.wraps(function)
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            # Reason: a fresh timer per call, since the decorated function may run in several threads
+            with Timer(self._histogram, self._labels):
+                return function(*args, **kwargs)
+        return timed
+
+
+class MetricsRegistry:
+    """The metrics exposed together on one endpoint."""
+
+    def __init__(self):
+        """Create an empty registry."""
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        """
+        Add a metric.
+
+        Args:
+            metric (Metric): The metric.
+
+        Returns:
+            Metric: The metric, for assignment at module level.
+
+        Raises:
+            ValueError: If a metric of the same name is registered.
+        """
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric '{metric.name}' is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text format.
+
+        Returns:
+            str: The exposition text.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+# The process-wide registry served on /metrics
+REGISTRY = MetricsRegistry()
+
+# HTTP requests
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "HTTP requests being handled."))
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ["method", "route", "status"]))
+AUTH_SECONDS = REGISTRY.register(Histogram(
+    "auth_validation_duration_seconds", "Bearer token validation latency by outcome.", ["outcome"]))
+
+# Search pipeline
+SEARCH_FETCH_SECONDS = REGISTRY.register(Histogram(
+    "search_fetch_duration_seconds", "Time to fetch the results of a search by source.", ["source"]))
+UPSTREAM_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "upstream_request_duration_seconds", "Upstream API request latency by source and request.", ["source", "request"]))
+UPSTREAM_RETRIES = REGISTRY.register(Counter(
+    "upstream_retries_total", "Upstream API requests retried.", ["source"]))
+UPSTREAM_TIMEOUTS = REGISTRY.register(Counter(
+    "upstream_timeouts_total", "Upstream API requests that timed out.", ["source"]))
+UPSTREAM_ERRORS = REGISTRY.register(Counter(
+    "upstream_errors_total", "Upstream API requests that failed.", ["source"]))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "pipeline_stage_duration_seconds", "Processing stage latency.", ["stage"]))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "cache_requests_total", "Cache lookups by cache and result.", ["cache", "result"]))
+
+# Chat agent
+AGENT_NODE_SECONDS = REGISTRY.register(Histogram(
+    "agent_node_duration_seconds", "Chat agent graph node latency.", ["node"]))
+LLM_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "llm_request_duration_seconds", "Chat model call latency by agent step.", ["step"]))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "llm_tokens_total", "Chat model tokens by agent step and kind (prompt or completion).", ["step", "kind"]))
+
+# Worker pools
+EXECUTOR_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "executor_queue_depth", "Tasks waiting for a worker thread by executor.", ["executor"]))
+EXECUTOR_BUSY_THREADS = REGISTRY.register(Gauge(
+    "executor_busy_threads", "Worker threads running a task by executor.", ["executor"]))
+
+# Admission control
+ADMISSION_ACTIVE = REGISTRY.register(Gauge(
+    "admission_active", "Admitted calls running by gate.", ["gate"]))
+ADMISSION_QUEUED = REGISTRY.register(Gauge(
+    "admission_queued", "Calls waiting for admission by gate.", ["gate"]))
+ADMISSION_QUEUE_SECONDS = REGISTRY.register(Histogram(
+    "admission_queue_duration_seconds", "Time calls waited for admission by gate.", ["gate"]))
+ADMISSION_REJECTED = REGISTRY.register(Counter(
+    "admission_rejected_total", "Calls refused admission by gate and reason.", ["gate", "reason"]))
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording in-flight requests and request latency by route template."""
+
+    def __init__(self, app: Callable):
+        """
+        Wrap an ASGI app.
+
+        Args:
+            app (Callable): The wrapped app.
+        """
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status_code = 500
+
+        async def send_with_status(message: Dict[str, Any]) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            # Reason: the matched route's template keeps ids in paths from creating a series per request
+            route = getattr(scope.get("route"), "path", "other")
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, method=scope["method"], route=route,
+                                         status=str(status_code))
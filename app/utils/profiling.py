@@ -0,0 +1,402 @@
+"""
+Profiling module for the Clinical Trials & FDA Data Search App.
+Profiles single search and chat requests on demand: a sampling profiler
+records the stacks of every busy thread and tracemalloc tracks memory while
+the request runs. The profile is stored as collapsed stacks, readable by
+flame graph tools such as speedscope or flamegraph.pl, and a JSON summary.
+Requests are profiled when they carry the admin X-Profile-Token header or
+are picked at PROFILE_SAMPLE_RATE. The middleware is only installed when one
+of them is configured, so profiling costs nothing when off.
+"""
+import hmac
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.utils.log import get_logger, get_request_id
+
+logger = get_logger(__name__)
+
+# Profile location, retention and triggers
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", str(PROJECT_ROOT / "data" / "profiles")))
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "100"))
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")  # Admin secret; empty disables the header trigger and the endpoints
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))  # Share of requests profiled without the header
+
+# Seconds between stack samples, and stack frames kept per memory allocation
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+PROFILE_TRACEMALLOC_FRAMES = 1
+
+# Header requesting a profile, and the response header naming it
+PROFILE_TOKEN_HEADER = "X-Profile-Token"
+PROFILE_ID_HEADER = "X-Profile-ID"
+
+# Request paths that can be profiled
+PROFILED_PATHS = ("/api/search", "/api/chat")
+
+# Leaf frames of threads waiting for work, left out of the samples
+IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+# Functions and allocation sites kept in the summary
+TOP_ENTRIES = 25
+
+PROFILE_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+# Reason: tracemalloc and the sampler are process-wide, so one request is profiled at a time
+_profile_lock = threading.Lock()
+
+
+def profiling_enabled(token: str = PROFILE_TOKEN, sample_rate: float = PROFILE_SAMPLE_RATE) -> bool:
+    """
+    Check whether any request can be profiled.
+
+    Args:
+        token (str): Admin token of the header trigger.
+        sample_rate (float): Share of requests profiled without the header.
+
+    Returns:
+        bool: True if the header trigger or sampling is configured.
+    """
+    return bool(token) or sample_rate > 0
+
+
+def token_matches(sent: Optional[str], token: str = PROFILE_TOKEN) -> bool:
+    """
+    Check an admin token in constant time.
+
+    Args:
+        sent (Optional[str]): Token sent by the client.
+        token (str): Configured token; an empty token matches nothing.
+
+    Returns:
+        bool: True if the tokens match.
+    """
+    return bool(token) and sent is not None and hmac.compare_digest(sent.encode("utf-8"), token.encode("utf-8"))
+
+
+def _frame_label(code: Any) -> str:
+    """Label a stack frame by function, file and line."""
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Samples the Python stacks of every busy thread from a background thread."""
+
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        """
+        Create an idle sampler.
+
+        Args:
+            interval (float): Seconds between samples.
+        """
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start sampling."""
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling and wait for the sampler thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        """Take samples until stopped."""
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            self.samples += 1
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in IDLE_LEAVES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                self.stacks[tuple(reversed(stack))] += 1
+
+    def folded(self) -> str:
+        """
+        Get the samples as collapsed stacks.
+
+        Returns:
+            str: One 'thread;outer;...;inner count' line per distinct stack.
+        """
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top_functions(self, limit: int = TOP_ENTRIES) -> List[Dict[str, Any]]:
+        """
+        Get the functions seen in the most samples.
+
+        Args:
+            limit (int): Number of functions.
+
+        Returns:
+            List[Dict[str, Any]]: Function label, samples with the function running ('self') and
+            samples with it anywhere on the stack ('total').
+        """
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for label in set(stack[1:]):
+                total[label] += count
+        return [{"function": label, "self": own[label], "total": count} for label, count in total.most_common(limit)]
+
+
+class RequestProfiler:
+    """Samples stacks and tracks memory while one request runs."""
+
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        """
+        Create a profiler.
+
+        Args:
+            interval (float): Seconds between stack samples.
+        """
+        self.sampler = StackSampler(interval)
+        self.started = 0.0
+        self.seconds = 0.0
+        self.memory: Dict[str, Any] = {}
+        self._traced_here = False
+
+    def start(self) -> None:
+        """Start sampling and memory tracking."""
+        self._traced_here = not tracemalloc.is_tracing()
+        if self._traced_here:
+            tracemalloc.start(PROFILE_TRACEMALLOC_FRAMES)
+        tracemalloc.reset_peak()
+        self.started = time.perf_counter()
+        self.sampler.start()
+
+    def stop(self) -> None:
+        """Stop sampling and record the memory peak and largest allocation sites."""
+        self.sampler.stop()
+        self.seconds = time.perf_counter() - self.started
+        current, peak = tracemalloc.get_traced_memory()
+        top = tracemalloc.take_snapshot().statistics("lineno")[:TOP_ENTRIES]
+        if self._traced_here:
+            tracemalloc.stop()
+        self.memory = {
+            "current_mb": current / 2**20,
+            "peak_mb": peak / 2**20,
+            "top_allocations": [{"site": str(stat.traceback[0]), "size_mb": stat.size / 2**20, "count": stat.count} for stat in top],
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Summarize the profile.
+
+        Returns:
+            Dict[str, Any]: Duration, sample counts, top functions and memory use.
+        """
+        return {
+            "seconds": self.seconds,
+            "interval": self.sampler.interval,
+            "samples": self.sampler.samples,
+            "top_functions": self.sampler.top_functions(),
+            "memory": self.memory,
+        }
+
+
+class ProfileStore:
+    """Stored profiles: a JSON summary and collapsed stacks per profile id."""
+
+    def __init__(self, root: Path = PROFILE_DIR, max_files: int = PROFILE_MAX_FILES):
+        """
+        Open a profile directory.
+
+        Args:
+            root (Path): Directory holding the profiles.
+            max_files (int): Profiles kept; the oldest are deleted beyond it.
+        """
+        self.root = Path(root)
+        self.max_files = max_files
+
+    def _path(self, profile_id: str, suffix: str) -> Path:
+        """
+        Get a profile file.
+
+        Raises:
+            ValueError: If the id is malformed.
+        """
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            raise ValueError(f"Invalid profile id '{profile_id}'")
+        return self.root / f"{profile_id}{suffix}"
+
+    def save(self, profile_id: str, summary: Dict[str, Any], folded: str) -> None:
+        """
+        Save a profile and delete the oldest beyond max_files.
+
+        Args:
+            profile_id (str): The profile id.
+            summary (Dict[str, Any]): The JSON summary.
+            folded (str): Collapsed stacks.
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._path(profile_id, ".folded").write_text(folded, encoding="utf-8")
+        # Reason: the summary is written last, so listed profiles are complete
+        self._path(profile_id, ".json").write_text(json.dumps(summary, indent=2), encoding="utf-8")
+        for path in self._summaries()[self.max_files:]:
+            path.unlink(missing_ok=True)
+            path.with_suffix(".folded").unlink(missing_ok=True)
+
+    def _summaries(self) -> List[Path]:
+        """Get the summary files, newest first."""
+        if not self.root.is_dir():
+            return []
+        return sorted(self.root.glob("*.json"), key=lambda path: path.stat().st_mtime, reverse=True)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """
+        List the stored profiles, newest first.
+
+        Returns:
+            List[Dict[str, Any]]: The summaries without their function and allocation tables.
+        """
+        profiles = []
+        for path in self._summaries():
+            try:
+                summary = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            profiles.append({key: value for key, value in summary.items() if key not in ("top_functions", "memory")})
+        return profiles
+
+    def load(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Load a profile's summary.
+
+        Args:
+            profile_id (str): The profile id.
+
+        Returns:
+            Optional[Dict[str, Any]]: The summary, or None if there is no such profile.
+        """
+        try:
+            return json.loads(self._path(profile_id, ".json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def folded(self, profile_id: str) -> Optional[str]:
+        """
+        Load a profile's collapsed stacks.
+
+        Args:
+            profile_id (str): The profile id.
+
+        Returns:
+            Optional[str]: The stacks, or None if there is no such profile.
+        """
+        try:
+            return self._path(profile_id, ".folded").read_text(encoding="utf-8")
+        except (OSError, ValueError):
+            return None
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling requested or sampled search and chat requests."""
+
+    def __init__(
+        self,
+        app: Callable,
+        store: Optional[ProfileStore] = None,
+        token: str = PROFILE_TOKEN,
+        sample_rate: float = PROFILE_SAMPLE_RATE,
+        interval: float = PROFILE_INTERVAL,
+    ):
+        """
+        Wrap an ASGI app.
+
+        Args:
+            app (Callable): The wrapped app.
+            store (Optional[ProfileStore]): Where profiles are saved (defaults to PROFILE_DIR).
+            token (str): Admin token of the X-Profile-Token header trigger.
+            sample_rate (float): Share of requests profiled without the header.
+            interval (float): Seconds between stack samples.
+        """
+        self.app = app
+        self.store = store or ProfileStore()
+        self.token = token
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self._header = PROFILE_TOKEN_HEADER.lower().encode("latin-1")
+
+    def _wanted(self, scope: Dict[str, Any]) -> Tuple[bool, str]:
+        """Decide whether to profile a request, and why."""
+        if not scope["path"].startswith(PROFILED_PATHS):
+            return False, ""
+        sent = next((value.decode("latin-1") for name, value in scope["headers"] if name == self._header), None)
+        if token_matches(sent, self.token):
+            return True, "header"
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return True, "sampled"
+        return False, ""
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        wanted, trigger = self._wanted(scope) if scope["type"] == "http" else (False, "")
+        if not wanted:
+            await self.app(scope, receive, send)
+            return
+        if not _profile_lock.acquire(blocking=False):
+            logger.info("Skipping profile of %s; another request is being profiled", scope["path"])
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+        status_code = 500
+
+        async def send_with_id(message: Dict[str, Any]) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(PROFILE_ID_HEADER.lower().encode("latin-1"),
+                                                                          profile_id.encode("latin-1"))]
+            await send(message)
+
+        profiler = RequestProfiler(self.interval)
+        try:
+            profiler.start()
+            try:
+                await self.app(scope, receive, send_with_id)
+            finally:
+                profiler.stop()
+                summary = {
+                    "profile_id": profile_id,
+                    "created_at": time.time(),
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status_code,
+                    "trigger": trigger,
+                    "request_id": get_request_id(),
+                    **profiler.summary(),
+                }
+                self.store.save(profile_id, summary, profiler.sampler.folded())
+                logger.info("Saved profile %s of %s %s (%.3fs)", profile_id, scope["method"], scope["path"], profiler.seconds)
+        finally:
+            _profile_lock.release()
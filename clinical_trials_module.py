@@ -1,172 +1,420 @@
+import os
+import re
+import numpy as np
 import requests
 import pandas as pd
 from dateutil.parser import parse
 from dateutil.parser import ParserError  
+from app.utils.log import get_logger
+from app.utils.metrics import STAGE_SECONDS, UPSTREAM_ERRORS, UPSTREAM_REQUEST_SECONDS, UPSTREAM_RETRIES, UPSTREAM_TIMEOUTS
 
-def get_clinical_trials_data(COND):
-    base_url = "https://clinicaltrials.gov/api/v2/studies"
+logger = get_logger(__name__)
+
+# ClinicalTrials.gov API v2 base URL, switchable to a local stand-in for offline runs
+CLINICAL_TRIALS_API_URL = os.getenv('CLINICAL_TRIALS_API_URL', 'https://clinicaltrials.gov/api/v2').rstrip('/')
+
+# Connect and read timeout of each studies API request, so a stalled connection releases its admission slot
+CTGOV_TIMEOUT_SECONDS = float(os.getenv('CTGOV_TIMEOUT_SECONDS', '30'))
+
+# Attempts per studies API page; timeouts and these transient statuses are retried
+CTGOV_MAX_RETRIES = int(os.getenv('CTGOV_MAX_RETRIES', '3'))
+CTGOV_RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Date columns parsed after normalization
+DATE_COLUMNS = ['statusVerifiedDate','startDate', 'completionDate', 'studyFirstSubmitDate', 'studyFirstPostDate', 'lastUpdatePostDate']
+
+# Eligibility ages converted to years, so age windows are numeric range queries
+AGE_COLUMNS = ['eligibilityMinimumAgeYears', 'eligibilityMaximumAgeYears']
+AGE_UNIT_YEARS = {
+    'year': 1.0,
+    'month': 1 / 12,
+    'week': 7 / 365.25,
+    'day': 1 / 365.25,
+    'hour': 1 / (24 * 365.25),
+    'minute': 1 / (60 * 24 * 365.25),
+}
+AGE_PATTERN = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([a-z]+?)s?\s*$', re.IGNORECASE)
+
+# Bit flags of the sexes a trial accepts; 0 when the sex eligibility is not recorded
+SEX_FEMALE = 1
+SEX_MALE = 2
+SEX_CODES = {'FEMALE': SEX_FEMALE, 'MALE': SEX_MALE, 'ALL': SEX_FEMALE | SEX_MALE}
+
+# Comma-joined columns mapped to the per-trial lists of the same values, which filters and
+# counts read because values such as "Korea, Republic of" contain the separator
+LIST_COLUMNS = {'phases': 'phaseList', 'country': 'countryList'}
+
+
+def normalize_study(study):
+    """
+    Flatten one ClinicalTrials.gov v2 study record into a single row.
+
+    Args:
+        study (dict): Study JSON as returned by the studies API or the bulk export.
+
+    Returns:
+        dict: Flat column values for the study.
+    """
+    flat_data = {}
+    
+    # Extract identification module
+    identification = study.get('protocolSection', {}).get('identificationModule', {})
+    flat_data['nctId'] = identification.get('nctId')
+    flat_data['organization'] = identification.get('organization', {}).get('fullName')
+    flat_data['organizationType'] = identification.get('organization', {}).get('class')
+    flat_data['briefTitle'] = identification.get('briefTitle')
+    flat_data['officialTitle'] = identification.get('officialTitle')
+    
+    # Extract status module
+    status = study.get('protocolSection', {}).get('statusModule', {})
+    flat_data['statusVerifiedDate'] = status.get('statusVerifiedDate')
+    flat_data['overallStatus'] = status.get('overallStatus')
+    flat_data['hasExpandedAccess'] = status.get('expandedAccessInfo', {}).get('hasExpandedAccess')
+    flat_data['startDate'] = status.get('startDateStruct', {}).get('date')
+    flat_data['completionDate'] = status.get('completionDateStruct', {}).get('date')
+    flat_data['completionDateType'] = status.get('completionDateStruct', {}).get('type')
+    flat_data['studyFirstSubmitDate'] = status.get('studyFirstSubmitDate')
+    flat_data['studyFirstPostDate'] = status.get('studyFirstPostDateStruct', {}).get('date')
+    flat_data['lastUpdatePostDate'] = status.get('lastUpdatePostDateStruct', {}).get('date')
+    flat_data['lastUpdatePostDateType'] = status.get('lastUpdatePostDateStruct', {}).get('type')
+
+    #Results status
+    flat_data['HasResults'] = study.get('hasResults')
+    
+    # Extract sponsor collaborators module
+    sponsor = study.get('protocolSection', {}).get('sponsorCollaboratorsModule', {})
+    flat_data['responsibleParty'] = sponsor.get('responsibleParty', {}).get('oldNameTitle')
+    flat_data['leadSponsor'] = sponsor.get('leadSponsor', {}).get('name')
+    flat_data['leadSponsorType'] = sponsor.get('leadSponsor', {}).get('class')
+    flat_data['collaborators'] = ', '.join([collab.get('name') for collab in sponsor.get('collaborators', [])])
+    flat_data['collaboratorsType'] = ', '.join([collab.get('class') for collab in sponsor.get('collaborators', [])])
+    
+    # Extract description module
+    description = study.get('protocolSection', {}).get('descriptionModule', {})
+    flat_data['briefSummary'] = description.get('briefSummary')
+    flat_data['detailedDescription'] = description.get('detailedDescription')
+    
+    # Extract conditions module
+    conditions = study.get('protocolSection', {}).get('conditionsModule', {})
+    flat_data['conditions'] = ', '.join(conditions.get('conditions', []))
+    
+    # Extract design module
+    design = study.get('protocolSection', {}).get('designModule', {})
+    flat_data['studyType'] = design.get('studyType')
+    flat_data['phases'] = ', '.join(design.get('phases', []))
+    flat_data['phaseList'] = list(design.get('phases', []))
+    flat_data['allocation'] = design.get('designInfo', {}).get('allocation')
+    flat_data['interventionModel'] = design.get('designInfo', {}).get('interventionModel')
+    flat_data['primaryPurpose'] = design.get('designInfo', {}).get('primaryPurpose')
+    flat_data['masking'] = design.get('designInfo', {}).get('maskingInfo', {}).get('masking')
+    flat_data['whoMasked'] = ', '.join(design.get('designInfo', {}).get('maskingInfo', {}).get('whoMasked', []))
+    flat_data['enrollmentCount'] = design.get('enrollmentInfo', {}).get('count')
+    flat_data['enrollmentType'] = design.get('enrollmentInfo', {}).get('type')
+    
+    # Extract arms interventions module
+    arms = study.get('protocolSection', {}).get('armsInterventionsModule', {}).get('armGroups', [])
+    flat_data['arms'] = ', '.join([arm.get('label') for arm in arms])
+    flat_data['interventions'] = ', '.join({intervention for arm in arms for intervention in arm.get('interventionNames', [])})
+
+     #interventions name
+    interventions = study.get('protocolSection', {}).get('armsInterventionsModule', {}).get('interventions', [])
+    flat_data['interventionDrug'] = ', '.join([intervention.get('name', '') for intervention in interventions 
+                                       if intervention.get('type', '').lower() == 'drug'])
+    flat_data['interventionBiological'] = ', '.join([intervention.get('name', '') for intervention in interventions 
+                                                    if intervention.get('type', '').lower() == 'biological'])
+    flat_data['interventioOthers'] = ', '.join([intervention.get('name', '') for intervention in interventions 
+                                                if intervention.get('type', '').lower() not in ['drug', 'biological']])
+    flat_data['interventionDescription'] = '\n'.join([f"{intervention.get('name', '')}: {intervention.get('description', '')}" for intervention 
+                                                      in interventions])
+
+    # Extract the outcome module
+    outcome = study.get('protocolSection', {}).get('outcomesModule', {})
+    flat_data['primaryOutcomes'] = '\n'.join([
+                                                f"Primary Outcome {i + 1}: {primary_outcome.get('measure', None) or 'None'}"
+                                                for i, primary_outcome in enumerate(outcome.get('primaryOutcomes', []))
+                                            ])
+    flat_data['secondaryOutcomes'] = '\n'.join([
+                                                f"Secondary Outcome {i + 1}: {primary_outcome.get('measure', None) or 'None'}"
+                                                for i, primary_outcome in enumerate(outcome.get('secondaryOutcomes', []))
+                                            ])
+    #Extract Eligibility
+    eligibility = study.get('protocolSection',{}).get('eligibilityModule',{})
+    flat_data['eligibilityCriteria'] = eligibility.get('eligibilityCriteria')
+    flat_data['healthyVolunteers'] = eligibility.get('healthyVolunteers')
+    flat_data['eligibilityGender'] = eligibility.get('sex')
+    flat_data['eligibilityMinimumAge'] = eligibility.get('minimumAge')
+    flat_data['eligibilityMaximumAge'] = eligibility.get('maximumAge')
+    flat_data['eligibilityStandardAges'] = eligibility.get('stdAges')
+    flat_data['eligibilityMinimumAgeYears'] = parse_age_years(eligibility.get('minimumAge'))
+    flat_data['eligibilityMaximumAgeYears'] = parse_age_years(eligibility.get('maximumAge'))
+    flat_data['eligibilitySexCode'] = SEX_CODES.get(eligibility.get('sex'), 0)
+
+    #Extract the locations
+    locations = study.get('protocolSection',{}).get('contactsLocationsModule',{}).get('locations',{})
+    if locations is not None:
+        flat_data['LocationName'] = ', '.join(set(location.get('facility') or '' for location in locations)) if locations is not None else ''
+        flat_data['city'] = ', '.join(set(location.get('city') or '' for location in locations)) if locations is not None else '' 
+        flat_data['state'] = ', '.join(set(location.get('state') or '' for location in locations)) if locations is not None else '' 
+        flat_data['country'] = ', '.join(set(location.get('country') or '' for location in locations)) if locations is not None else '' 
+    flat_data['countryList'] = sorted({location.get('country') for location in locations or [] if location.get('country')})
+
+    return flat_data
+
+
+def parse_date(date_str):
+    """
+    Parse a ClinicalTrials.gov date, defaulting missing month and day parts to 1.
+
+    Args:
+        date_str (str): Date string such as "2020", "2020-05" or "2020-05-17".
+
+    Returns:
+        datetime: The parsed date, or NaT if it cannot be parsed.
+    """
+    if pd.isna(date_str):
+        return pd.NaT
+    if isinstance(date_str, list):
+        date_str = date_str[0] if date_str else None
+    if not date_str:
+        return pd.NaT
+    try:
+        # Parse the date, set day to 1 if only year and month are provided
+        parsed_date = parse(date_str, default=parse('2000-01-01'))
+        if len(date_str) <= 7:  # If only year or year-month is provided
+            return parsed_date.replace(day=1)
+        return parsed_date
+    except ParserError:
+        return pd.NaT
+
+
+def parse_age_years(age_str):
+    """
+    Convert a ClinicalTrials.gov eligibility age to years.
+
+    Args:
+        age_str (str): Age such as "18 Years", "6 Months" or "28 Days".
+
+    Returns:
+        float: The age in years, or None if it is missing or cannot be parsed.
+    """
+    if not isinstance(age_str, str):
+        return None
+    match = AGE_PATTERN.match(age_str)
+    if not match or match.group(2).lower() not in AGE_UNIT_YEARS:
+        return None
+    return float(match.group(1)) * AGE_UNIT_YEARS[match.group(2).lower()]
+
+
+def convert_numeric_columns(df):
+    """
+    Parse the date columns and store the eligibility ages as floats.
+
+    Args:
+        df (pd.DataFrame): Normalized studies.
+
+    Returns:
+        pd.DataFrame: The same frame with converted columns.
+    """
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].apply(parse_date)
+    for col in AGE_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(float)
+    return df
+
+
+def age_window_mask(df, min_years=None, max_years=None):
+    """
+    Select the trials whose eligible ages overlap an age window.
+
+    A missing minimum or maximum age means the trial has no limit on that side.
+    With min_years equal to max_years this selects the trials open to one age.
+
+    Args:
+        df (pd.DataFrame): Studies with the AGE_COLUMNS.
+        min_years (float, optional): Youngest age of the window.
+        max_years (float, optional): Oldest age of the window.
+
+    Returns:
+        pd.Series: Boolean mask over the rows of df.
+    """
+    low = pd.to_numeric(df['eligibilityMinimumAgeYears'], errors='coerce').fillna(0.0)
+    high = pd.to_numeric(df['eligibilityMaximumAgeYears'], errors='coerce').fillna(np.inf)
+    mask = pd.Series(True, index=df.index)
+    if max_years is not None:
+        mask &= low <= max_years
+    if min_years is not None:
+        mask &= high >= min_years
+    return mask
+
+
+def sex_mask(df, sex):
+    """
+    Select the trials accepting participants of a sex.
+
+    Args:
+        df (pd.DataFrame): Studies with the eligibilitySexCode column.
+        sex (str): 'FEMALE', 'MALE', or 'ALL' for trials accepting both.
+
+    Returns:
+        pd.Series: Boolean mask over the rows of df.
+    """
+    code = SEX_CODES[sex.upper()]
+    codes = pd.to_numeric(df['eligibilitySexCode'], errors='coerce').fillna(0).astype(int)
+    return (codes & code) == code
+
+
+# Normalized rows between progress reports
+PROGRESS_INTERVAL = 1000
+
+
+def studies_to_dataframe(studies, progress=None):
+    """
+    Normalize study records and parse their date columns.
+
+    Args:
+        studies (list): Study JSON records.
+        progress (callable, optional): Called as progress(rows_normalized=n) while normalizing.
+
+    Returns:
+        pd.DataFrame: One row per study.
+    """
+    # Normalize all studies
+    with STAGE_SECONDS.time(stage="normalize"):
+        normalized_data = []
+        for study in studies:
+            normalized_data.append(normalize_study(study))
+            if progress is not None and len(normalized_data) % PROGRESS_INTERVAL == 0:
+                progress(rows_normalized=len(normalized_data))
+        if progress is not None:
+            progress(rows_normalized=len(normalized_data))
+
+        # Convert to DataFrame
+        df = pd.DataFrame(normalized_data)
+
+    # Convert date and age columns
+    with STAGE_SECONDS.time(stage="date_parsing"):
+        return convert_numeric_columns(df)
+
+
+def fetch_studies_page(url, params, request):
+    """
+    Get one page of the studies API, retrying timeouts and transient error statuses.
+
+    Args:
+        url (str): Studies endpoint URL.
+        params (dict): Query parameters of the page.
+        request (str): Request label of the latency metric, 'first_page' or 'next_page'.
+
+    Returns:
+        dict: The page JSON.
+
+    Raises:
+        requests.exceptions.RequestException: If the last of CTGOV_MAX_RETRIES attempts fails,
+            or the API answers with a status that is not retried.
+    """
+    for retry in range(CTGOV_MAX_RETRIES):
+        last_attempt = retry + 1 == CTGOV_MAX_RETRIES
+        try:
+            with UPSTREAM_REQUEST_SECONDS.time(source="ctgov", request=request):
+                response = requests.get(url, params=params, timeout=CTGOV_TIMEOUT_SECONDS)
+            if response.status_code in CTGOV_RETRY_STATUSES and not last_attempt:
+                UPSTREAM_RETRIES.inc(source="ctgov")
+                logger.warning("Studies API returned %s (attempt %d/%d). Retrying...", response.status_code, retry + 1, CTGOV_MAX_RETRIES)
+                continue
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.Timeout:
+            UPSTREAM_TIMEOUTS.inc(source="ctgov")
+            if last_attempt:
+                UPSTREAM_ERRORS.inc(source="ctgov")
+                raise
+            UPSTREAM_RETRIES.inc(source="ctgov")
+            logger.warning("Request timed out (attempt %d/%d). Retrying...", retry + 1, CTGOV_MAX_RETRIES)
+        except requests.exceptions.RequestException as e:
+            UPSTREAM_ERRORS.inc(source="ctgov")
+            logger.error("Error fetching data: %s", e)
+            raise
+
+
+def fetch_studies(COND, max_records=None, progress=None):
+    """
+    Page through the ClinicalTrials.gov studies API for a search term.
+
+    Args:
+        COND (str): Search term.
+        max_records (int, optional): Stop after this many studies, in the API's relevance order.
+            Defaults to None, which fetches every match.
+        progress (callable, optional): Called as progress(pages_fetched=n, total=total) after each page.
+
+    Returns:
+        tuple: (list of study JSON records, total number of matching studies or None if unknown).
+
+    Raises:
+        requests.exceptions.RequestException: If a page still fails after its retries, so a
+            failed download is never returned as a truncated one.
+    """
+    base_url = f"{CLINICAL_TRIALS_API_URL}/studies"
     params = {
         "query.term": str(COND),
-        "pageSize": 1000,
+        "pageSize": 1000 if max_records is None else max(1, min(1000, max_records)),
+        "countTotal": "true",
         "pageToken": None  # Set initial page token to None
     }
 
     all_studies = {}
+    total = None
     i = 0
     while True:
-        response = requests.get(base_url, params=params)
-        
-        if response.status_code == 200:
-            data = response.json()
-            studies = data.get("studies", [])
-            
-            if i == 0:
-                all_studies.update(data)  # Add the studies from this page to the dictionary
-                page_token = data.get("nextPageToken")
-            elif i > 0:
-                # Extend the studies list with new studies
-                all_studies["studies"].extend(data.get("studies", []))
-                page_token = data.get("nextPageToken")
-            if not page_token:
-                break  # Exit the loop when there are no more pages
-            params['pageToken'] = page_token  # Set the page token for the next request
-            i += 1
-            print(f"Page {i} processed")
-        else:
-            print(f"Error fetching data: {response.status_code}")
-            break  # Exit on error
-
-    def normalize_study(study):
-        flat_data = {}
-        
-        # Extract identification module
-        identification = study.get('protocolSection', {}).get('identificationModule', {})
-        flat_data['nctId'] = identification.get('nctId')
-        flat_data['organization'] = identification.get('organization', {}).get('fullName')
-        flat_data['organizationType'] = identification.get('organization', {}).get('class')
-        flat_data['briefTitle'] = identification.get('briefTitle')
-        flat_data['officialTitle'] = identification.get('officialTitle')
-        
-        # Extract status module
-        status = study.get('protocolSection', {}).get('statusModule', {})
-        flat_data['statusVerifiedDate'] = status.get('statusVerifiedDate')
-        flat_data['overallStatus'] = status.get('overallStatus')
-        flat_data['hasExpandedAccess'] = status.get('expandedAccessInfo', {}).get('hasExpandedAccess')
-        flat_data['startDate'] = status.get('startDateStruct', {}).get('date')
-        flat_data['completionDate'] = status.get('completionDateStruct', {}).get('date')
-        flat_data['completionDateType'] = status.get('completionDateStruct', {}).get('type')
-        flat_data['studyFirstSubmitDate'] = status.get('studyFirstSubmitDate')
-        flat_data['studyFirstPostDate'] = status.get('studyFirstPostDateStruct', {}).get('date')
-        flat_data['lastUpdatePostDate'] = status.get('lastUpdatePostDateStruct', {}).get('date')
-        flat_data['lastUpdatePostDateType'] = status.get('lastUpdatePostDateStruct', {}).get('type')
-
-        #Results status
-        flat_data['HasResults'] = study.get('hasResults')
-        
-        # Extract sponsor collaborators module
-        sponsor = study.get('protocolSection', {}).get('sponsorCollaboratorsModule', {})
-        flat_data['responsibleParty'] = sponsor.get('responsibleParty', {}).get('oldNameTitle')
-        flat_data['leadSponsor'] = sponsor.get('leadSponsor', {}).get('name')
-        flat_data['leadSponsorType'] = sponsor.get('leadSponsor', {}).get('class')
-        flat_data['collaborators'] = ', '.join([collab.get('name') for collab in sponsor.get('collaborators', [])])
-        flat_data['collaboratorsType'] = ', '.join([collab.get('class') for collab in sponsor.get('collaborators', [])])
-        
-        # Extract description module
-        description = study.get('protocolSection', {}).get('descriptionModule', {})
-        flat_data['briefSummary'] = description.get('briefSummary')
-        flat_data['detailedDescription'] = description.get('detailedDescription')
-        
-        # Extract conditions module
-        conditions = study.get('protocolSection', {}).get('conditionsModule', {})
-        flat_data['conditions'] = ', '.join(conditions.get('conditions', []))
-        
-        # Extract design module
-        design = study.get('protocolSection', {}).get('designModule', {})
-        flat_data['studyType'] = design.get('studyType')
-        flat_data['phases'] = ', '.join(design.get('phases', []))
-        flat_data['allocation'] = design.get('designInfo', {}).get('allocation')
-        flat_data['interventionModel'] = design.get('designInfo', {}).get('interventionModel')
-        flat_data['primaryPurpose'] = design.get('designInfo', {}).get('primaryPurpose')
-        flat_data['masking'] = design.get('designInfo', {}).get('maskingInfo', {}).get('masking')
-        flat_data['whoMasked'] = ', '.join(design.get('designInfo', {}).get('maskingInfo', {}).get('whoMasked', []))
-        flat_data['enrollmentCount'] = design.get('enrollmentInfo', {}).get('count')
-        flat_data['enrollmentType'] = design.get('enrollmentInfo', {}).get('type')
-        
-        # Extract arms interventions module
-        arms = study.get('protocolSection', {}).get('armsInterventionsModule', {}).get('armGroups', [])
-        flat_data['arms'] = ', '.join([arm.get('label') for arm in arms])
-        flat_data['interventions'] = ', '.join({intervention for arm in arms for intervention in arm.get('interventionNames', [])})
-
-         #interventions name
-        interventions = study.get('protocolSection', {}).get('armsInterventionsModule', {}).get('interventions', [])
-        flat_data['interventionDrug'] = ', '.join([intervention.get('name', '') for intervention in interventions 
-                                           if intervention.get('type', '').lower() == 'drug'])
-        flat_data['interventionBiological'] = ', '.join([intervention.get('name', '') for intervention in interventions 
-                                                        if intervention.get('type', '').lower() == 'biological'])
-        flat_data['interventioOthers'] = ', '.join([intervention.get('name', '') for intervention in interventions 
-                                                    if intervention.get('type', '').lower() not in ['drug', 'biological']])
-        flat_data['interventionDescription'] = '\n'.join([f"{intervention.get('name', '')}: {intervention.get('description', '')}" for intervention 
-                                                          in interventions])
-
-        # Extract the outcome module
-        outcome = study.get('protocolSection', {}).get('outcomesModule', {})
-        flat_data['primaryOutcomes'] = '\n'.join([
-                                                    f"Primary Outcome {i + 1}: {primary_outcome.get('measure', None) or 'None'}"
-                                                    for i, primary_outcome in enumerate(outcome.get('primaryOutcomes', []))
-                                                ])
-        flat_data['secondaryOutcomes'] = '\n'.join([
-                                                    f"Secondary Outcome {i + 1}: {primary_outcome.get('measure', None) or 'None'}"
-                                                    for i, primary_outcome in enumerate(outcome.get('secondaryOutcomes', []))
-                                                ])
-        #Extract Eligibility
-        eligibility = study.get('protocolSection',{}).get('eligibilityModule',{})
-        flat_data['eligibilityCriteria'] = eligibility.get('eligibilityCriteria')
-        flat_data['healthyVolunteers'] = eligibility.get('healthyVolunteers')
-        flat_data['eligibilityGender'] = eligibility.get('sex')
-        flat_data['eligibilityMinimumAge'] = eligibility.get('minimumAge')
-        flat_data['eligibilityMaximumAge'] = eligibility.get('maximumAge')
-        flat_data['eligibilityStandardAges'] = eligibility.get('stdAges')
-
-        #Extract the locations
-        locations = study.get('protocolSection',{}).get('contactsLocationsModule',{}).get('locations',{})
-        if locations is not None:
-            flat_data['LocationName'] = ', '.join(set(location.get('facility') or '' for location in locations)) if locations is not None else ''
-            flat_data['city'] = ', '.join(set(location.get('city') or '' for location in locations)) if locations is not None else '' 
-            flat_data['state'] = ', '.join(set(location.get('state') or '' for location in locations)) if locations is not None else '' 
-            flat_data['country'] = ', '.join(set(location.get('country') or '' for location in locations)) if locations is not None else '' 
-
-        return flat_data
+        data = fetch_studies_page(base_url, params, "first_page" if i == 0 else "next_page")
+        studies = data.get("studies", [])
 
-    # Normalize all studies
-    normalized_data = [normalize_study(study) for study in all_studies.get('studies', [])]
-
-    # Convert to DataFrame
-    df = pd.DataFrame(normalized_data)
-
-    def parse_date(date_str):
-        if pd.isna(date_str):
-            return pd.NaT
-        if isinstance(date_str, list):
-            date_str = date_str[0] if date_str else None
-        if not date_str:
-            return pd.NaT
-        try:
-            # Parse the date, set day to 1 if only year and month are provided
-            parsed_date = parse(date_str, default=parse('2000-01-01'))
-            if len(date_str) <= 7:  # If only year or year-month is provided
-                return parsed_date.replace(day=1)
-            return parsed_date
-        except ParserError:
-            return pd.NaT
-
-    # Convert date columns
-    date_columns = ['statusVerifiedDate','startDate', 'completionDate', 'studyFirstSubmitDate', 'studyFirstPostDate', 'lastUpdatePostDate']
-    
-    for col in date_columns:
-        df[col] = df[col].apply(parse_date)
-    
-    return df
+        if i == 0:
+            all_studies.update(data)  # Add the studies from this page to the dictionary
+            total = data.get("totalCount")
+            page_token = data.get("nextPageToken")
+        elif i > 0:
+            # Extend the studies list with new studies
+            all_studies["studies"].extend(data.get("studies", []))
+            page_token = data.get("nextPageToken")
+        if progress is not None:
+            progress(pages_fetched=i + 1, total=total)
+        if max_records is not None and len(all_studies.get("studies", [])) >= max_records:
+            break  # Exit the loop once enough studies have been collected
+        if not page_token:
+            break  # Exit the loop when there are no more pages
+        params['pageToken'] = page_token  # Set the page token for the next request
+        i += 1
+        logger.debug("Page %d processed", i)
+
+    studies = all_studies.get('studies', [])
+    if max_records is not None:
+        studies = studies[:max_records]
+    return studies, total
+
+
+def get_clinical_trials_data(COND, progress=None):
+    studies, _ = fetch_studies(COND, progress=progress)
+    return studies_to_dataframe(studies, progress)
+
+
+def get_clinical_trials_candidates(COND, max_records, progress=None):
+    """
+    Fetch the best-matching studies for a search term without paging through every match.
+
+    Args:
+        COND (str): Search term.
+        max_records (int): Maximum number of studies to fetch, in the API's relevance order.
+        progress (callable, optional): Progress callback, as for fetch_studies and studies_to_dataframe.
+
+    Returns:
+        tuple: (pd.DataFrame of studies, exact total number of matching studies).
+    """
+    studies, total = fetch_studies(COND, max_records, progress)
+    df = studies_to_dataframe(studies, progress)
+    return df, total if total is not None else len(df)
     
 
 # Example usage:
-# df = get_clinical_trials_data("Novartis")
\ No newline at end of file
+# df = get_clinical_trials_data("Novartis")
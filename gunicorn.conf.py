@@ -0,0 +1,42 @@
+"""
+Gunicorn configuration for production deployments of the Clinical Trials & FDA Data Search App.
+Runs several uvicorn worker processes under gunicorn, which restarts workers
+that exit. The workers share cached search results and the memory-mapped
+local mirrors through the data directory, so adding a worker adds throughput
+without another copy of the data.
+
+Usage:
+    gunicorn -c gunicorn.conf.py app.main:app
+    WEB_CONCURRENCY=8 gunicorn -c gunicorn.conf.py app.main:app
+"""
+import multiprocessing
+import os
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Searches of large result sets run for minutes; a worker silent for longer is restarted
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "300"))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then, staggered, so memory growth is bounded
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = max_requests // 10
+
+# Reason: the app starts threads and sandbox processes at import and startup, which do not survive a fork
+preload_app = False
+
+# Follow-up requests of a search can reach any worker, so every worker shares the search cache
+os.environ.setdefault("SEARCH_CACHE_SHARED", "1")
+
+
+def on_starting(server):
+    """Write the mapped copies of the local mirrors once, before the workers start."""
+    from app.data import ct_mirror, fda_mirror
+    from app.data.columnar import mapped_copy
+
+    for path in (ct_mirror.CT_MIRROR_DIR / ct_mirror.TRIALS_FILE, fda_mirror.FDA_MIRROR_DIR / fda_mirror.LABELS_FILE):
+        if path.is_file():
+            server.log.info("Mapped mirror copy %s", mapped_copy(path))
@@ -1,12 +1,55 @@
+import os
 import requests
 import re
 import pandas as pd
 from filter_parser import Filter_Parser_Data
+from app.utils.log import get_logger
+from app.utils.metrics import UPSTREAM_ERRORS, UPSTREAM_REQUEST_SECONDS, UPSTREAM_RETRIES, UPSTREAM_TIMEOUTS
+
+logger = get_logger(__name__)
+
+# openFDA API base URL, switchable to a local stand-in for offline runs
+OPENFDA_API_URL = os.getenv('OPENFDA_API_URL', 'https://api.fda.gov').rstrip('/')
 
 
 class Open_FDA:
     """A class for fetching and processing data from the Open FDA API."""
 
+    # Label fields kept from the API results and the bulk download files
+    needed_column_names = {
+        'adverse_reactions',
+        'application_number',
+        'brand_name',
+        'clinical_pharmacology',
+        'clinical_studies',
+        'contraindications',
+        'description',
+        'dosage_and_administration',
+        'drug_interactions',
+        'generic_name',
+        'how_supplied',
+        'indications_and_usage',
+        'information_for_patients',
+        'is_original_packager',
+        'manufacturer_name',
+        'mechanism_of_action',
+        'pharm_class_cs',
+        'pharm_class_epc',
+        'pharm_class_moa',
+        'pharmacodynamics',
+        'pharmacokinetics',
+        'product_type',
+        'route',
+        'substance_name',
+        'upc',
+        'warnings',
+        'warnings_and_cautions',
+        'laboratory_tests',
+        'drug_interactions',
+        'precautions',
+        'adverse_reactions'
+        }
+
     @staticmethod
     def total_rows_in_openfda(user_keyword, keyword_domain, timeout=5, max_retries=3):
         """
@@ -25,18 +68,21 @@ class Open_FDA:
         for retry in range(max_retries):
             try:
                 timeout_occurred = False
-                response = requests.get(api_url, timeout=timeout)
+                with UPSTREAM_REQUEST_SECONDS.time(source="openfda", request="total"):
+                    response = requests.get(api_url, timeout=timeout)
                 response.raise_for_status()
                 if response.status_code == 200:
                     data = response.json()
                     return data["meta"]["results"]["total"]
             except requests.exceptions.Timeout:
                 timeout_occurred = True
-                print(
-                    f"Request timed out (attempt {retry+1}/{max_retries}). Retrying..."
-                )
+                UPSTREAM_TIMEOUTS.inc(source="openfda")
+                if retry + 1 < max_retries:
+                    UPSTREAM_RETRIES.inc(source="openfda")
+                logger.warning("Request timed out (attempt %d/%d). Retrying...", retry + 1, max_retries)
             except requests.exceptions.RequestException as e:
-                print("Error:", e)
+                UPSTREAM_ERRORS.inc(source="openfda")
+                logger.error("Error: %s", e)
                 break
 
             if not timeout_occurred:
@@ -58,9 +104,9 @@ class Open_FDA:
             str: The generated API URL.
         """
         if keyword_domain == "disease":
-            open_fda_api_url = f'https://api.fda.gov/drug/label.json?search=indications_and_usage:"{user_keyword}"&limit={limit}'
+            open_fda_api_url = f'{OPENFDA_API_URL}/drug/label.json?search=indications_and_usage:"{user_keyword}"&limit={limit}'
         elif keyword_domain == "drug":
-            open_fda_api_url = f'https://api.fda.gov/drug/label.json?search=brand_name.exact"{user_keyword}"+generic_name.exact"{user_keyword}"&limit={limit}'
+            open_fda_api_url = f'{OPENFDA_API_URL}/drug/label.json?search=brand_name.exact"{user_keyword}"+generic_name.exact"{user_keyword}"&limit={limit}'
         return open_fda_api_url
 
     @staticmethod
@@ -82,78 +128,57 @@ class Open_FDA:
             limit = 1000
 
         api_url = Open_FDA.open_fda_url_selection(user_keyword, keyword_domain, limit)
-        needed_column_names = {
-            'adverse_reactions',
-            'application_number',
-            'brand_name',
-            'clinical_pharmacology',
-            'clinical_studies',
-            'contraindications',
-            'description',
-            'dosage_and_administration',
-            'drug_interactions',
-            'generic_name',
-            'how_supplied',
-            'indications_and_usage',
-            'information_for_patients',
-            'is_original_packager',
-            'manufacturer_name',
-            'mechanism_of_action',
-            'pharm_class_cs',
-            'pharm_class_epc',
-            'pharm_class_moa',
-            'pharmacodynamics',
-            'pharmacokinetics',
-            'product_type',
-            'route',
-            'substance_name',
-            'upc',
-            'warnings',
-            'warnings_and_cautions',
-            'laboratory_tests',
-            'drug_interactions',
-            'precautions',
-            'adverse_reactions'
-            }       
-        
         for retry in range(max_retries):
             try:
                 timeout_occurred = False
-                response = requests.get(api_url, timeout=timeout)
+                with UPSTREAM_REQUEST_SECONDS.time(source="openfda", request="labels"):
+                    response = requests.get(api_url, timeout=timeout)
                 response.raise_for_status()
                 if response.status_code == 200:
                     data = response.json()
-                    api_data = []
-                    for current_data in data["results"]:
-                        api_unit_data = {}
-                        for key, value in current_data.items():
-                            if key == "openfda":
-                                for openfda_key, openfda_value in value.items():
-                                    if openfda_key in needed_column_names:
-                                        api_unit_data[openfda_key] = (
-                                            Filter_Parser_Data.clean_openfda_value(
-                                                openfda_value
-                                            )
-                                        )
-                            else:
-                                if key in needed_column_names:
-                                    api_unit_data[key] = (
-                                        Filter_Parser_Data.clean_openfda_value(value)
-                                    )
-                        api_data.append(api_unit_data)
-                    return api_data
+                    return [Open_FDA.extract_label_record(current_data) for current_data in data["results"]]
             except requests.exceptions.Timeout:
                 timeout_occurred = True
-                print(
-                    f"Request timed out (attempt {retry+1}/{max_retries}). Retrying..."
-                )
+                UPSTREAM_TIMEOUTS.inc(source="openfda")
+                if retry + 1 < max_retries:
+                    UPSTREAM_RETRIES.inc(source="openfda")
+                logger.warning("Request timed out (attempt %d/%d). Retrying...", retry + 1, max_retries)
             except requests.exceptions.RequestException as e:
-                print("Error:", e)
+                UPSTREAM_ERRORS.inc(source="openfda")
+                logger.error("Error: %s", e)
                 break
             if not timeout_occurred:
                 break
         return None
 
+    @staticmethod
+    def extract_label_record(current_data):
+        """
+        Extract the needed columns from one drug label result, flattening the openfda section.
+
+        Args:
+            current_data (dict): A drug label as returned by the API or the bulk download files.
+
+        Returns:
+            dict: The cleaned values of the needed columns.
+        """
+        api_unit_data = {}
+        for key, value in current_data.items():
+            if key == "openfda":
+                for openfda_key, openfda_value in value.items():
+                    if openfda_key in Open_FDA.needed_column_names:
+                        api_unit_data[openfda_key] = (
+                            Filter_Parser_Data.clean_openfda_value(
+                                openfda_value
+                            )
+                        )
+            else:
+                if key in Open_FDA.needed_column_names:
+                    api_unit_data[key] = (
+                        Filter_Parser_Data.clean_openfda_value(value)
+                    )
+        return api_unit_data
+
     @staticmethod
     def remove_column_headers_from_text(df):
         columns_to_clean = {
@@ -216,6 +241,19 @@ class Open_FDA:
             
         df = Open_FDA.remove_column_headers_from_text(df)
 
+        return Open_FDA.order_label_columns(df)
+
+    @staticmethod
+    def order_label_columns(df):
+        """
+        Drop labels without a brand or generic name and move the key columns to the front.
+
+        Args:
+            df (pd.DataFrame): Drug label data.
+
+        Returns:
+            pd.DataFrame: The filtered and reordered data.
+        """
         df = df.dropna(subset=['brand_name', 'generic_name'], how='all')
         # List the columns you want to move to the front
         columns_to_front = ['brand_name', 'generic_name', 'manufacturer_name', 'application_number', 'indications_and_usage']
@@ -224,3 +262,40 @@ class Open_FDA:
         df = df[columns_to_front + [col for col in df.columns if col not in columns_to_front]]
         
         return df
+
+    @staticmethod
+    def collapse_repackager_labels(df):
+        """
+        Collapse the labels of one product from different repackagers and NDCs into one row.
+
+        Labels are grouped by application_number and normalized generic_name. Each
+        group keeps one representative, preferring the original packager's label, plus
+        label_count (the number of labels collapsed) and manufacturers (the sorted
+        manufacturer names of the group). Labels without an application number are kept
+        as they are.
+
+        Args:
+            df (pd.DataFrame): Drug label data.
+
+        Returns:
+            pd.DataFrame: One row per product.
+        """
+        if df is None or df.empty:
+            return df
+        df = df.reset_index(drop=True)
+        application = df['application_number'].fillna('').astype(str).str.strip() if 'application_number' in df.columns else pd.Series('', index=df.index)
+        generic = df['generic_name'].fillna('').astype(str).str.casefold().str.split().str.join(' ') if 'generic_name' in df.columns else pd.Series('', index=df.index)
+        # Reason: labels without an application number cannot be attributed to a product, so each stays its own group
+        group = (application + '|' + generic).where(application != '', '#' + df.index.astype(str))
+
+        original = df['is_original_packager'].astype(str).str.lower() == 'true' if 'is_original_packager' in df.columns else pd.Series(False, index=df.index)
+        order = pd.DataFrame({'group': group, 'original': original}).sort_values(['group', 'original'], ascending=[True, False], kind='stable')
+        representatives = order.drop_duplicates('group')
+        rows = representatives.index.sort_values()
+
+        collapsed = df.loc[rows].copy()
+        collapsed['label_count'] = group.map(group.value_counts()).loc[rows].to_numpy()
+        if 'manufacturer_name' in df.columns:
+            manufacturers = df['manufacturer_name'].dropna().astype(str).groupby(group).agg(lambda names: sorted(set(names)))
+            collapsed['manufacturers'] = group.loc[rows].map(manufacturers).map(lambda names: names if isinstance(names, list) else []).to_numpy()
+        return collapsed.reset_index(drop=True)
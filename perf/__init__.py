@@ -0,0 +1,5 @@
+"""
+Performance tooling for the Clinical Trials & FDA Data Search App.
+Runs the app offline against recorded upstream responses so that benchmarks
+and load tests are repeatable and do not depend on live services.
+"""
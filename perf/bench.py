@@ -0,0 +1,322 @@
+"""
+Search pipeline benchmark for the Clinical Trials & FDA Data Search App.
+Times each stage of a clinical trials search (page decoding, normalization,
+date parsing, type conversion, record conversion and response encoding) at
+several scales, tracks each stage's peak memory, and compares the results
+with a stored baseline.
+
+Usage:
+    python -m perf.bench --scales 100,10000
+    python -m perf.bench --cassettes data/cassettes --update-baseline
+"""
+import argparse
+import copy
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.api.search import SearchResponse, safe_convert_types, safe_dataframe_to_dict
+from clinical_trials_module import convert_numeric_columns, normalize_study
+from perf.replay import CASSETTE_DIR
+from perf.synthetic_trials import synthetic_studies
+
+# Result and baseline location
+PROJECT_ROOT = Path(__file__).parent.parent
+BENCH_DIR = Path(os.getenv("BENCH_DIR", str(PROJECT_ROOT / "data" / "bench")))
+
+# Study counts benchmarked by default
+DEFAULT_SCALES = [100, 10_000, 100_000]
+
+# Studies per API page, as requested by fetch_studies
+PAGE_SIZE = 1000
+
+# Slowdown relative to the baseline reported as a regression, ignoring stages that got
+# slower by less than the timer noise
+REGRESSION_THRESHOLD = 1.2
+REGRESSION_MIN_SECONDS = 0.01
+
+# Stages of a search, in pipeline order
+STAGES = ["fetch", "normalize_study", "date_parsing", "safe_convert_types", "safe_dataframe_to_dict", "response_encoding"]
+
+
+def recorded_studies(cassette_dir: Path) -> List[Dict[str, Any]]:
+    """
+    Get the studies of the ClinicalTrials.gov pages recorded by perf.replay.
+
+    Args:
+        cassette_dir (Path): Cassette directory.
+
+    Returns:
+        List[Dict[str, Any]]: The recorded studies (empty if none were recorded).
+    """
+    studies = []
+    for path in sorted((Path(cassette_dir) / "ctgov").glob("*.json")):
+        with open(path, "r", encoding="utf-8") as f:
+            interaction = json.load(f)
+        if interaction["status"] == 200:
+            studies.extend(json.loads(interaction["body"]).get("studies", []))
+    return studies
+
+
+def scale_studies(templates: List[Dict[str, Any]], count: int) -> List[Dict[str, Any]]:
+    """
+    Repeat template studies up to a study count, giving each copy its own NCT id.
+
+    Args:
+        templates (List[Dict[str, Any]]): Studies to repeat.
+        count (int): Number of studies.
+
+    Returns:
+        List[Dict[str, Any]]: The studies.
+    """
+    studies = []
+    for i in range(count):
+        study = copy.deepcopy(templates[i % len(templates)])
+        study.setdefault("protocolSection", {}).setdefault("identificationModule", {})["nctId"] = f"NCT{i:08d}"
+        studies.append(study)
+    return studies
+
+
+def api_pages(studies: List[Dict[str, Any]], page_size: int = PAGE_SIZE) -> List[str]:
+    """
+    Serialize studies as the response bodies of the studies API.
+
+    Args:
+        studies (List[Dict[str, Any]]): The studies.
+        page_size (int): Studies per page.
+
+    Returns:
+        List[str]: One JSON body per page, linked by nextPageToken.
+    """
+    pages = []
+    for start in range(0, len(studies), page_size):
+        page = {"studies": studies[start:start + page_size]}
+        if start == 0:
+            page["totalCount"] = len(studies)
+        if start + page_size < len(studies):
+            page["nextPageToken"] = f"page-{start + page_size}"
+        pages.append(json.dumps(page))
+    return pages
+
+
+def pipeline_stages(pages: List[str]) -> List[Tuple[str, Callable[[Any], Any]]]:
+    """
+    Get the stages of a search, each taking the previous stage's output.
+
+    Args:
+        pages (List[str]): API response bodies, decoded by the fetch stage.
+
+    Returns:
+        List[Tuple[str, Callable[[Any], Any]]]: Stage names and functions, in STAGES order.
+    """
+    def fetch(_):
+        studies = []
+        for body in pages:
+            studies.extend(json.loads(body)["studies"])
+        return studies
+
+    def encode(records):
+        response = SearchResponse(clinical_trials=records, fda_data=[], total_clinical_trials=len(records), total_fda_data=0)
+        return JSONResponse(content=jsonable_encoder(response)).body
+
+    return [
+        ("fetch", fetch),
+        ("normalize_study", lambda studies: pd.DataFrame([normalize_study(study) for study in studies])),
+        ("date_parsing", convert_numeric_columns),
+        ("safe_convert_types", safe_convert_types),
+        ("safe_dataframe_to_dict", safe_dataframe_to_dict),
+        ("response_encoding", encode),
+    ]
+
+
+def run_pipeline(pages: List[str], trace_memory: bool = False) -> Dict[str, Dict[str, float]]:
+    """
+    Run the stages of a search once.
+
+    Args:
+        pages (List[str]): API response bodies.
+        trace_memory (bool): Measure each stage's peak memory instead of its time.
+
+    Returns:
+        Dict[str, Dict[str, float]]: Per stage, "seconds" or "peak_mb".
+    """
+    results = {}
+    value = None
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        for name, stage in pipeline_stages(pages):
+            if trace_memory:
+                tracemalloc.reset_peak()
+                baseline = tracemalloc.get_traced_memory()[0]
+            started = time.perf_counter()
+            value = stage(value)
+            elapsed = time.perf_counter() - started
+            if trace_memory:
+                results[name] = {"peak_mb": (tracemalloc.get_traced_memory()[1] - baseline) / 2**20}
+            else:
+                results[name] = {"seconds": elapsed}
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    return results
+
+
+def benchmark_scale(
+    count: int,
+    templates: Optional[List[Dict[str, Any]]] = None,
+    repeat: int = 1,
+    trace_memory: bool = True,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Benchmark the pipeline at one study count.
+
+    Args:
+        count (int): Number of studies.
+        templates (Optional[List[Dict[str, Any]]]): Studies repeated up to the count (synthetic studies when None).
+        repeat (int): Timed runs; each stage reports its median time.
+        trace_memory (bool): Add a run measuring each stage's peak memory.
+        seed (int): Seed of the synthetic studies.
+
+    Returns:
+        Dict[str, Any]: The study count, total seconds and per-stage results.
+    """
+    studies = scale_studies(templates, count) if templates else list(synthetic_studies(count, seed))
+    pages = api_pages(studies)
+    runs = [run_pipeline(pages) for _ in range(repeat)]
+    stages = {name: {"seconds": statistics.median(run[name]["seconds"] for run in runs)} for name in STAGES}
+    if trace_memory:
+        for name, memory in run_pipeline(pages, trace_memory=True).items():
+            stages[name].update(memory)
+    return {"studies": count, "seconds": sum(stage["seconds"] for stage in stages.values()), "stages": stages}
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float = REGRESSION_THRESHOLD) -> List[Dict[str, Any]]:
+    """
+    Compare benchmark results with a baseline.
+
+    Args:
+        results (Dict[str, Any]): Results of run_benchmarks.
+        baseline (Dict[str, Any]): Earlier results of run_benchmarks.
+        threshold (float): Time ratio above which a stage counts as a regression, if it also got
+            REGRESSION_MIN_SECONDS slower.
+
+    Returns:
+        List[Dict[str, Any]]: Per scale and stage present in both, the times, their ratio and
+        whether it is a regression.
+    """
+    rows = []
+    for scale, result in results["scales"].items():
+        previous = baseline.get("scales", {}).get(scale)
+        if previous is None:
+            continue
+        for name, stage in result["stages"].items():
+            before = previous["stages"].get(name, {}).get("seconds")
+            if not before:
+                continue
+            ratio = stage["seconds"] / before
+            regression = ratio > threshold and stage["seconds"] - before > REGRESSION_MIN_SECONDS
+            rows.append({"scale": scale, "stage": name, "baseline_seconds": before, "seconds": stage["seconds"],
+                         "ratio": ratio, "regression": regression})
+    return rows
+
+
+def run_benchmarks(
+    scales: List[int],
+    templates: Optional[List[Dict[str, Any]]] = None,
+    repeat: int = 1,
+    trace_memory: bool = True,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Benchmark the pipeline at several scales.
+
+    Args:
+        scales (List[int]): Study counts.
+        templates (Optional[List[Dict[str, Any]]]): Studies repeated up to each count (synthetic studies when None).
+        repeat (int): Timed runs per scale.
+        trace_memory (bool): Measure each stage's peak memory.
+        seed (int): Seed of the synthetic studies.
+
+    Returns:
+        Dict[str, Any]: Machine-readable results keyed by study count.
+    """
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "seed": seed,
+        "scales": {str(count): benchmark_scale(count, templates, repeat, trace_memory, seed) for count in scales},
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Run the benchmarks, save the results and compare them with the baseline.
+
+    Args:
+        argv (Optional[List[str]]): Command line arguments.
+
+    Returns:
+        int: Process exit code; 1 if a stage regressed against the baseline.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the stages of the clinical trials search pipeline.")
+    parser.add_argument("--scales", default=",".join(str(scale) for scale in DEFAULT_SCALES), help="Comma-separated study counts")
+    parser.add_argument("--repeat", type=int, default=1, help="Timed runs per scale")
+    parser.add_argument("--cassettes", type=Path, default=None,
+                        help=f"Use the studies recorded by perf.replay (e.g. {CASSETTE_DIR}) as templates")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic studies")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the peak memory run")
+    parser.add_argument("--output", type=Path, default=BENCH_DIR / "latest.json", help="Results file")
+    parser.add_argument("--baseline", type=Path, default=BENCH_DIR / "baseline.json", help="Baseline results file")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="Time ratio counted as a regression")
+    parser.add_argument("--update-baseline", action="store_true", help="Save the results as the new baseline")
+    args = parser.parse_args(argv)
+
+    templates = recorded_studies(args.cassettes) if args.cassettes else None
+    if args.cassettes and not templates:
+        print(f"No recorded ClinicalTrials.gov pages in {args.cassettes}")
+        return 2
+    results = run_benchmarks([int(scale) for scale in args.scales.split(",")], templates, args.repeat, not args.no_memory,
+                             args.seed)
+
+    print(f"{'studies':>8} {'stage':<24} {'seconds':>9} {'peak MB':>9}")
+    for scale, result in results["scales"].items():
+        for name, stage in result["stages"].items():
+            peak = f"{stage['peak_mb']:9.1f}" if "peak_mb" in stage else f"{'':>9}"
+            print(f"{scale:>8} {name:<24} {stage['seconds']:9.4f} {peak}")
+
+    regressions = []
+    if args.baseline.is_file():
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            results["comparison"] = compare(results, json.load(f), args.threshold)
+        regressions = [row for row in results["comparison"] if row["regression"]]
+        for row in regressions:
+            print(f"REGRESSION {row['scale']:>8} {row['stage']:<24} {row['baseline_seconds']:.4f}s -> {row['seconds']:.4f}s "
+                  f"({row['ratio']:.2f}x)")
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    if args.update_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({key: value for key, value in results.items() if key != "comparison"}, f, indent=2)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
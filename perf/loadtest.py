@@ -0,0 +1,378 @@
+"""
+Load test harness for the Clinical Trials & FDA Data Search App.
+Drives mixed /api/search and /api/chat traffic from concurrent virtual users
+against one app worker and reports throughput, latency percentiles and error
+rates per endpoint. By default the app runs in-process with the test auth
+override, the fake chat model and a replay stand-in serving synthetic
+upstream responses, so the run is offline and repeatable. Event loop lag and
+thread pool saturation are sampled inside the app's event loop.
+
+Usage:
+    python -m perf.loadtest --users 20 --duration 60 --chat-ratio 0.3
+    python -m perf.loadtest --url http://127.0.0.1:8000/api --token TOKEN --users 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import anyio.to_thread
+import httpx
+import numpy as np
+import uvicorn
+
+from perf.replay import Cassette, ReplaySettings, create_replay_app
+from perf.synthetic import write_cassette
+from perf.synthetic_labels import synthetic_labels
+from perf.synthetic_trials import synthetic_studies
+
+# Search terms of the generated traffic
+SEARCH_TERMS = ["diabetes", "asthma", "hypertension", "breast cancer", "depression"]
+
+# Chat questions: the first two are answered from templates, the rest go through the LLM agent
+CHAT_QUERIES = [
+    "How many trials are there by status?",
+    "Which countries have the most trials?",
+    "Which sponsors run studies with metformin in elderly patients?",
+    "Summarize the adverse reactions of the drugs in these labels",
+]
+
+# Studies and labels per search term in the generated upstream responses
+STUDIES_PER_TERM = 500
+LABELS_PER_TERM = 100
+
+# Rows of data sent with each chat request
+CHAT_ROWS = 200
+
+# Interval of the event loop lag probe, and the lag counted as a blocked loop
+LOOP_PROBE_INTERVAL = 0.01
+LOOP_BLOCKED_MS = 50.0
+
+
+class LoopMonitor:
+    """Samples event loop lag and thread pool load inside a running event loop."""
+
+    def __init__(self, interval: float = LOOP_PROBE_INTERVAL):
+        """
+        Create an idle monitor.
+
+        Args:
+            interval (float): Seconds between samples.
+        """
+        self.interval = interval
+        self.lags_ms: List[float] = []
+        self.queued: List[int] = []
+        self.threads: List[int] = []
+        self.max_workers: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Start sampling in the current event loop; used as an app startup handler."""
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        """Sample until cancelled."""
+        loop = asyncio.get_running_loop()
+        limiter = anyio.to_thread.current_default_thread_limiter()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.lags_ms.append(max(loop.time() - expected, 0.0) * 1000)
+            self.max_workers = int(limiter.total_tokens)
+            self.threads.append(limiter.borrowed_tokens)
+            self.queued.append(limiter.statistics().tasks_waiting)
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Summarize the samples.
+
+        Returns:
+            Dict[str, Any]: Loop lag percentiles, the share of samples with a blocked loop, and
+            the thread pool's size, most busy threads and backlog.
+        """
+        lags = np.asarray(self.lags_ms or [0.0])
+        return {
+            "loop_lag_ms": {"p50": float(np.percentile(lags, 50)), "p99": float(np.percentile(lags, 99)), "max": float(lags.max())},
+            "loop_blocked_ratio": float((lags > LOOP_BLOCKED_MS).mean()),
+            "threadpool_size": self.max_workers,
+            "threadpool_busy_max": max(self.threads, default=0),
+            "threadpool_queue_max": max(self.queued, default=0),
+            "threadpool_queue_mean": statistics.fmean(self.queued) if self.queued else 0.0,
+        }
+
+
+def _free_port() -> int:
+    """Get a free local TCP port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class BackgroundServer:
+    """An ASGI app served by uvicorn in a daemon thread."""
+
+    def __init__(self, app: Any, port: Optional[int] = None):
+        """
+        Start serving.
+
+        Args:
+            app (Any): The ASGI app.
+            port (Optional[int]): Port to listen on (a free one by default).
+        """
+        self.url = f"http://127.0.0.1:{port or _free_port()}"
+        self._server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=int(self.url.rsplit(":", 1)[1]),
+                                                     log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        while not self._server.started:
+            if not self._thread.is_alive():
+                raise RuntimeError(f"Server on {self.url} failed to start")
+            time.sleep(0.05)
+
+    def stop(self) -> None:
+        """Stop serving and wait for the thread to exit."""
+        self._server.should_exit = True
+        self._thread.join()
+
+
+def write_upstream_cassette(cassette: Cassette, terms: List[str], studies: int, labels: int, seed: int = 0) -> None:
+    """
+    Write synthetic upstream responses for every search term.
+
+    Args:
+        cassette (Cassette): Cassette to write to.
+        terms (List[str]): Search terms.
+        studies (int): Studies per term.
+        labels (int): Labels per term.
+        seed (int): Data set seed.
+    """
+    for term in terms:
+        write_cassette(cassette, term, studies, labels, seed)
+
+
+def chat_payload_data(rows: int = CHAT_ROWS, seed: int = 0) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Build the data sent with chat requests, as the frontend sends search results.
+
+    Args:
+        rows (int): Rows per dataset.
+        seed (int): Data set seed.
+
+    Returns:
+        Dict[str, List[Dict[str, Any]]]: clinical_trials_df and fda_df records.
+    """
+    import pandas as pd
+
+    from app.api.search import safe_convert_types, safe_dataframe_to_dict
+    from clinical_trials_module import convert_numeric_columns, normalize_study
+    from openfda import Open_FDA
+
+    trials = convert_numeric_columns(pd.DataFrame([normalize_study(study) for study in synthetic_studies(rows, seed)]))
+    trials = safe_dataframe_to_dict(safe_convert_types(trials))
+    labels = pd.DataFrame([Open_FDA.extract_label_record(label) for label in synthetic_labels(rows, seed)])
+    labels = safe_dataframe_to_dict(safe_convert_types(labels))
+    return {"clinical_trials_df": trials, "fda_df": labels}
+
+
+async def run_load(
+    base_url: str,
+    users: int,
+    duration: float,
+    chat_ratio: float,
+    chat_data: Dict[str, List[Dict[str, Any]]],
+    token: str = "load-test",
+    seed: int = 0,
+    timeout: float = 120.0,
+) -> List[Dict[str, Any]]:
+    """
+    Send traffic from concurrent virtual users until the duration has passed.
+
+    Each user sends one request at a time, picking a chat request with
+    probability chat_ratio and a search request otherwise.
+
+    Args:
+        base_url (str): API base URL, e.g. "http://127.0.0.1:8000/api".
+        users (int): Concurrent virtual users.
+        duration (float): Seconds to send requests for.
+        chat_ratio (float): Share of chat requests.
+        chat_data (Dict[str, List[Dict[str, Any]]]): Data sent with chat requests.
+        token (str): Bearer token.
+        seed (int): Seed of the traffic mix.
+        timeout (float): Request timeout in seconds.
+
+    Returns:
+        List[Dict[str, Any]]: One sample per request with its endpoint, start, latency, status and error.
+    """
+    samples = []
+    deadline = time.perf_counter() + duration
+    headers = {"Authorization": f"Bearer {token}"}
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+
+    async def user(number: int, client: httpx.AsyncClient) -> None:
+        rng = random.Random(f"{seed}:{number}")
+        while time.perf_counter() < deadline:
+            if rng.random() < chat_ratio:
+                endpoint, payload = "/chat", {"query": rng.choice(CHAT_QUERIES), **chat_data, "chat_history": []}
+            else:
+                endpoint, payload = "/search", {"keyword": rng.choice(SEARCH_TERMS), "searchType": "disease"}
+            started = time.perf_counter()
+            status, error = None, None
+            try:
+                response = await client.post(f"{base_url}{endpoint}", json=payload, headers=headers)
+                status = response.status_code
+                if status >= 400:
+                    error = f"HTTP {status}"
+            except httpx.HTTPError as e:
+                error = type(e).__name__
+            samples.append({"endpoint": endpoint, "started": started, "latency": time.perf_counter() - started,
+                            "status": status, "error": error})
+
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        await asyncio.gather(*(user(number, client) for number in range(users)))
+    return samples
+
+
+def summarize(samples: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Summarize request samples per endpoint.
+
+    Args:
+        samples (List[Dict[str, Any]]): Samples from run_load.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Per endpoint, the request count, throughput, latency
+        percentiles in milliseconds, error rate and errors by kind.
+    """
+    report = {}
+    for endpoint in sorted({sample["endpoint"] for sample in samples}):
+        selected = [sample for sample in samples if sample["endpoint"] == endpoint]
+        latencies = np.asarray([sample["latency"] for sample in selected]) * 1000
+        elapsed = max(s["started"] + s["latency"] for s in selected) - min(s["started"] for s in selected)
+        errors = [sample["error"] for sample in selected if sample["error"]]
+        report[endpoint] = {
+            "requests": len(selected),
+            "throughput_rps": len(selected) / elapsed if elapsed > 0 else 0.0,
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+            "p99_ms": float(np.percentile(latencies, 99)),
+            "error_rate": len(errors) / len(selected),
+            "errors": {kind: errors.count(kind) for kind in sorted(set(errors))},
+        }
+    return report
+
+
+def run_in_process(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Run the load test against the app served in this process.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments.
+
+    Returns:
+        Dict[str, Any]: The endpoint and event loop report.
+    """
+    os.environ["CHAT_LLM_BACKEND"] = "fake"
+    os.environ["FAKE_LLM_LATENCY_MS"] = str(args.llm_latency_ms)
+    import clinical_trials_module
+    import openfda
+    from app.agents import llm
+    from app.api.auth import get_current_user
+    from app.main import app
+    from app.models.user import User
+    from app.utils.log import configure_logging
+
+    # Reason: per-request records would swamp the report
+    configure_logging(level=args.log_level)
+
+    llm.CHAT_LLM_BACKEND = "fake"
+    llm.FAKE_LLM_LATENCY_MS = args.llm_latency_ms
+    upstream_urls = clinical_trials_module.CLINICAL_TRIALS_API_URL, openfda.OPENFDA_API_URL
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cassette = Cassette(args.cassettes or tmp)
+        if args.cassettes is None:
+            write_upstream_cassette(cassette, SEARCH_TERMS, args.studies, args.labels, args.seed)
+        upstream = BackgroundServer(create_replay_app(cassette, "replay", ReplaySettings(latency_scale=args.upstream_latency_scale,
+                                                                                          seed=args.seed)))
+        clinical_trials_module.CLINICAL_TRIALS_API_URL = f"{upstream.url}/ctgov"
+        openfda.OPENFDA_API_URL = f"{upstream.url}/openfda"
+
+        monitor = LoopMonitor()
+        app.router.on_startup.append(monitor.start)
+        app.dependency_overrides[get_current_user] = lambda: User(id="load-test", email="load-test@example.com")
+        chat_data = chat_payload_data(args.chat_rows, args.seed)
+        server = BackgroundServer(app)
+        try:
+            samples = asyncio.run(run_load(f"{server.url}/api", args.users, args.duration, args.chat_ratio, chat_data,
+                                           seed=args.seed))
+        finally:
+            server.stop()
+            upstream.stop()
+            app.router.on_startup.remove(monitor.start)
+            app.dependency_overrides.pop(get_current_user, None)
+            clinical_trials_module.CLINICAL_TRIALS_API_URL, openfda.OPENFDA_API_URL = upstream_urls
+    return {"endpoints": summarize(samples), "server": monitor.report()}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Run the load test and print its report.
+
+    Args:
+        argv (Optional[List[str]]): Command line arguments.
+
+    Returns:
+        int: Process exit code.
+    """
+    parser = argparse.ArgumentParser(description="Load test /api/search and /api/chat with mixed traffic.")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to send requests for")
+    parser.add_argument("--chat-ratio", type=float, default=0.3, help="Share of chat requests")
+    parser.add_argument("--chat-rows", type=int, default=CHAT_ROWS, help="Rows per dataset sent with chat requests")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the data and the traffic mix")
+    parser.add_argument("--url", default=None, help="API base URL of a running server (default: serve the app in-process)")
+    parser.add_argument("--token", default="load-test", help="Bearer token sent to a running server")
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0, help="Latency of the fake chat model")
+    parser.add_argument("--cassettes", type=Path, default=None, help="Upstream recordings (default: synthetic responses)")
+    parser.add_argument("--studies", type=int, default=STUDIES_PER_TERM, help="Synthetic studies per search term")
+    parser.add_argument("--labels", type=int, default=LABELS_PER_TERM, help="Synthetic labels per search term")
+    parser.add_argument("--upstream-latency-scale", type=float, default=1.0, help="Multiplier of upstream latencies")
+    parser.add_argument("--log-level", default="WARNING", help="Log level of the in-process app")
+    parser.add_argument("--output", type=Path, default=None, help="Write the report as JSON")
+    args = parser.parse_args(argv)
+
+    if args.url:
+        samples = asyncio.run(run_load(args.url.rstrip("/"), args.users, args.duration, args.chat_ratio,
+                                       chat_payload_data(args.chat_rows, args.seed), args.token, args.seed))
+        report = {"endpoints": summarize(samples), "server": None}
+    else:
+        report = run_in_process(args)
+
+    print(f"{'endpoint':<10} {'requests':>8} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for endpoint, stats in report["endpoints"].items():
+        print(f"{endpoint:<10} {stats['requests']:>8} {stats['throughput_rps']:>8.2f} {stats['p50_ms']:>9.0f} "
+              f"{stats['p95_ms']:>9.0f} {stats['p99_ms']:>9.0f} {stats['error_rate']:>7.1%}")
+    if report["server"] is not None:
+        server = report["server"]
+        print(f"event loop lag p50/p99/max: {server['loop_lag_ms']['p50']:.1f}/{server['loop_lag_ms']['p99']:.1f}/"
+              f"{server['loop_lag_ms']['max']:.1f} ms, blocked {server['loop_blocked_ratio']:.1%} of the time")
+        print(f"thread pool: {server['threadpool_busy_max']}/{server['threadpool_size']} threads busy at most, "
+              f"queue max {server['threadpool_queue_max']}, mean {server['threadpool_queue_mean']:.1f}")
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,288 @@
+"""
+Record/replay stand-in for the upstream services of the Clinical Trials & FDA Data Search App.
+In record mode the server proxies ClinicalTrials.gov, openFDA and Supabase and
+saves each response to a cassette directory. In replay mode it answers from
+the cassettes with the recorded latency (or a configured one), jitter and
+injected errors. Pointing CLINICAL_TRIALS_API_URL, OPENFDA_API_URL and
+SUPABASE_URL at the server runs the app offline under realistic timing.
+
+Usage:
+    python -m perf.replay record --cassettes data/cassettes
+    python -m perf.replay replay --cassettes data/cassettes --jitter-ms 50 --error-rate 0.01
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request, Response
+from pydantic import BaseModel, Field
+
+# Cassette location and server address
+PROJECT_ROOT = Path(__file__).parent.parent
+CASSETTE_DIR = Path(os.getenv("CASSETTE_DIR", str(PROJECT_ROOT / "data" / "cassettes")))
+REPLAY_HOST = os.getenv("REPLAY_HOST", "127.0.0.1")
+REPLAY_PORT = int(os.getenv("REPLAY_PORT", "8001"))
+
+# Upstream base URLs by service, served under /<service> by the stand-in
+UPSTREAMS = {
+    "ctgov": "https://clinicaltrials.gov/api/v2",
+    "openfda": "https://api.fda.gov",
+    "supabase": os.getenv("SUPABASE_URL", "https://sgtguuqbuqtpwmfknovr.supabase.co"),
+}
+
+# App settings naming each service's base URL
+SERVICE_ENV_VARS = {
+    "ctgov": "CLINICAL_TRIALS_API_URL",
+    "openfda": "OPENFDA_API_URL",
+    "supabase": "SUPABASE_URL",
+}
+
+# Request headers forwarded upstream while recording
+FORWARDED_HEADERS = ("authorization", "apikey", "content-type", "accept")
+
+# Response headers kept in cassettes; encoding and length no longer hold for the decoded body
+KEPT_HEADERS = ("content-type", "retry-after")
+
+
+class ReplaySettings(BaseModel):
+    """Timing and fault injection of replayed responses."""
+    latency_ms: Optional[float] = Field(None, ge=0)  # None replays each response's recorded latency
+    latency_scale: float = Field(1.0, ge=0)  # Multiplies recorded latencies
+    jitter_ms: float = Field(0.0, ge=0)  # Uniform +/- jitter added to every response
+    error_rate: float = Field(0.0, ge=0, le=1)  # Fraction of requests answered with error_status
+    error_status: int = 503
+    seed: Optional[int] = None
+
+
+class Interaction(BaseModel):
+    """A recorded upstream response."""
+    service: str
+    method: str
+    path: str
+    query: List[Tuple[str, str]]
+    status: int
+    headers: Dict[str, str] = {}
+    body: str
+    elapsed_ms: float
+
+
+def interaction_key(service: str, method: str, path: str, query: List[Tuple[str, str]]) -> str:
+    """
+    Get the cassette key of a request.
+
+    Args:
+        service (str): Service name, a key of UPSTREAMS.
+        method (str): HTTP method.
+        path (str): Path below the service's base URL.
+        query (List[Tuple[str, str]]): Query parameters.
+
+    Returns:
+        str: A hash of the method, path and sorted query parameters.
+    """
+    text = json.dumps([service, method.upper(), path.strip("/"), sorted(query)])
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """Recorded interactions, one JSON file per request key under a service directory."""
+
+    def __init__(self, root: Path = CASSETTE_DIR):
+        """
+        Open a cassette directory.
+
+        Args:
+            root (Path): Directory holding the recordings.
+        """
+        self.root = Path(root)
+
+    def _path(self, service: str, key: str) -> Path:
+        """Get the file of a recorded interaction."""
+        return self.root / service / f"{key}.json"
+
+    def save(self, interaction: Interaction) -> None:
+        """
+        Save an interaction, replacing an earlier recording of the same request.
+
+        Args:
+            interaction (Interaction): The recorded response.
+        """
+        key = interaction_key(interaction.service, interaction.method, interaction.path, interaction.query)
+        path = self._path(interaction.service, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(interaction.model_dump_json())
+        os.replace(tmp_path, path)
+
+    def load(self, service: str, method: str, path: str, query: List[Tuple[str, str]]) -> Optional[Interaction]:
+        """
+        Load the recording of a request.
+
+        Args:
+            service (str): Service name.
+            method (str): HTTP method.
+            path (str): Path below the service's base URL.
+            query (List[Tuple[str, str]]): Query parameters.
+
+        Returns:
+            Optional[Interaction]: The recording, or None if the request was not recorded.
+        """
+        try:
+            with open(self._path(service, interaction_key(service, method, path, query)), "r", encoding="utf-8") as f:
+                return Interaction.model_validate(json.load(f))
+        except OSError:
+            return None
+
+
+def offline_environment(base_url: str) -> Dict[str, str]:
+    """
+    Get the app settings that route every upstream service through a stand-in.
+
+    Args:
+        base_url (str): Address of the stand-in, e.g. "http://127.0.0.1:8001".
+
+    Returns:
+        Dict[str, str]: Environment variables mapped to the service URLs of the stand-in.
+    """
+    base_url = base_url.rstrip("/")
+    return {variable: f"{base_url}/{service}" for service, variable in SERVICE_ENV_VARS.items()}
+
+
+def create_replay_app(
+    cassette: Cassette,
+    mode: str = "replay",
+    settings: Optional[ReplaySettings] = None,
+    upstreams: Optional[Dict[str, str]] = None,
+    client: Optional[httpx.AsyncClient] = None,
+) -> FastAPI:
+    """
+    Create the stand-in server.
+
+    Args:
+        cassette (Cassette): Where recordings are saved to and replayed from.
+        mode (str): 'record' proxies upstream and saves responses, 'replay' answers from the cassette.
+        settings (Optional[ReplaySettings]): Timing and fault injection of replayed responses.
+        upstreams (Optional[Dict[str, str]]): Upstream base URLs by service (defaults to UPSTREAMS).
+        client (Optional[httpx.AsyncClient]): HTTP client used while recording.
+
+    Returns:
+        FastAPI: The server application.
+
+    Raises:
+        ValueError: If the mode is unknown.
+    """
+    if mode not in ("record", "replay"):
+        raise ValueError(f"Unknown mode '{mode}'; use 'record' or 'replay'")
+    settings = settings or ReplaySettings()
+    upstreams = upstreams or UPSTREAMS
+    rng = random.Random(settings.seed)
+    app = FastAPI(title="Upstream record/replay stand-in")
+
+    async def record(service: str, path: str, query: List[Tuple[str, str]], request: Request) -> Interaction:
+        """Forward a request upstream and save the response."""
+        headers = {name: value for name, value in request.headers.items() if name in FORWARDED_HEADERS}
+        http = client or httpx.AsyncClient(timeout=60)
+        try:
+            started = time.perf_counter()
+            response = await http.request(request.method, f"{upstreams[service]}/{path}", params=query,
+                                          headers=headers, content=await request.body())
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        finally:
+            if client is None:
+                await http.aclose()
+        interaction = Interaction(
+            service=service,
+            method=request.method,
+            path=path,
+            query=query,
+            status=response.status_code,
+            headers={name: value for name, value in response.headers.items() if name in KEPT_HEADERS},
+            body=response.text,
+            elapsed_ms=elapsed_ms,
+        )
+        cassette.save(interaction)
+        return interaction
+
+    def delay_seconds(interaction: Optional[Interaction]) -> float:
+        """Get the delay of a replayed response."""
+        if settings.latency_ms is not None:
+            latency = settings.latency_ms
+        else:
+            latency = interaction.elapsed_ms * settings.latency_scale if interaction is not None else 0.0
+        latency += rng.uniform(-settings.jitter_ms, settings.jitter_ms)
+        return max(latency, 0.0) / 1000
+
+    @app.api_route("/{service}/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE"])
+    async def handle(service: str, path: str, request: Request) -> Response:
+        if service not in upstreams:
+            return Response(json.dumps({"error": f"Unknown service '{service}'"}), status_code=404,
+                            media_type="application/json")
+        query = parse_qsl(request.url.query, keep_blank_values=True)
+        if mode == "record":
+            interaction = await record(service, path, query, request)
+            return Response(interaction.body, status_code=interaction.status, headers=interaction.headers)
+
+        interaction = cassette.load(service, request.method, path, query)
+        await asyncio.sleep(delay_seconds(interaction))
+        if rng.random() < settings.error_rate:
+            return Response(json.dumps({"error": "Injected upstream error"}), status_code=settings.error_status,
+                            media_type="application/json", headers={"Retry-After": "1"})
+        if interaction is None:
+            return Response(json.dumps({"error": f"No recording of {request.method} /{service}/{path}"}),
+                            status_code=404, media_type="application/json")
+        return Response(interaction.body, status_code=interaction.status, headers=interaction.headers)
+
+    return app
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Run the stand-in server.
+
+    Args:
+        argv (Optional[List[str]]): Command line arguments.
+
+    Returns:
+        int: Process exit code.
+    """
+    parser = argparse.ArgumentParser(description="Record or replay ClinicalTrials.gov, openFDA and Supabase responses.")
+    parser.add_argument("mode", choices=["record", "replay"], help="Proxy and record upstream, or replay recordings")
+    parser.add_argument("--cassettes", type=Path, default=CASSETTE_DIR, help="Directory of the recordings")
+    parser.add_argument("--host", default=REPLAY_HOST, help="Address to listen on")
+    parser.add_argument("--port", type=int, default=REPLAY_PORT, help="Port to listen on")
+    parser.add_argument("--latency-ms", type=float, default=None, help="Fixed latency instead of the recorded one")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiplier of recorded latencies")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform +/- jitter per response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with an error")
+    parser.add_argument("--error-status", type=int, default=503, help="Status of injected errors")
+    parser.add_argument("--seed", type=int, default=None, help="Seed of the jitter and error injection")
+    args = parser.parse_args(argv)
+
+    settings = ReplaySettings(
+        latency_ms=args.latency_ms,
+        latency_scale=args.latency_scale,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        seed=args.seed,
+    )
+    app = create_replay_app(Cassette(args.cassettes), args.mode, settings)
+    print(f"Serving {args.mode} stand-in; start the app with:")
+    for variable, url in offline_environment(f"http://{args.host}:{args.port}").items():
+        print(f"  {variable}={url}")
+    uvicorn.run(app, host=args.host, port=args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
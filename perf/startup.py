@@ -0,0 +1,126 @@
+"""
+Startup time check for the Clinical Trials & FDA Data Search App.
+Imports the app in fresh interpreters, as a worker does when it boots, and
+reports the import time and the modules taking the longest to import. Fails
+when the import exceeds the time budget or pulls in a dependency that is
+only needed by the chat agent, which is imported on the first chat request.
+
+Usage:
+    python -m perf.startup
+    python -m perf.startup --runs 5 --budget 2.5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+# Seconds a cold import of the app may take
+IMPORT_TIME_BUDGET = float(os.getenv("IMPORT_TIME_BUDGET", "5.0"))
+
+# Packages imported lazily by the chat agent, which must not load at startup
+DEFERRED_MODULES = ("langchain_core", "langgraph", "langchain_openai", "openai")
+
+
+def parse_importtime(text: str) -> List[Tuple[str, int, int, int]]:
+    """
+    Parse the report of python -X importtime.
+
+    Args:
+        text (str): The interpreter's stderr.
+
+    Returns:
+        List[Tuple[str, int, int, int]]: Module, own and cumulative microseconds, and nesting depth, per import.
+    """
+    imports = []
+    for line in text.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        imports.append((name.strip(), int(own), int(cumulative), depth))
+    return imports
+
+
+def measure_import(module: str = "app.main") -> Dict[str, Any]:
+    """
+    Import a module in a fresh interpreter.
+
+    Args:
+        module (str): Module to import.
+
+    Returns:
+        Dict[str, Any]: Import 'seconds', the loaded 'modules' and the parsed 'imports'.
+
+    Raises:
+        RuntimeError: If the import fails.
+    """
+    code = f"import sys, json, {module}; print(json.dumps(sorted(sys.modules)))"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=PROJECT_ROOT,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    imports = parse_importtime(result.stderr)
+    seconds = next(cumulative for name, _, cumulative, depth in imports if name == module and depth == 0) / 1e6
+    return {"seconds": seconds, "modules": json.loads(result.stdout.splitlines()[-1]), "imports": imports}
+
+
+def deferred_loaded(modules: List[str], deferred: Tuple[str, ...] = DEFERRED_MODULES) -> List[str]:
+    """
+    Get the deferred packages among loaded modules.
+
+    Args:
+        modules (List[str]): Loaded module names.
+        deferred (Tuple[str, ...]): Packages that must not be loaded.
+
+    Returns:
+        List[str]: The deferred packages that were loaded.
+    """
+    loaded = set(modules)
+    return [package for package in deferred if package in loaded]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Measure the app's cold import time and check it against the budget.
+
+    Args:
+        argv (Optional[List[str]]): Command line arguments.
+
+    Returns:
+        int: Process exit code; 1 if the import is over budget or loads a deferred package.
+    """
+    parser = argparse.ArgumentParser(description="Check the cold import time of the app.")
+    parser.add_argument("--module", default="app.main", help="Module imported by a worker at boot")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters to time; the median is reported")
+    parser.add_argument("--budget", type=float, default=IMPORT_TIME_BUDGET, help="Seconds the import may take")
+    parser.add_argument("--top", type=int, default=15, help="Slowest imported packages to list")
+    args = parser.parse_args(argv)
+
+    runs = sorted((measure_import(args.module) for _ in range(args.runs)), key=lambda run: run["seconds"])
+    median = runs[len(runs) // 2]
+    seconds = statistics.median(run["seconds"] for run in runs)
+
+    print(f"{'cumulative s':>12} {'own s':>8} package")
+    top_level = [entry for entry in median["imports"] if entry[3] == 1]
+    for name, own, cumulative, _ in sorted(top_level, key=lambda entry: entry[2], reverse=True)[:args.top]:
+        print(f"{cumulative / 1e6:12.3f} {own / 1e6:8.3f} {name}")
+    print(f"import {args.module}: {seconds:.3f}s (median of {len(runs)}, budget {args.budget:.3f}s)")
+
+    failed = False
+    if seconds > args.budget:
+        print(f"OVER BUDGET by {seconds - args.budget:.3f}s")
+        failed = True
+    for package in deferred_loaded(median["modules"]):
+        print(f"DEFERRED PACKAGE IMPORTED AT STARTUP: {package}")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""
+Synthetic data generator for scale testing the Clinical Trials & FDA Data Search App.
+Generates ClinicalTrials.gov v2 studies and openFDA drug labels with realistic
+value distributions (statuses, phases, multi-country sites, long eligibility
+criteria and label sections) at any scale. Every record is derived from the
+seed and its position alone, so output is reproducible and any slice can be
+generated without the records before it. Studies come from
+perf.synthetic_trials and labels from perf.synthetic_labels; this module
+writes them as replay cassettes and bulk layouts.
+
+Usage:
+    python -m perf.synthetic cassette data/cassettes --term diabetes --studies 100000 --labels 1000
+    python -m perf.synthetic ct-export data/ctg-studies.json.zip --count 500000
+    python -m perf.synthetic fda-bulk data/fda-bulk --count 200000
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import List, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+from openfda import Open_FDA
+from perf.replay import Cassette, Interaction
+from perf.synthetic_labels import LABELS_PER_FILE, OPENFDA_MAX_LIMIT, label_response, synthetic_labels, write_fda_bulk
+from perf.synthetic_trials import PAGE_SIZE, study_pages, write_ct_export
+
+# Upstream latencies recorded with generated responses
+CT_PAGE_LATENCY_MS = 900.0
+OPENFDA_LATENCY_MS = 400.0
+
+
+def write_cassette(
+    cassette: Cassette,
+    term: str,
+    studies: int,
+    labels: int,
+    seed: int = 0,
+    page_size: int = PAGE_SIZE,
+) -> None:
+    """
+    Write generated responses to a cassette, as perf.replay would record a search for a term.
+
+    The ClinicalTrials.gov pages answer fetch_studies for the term without a
+    result limit, and the openFDA responses answer a disease-domain
+    Open_FDA.open_fda_main for the term.
+
+    Args:
+        cassette (Cassette): Cassette to write to.
+        term (str): Search term.
+        studies (int): Number of matching studies.
+        labels (int): Number of matching labels.
+        seed (int): Data set seed.
+        page_size (int): Studies per page.
+    """
+    query = [("query.term", term), ("pageSize", str(page_size)), ("countTotal", "true")]
+    token = None
+    for page in study_pages(studies, seed, page_size, condition=term):
+        cassette.save(Interaction(service="ctgov", method="GET", path="studies",
+                                  query=query + ([("pageToken", token)] if token else []), status=200,
+                                  headers={"content-type": "application/json"}, body=json.dumps(page),
+                                  elapsed_ms=CT_PAGE_LATENCY_MS))
+        token = page.get("nextPageToken")
+
+    generated = list(synthetic_labels(min(labels, OPENFDA_MAX_LIMIT), seed, condition=term))
+    for limit in (1, min(labels, OPENFDA_MAX_LIMIT)):
+        url = Open_FDA.open_fda_url_selection(term, "disease", limit)
+        found = labels > 0
+        body = label_response(generated[:limit], labels) if found else {"error": {"code": "NOT_FOUND", "message": "No matches found!"}}
+        cassette.save(Interaction(service="openfda", method="GET", path=urlsplit(url).path, query=parse_qsl(urlsplit(url).query),
+                                  status=200 if found else 404, headers={"content-type": "application/json"},
+                                  body=json.dumps(body), elapsed_ms=OPENFDA_LATENCY_MS))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Write synthetic data sets.
+
+    Args:
+        argv (Optional[List[str]]): Command line arguments.
+
+    Returns:
+        int: Process exit code.
+    """
+    parser = argparse.ArgumentParser(description="Generate synthetic ClinicalTrials.gov studies and openFDA drug labels.")
+    parser.add_argument("--seed", type=int, default=0, help="Data set seed")
+    commands = parser.add_subparsers(dest="command", required=True)
+    cassette = commands.add_parser("cassette", help="Write a search's API responses for perf.replay")
+    cassette.add_argument("cassettes", type=Path, help="Cassette directory")
+    cassette.add_argument("--term", required=True, help="Search term")
+    cassette.add_argument("--studies", type=int, default=10000, help="Number of matching studies")
+    cassette.add_argument("--labels", type=int, default=1000, help="Number of matching labels")
+    export = commands.add_parser("ct-export", help="Write a ClinicalTrials.gov bulk export zip")
+    export.add_argument("path", type=Path, help="Zip file to write")
+    export.add_argument("--count", type=int, required=True, help="Number of studies")
+    bulk = commands.add_parser("fda-bulk", help="Write openFDA drug label bulk download files")
+    bulk.add_argument("directory", type=Path, help="Directory to write to")
+    bulk.add_argument("--count", type=int, required=True, help="Number of labels")
+    bulk.add_argument("--labels-per-file", type=int, default=LABELS_PER_FILE, help="Labels per file")
+    args = parser.parse_args(argv)
+
+    if args.command == "cassette":
+        write_cassette(Cassette(args.cassettes), args.term, args.studies, args.labels, args.seed)
+        print(f"Wrote {args.studies} studies and {args.labels} labels for '{args.term}' to {args.cassettes}")
+    elif args.command == "ct-export":
+        write_ct_export(args.path, args.count, args.seed)
+        print(f"Wrote {args.count} studies to {args.path}")
+    else:
+        paths = write_fda_bulk(args.directory, args.count, args.seed, args.labels_per_file)
+        print(f"Wrote {args.count} labels to {len(paths)} files in {args.directory}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
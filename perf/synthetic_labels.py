@@ -0,0 +1,137 @@
+"""
+Synthetic openFDA drug labels for scale testing.
+Generates label records with long sections whose text repeats across the
+repackagers of a product, as API responses or bulk download files.
+"""
+import json
+import random
+import zipfile
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from perf.synthetic_values import CONDITIONS, DRUGS, LABEL_SENTENCES, MANUFACTURERS, choose, draw_date, fill
+
+# Most labels returned by one openFDA request
+OPENFDA_MAX_LIMIT = 1000
+
+# Labels per bulk download file
+LABELS_PER_FILE = 20000
+
+# Repackagers, the manufacturers of most labels of a product
+REPACKAGERS = ["Bryant Ranch Prepack", "A-S Medication Solutions", "Proficient Rx LP", "NuCare Pharmaceuticals, Inc.",
+               "Preferred Pharmaceuticals Inc.", "Direct_Rx", "REMEDYREPACK INC.", "PD-Rx Pharmaceuticals, Inc."]
+
+# Label sections with their (min, max) sentence counts
+LABEL_SECTIONS = {
+    "indications_and_usage": (1, 6), "dosage_and_administration": (3, 25), "contraindications": (1, 8),
+    "warnings_and_cautions": (5, 60), "adverse_reactions": (10, 150), "drug_interactions": (3, 40),
+    "clinical_pharmacology": (5, 50), "mechanism_of_action": (1, 6), "pharmacokinetics": (5, 40),
+    "clinical_studies": (5, 80), "how_supplied": (1, 6), "information_for_patients": (2, 20), "description": (2, 10),
+}
+
+
+def synthetic_label(index: int, seed: int = 0, products: Optional[int] = None, condition: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Generate one openFDA drug label.
+
+    Labels of the same product share its names, application number and
+    section texts, and most of them come from repackagers, as on openFDA.
+
+    Args:
+        index (int): Position of the label.
+        seed (int): Data set seed.
+        products (Optional[int]): Number of distinct products labels are drawn from (one per label when None).
+        condition (Optional[str]): Condition named in every label's indications (drawn per product when None).
+
+    Returns:
+        Dict[str, Any]: Drug label JSON as returned by the label API and the bulk download files.
+    """
+    rng = random.Random(f"{seed}:label:{index}")
+    product = rng.randrange(products) if products else index
+    product_rng = random.Random(f"{seed}:product:{product}")
+    generic, brand, route, product_type = product_rng.choice(DRUGS)
+    condition = condition or choose(product_rng, CONDITIONS)
+    names = {"brand": brand, "generic": generic.lower(), "condition": condition}
+    label = {
+        section: [" ".join(fill(product_rng, product_rng.choice(LABEL_SENTENCES), **names)
+                           for _ in range(product_rng.randint(low, high)))]
+        for section, (low, high) in LABEL_SECTIONS.items()
+    }
+    application = f"{product_rng.choice(['NDA', 'ANDA', 'ANDA', 'BLA'])}{200000 + product:06d}"
+    original = rng.random() < 0.3
+    label.update({
+        "effective_time": draw_date(rng, date(2010, 1, 1), 15 * 365)[1].replace("-", ""),
+        "set_id": f"{seed:08x}-{index:012x}",
+        "openfda": {
+            "brand_name": [brand if original or rng.random() < 0.5 else generic],
+            "generic_name": [generic],
+            "substance_name": [generic.split(" ")[0]],
+            "manufacturer_name": [product_rng.choice(MANUFACTURERS) if original else rng.choice(REPACKAGERS)],
+            "application_number": [application],
+            "product_type": [product_type],
+            "route": [route],
+            "is_original_packager": [original],
+            "upc": [f"{rng.randrange(10**11, 10**12)}"],
+        },
+    })
+    return label
+
+
+def synthetic_labels(count: int, seed: int = 0, products: Optional[int] = None, condition: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Generate consecutive drug labels.
+
+    Args:
+        count (int): Number of labels.
+        seed (int): Data set seed.
+        products (Optional[int]): Number of distinct products (a quarter of the labels when None).
+        condition (Optional[str]): Condition named in every label's indications.
+
+    Yields:
+        Dict[str, Any]: Drug label JSON.
+    """
+    products = products or max(1, count // 4)
+    for index in range(count):
+        yield synthetic_label(index, seed, products, condition)
+
+
+def label_response(labels: List[Dict[str, Any]], total: int) -> Dict[str, Any]:
+    """
+    Wrap labels as a response of the label API.
+
+    Args:
+        labels (List[Dict[str, Any]]): The returned labels.
+        total (int): Number of matching labels, reported in meta.results.total.
+
+    Returns:
+        Dict[str, Any]: The response JSON.
+    """
+    return {"meta": {"results": {"skip": 0, "limit": len(labels), "total": total}}, "results": labels}
+
+
+def write_fda_bulk(directory: Path, count: int, seed: int = 0, labels_per_file: int = LABELS_PER_FILE) -> List[Path]:
+    """
+    Write labels as openFDA drug label bulk download files.
+
+    Args:
+        directory (Path): Directory to write to.
+        count (int): Number of labels.
+        seed (int): Data set seed.
+        labels_per_file (int): Labels per file.
+
+    Returns:
+        List[Path]: The drug-label-NNNN-of-NNNN.json.zip files.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    labels = synthetic_labels(count, seed)
+    files = max(1, -(-count // labels_per_file))
+    paths = []
+    for number in range(1, files + 1):
+        name = f"drug-label-{number:04d}-of-{files:04d}.json"
+        results = [next(labels) for _ in range(min(labels_per_file, count - (number - 1) * labels_per_file))]
+        with zipfile.ZipFile(directory / f"{name}.zip", "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr(name, json.dumps({"meta": {"results": {"total": count}}, "results": results}))
+        paths.append(directory / f"{name}.zip")
+    return paths
@@ -0,0 +1,252 @@
+"""
+Synthetic ClinicalTrials.gov studies for scale testing.
+Generates v2 study records with realistic statuses, phases, multi-country
+sites and long eligibility criteria, as API response pages or a bulk export.
+"""
+import json
+import random
+import zipfile
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from perf.synthetic_values import CONDITIONS, DRUGS, LABEL_SENTENCES, MANUFACTURERS, choose, draw_date, fill
+
+# Studies per API page, as requested by fetch_studies
+PAGE_SIZE = 1000
+
+# Value distributions, as (value, weight) pairs
+STATUSES = [
+    ("COMPLETED", 45), ("RECRUITING", 15), ("UNKNOWN", 12), ("ACTIVE_NOT_RECRUITING", 7), ("TERMINATED", 6),
+    ("NOT_YET_RECRUITING", 5), ("WITHDRAWN", 3), ("ENROLLING_BY_INVITATION", 2), ("SUSPENDED", 1),
+]
+STUDY_TYPES = [("INTERVENTIONAL", 77), ("OBSERVATIONAL", 22), ("EXPANDED_ACCESS", 1)]
+PHASES = [
+    (["NA"], 25), (["PHASE2"], 20), (["PHASE1"], 15), (["PHASE3"], 14), (["PHASE4"], 12),
+    (["PHASE1", "PHASE2"], 7), (["PHASE2", "PHASE3"], 4), (["EARLY_PHASE1"], 3),
+]
+SPONSOR_CLASSES = [("OTHER", 70), ("INDUSTRY", 22), ("NIH", 3), ("OTHER_GOV", 3), ("NETWORK", 1), ("FED", 1)]
+SEXES = [("ALL", 85), ("FEMALE", 10), ("MALE", 5)]
+INTERVENTION_TYPES = [
+    ("DRUG", 55), ("BIOLOGICAL", 8), ("BEHAVIORAL", 12), ("DEVICE", 10), ("PROCEDURE", 10), ("OTHER", 5),
+]
+COUNTRIES = [
+    ("United States", 40), ("China", 10), ("France", 6), ("Canada", 5), ("United Kingdom", 5), ("Germany", 5),
+    ("Italy", 4), ("Spain", 4), ("Japan", 3), ("Korea, Republic of", 3), ("Egypt", 3), ("Netherlands", 2),
+    ("Brazil", 2), ("Australia", 2), ("India", 2), ("Denmark", 1), ("Belgium", 1), ("Israel", 1), ("Poland", 1),
+]
+CITIES = {
+    "United States": [("Boston", "Massachusetts"), ("Houston", "Texas"), ("New York", "New York"),
+                      ("Los Angeles", "California"), ("Chicago", "Illinois"), ("Rochester", "Minnesota")],
+    "China": [("Beijing", "Beijing"), ("Shanghai", "Shanghai"), ("Guangzhou", "Guangdong")],
+    "Canada": [("Toronto", "Ontario"), ("Montreal", "Quebec"), ("Vancouver", "British Columbia")],
+    "Australia": [("Sydney", "New South Wales"), ("Melbourne", "Victoria")],
+    "India": [("Mumbai", "Maharashtra"), ("New Delhi", "Delhi")],
+}
+OTHER_CITIES = ["Capital City", "University Town", "Port City", "Riverside"]
+FACILITY_SUFFIXES = ["University Hospital", "Medical Center", "Cancer Institute", "Research Site", "Clinic"]
+
+# Sentence pools of the eligibility criteria
+INCLUSION_CRITERIA = [
+    "Age {low} to {high} years at the time of screening", "Diagnosis of {condition} confirmed at least {n} months before screening",
+    "HbA1c between {low}.0% and {high}.5%", "Body mass index between {low} and {high} kg/m2",
+    "Eastern Cooperative Oncology Group performance status of 0 or 1", "Adequate bone marrow, renal and hepatic function",
+    "Stable dose of background therapy for at least {n} weeks", "Able to provide written informed consent",
+    "Women of childbearing potential must use effective contraception for {n} months after the last dose",
+    "At least one measurable lesion per RECIST version 1.1",
+]
+EXCLUSION_CRITERIA = [
+    "Pregnant or breastfeeding women", "Estimated glomerular filtration rate below {low} mL/min/1.73 m2",
+    "History of malignancy within the past {n} years, except adequately treated basal cell carcinoma",
+    "Participation in another interventional study within {n} days", "Known hypersensitivity to {drug} or its excipients",
+    "Active hepatitis B or C infection", "Myocardial infarction or stroke within {n} months before screening",
+    "Uncontrolled hypertension (systolic blood pressure above {high}0 mmHg)", "Current alcohol or drug abuse",
+    "Any condition that, in the opinion of the investigator, would interfere with study participation",
+]
+
+
+def _locations(rng: random.Random) -> List[Dict[str, str]]:
+    """Draw study sites: usually one, with a long tail of large multi-country trials."""
+    count = min(int(rng.paretovariate(1.1)), 500)
+    home = choose(rng, COUNTRIES)
+    locations = []
+    for _ in range(count):
+        country = home if rng.random() < 0.6 else choose(rng, COUNTRIES)
+        city, state = rng.choice(CITIES.get(country, [(rng.choice(OTHER_CITIES), None)]))
+        location = {"facility": f"{city} {rng.choice(FACILITY_SUFFIXES)}", "status": "RECRUITING", "city": city,
+                    "country": country}
+        if state is not None:
+            location["state"] = state
+        locations.append(location)
+    return locations
+
+
+def _criteria(rng: random.Random, condition: str, drug: str) -> str:
+    """Draw eligibility criteria text of realistic, long-tailed length."""
+    inclusion = [fill(rng, rng.choice(INCLUSION_CRITERIA), condition=condition, drug=drug)
+                 for _ in range(min(int(rng.lognormvariate(1.8, 0.6)) + 1, 40))]
+    exclusion = [fill(rng, rng.choice(EXCLUSION_CRITERIA), condition=condition, drug=drug)
+                 for _ in range(min(int(rng.lognormvariate(2.2, 0.7)) + 1, 80))]
+    return ("Inclusion Criteria:\n\n" + "\n".join(f"* {line}" for line in inclusion)
+            + "\n\nExclusion Criteria:\n\n" + "\n".join(f"* {line}" for line in exclusion))
+
+
+def synthetic_study(index: int, seed: int = 0, condition: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Generate one ClinicalTrials.gov v2 study.
+
+    Args:
+        index (int): Position of the study; it determines the NCT id and, with the seed, every value.
+        seed (int): Data set seed.
+        condition (Optional[str]): Primary condition of the study (drawn when None).
+
+    Returns:
+        Dict[str, Any]: Study JSON as returned by the studies API and the bulk export.
+    """
+    rng = random.Random(f"{seed}:study:{index}")
+    condition = condition or choose(rng, CONDITIONS)
+    conditions = [condition] + [choose(rng, CONDITIONS) for _ in range(rng.choice([0, 0, 0, 1, 2]))]
+    study_type = choose(rng, STUDY_TYPES)
+    status = choose(rng, STATUSES)
+    sponsor_class = choose(rng, SPONSOR_CLASSES)
+    sponsor = rng.choice(MANUFACTURERS) if sponsor_class == "INDUSTRY" else f"{rng.choice(OTHER_CITIES)} {rng.choice(FACILITY_SUFFIXES)}"
+
+    interventions = []
+    for _ in range(rng.choice([1, 1, 2, 2, 3])):
+        kind = choose(rng, INTERVENTION_TYPES)
+        name = rng.choice(DRUGS)[rng.choice([0, 1])].title() if kind in ("DRUG", "BIOLOGICAL") else f"{kind.title()} Program"
+        interventions.append({"type": kind, "name": name, "description": fill(rng, "{n} mg once daily for {low} weeks")})
+    if study_type == "INTERVENTIONAL" and rng.random() < 0.3:
+        interventions.append({"type": "DRUG", "name": "Placebo", "description": "Matching placebo"})
+    drug = interventions[0]["name"]
+    arms = [{"label": f"{intervention['name']} Arm", "interventionNames": [f"{intervention['type'].title()}: {intervention['name']}"]}
+            for intervention in interventions]
+
+    submitted, submitted_text = draw_date(rng, date(2000, 1, 1), 26 * 365)
+    started, started_text = draw_date(rng, submitted, 365, month_only=rng.random() < 0.4)
+    completed, completed_text = draw_date(rng, started, 6 * 365, month_only=rng.random() < 0.5)
+    _, posted_text = draw_date(rng, submitted, 30)
+    _, updated_text = draw_date(rng, submitted, 8 * 365)
+    minimum_age = rng.choice(["18 Years", "18 Years", "18 Years", "12 Years", "6 Months", "65 Years", "21 Years", None])
+    maximum_age = rng.choice(["75 Years", "65 Years", "80 Years", "17 Years", None, None, None])
+
+    protocol = {
+        "identificationModule": {
+            "nctId": f"NCT{index + 1:08d}",
+            "organization": {"fullName": sponsor, "class": sponsor_class},
+            "briefTitle": f"{drug} in {condition}",
+            "officialTitle": f"A {study_type.title()} Study of {drug} in Patients With {condition} ({index})",
+        },
+        "statusModule": {
+            "statusVerifiedDate": updated_text[:7],
+            "overallStatus": status,
+            "expandedAccessInfo": {"hasExpandedAccess": study_type == "EXPANDED_ACCESS"},
+            "startDateStruct": {"date": started_text},
+            "completionDateStruct": {"date": completed_text, "type": "ACTUAL" if status == "COMPLETED" else "ESTIMATED"},
+            "studyFirstSubmitDate": submitted_text,
+            "studyFirstPostDateStruct": {"date": posted_text},
+            "lastUpdatePostDateStruct": {"date": updated_text, "type": "ACTUAL"},
+        },
+        "sponsorCollaboratorsModule": {
+            "responsibleParty": {"oldNameTitle": rng.choice(["Principal Investigator", "Sponsor", None])},
+            "leadSponsor": {"name": sponsor, "class": sponsor_class},
+            "collaborators": [{"name": rng.choice(MANUFACTURERS), "class": "INDUSTRY"} for _ in range(rng.choice([0, 0, 1, 2]))],
+        },
+        "descriptionModule": {
+            "briefSummary": " ".join(fill(rng, rng.choice(LABEL_SENTENCES), brand=drug, generic=drug, condition=condition)
+                                     for _ in range(rng.randint(2, 8))),
+            "detailedDescription": " ".join(fill(rng, rng.choice(LABEL_SENTENCES), brand=drug, generic=drug, condition=condition)
+                                            for _ in range(int(rng.lognormvariate(2.5, 1.0)))),
+        },
+        "conditionsModule": {"conditions": list(dict.fromkeys(conditions))},
+        "designModule": {
+            "studyType": study_type,
+            "phases": choose(rng, PHASES) if study_type == "INTERVENTIONAL" else [],
+            "designInfo": {
+                "allocation": rng.choice(["RANDOMIZED", "RANDOMIZED", "NON_RANDOMIZED", "NA"]),
+                "interventionModel": rng.choice(["PARALLEL", "PARALLEL", "SINGLE_GROUP", "CROSSOVER"]),
+                "primaryPurpose": rng.choice(["TREATMENT", "TREATMENT", "PREVENTION", "SUPPORTIVE_CARE", "DIAGNOSTIC"]),
+                "maskingInfo": {"masking": rng.choice(["NONE", "DOUBLE", "QUADRUPLE", "SINGLE"]),
+                                "whoMasked": rng.sample(["PARTICIPANT", "INVESTIGATOR", "OUTCOMES_ASSESSOR"], rng.randint(0, 2))},
+            },
+            "enrollmentInfo": {"count": int(rng.lognormvariate(4.2, 1.3)), "type": "ACTUAL" if status == "COMPLETED" else "ESTIMATED"},
+        },
+        "armsInterventionsModule": {"armGroups": arms, "interventions": interventions},
+        "outcomesModule": {
+            "primaryOutcomes": [{"measure": f"Change in {condition} severity score at week {rng.randint(4, 104)}"}
+                                for _ in range(rng.randint(1, 3))],
+            "secondaryOutcomes": [{"measure": f"Incidence of adverse events through week {rng.randint(4, 104)}"}
+                                  for _ in range(rng.randint(0, 12))],
+        },
+        "eligibilityModule": {
+            "eligibilityCriteria": _criteria(rng, condition, drug),
+            "healthyVolunteers": rng.random() < 0.1,
+            "sex": choose(rng, SEXES),
+            "stdAges": ["ADULT", "OLDER_ADULT"] if maximum_age is None else ["ADULT"],
+        },
+        "contactsLocationsModule": {"locations": _locations(rng)},
+    }
+    if minimum_age is not None:
+        protocol["eligibilityModule"]["minimumAge"] = minimum_age
+    if maximum_age is not None:
+        protocol["eligibilityModule"]["maximumAge"] = maximum_age
+    return {"protocolSection": protocol, "hasResults": status == "COMPLETED" and rng.random() < 0.4}
+
+
+def synthetic_studies(count: int, seed: int = 0, start: int = 0, condition: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Generate consecutive studies.
+
+    Args:
+        count (int): Number of studies.
+        seed (int): Data set seed.
+        start (int): Index of the first study.
+        condition (Optional[str]): Primary condition of every study (drawn when None).
+
+    Yields:
+        Dict[str, Any]: Study JSON.
+    """
+    for index in range(start, start + count):
+        yield synthetic_study(index, seed, condition)
+
+
+def study_pages(count: int, seed: int = 0, page_size: int = PAGE_SIZE, condition: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Generate studies as the response pages of the studies API.
+
+    Args:
+        count (int): Number of studies.
+        seed (int): Data set seed.
+        page_size (int): Studies per page.
+        condition (Optional[str]): Primary condition of every study.
+
+    Yields:
+        Dict[str, Any]: Pages linked by nextPageToken; the first carries totalCount.
+    """
+    for start in range(0, max(count, 1), page_size):
+        page = {"studies": list(synthetic_studies(min(page_size, count - start), seed, start, condition))}
+        if start == 0:
+            page["totalCount"] = count
+        if start + page_size < count:
+            page["nextPageToken"] = f"{seed}-{start + page_size}"
+        yield page
+
+
+def write_ct_export(path: Path, count: int, seed: int = 0) -> Path:
+    """
+    Write studies as a ClinicalTrials.gov bulk export zip, one JSON file per study.
+
+    Args:
+        path (Path): Zip file to write, e.g. ctg-studies.json.zip.
+        count (int): Number of studies.
+        seed (int): Data set seed.
+
+    Returns:
+        Path: The zip file.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for study in synthetic_studies(count, seed):
+            archive.writestr(f"{study['protocolSection']['identificationModule']['nctId']}.json", json.dumps(study))
+    return path
@@ -0,0 +1,76 @@
+"""
+Shared value pools of the synthetic data generator.
+Conditions, drugs, manufacturers and label sentences used by both the
+synthetic studies and the synthetic drug labels, and the helpers that draw
+from them.
+"""
+import random
+from datetime import date, timedelta
+from typing import Any, List, Tuple
+
+# Conditions, as (value, weight) pairs
+CONDITIONS = [
+    ("Type 2 Diabetes Mellitus", 8), ("Breast Cancer", 7), ("Hypertension", 6), ("Asthma", 5), ("COVID-19", 5),
+    ("Obesity", 5), ("Depression", 5), ("HIV Infections", 4), ("Heart Failure", 4), ("Non-small Cell Lung Cancer", 4),
+    ("Rheumatoid Arthritis", 3), ("Alzheimer Disease", 3), ("Chronic Kidney Disease", 3), ("Stroke", 3),
+    ("Multiple Sclerosis", 2), ("Psoriasis", 2), ("Hepatitis C", 2), ("Parkinson Disease", 2), ("Migraine", 2),
+]
+
+# Drugs as (generic name, brand name, route, product type)
+DRUGS = [
+    ("METFORMIN HYDROCHLORIDE", "GLUCOPHAGE", "ORAL", "HUMAN PRESCRIPTION DRUG"),
+    ("SITAGLIPTIN", "JANUVIA", "ORAL", "HUMAN PRESCRIPTION DRUG"),
+    ("ATORVASTATIN CALCIUM", "LIPITOR", "ORAL", "HUMAN PRESCRIPTION DRUG"),
+    ("LISINOPRIL", "ZESTRIL", "ORAL", "HUMAN PRESCRIPTION DRUG"),
+    ("AMLODIPINE BESYLATE", "NORVASC", "ORAL", "HUMAN PRESCRIPTION DRUG"),
+    ("SERTRALINE HYDROCHLORIDE", "ZOLOFT", "ORAL", "HUMAN PRESCRIPTION DRUG"),
+    ("ALBUTEROL SULFATE", "PROVENTIL", "RESPIRATORY (INHALATION)", "HUMAN PRESCRIPTION DRUG"),
+    ("PEMBROLIZUMAB", "KEYTRUDA", "INTRAVENOUS", "HUMAN PRESCRIPTION DRUG"),
+    ("TRASTUZUMAB", "HERCEPTIN", "INTRAVENOUS", "HUMAN PRESCRIPTION DRUG"),
+    ("ADALIMUMAB", "HUMIRA", "SUBCUTANEOUS", "HUMAN PRESCRIPTION DRUG"),
+    ("INSULIN GLARGINE", "LANTUS", "SUBCUTANEOUS", "HUMAN PRESCRIPTION DRUG"),
+    ("SEMAGLUTIDE", "OZEMPIC", "SUBCUTANEOUS", "HUMAN PRESCRIPTION DRUG"),
+    ("ACETAMINOPHEN", "TYLENOL", "ORAL", "HUMAN OTC DRUG"),
+    ("IBUPROFEN", "ADVIL", "ORAL", "HUMAN OTC DRUG"),
+    ("OMEPRAZOLE", "PRILOSEC", "ORAL", "HUMAN OTC DRUG"),
+    ("TENOFOVIR DISOPROXIL FUMARATE", "VIREAD", "ORAL", "HUMAN PRESCRIPTION DRUG"),
+    ("SOFOSBUVIR", "SOVALDI", "ORAL", "HUMAN PRESCRIPTION DRUG"),
+    ("DONEPEZIL HYDROCHLORIDE", "ARICEPT", "ORAL", "HUMAN PRESCRIPTION DRUG"),
+    ("SUMATRIPTAN", "IMITREX", "ORAL", "HUMAN PRESCRIPTION DRUG"),
+    ("METHOTREXATE", "TREXALL", "ORAL", "HUMAN PRESCRIPTION DRUG"),
+]
+MANUFACTURERS = ["Merck Sharp & Dohme LLC", "Pfizer Laboratories Div Pfizer Inc", "Teva Pharmaceuticals USA, Inc.",
+                 "Sandoz Inc", "Mylan Pharmaceuticals Inc.", "Aurobindo Pharma Limited", "Genentech, Inc.",
+                 "Zydus Pharmaceuticals USA Inc.", "Dr. Reddy's Laboratories Limited", "Eli Lilly and Company"]
+
+# Sentences of descriptions and label sections
+LABEL_SENTENCES = [
+    "{brand} ({generic}) is indicated for the treatment of {condition} in adults.",
+    "The most common adverse reactions (incidence of at least {n}%) were nausea, diarrhea, headache and fatigue.",
+    "Monitor renal function before initiating {brand} and at least annually thereafter.",
+    "In clinical trials, {n} patients received {generic} for a median duration of {low} weeks.",
+    "Discontinue {brand} if signs of hypersensitivity occur and institute appropriate therapy.",
+    "Coadministration with strong CYP3A4 inhibitors increased {generic} exposure by {n}-fold.",
+    "The recommended starting dose is {n} mg once daily, adjusted in {low} mg increments.",
+    "Use in pregnancy only if the potential benefit justifies the potential risk to the fetus.",
+    "Elimination half-life is approximately {n} hours; steady state is reached within {low} days.",
+    "Store at 20 to 25 degrees C; excursions permitted between 15 and 30 degrees C.",
+]
+
+
+def choose(rng: random.Random, weighted: List[Tuple[Any, float]]) -> Any:
+    """Draw one value of a (value, weight) list."""
+    values, weights = zip(*weighted)
+    return rng.choices(values, weights)[0]
+
+
+def fill(rng: random.Random, template: str, **names: str) -> str:
+    """Fill a sentence template with random numbers and the given names."""
+    low = rng.randint(1, 60)
+    return template.format(low=low, high=low + rng.randint(5, 40), n=rng.randint(2, 24), **names)
+
+
+def draw_date(rng: random.Random, start: date, days: int, month_only: bool = False) -> Tuple[date, str]:
+    """Draw a date up to a number of days after another, with its API formatting."""
+    value = start + timedelta(days=rng.randint(0, max(days, 0)))
+    return value, value.strftime("%Y-%m" if month_only else "%Y-%m-%d")